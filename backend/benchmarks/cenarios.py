@@ -0,0 +1,63 @@
+"""Cenários dos benchmarks: endpoints mais usados do painel
+
+Cada cenário recebe o contexto (token, dados de apoio) e o índice da
+requisição e devolve (método, caminho, corpo JSON, status esperado).
+"""
+from benchmarks.dados import ADMIN_CPF, ADMIN_SENHA, NOMES, SOBRENOMES, TIPOS_MUDANCA
+
+def login(contexto, indice):
+    return "POST", "/api/auth/login", {"cpf": ADMIN_CPF, "password": ADMIN_SENHA}, 200
+
+def orcamentos_listar(contexto, indice):
+    return "GET", f"/api/orcamentos/?page={indice % 20 + 1}&per_page=20", None, 200
+
+def orcamentos_criar(contexto, indice):
+    return "POST", "/api/orcamentos/", {
+        "cliente_nome": f"{NOMES[indice % len(NOMES)]} {SOBRENOMES[indice % len(SOBRENOMES)]}",
+        "cliente_email": f"bench{indice}@exemplo.com.br",
+        "cliente_telefone": f"(11) 98{indice % 1000:03d}-{indice % 10000:04d}",
+        "tipo_mudanca": TIPOS_MUDANCA[indice % len(TIPOS_MUDANCA)],
+        "data_mudanca": "2026-12-15T08:00:00",
+        "valor_total": 4500 + indice % 500,
+        "desconto": 150
+    }, 201
+
+def dashboard_metricas(contexto, indice):
+    return "GET", "/api/dashboard/metricas", None, 200
+
+def dashboard_atividades(contexto, indice):
+    return "GET", "/api/dashboard/atividades-recentes", None, 200
+
+def clientes_busca(contexto, indice):
+    termos = SOBRENOMES + ["cliente1", "(11) 9"]
+    return "GET", f"/api/clientes/?busca={termos[indice % len(termos)]}&per_page=20", None, 200
+
+def documentos_contrato(contexto, indice):
+    # Número diferente a cada requisição: mede a renderização (cache MISS), não o cache
+    return "POST", "/api/documentos/gerar-contrato", {
+        "numero": f"BENCH-{contexto['execucao']}-{indice:06d}",
+        "cliente": {
+            "nome": "Maria Souza Lima",
+            "cpf_cnpj": "123.456.789-09",
+            "telefone": "(11) 98765-4321",
+            "email": "maria@exemplo.com.br",
+            "endereco_origem": "Rua Augusta, 1500 - São Paulo/SP"
+        },
+        "servico": {
+            "tipo": "Residencial",
+            "data_mudanca": "15/12/2026",
+            "endereco_origem": "Rua Augusta, 1500 - São Paulo/SP",
+            "endereco_destino": "Av. Paulista, 900 - São Paulo/SP",
+            "valor": 4850.0
+        }
+    }, 200
+
+CENARIOS = {
+    "login": login,
+    "orcamentos_listar": orcamentos_listar,
+    "orcamentos_criar": orcamentos_criar,
+    "dashboard_metricas": dashboard_metricas,
+    "dashboard_atividades": dashboard_atividades,
+    "clientes_busca": clientes_busca,
+    "documentos_contrato": documentos_contrato
+}
@@ -0,0 +1,186 @@
+"""Carga de dados realista e reproduzível (semente fixa) para os benchmarks"""
+import random
+from datetime import datetime, timedelta
+from pymongo import InsertOne
+from src.models.financeiro import FinanceiroRollup
+from src.models.user import User
+from src.services.contatos import campos_normalizados
+from src.services.dedupe_clientes import chaves_bloqueio
+
+ADMIN_CPF = "00000000191"
+ADMIN_SENHA = "123456"
+
+# Volumes por escala
+ESCALAS = {
+    "pequena": {"usuarios": 10, "clientes": 2000, "orcamentos": 5000, "atividades": 10000, "transacoes": 5000},
+    "media": {"usuarios": 30, "clientes": 20000, "orcamentos": 50000, "atividades": 100000, "transacoes": 50000},
+    "grande": {"usuarios": 100, "clientes": 100000, "orcamentos": 300000, "atividades": 500000, "transacoes": 200000}
+}
+
+NOMES = ["Ana", "João", "Maria", "Pedro", "Lucas", "Carla", "Bruno", "Fernanda", "Rafael", "Juliana",
+         "Marcos", "Patrícia", "Thiago", "Camila", "Gustavo", "Aline", "Felipe", "Larissa", "Rodrigo", "Beatriz"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Lima", "Costa", "Pereira", "Almeida", "Ferreira",
+              "Ribeiro", "Gomes", "Martins", "Carvalho", "Rocha", "Barbosa", "Araújo", "Mendes", "Nunes"]
+EMPRESAS = [None, None, None, "Tech Ltda", "Comercial Paulista", "Grupo Horizonte", "Alfa Engenharia"]
+BAIRROS = ["Moema", "Pinheiros", "Tatuapé", "Santana", "Vila Mariana", "Butantã", "Mooca", "Lapa"]
+TIPOS_MUDANCA = ["residencial", "comercial", "interestadual"]
+STATUS_ORCAMENTO = ["pendente"] * 4 + ["aprovado"] * 3 + ["rejeitado"]
+STATUS_CLIENTE = ["novo", "em_negociacao", "fechado", "Perdido"]
+ACOES = ["login", "create_orcamento", "update_orcamento", "logout", "view_cliente"]
+CATEGORIAS = {"receita": ["mudanca", "guarda_moveis", "embalagem"], "despesa": ["combustivel", "salarios", "aluguel"]}
+
+def _inserir(colecao, documentos, lote=5000):
+    """Inserir em lotes (bulk_write não ordenado) sem manter tudo em memória"""
+    operacoes = []
+    total = 0
+    for documento in documentos:
+        operacoes.append(InsertOne(documento))
+        if len(operacoes) >= lote:
+            total += colecao.bulk_write(operacoes, ordered=False).inserted_count
+            operacoes = []
+    if operacoes:
+        total += colecao.bulk_write(operacoes, ordered=False).inserted_count
+    return total
+
+def _nome(rng):
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+def _telefone(rng):
+    return f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+
+def _cpf(numero):
+    digitos = f"{numero:011d}"
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+def _endereco(rng):
+    return f"Rua {rng.choice(SOBRENOMES)}, {rng.randint(1, 2000)} - {rng.choice(BAIRROS)}, São Paulo/SP"
+
+def semear(db, escala="media", semente=42):
+    """Apagar e recriar as coleções usadas pelos cenários; retorna o volume criado por coleção
+
+    `db` precisa ser o mesmo banco de `get_db()` (os rollups financeiros são
+    reconstruídos pelo próprio modelo).
+    """
+    volumes = ESCALAS[escala]
+    rng = random.Random(semente)
+    agora = datetime.utcnow()
+
+    for colecao in ("users", "clientes", "orcamentos", "user_activities", "financeiro",
+                    "financeiro_rollups", "documentos_cache"):
+        db[colecao].delete_many({})
+
+    usuarios = [{
+        "cpf": ADMIN_CPF,
+        "name": "Administrador VIP",
+        "role": "admin",
+        "email": "admin@vipmudancas.com.br",
+        "password": User().set_password(ADMIN_SENHA),
+        "active": True,
+        "created_at": agora
+    }]
+    for indice in range(volumes["usuarios"]):
+        usuarios.append({
+            "cpf": f"{90000000000 + indice}",
+            "name": _nome(rng),
+            "role": "vendedor",
+            "email": f"vendedor{indice}@vipmudancas.com.br",
+            "password": usuarios[0]["password"],
+            "active": True,
+            "created_at": agora
+        })
+    ids_usuarios = db.users.insert_many(usuarios).inserted_ids
+    vendedores = list(zip(ids_usuarios, [usuario["name"] for usuario in usuarios]))
+
+    def clientes():
+        for indice in range(volumes["clientes"]):
+            criado = agora - timedelta(minutes=rng.randint(0, 60 * 24 * 730))
+            cliente = {
+                "nome": _nome(rng),
+                "email": f"cliente{indice}@exemplo.com.br",
+                "telefone": _telefone(rng),
+                "cpf_cnpj": _cpf(10000000000 + indice * 37),
+                "endereco": {"logradouro": _endereco(rng)},
+                "status": rng.choice(STATUS_CLIENTE),
+                "fonte": rng.choice(["Site/Instagram", "ManyChat Bot", "Indicação", "Manual"]),
+                "empresa": rng.choice(EMPRESAS),
+                "observacoes": "",
+                "ativo": rng.random() > 0.05,
+                "data_criacao": criado,
+                "data_atualizacao": criado
+            }
+            cliente.update(campos_normalizados("clientes", cliente))
+            cliente["chaves_bloqueio"] = chaves_bloqueio(cliente)
+            yield cliente
+
+    def orcamentos():
+        for indice in range(volumes["orcamentos"]):
+            vendedor_id, vendedor_nome = rng.choice(vendedores)
+            criado = agora - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            valor_total = round(rng.uniform(800, 25000), 2)
+            desconto = round(valor_total * rng.choice([0, 0, 0.05, 0.1]), 2)
+            orcamento = {
+                "numero_orcamento": f"ORC-BENCH-{indice:08d}",
+                "cliente_nome": _nome(rng),
+                "cliente_email": f"cliente{rng.randint(0, volumes['clientes'] - 1)}@exemplo.com.br",
+                "cliente_telefone": _telefone(rng),
+                "endereco_origem": {"logradouro": _endereco(rng)},
+                "endereco_destino": {"logradouro": _endereco(rng)},
+                "tipo_mudanca": rng.choice(TIPOS_MUDANCA),
+                "data_mudanca": criado + timedelta(days=rng.randint(5, 60)),
+                "data_visita": criado + timedelta(days=rng.randint(1, 4)),
+                "itens": [{"descricao": "Caixa", "quantidade": rng.randint(5, 80)}],
+                "servicos_adicionais": rng.sample(["embalagem", "montagem", "guarda_moveis"], rng.randint(0, 2)),
+                "valor_total": valor_total,
+                "desconto": desconto,
+                "valor_final": valor_total - desconto,
+                "observacoes": "",
+                "status": rng.choice(STATUS_ORCAMENTO),
+                "validade": criado + timedelta(days=30),
+                "vendedor_id": str(vendedor_id),
+                "vendedor_nome": vendedor_nome,
+                "data_criacao": criado,
+                "data_atualizacao": criado
+            }
+            orcamento.update(campos_normalizados("orcamentos", orcamento))
+            yield orcamento
+
+    def atividades():
+        for _ in range(volumes["atividades"]):
+            vendedor_id, _nome_vendedor = rng.choice(vendedores)
+            acao = rng.choice(ACOES)
+            yield {
+                "user_id": str(vendedor_id),
+                "action": acao,
+                "description": f"Atividade {acao}",
+                "timestamp": agora - timedelta(seconds=rng.randint(0, 86400 * 90)),
+                "ip_address": None,
+                "user_agent": None,
+                "additional_data": {}
+            }
+
+    def transacoes():
+        for _ in range(volumes["transacoes"]):
+            tipo = "receita" if rng.random() < 0.6 else "despesa"
+            data = agora - timedelta(days=rng.randint(0, 365))
+            yield {
+                "tipo": tipo,
+                "categoria": rng.choice(CATEGORIAS[tipo]),
+                "descricao": f"Lançamento de {tipo}",
+                "valor": round(rng.uniform(100, 15000), 2),
+                "status": rng.choice(["pago", "pago", "pendente"]),
+                "data": data,
+                "competencia": data.strftime("%Y-%m"),
+                "data_vencimento": data,
+                "data_criacao": data,
+                "data_atualizacao": data
+            }
+
+    volume = {
+        "usuarios": len(ids_usuarios),
+        "clientes": _inserir(db.clientes, clientes()),
+        "orcamentos": _inserir(db.orcamentos, orcamentos()),
+        "user_activities": _inserir(db.user_activities, atividades()),
+        "financeiro": _inserir(db.financeiro, transacoes())
+    }
+    FinanceiroRollup.reconstruir()
+    return volume
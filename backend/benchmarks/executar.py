@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Benchmarks de carga da API: sobe mongod + API, carrega dados e mede os endpoints principais
+
+Cada cenário roda com concorrência fixa depois de um aquecimento. O
+resultado (p50/p95/p99, média e vazão) é gravado em JSON e comparado com a
+linha de base: se algum cenário piorar além da tolerância, o processo
+termina com código 1.
+
+Uso:
+    python benchmarks/executar.py --salvar-baseline          # gerar a linha de base (máquina de referência)
+    python benchmarks/executar.py                            # medir e comparar com benchmarks/baseline.json
+    python benchmarks/executar.py --escala pequena --cenarios login,clientes_busca
+    python benchmarks/executar.py --mongodb-uri mongodb://localhost:27017   # mongod já em execução
+
+Requer `mongod` no PATH (ou --mongod) quando --mongodb-uri não é informado.
+O banco de benchmark (--banco) é apagado e recriado a cada execução.
+
+Linha de base: números só são comparáveis na mesma máquina, então nenhum
+baseline.json é versionado. Na integração contínua a linha de base é gerada
+no próprio runner, medindo antes a revisão de referência (em um git worktree
+temporário, com a mesma carga):
+
+    python benchmarks/executar.py --baseline-ref origin/main --exigir-baseline
+
+Com --exigir-baseline, a ausência de linha de base comparável termina com
+código 2 em vez de passar em silêncio.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from pymongo import MongoClient
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from benchmarks import dados
+from benchmarks.cenarios import CENARIOS
+from src import database
+
+BASELINE_PADRAO = os.path.join(BACKEND, "benchmarks", "baseline.json")
+SAIDA_PADRAO = os.path.join(BACKEND, "benchmarks", "resultados", "ultimo.json")
+
+def _porta_livre():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _aguardar(verificar, timeout, descricao):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            if verificar():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Tempo esgotado aguardando {descricao}")
+
+def iniciar_mongod(binario):
+    """mongod temporário (diretório de dados descartável); retorna (processo, uri, diretório)"""
+    if not shutil.which(binario):
+        raise RuntimeError(f"mongod não encontrado: {binario} (use --mongod ou --mongodb-uri)")
+    diretorio = tempfile.mkdtemp(prefix="vip-bench-mongo-")
+    porta = _porta_livre()
+    processo = subprocess.Popen(
+        [binario, "--dbpath", diretorio, "--port", str(porta), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+    )
+    uri = f"mongodb://127.0.0.1:{porta}"
+    cliente = MongoClient(uri, serverSelectionTimeoutMS=500)
+    _aguardar(lambda: cliente.admin.command("ping"), 30, "mongod")
+    cliente.close()
+    return processo, uri, diretorio
+
+def iniciar_api(uri, banco, workers, threads):
+    """API em gunicorn (mesma forma de execução de produção); retorna (processo, url base)"""
+    porta = _porta_livre()
+    ambiente = {**os.environ, "MONGODB_URI": uri, "MONGODB_DATABASE": banco, "FLASK_DEBUG": "false"}
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", "gthread", "--threads", str(threads),
+         "-b", f"127.0.0.1:{porta}", "--log-level", "warning", "src.main:app"],
+        cwd=BACKEND, env=ambiente
+    )
+    base = f"http://127.0.0.1:{porta}"
+    _aguardar(lambda: requests.get(f"{base}/api/health", timeout=1).status_code == 200, 60, "API")
+    return processo, base
+
+def _percentil(ordenadas, percentil):
+    """Percentil pelo método do posto mais próximo"""
+    if not ordenadas:
+        return None
+    return ordenadas[max(math.ceil(percentil / 100 * len(ordenadas)) - 1, 0)]
+
+def medir(nome, contexto, base, requisicoes, concorrencia, aquecimento):
+    """Executar um cenário e devolver as estatísticas (tempos em ms)"""
+    cenario = CENARIOS[nome]
+    sessoes = threading.local()
+
+    def _sessao():
+        sessao = getattr(sessoes, "sessao", None)
+        if sessao is None:
+            sessao = sessoes.sessao = requests.Session()
+            sessao.headers["Authorization"] = f"Bearer {contexto['token']}"
+        return sessao
+
+    def _uma(indice):
+        metodo, caminho, corpo, esperado = cenario(contexto, indice)
+        inicio = time.perf_counter()
+        try:
+            resposta = _sessao().request(metodo, base + caminho, json=corpo, timeout=60)
+            resposta.content
+            ok = resposta.status_code == esperado
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - inicio, ok
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        list(pool.map(_uma, range(aquecimento)))
+        inicio = time.perf_counter()
+        resultados = list(pool.map(_uma, range(aquecimento, aquecimento + requisicoes)))
+        total = time.perf_counter() - inicio
+
+    tempos = sorted(duracao * 1000 for duracao, ok in resultados)
+    return {
+        "requisicoes": requisicoes,
+        "erros": sum(1 for duracao, ok in resultados if not ok),
+        "p50_ms": round(_percentil(tempos, 50), 2),
+        "p95_ms": round(_percentil(tempos, 95), 2),
+        "p99_ms": round(_percentil(tempos, 99), 2),
+        "media_ms": round(sum(tempos) / len(tempos), 2),
+        "max_ms": round(tempos[-1], 2),
+        "throughput_rps": round(requisicoes / total, 1)
+    }
+
+def comparar(resultado, baseline, tolerancia, minimo_ms):
+    """Regressões em relação à linha de base (lista vazia = sem regressão)"""
+    regressoes = []
+    for nome, atual in resultado["cenarios"].items():
+        anterior = baseline["cenarios"].get(nome)
+        if not anterior:
+            continue
+        # Diferenças de poucos ms são ruído, mesmo quando grandes em proporção
+        for metrica in ("p50_ms", "p95_ms", "p99_ms"):
+            if (atual[metrica] > anterior[metrica] * (1 + tolerancia)
+                    and atual[metrica] - anterior[metrica] > minimo_ms):
+                regressoes.append(f"{nome}: {metrica} {anterior[metrica]} -> {atual[metrica]}")
+        if atual["throughput_rps"] < anterior["throughput_rps"] * (1 - tolerancia):
+            regressoes.append(f"{nome}: throughput {anterior['throughput_rps']} -> {atual['throughput_rps']} req/s")
+        if atual["erros"] > anterior["erros"]:
+            regressoes.append(f"{nome}: erros {anterior['erros']} -> {atual['erros']}")
+    return regressoes
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def _gravar(caminho, conteudo):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False, indent=2)
+        arquivo.write("\n")
+
+def medir_revisao(ref, opcoes):
+    """Rodar os benchmarks da revisão `ref` (git worktree temporário) nesta máquina e devolver o resultado"""
+    raiz = subprocess.check_output(["git", "rev-parse", "--show-toplevel"], cwd=BACKEND, text=True).strip()
+    diretorio = tempfile.mkdtemp(prefix="bench-ref-")
+    arvore = os.path.join(diretorio, "arvore")
+    subprocess.run(["git", "worktree", "add", "--detach", arvore, ref], cwd=raiz, check=True)
+    try:
+        backend_ref = os.path.join(arvore, os.path.relpath(BACKEND, raiz))
+        caminho = os.path.join(diretorio, "baseline.json")
+        comando = [
+            sys.executable, os.path.join(backend_ref, "benchmarks", "executar.py"),
+            "--banco", opcoes.banco, "--escala", opcoes.escala, "--cenarios", opcoes.cenarios,
+            "--concorrencia", str(opcoes.concorrencia), "--requisicoes", str(opcoes.requisicoes),
+            "--aquecimento", str(opcoes.aquecimento), "--workers", str(opcoes.workers),
+            "--threads", str(opcoes.threads), "--mongod", opcoes.mongod,
+            "--salvar-baseline", "--baseline", caminho, "--saida", os.path.join(diretorio, "saida.json")
+        ]
+        if opcoes.mongodb_uri:
+            comando += ["--mongodb-uri", opcoes.mongodb_uri]
+        print(f"Medindo a revisão de referência {ref}")
+        subprocess.run(comando, cwd=backend_ref, check=True)
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", arvore], cwd=raiz)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argumentos.add_argument("--mongodb-uri", help="usar um mongod já em execução (o banco de benchmark é apagado)")
+    argumentos.add_argument("--mongod", default="mongod", help="binário do mongod temporário")
+    argumentos.add_argument("--banco", default="vip_mudancas_bench")
+    argumentos.add_argument("--escala", choices=sorted(dados.ESCALAS), default="media")
+    argumentos.add_argument("--cenarios", default=",".join(CENARIOS), help="lista separada por vírgulas")
+    argumentos.add_argument("--concorrencia", type=int, default=8)
+    argumentos.add_argument("--requisicoes", type=int, default=400, help="por cenário, após o aquecimento")
+    argumentos.add_argument("--aquecimento", type=int, default=40)
+    argumentos.add_argument("--workers", type=int, default=2, help="workers do gunicorn")
+    argumentos.add_argument("--threads", type=int, default=8, help="threads por worker do gunicorn")
+    argumentos.add_argument("--baseline", default=BASELINE_PADRAO)
+    argumentos.add_argument("--salvar-baseline", action="store_true", help="gravar o resultado como nova linha de base")
+    argumentos.add_argument("--baseline-ref", help="medir antes esta revisão do git e usá-la como linha de base")
+    argumentos.add_argument("--exigir-baseline", action="store_true",
+                            help="terminar com código 2 se não houver linha de base comparável")
+    argumentos.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    argumentos.add_argument("--minimo-ms", type=float, default=2.0, help="piora absoluta mínima para contar como regressão")
+    argumentos.add_argument("--saida", default=SAIDA_PADRAO)
+    opcoes = argumentos.parse_args()
+
+    cenarios = [nome.strip() for nome in opcoes.cenarios.split(",") if nome.strip()]
+    desconhecidos = [nome for nome in cenarios if nome not in CENARIOS]
+    if desconhecidos:
+        argumentos.error(f"cenários desconhecidos: {', '.join(desconhecidos)}")
+
+    # Referência medida primeiro, sem disputar a máquina com a execução atual
+    baseline = medir_revisao(opcoes.baseline_ref, opcoes) if opcoes.baseline_ref else None
+
+    processos = []
+    diretorio_mongo = None
+    try:
+        uri = opcoes.mongodb_uri
+        if not uri:
+            processo_mongo, uri, diretorio_mongo = iniciar_mongod(opcoes.mongod)
+            processos.append(processo_mongo)
+
+        # Carga de dados com os mesmos modelos/índices da aplicação
+        cliente = MongoClient(uri)
+        database.mongo_client = cliente
+        database.mongo_db = cliente[opcoes.banco]
+        inicio = time.perf_counter()
+        volume = dados.semear(database.mongo_db, opcoes.escala)
+        database.create_indexes()
+        print(f"Dados carregados em {time.perf_counter() - inicio:.1f}s: {volume}")
+
+        processo_api, base = iniciar_api(uri, opcoes.banco, opcoes.workers, opcoes.threads)
+        processos.append(processo_api)
+
+        resposta = requests.post(
+            f"{base}/api/auth/login", json={"cpf": dados.ADMIN_CPF, "password": dados.ADMIN_SENHA}, timeout=30
+        )
+        resposta.raise_for_status()
+        contexto = {"token": resposta.json()["access_token"], "execucao": int(time.time())}
+
+        resultado = {
+            "ambiente": {
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "cpus": os.cpu_count(),
+                "escala": opcoes.escala,
+                "volume": volume,
+                "concorrencia": opcoes.concorrencia,
+                "requisicoes": opcoes.requisicoes,
+                "workers": opcoes.workers,
+                "threads": opcoes.threads
+            },
+            "data": datetime.utcnow().isoformat(),
+            "cenarios": {}
+        }
+
+        print(f"{'cenário':<24}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}{'erros':>8}")
+        for nome in cenarios:
+            estatisticas = medir(nome, contexto, base, opcoes.requisicoes, opcoes.concorrencia, opcoes.aquecimento)
+            resultado["cenarios"][nome] = estatisticas
+            print(f"{nome:<24}{estatisticas['p50_ms']:>10}{estatisticas['p95_ms']:>10}"
+                  f"{estatisticas['p99_ms']:>10}{estatisticas['throughput_rps']:>10}{estatisticas['erros']:>8}")
+    finally:
+        for processo in reversed(processos):
+            processo.terminate()
+            try:
+                processo.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+        if diretorio_mongo:
+            shutil.rmtree(diretorio_mongo, ignore_errors=True)
+
+    _gravar(opcoes.saida, resultado)
+    print(f"Resultado gravado em {opcoes.saida}")
+
+    if opcoes.salvar_baseline:
+        _gravar(opcoes.baseline, resultado)
+        print(f"Linha de base atualizada: {opcoes.baseline}")
+        return 0
+
+    sem_baseline = 2 if opcoes.exigir_baseline else 0
+    if baseline is None:
+        if not os.path.exists(opcoes.baseline):
+            print("Sem linha de base para comparar (use --baseline-ref ou --salvar-baseline na máquina de referência)")
+            return sem_baseline
+        with open(opcoes.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+
+    # Resultados só são comparáveis com a mesma carga
+    for chave in ("escala", "concorrencia", "requisicoes"):
+        if baseline["ambiente"].get(chave) != resultado["ambiente"][chave]:
+            print(f"Linha de base com {chave} diferente ({baseline['ambiente'].get(chave)}); comparação ignorada")
+            return sem_baseline
+
+    regressoes = comparar(resultado, baseline, opcoes.tolerancia, opcoes.minimo_ms)
+    if regressoes:
+        print(f"Regressões acima de {opcoes.tolerancia:.0%} em relação a {baseline['ambiente'].get('commit')}:")
+        for regressao in regressoes:
+            print(f"  - {regressao}")
+        return 1
+
+    print(f"Sem regressões em relação à linha de base ({baseline['ambiente'].get('commit')})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
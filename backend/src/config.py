@@ -20,14 +20,45 @@ class Config:
     AUTHENTIC_API_KEY = os.environ.get("AUTHENTIC_API_KEY")
     AUTHENTIC_BASE_URL = os.environ.get("AUTHENTIC_BASE_URL") or "https://api.authentic.com"
     
+    # WhatsApp Configuration
+    WHATSAPP_TEMPLATES_RELOAD_SECONDS = int(os.environ.get("WHATSAPP_TEMPLATES_RELOAD_SECONDS", "30"))
+    
+    # Calendário Configuration
+    CALENDARIO_CACHE_SECONDS = int(os.environ.get("CALENDARIO_CACHE_SECONDS", "30"))
+    CALENDARIO_JANELA_MAX_DIAS = int(os.environ.get("CALENDARIO_JANELA_MAX_DIAS", "93"))
+    
+    # Webhook Inbox Configuration
+    WEBHOOK_INBOX_LEASE_SECONDS = int(os.environ.get("WEBHOOK_INBOX_LEASE_SECONDS", "60"))
+    WEBHOOK_INBOX_MAX_TENTATIVAS = int(os.environ.get("WEBHOOK_INBOX_MAX_TENTATIVAS", "5"))
+    WEBHOOK_INBOX_RETENCAO_DIAS = int(os.environ.get("WEBHOOK_INBOX_RETENCAO_DIAS", "7"))
+    
+    # Cora Configuration
+    CORA_API_URL = os.environ.get("CORA_API_URL") or "https://api.cora.com.br"
+    CORA_API_TOKEN = os.environ.get("CORA_API_TOKEN")
+    CORA_CONCORRENCIA = int(os.environ.get("CORA_CONCORRENCIA", "8"))
+    CORA_LOTE = int(os.environ.get("CORA_LOTE", "100"))
+    GUARDA_MOVEIS_DIA_VENCIMENTO = int(os.environ.get("GUARDA_MOVEIS_DIA_VENCIMENTO", "10"))
+    GUARDA_MOVEIS_INDICE_RELOAD_SECONDS = int(os.environ.get("GUARDA_MOVEIS_INDICE_RELOAD_SECONDS", "2"))
+    GUARDA_MOVEIS_STATUS_SECONDS = int(os.environ.get("GUARDA_MOVEIS_STATUS_SECONDS", "300"))
+    
     # Google Configuration
     GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_CLIENT_SECRET")
     GOOGLE_REDIRECT_URI = os.environ.get("GOOGLE_REDIRECT_URI")
     GOOGLE_ANALYTICS_ID = os.environ.get("GOOGLE_ANALYTICS_ID")
     GOOGLE_CALENDAR_API_KEY = os.environ.get("GOOGLE_CALENDAR_API_KEY")
+    GOOGLE_CALENDAR_API_URL = os.environ.get("GOOGLE_CALENDAR_API_URL") or "https://www.googleapis.com/calendar/v3"
+    GOOGLE_CALENDAR_ACCESS_TOKEN = os.environ.get("GOOGLE_CALENDAR_ACCESS_TOKEN")
+    GOOGLE_CALENDAR_IDS = os.environ.get("GOOGLE_CALENDAR_IDS", "primary").split(",")
+    GOOGLE_CALENDAR_SYNC_SECONDS = int(os.environ.get("GOOGLE_CALENDAR_SYNC_SECONDS", "60"))
     GOOGLE_FORMS_API_KEY = os.environ.get("GOOGLE_FORMS_API_KEY")
     
+    # Métricas Configuration
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # Bearer exigido em /api/metrics (sem ele, endpoint desligado)
+    CONSULTAS_LENTAS_MS = float(os.environ.get("CONSULTAS_LENTAS_MS", "100"))
+    CONSULTAS_LENTAS_AMOSTRAGEM = float(os.environ.get("CONSULTAS_LENTAS_AMOSTRAGEM", "0.2"))  # fração com explain
+    CONSULTAS_LENTAS_MAX_BYTES = int(os.environ.get("CONSULTAS_LENTAS_MAX_BYTES", "67108864"))  # 64MB (capped)
+    
     # CORS Configuration
     CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
     
@@ -37,7 +68,33 @@ class Config:
     
     # Upload Configuration
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER") or "uploads"
-    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", "16777216"))  # 16MB
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", "16777216"))  # 16MB (rotas JSON)
+    ARQUIVOS_MAX_BYTES = int(os.environ.get("ARQUIVOS_MAX_BYTES", "1073741824"))  # 1GB (envio para o GridFS)
+    ARQUIVOS_CHUNK_BYTES = int(os.environ.get("ARQUIVOS_CHUNK_BYTES", "261120"))  # 255KB (padrão do GridFS)
+    ARQUIVOS_ORFAOS_HORAS = int(os.environ.get("ARQUIVOS_ORFAOS_HORAS", "24"))  # envio sem vínculo removido depois disso
+    
+    # Documentos Configuration
+    DOCUMENTOS_LOTE_MAX = int(os.environ.get("DOCUMENTOS_LOTE_MAX", "500"))
+    DOCUMENTOS_LOTE_PROCESSOS = int(os.environ.get("DOCUMENTOS_LOTE_PROCESSOS", "0"))  # 0 = núcleos disponíveis
+    DOCUMENTOS_CACHE_MAX_BYTES = int(os.environ.get("DOCUMENTOS_CACHE_MAX_BYTES", "536870912"))  # 512MB
+    
+    # Clientes Configuration
+    TELEFONE_DDI_PADRAO = os.environ.get("TELEFONE_DDI_PADRAO", "55")  # telefones sem DDI
+    CLIENTES_DEDUPE_LIMIAR = float(os.environ.get("CLIENTES_DEDUPE_LIMIAR", "0.7"))
+    CLIENTES_DEDUPE_BLOCO_MAX = int(os.environ.get("CLIENTES_DEDUPE_BLOCO_MAX", "200"))
+    CLIENTES_DEDUPE_VARREDURA_SECONDS = int(os.environ.get("CLIENTES_DEDUPE_VARREDURA_SECONDS", "86400"))
+    CLIENTES_DEDUPE_VARREDURA_LEASE_SECONDS = int(os.environ.get("CLIENTES_DEDUPE_VARREDURA_LEASE_SECONDS", "7200"))
+    
+    # Licitações Configuration
+    LICITACOES_MONITOR_RELOAD_SECONDS = int(os.environ.get("LICITACOES_MONITOR_RELOAD_SECONDS", "30"))
+    LICITACOES_CRAWLER_SECONDS = int(os.environ.get("LICITACOES_CRAWLER_SECONDS", "900"))
+    LICITACOES_CRAWLER_CONCORRENCIA = int(os.environ.get("LICITACOES_CRAWLER_CONCORRENCIA", "4"))
+    LICITACOES_CRAWLER_INTERVALO_MS = int(os.environ.get("LICITACOES_CRAWLER_INTERVALO_MS", "1000"))  # por portal
+    LICITACOES_CRAWLER_MAX_PAGINAS = int(os.environ.get("LICITACOES_CRAWLER_MAX_PAGINAS", "50"))
+    
+    # Notificações Configuration
+    NOTIFICACOES_LEASE_SECONDS = int(os.environ.get("NOTIFICACOES_LEASE_SECONDS", "60"))
+    NOTIFICACOES_MAX_TENTATIVAS = int(os.environ.get("NOTIFICACOES_MAX_TENTATIVAS", "5"))
     
     # Email Configuration
     SMTP_SERVER = os.environ.get("SMTP_SERVER")
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from flask import has_request_context, request
+from pymongo import monitoring
+from src.config import Config
+from src.metricas import Contador
+
+COLECAO = "slow_queries"
+
+# Comandos cujo plano pode ser obtido com explain
+EXPLICAVEIS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Campos do protocolo/sessão que não fazem parte do comando explicado
+CAMPOS_PROTOCOLO = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+                    "startTransaction", "readConcern", "writeConcern", "cursor", "batchSize", "singleBatch"}
+
+consultas_lentas = Contador(
+    "vip_mongo_consultas_lentas_total", "Comandos MongoDB acima do limite de consulta lenta",
+    ("comando", "colecao", "plano")
+)
+
+# Marca as operações feitas pela própria thread de explain (não são monitoradas)
+_local = threading.local()
+
+def _formato(valor):
+    """Forma da consulta sem os valores (evita gravar dados de clientes no log)"""
+    if isinstance(valor, dict):
+        return {chave: _formato(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_formato(item) for item in valor[:5]]
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor in (1, -1):
+        return valor  # direção de ordenação / projeção
+    return type(valor).__name__
+
+def _resumo_comando(comando):
+    """Partes relevantes do comando (filtro, ordenação, pipeline) já sem valores"""
+    resumo = {}
+    for campo in ("filter", "sort", "projection", "pipeline", "query", "key", "limit", "skip"):
+        if campo in comando:
+            resumo[campo] = _formato(comando[campo])
+    for campo in ("updates", "deletes"):
+        if comando.get(campo):
+            resumo[campo] = _formato([item.get("q") for item in comando[campo]])
+    return resumo
+
+def _planos_vencedores(explain):
+    """winningPlan(s) do explain, inclusive dentro dos estágios de um aggregate"""
+    if isinstance(explain, dict):
+        for chave, valor in explain.items():
+            if chave == "winningPlan":
+                yield valor
+            elif chave != "rejectedPlans":
+                yield from _planos_vencedores(valor)
+    elif isinstance(explain, list):
+        for item in explain:
+            yield from _planos_vencedores(item)
+
+def _estagios(plano):
+    if isinstance(plano, dict):
+        if "stage" in plano:
+            yield plano
+        for chave, valor in plano.items():
+            if chave != "stage":
+                yield from _estagios(valor)
+    elif isinstance(plano, list):
+        for item in plano:
+            yield from _estagios(item)
+
+def analisar_explain(explain):
+    """Estágios do plano vencedor, índices usados e indicadores de COLLSCAN / SORT em memória"""
+    estagios = []
+    indices = []
+    for plano in _planos_vencedores(explain):
+        for estagio in _estagios(plano):
+            nome = str(estagio["stage"]).upper()
+            estagios.append(nome)
+            if estagio.get("indexName"):
+                indices.append(estagio["indexName"])
+    return {
+        "estagios": estagios,
+        "indices": sorted(set(indices)),
+        "collscan": "COLLSCAN" in estagios,
+        "sort_em_memoria": "SORT" in estagios
+    }
+
+class MonitorConsultasLentas(monitoring.CommandListener):
+    """Registra comandos acima do limite em `slow_queries`; uma amostra deles vai com o explain
+
+    O ouvinte só enfileira: explain e gravação acontecem em uma thread própria,
+    fora do caminho da requisição. Se a fila encher, o registro é descartado.
+    """
+
+    def __init__(self, limite_ms=None, amostragem=None):
+        self.limite_ms = Config.CONSULTAS_LENTAS_MS if limite_ms is None else limite_ms
+        self.amostragem = Config.CONSULTAS_LENTAS_AMOSTRAGEM if amostragem is None else amostragem
+        self._comandos = {}
+        self._lock = threading.Lock()
+        self._fila = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._explicados = {}  # forma da consulta -> último explain (monotônico)
+
+    def started(self, event):
+        if getattr(_local, "ignorar", False):
+            return
+        colecao = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            colecao = event.command.get("collection")
+        if not isinstance(colecao, str) or colecao == COLECAO:
+            return
+
+        origem = {}
+        if has_request_context():
+            origem = {
+                "rota": request.url_rule.rule if request.url_rule else request.path,
+                "metodo": request.method,
+                "endpoint": request.endpoint
+            }
+        with self._lock:
+            self._comandos[(event.connection_id, event.request_id)] = (
+                colecao, dict(event.command), event.database_name, origem
+            )
+
+    def _finalizar(self, event, erro=None):
+        with self._lock:
+            registro = self._comandos.pop((event.connection_id, event.request_id), None)
+        if registro is None or event.duration_micros / 1000 < self.limite_ms:
+            return
+
+        colecao, comando, database, origem = registro
+        try:
+            self._fila.put_nowait({
+                "comando": event.command_name,
+                "colecao": colecao,
+                "database": database,
+                "duracao_ms": round(event.duration_micros / 1000, 1),
+                "erro": erro,
+                "origem": origem,
+                "bruto": comando,
+                "data": datetime.utcnow()
+            })
+        except queue.Full:
+            return
+        self._iniciar_thread()
+
+    def succeeded(self, event):
+        self._finalizar(event)
+
+    def failed(self, event):
+        self._finalizar(event, erro=str(event.failure.get("errmsg", event.failure)))
+
+    def _iniciar_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._processar, name="consultas-lentas", daemon=True)
+                    self._thread.start()
+
+    def _deve_explicar(self, item, bruto, forma):
+        if item["comando"] not in EXPLICAVEIS or item["erro"] or random.random() >= self.amostragem:
+            return False
+        # explain de escrita só aceita um comando por lote (bulk_write envia vários)
+        for campo in ("updates", "deletes"):
+            if len(bruto.get(campo) or []) > 1:
+                return False
+        # A mesma forma de consulta é explicada no máximo uma vez a cada 5 minutos
+        agora = time.monotonic()
+        if agora - self._explicados.get(forma, -300) < 300:
+            return False
+        if len(self._explicados) > 10000:
+            self._explicados.clear()
+        self._explicados[forma] = agora
+        return True
+
+    @staticmethod
+    def _explicar(db, item, bruto):
+        comando = {chave: valor for chave, valor in bruto.items() if chave not in CAMPOS_PROTOCOLO}
+        if item["comando"] == "aggregate":
+            comando["cursor"] = {}
+        explain = db.client[item["database"]].command({"explain": comando, "verbosity": "queryPlanner"})
+        return analisar_explain(explain)
+
+    def _processar(self):
+        from src.database import get_db
+
+        _local.ignorar = True
+        while True:
+            item = self._fila.get()
+            try:
+                db = get_db()
+                bruto = item.pop("bruto")
+                item["consulta"] = _resumo_comando(bruto)
+                forma = hashlib.sha1(
+                    json.dumps([item["colecao"], item["comando"], item["consulta"]], sort_keys=True).encode()
+                ).hexdigest()
+                item["forma"] = forma
+
+                plano = None
+                if self._deve_explicar(item, bruto, forma):
+                    # Falha no explain não descarta o registro: ele é gravado sem o plano
+                    try:
+                        plano = item["plano"] = self._explicar(db, item, bruto)
+                    except Exception as e:
+                        item["erro_explain"] = str(e)
+
+                if plano is None:
+                    rotulo_plano = "sem_explain"
+                elif plano["collscan"]:
+                    rotulo_plano = "collscan"
+                elif plano["sort_em_memoria"]:
+                    rotulo_plano = "sort_em_memoria"
+                else:
+                    rotulo_plano = "indice"
+                consultas_lentas.inc(item["comando"], item["colecao"], rotulo_plano)
+
+                db[COLECAO].insert_one(item)
+            except Exception as e:
+                print(f"Erro ao registrar consulta lenta: {e}")
+
+monitor_consultas_lentas = MonitorConsultasLentas()
+
+def criar_colecao(db):
+    """Coleção limitada (capped): os registros mais antigos são descartados automaticamente"""
+    if COLECAO not in db.list_collection_names():
+        db.create_collection(COLECAO, capped=True, size=Config.CONSULTAS_LENTAS_MAX_BYTES)
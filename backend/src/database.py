@@ -1,6 +1,8 @@
 from pymongo import MongoClient
 from flask import current_app, g
 from src.config import Config
+from src.consultas_lentas import criar_colecao as criar_colecao_consultas_lentas, monitor_consultas_lentas
+from src.metricas import OuvinteComandos
 
 # Cliente MongoDB global
 mongo_client = None
@@ -11,7 +13,12 @@ def init_mongodb(app):
     global mongo_client, mongo_db
     
     try:
-        mongo_client = MongoClient(app.config['MONGODB_URI'])
+        # Ouvintes de comandos: métricas (latência, documentos, comandos por requisição)
+        # e registro de consultas lentas com amostragem de explain
+        mongo_client = MongoClient(
+            app.config['MONGODB_URI'],
+            event_listeners=[OuvinteComandos(), monitor_consultas_lentas]
+        )
         mongo_db = mongo_client[app.config['MONGODB_DATABASE']]
         
         # Testar conexão
@@ -39,15 +46,39 @@ def create_indexes():
         db.users.create_index("email")
         
         # Índices para clientes
-        db.clientes.create_index("cpf_cnpj", unique=True)
+        # CPF/CNPJ é opcional (ManyChat, pré-cadastro): só documentos preenchidos entram no índice único.
+        # O índice antigo (não parcial) indexava a ausência como null e barrava o segundo cliente sem documento.
+        indice_cpf = db.clientes.index_information().get("cpf_cnpj_1")
+        if indice_cpf and "partialFilterExpression" not in indice_cpf:
+            db.clientes.drop_index("cpf_cnpj_1")
+        db.clientes.create_index(
+            "cpf_cnpj", unique=True,
+            partialFilterExpression={"cpf_cnpj": {"$type": "string"}}
+        )
         db.clientes.create_index("email")
         db.clientes.create_index("telefone")
+        db.clientes.create_index("telefone_e164")
+        db.clientes.create_index(
+            "cpf_cnpj_digitos", unique=True,
+            partialFilterExpression={"cpf_cnpj_digitos": {"$type": "string"}}
+        )
+        db.clientes.create_index("manychat_user_id", unique=True, sparse=True)
+        db.clientes.create_index("chaves_bloqueio")
+        db.clientes_duplicatas.create_index([("status", 1), ("score", -1)])
+        db.clientes_duplicatas.create_index("clientes")
+        db.clientes_historico.create_index([("cliente_id", 1), ("contagem", 1)])
+        db.clientes_historico.create_index([("cliente_id", 1), ("fim", -1)])
         
         # Índices para orçamentos
         db.orcamentos.create_index("numero_orcamento", unique=True)
         db.orcamentos.create_index("cliente_id")
+        db.orcamentos.create_index("cliente_telefone_e164")
         db.orcamentos.create_index("status")
         db.orcamentos.create_index("data_criacao")
+        db.orcamentos.create_index("data_visita")
+        db.orcamentos.create_index("data_mudanca")
+        db.orcamentos.create_index([("vendedor_id", 1), ("data_visita", 1)])
+        db.orcamentos.create_index([("vendedor_id", 1), ("data_mudanca", 1)])
         
         # Índices para contratos
         db.contratos.create_index("numero_contrato", unique=True)
@@ -58,24 +89,119 @@ def create_indexes():
         db.ordens_servico.create_index("numero_os", unique=True)
         db.ordens_servico.create_index("contrato_id")
         db.ordens_servico.create_index("status")
+        db.ordens_servico.create_index("data_servico")
+        db.ordens_servico.create_index([("equipe_id", 1), ("data_servico", 1)])
+        db.ordens_servico.create_index([("vendedor_id", 1), ("data_servico", 1)])
         
         # Índices para financeiro
         db.financeiro.create_index("tipo")
         db.financeiro.create_index("data_vencimento")
         db.financeiro.create_index("status")
         db.financeiro.create_index("cliente_id")
+        db.financeiro.create_index([("competencia", 1), ("tipo", 1)])
+        db.financeiro.create_index([("data", -1)])
+        db.financeiro_rollups.create_index([("mes", 1), ("tipo", 1), ("categoria", 1)], unique=True)
+        db.financeiro_rollups.create_index("atualizado_em")
         
         # Índices para leads
         db.leads.create_index("email")
         db.leads.create_index("telefone")
+        db.leads.create_index("telefone_e164")
         db.leads.create_index("status")
         db.leads.create_index("data_criacao")
+        db.leads.create_index([("status", 1), ("data_criacao", -1)])
+        db.leads.create_index(
+            "chaves_dedupe", unique=True,
+            partialFilterExpression={"chaves_dedupe": {"$exists": True}}
+        )
+        
+        # Índices para licitações
+        db.licitacoes.create_index("chave", unique=True, sparse=True)
+        db.licitacoes.create_index("status")
+        db.licitacoes.create_index([("data_criacao", -1)])
+        db.licitacoes.create_index("data_limite")
+        db.licitacoes.create_index([("status", 1), ("data_limite", 1)])
+        db.licitacoes.create_index([("portal", 1), ("orgao", 1)])
+        db.licitacoes.create_index([("palavras_encontradas", 1), ("data_criacao", -1)])
+        db.licitacoes_resumo.create_index([("portal", 1), ("orgao", 1)], unique=True)
+        
+        # Índices para guarda-móveis (filtro por status, status vencido)
+        db.guarda_moveis.create_index([("status", 1), ("valor_mensal", 1)])
+        db.guarda_moveis.create_index("box_numero", unique=True)
+        db.guarda_moveis.create_index("data_atualizacao")
+        db.guarda_moveis.create_index([("status", 1), ("data_inicio", 1)])
+        db.guarda_moveis.create_index([("status", 1), ("data_fim", 1)])
+        
+        # Índices para ocupações dos boxes (conflito de período, atualização incremental do índice
+        # e faturamento por competência)
+        db.guarda_moveis_ocupacoes.create_index([("box_id", 1), ("status", 1), ("data_inicio", 1)])
+        db.guarda_moveis_ocupacoes.create_index("atualizado_em")
+        db.guarda_moveis_ocupacoes.create_index([("status", 1), ("data_inicio", 1)])
+        
+        # Índices para boletos (um por box e competência)
+        db.boletos.create_index("chave_periodo", unique=True)
+        db.boletos.create_index([("competencia", 1), ("status", 1)])
+        
+        # Índices para execuções de faturamento (uma ativa por competência)
+        db.faturamento_execucoes.create_index(
+            "competencia",
+            unique=True,
+            partialFilterExpression={"ativa": True}
+        )
+        db.faturamento_execucoes.create_index([("status", 1), ("data_criacao", 1)])
+        
+        # Índices para estoque (itens abaixo do mínimo pelo indicador mantido nas movimentações)
+        db.estoque.create_index([("estoque_baixo", 1), ("item", 1)])
+        db.estoque.create_index("item")
+        db.estoque_movimentacoes.create_index([("item_id", 1), ("contagem", 1)])
+        db.estoque_movimentacoes.create_index([("item_id", 1), ("fim", -1)])
         
         # Índices para programa de pontos
         db.programa_pontos.create_index("cliente_id")
         db.programa_pontos.create_index("tipo")
         db.programa_pontos.create_index("data_criacao")
         
+        # Índices para templates de WhatsApp
+        db.whatsapp_templates.create_index("nome", unique=True)
+        
+        # Índices para mensagens enviadas (status de entrega)
+        db.mensagens.create_index("mensagem_id", unique=True)
+        db.mensagens.create_index([("telefone", 1), ("data_criacao", -1)])
+        db.mensagens.create_index([("campanha_id", 1), ("status", 1)])
+        
+        # Índices para cache de documentos gerados (remoção dos menos acessados)
+        db.documentos_cache.create_index("ultimo_acesso")
+        
+        # Índices para arquivos (GridFS, deduplicados pelo hash do conteúdo)
+        db.arquivos.files.create_index("metadata.sha256", unique=True, sparse=True)
+        db.arquivos_vinculos.create_index(
+            [("arquivo_id", 1), ("entidade", 1), ("entidade_id", 1)],
+            unique=True
+        )
+        db.arquivos_vinculos.create_index([("entidade", 1), ("entidade_id", 1), ("data_criacao", -1)])
+        
+        # Índices para eventos sincronizados do Google Agenda
+        db.eventos.create_index([("calendario_id", 1), ("google_id", 1)], unique=True)
+        db.eventos.create_index([("inicio", 1), ("fim", 1)])
+        db.eventos.create_index([("calendario_id", 1), ("sincronizado_em", 1)])
+        
+        # Índices para notificações programadas (fila ordenada pela próxima execução)
+        db.notificacoes.create_index([("status", 1), ("next_run_at", 1)])
+        db.notificacoes.create_index([("status", 1), ("lease_ate", 1)])
+        
+        # Índices para caixa de entrada de webhooks
+        # (deduplicação pelo id do provedor enquanto o evento estiver retido)
+        db.webhook_inbox.create_index([("provedor", 1), ("mensagem_id", 1)], unique=True)
+        db.webhook_inbox.create_index([("status", 1), ("disponivel_em", 1)])
+        db.webhook_inbox.create_index([("status", 1), ("lease_ate", 1)])
+        db.webhook_inbox.create_index(
+            "processado_em",
+            expireAfterSeconds=Config.WEBHOOK_INBOX_RETENCAO_DIAS * 86400
+        )
+        
+        # Registro de consultas lentas (coleção limitada, sem índices além do _id)
+        criar_colecao_consultas_lentas(db)
+        
         # Índices para atividades de usuário
         db.user_activities.create_index("user_id")
         db.user_activities.create_index("timestamp")
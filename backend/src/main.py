@@ -1,23 +1,50 @@
+import hmac
 import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, Request, Response, request, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from src.config import Config
 from src.database import init_mongodb, get_db
+from src import metricas
 from src.models.user import User
+from src.services.disponibilidade_boxes import indice_boxes
 
 # Importar blueprints (apenas os que foram atualizados para MongoDB)
+from src.routes.arquivos import arquivos_bp
 from src.routes.auth import auth_bp
+from src.routes.clientes import clientes_bp
+from src.routes.contatos import contatos_bp
 from src.routes.dashboard import dashboard_bp
+from src.routes.documentos import documentos_bp
+from src.routes.estoque import estoque_bp
+from src.routes.financeiro import financeiro_bp
+from src.routes.guardamoveis import guardamoveis_bp
 from src.routes.ia import ia_bp
 from src.routes.integracoes import integracoes_bp
+from src.routes.leads import leads_bp
+from src.routes.licitacoes import licitacoes_bp
+from src.routes.monitoramento import monitoramento_bp
 from src.routes.orcamentos import orcamentos_bp
+from src.routes.whatsapp import whatsapp_bp
+
+class Requisicao(Request):
+    """MAX_CONTENT_LENGTH vale para as rotas JSON; o envio de arquivos (em blocos para o GridFS) tem limite próprio"""
+
+    LIMITES_POR_ROTA = {"arquivos.upload_arquivo": "ARQUIVOS_MAX_BYTES"}
+
+    @property
+    def max_content_length(self):
+        chave = self.LIMITES_POR_ROTA.get(self.endpoint)
+        if chave:
+            return app.config.get(chave)
+        return super().max_content_length
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.request_class = Requisicao
 
 # Configurações
 app.config.from_object(Config)
@@ -28,9 +55,18 @@ CORS(app, origins=Config.CORS_ORIGINS)
 # JWT
 jwt = JWTManager(app)
 
+# Latência por rota e comandos MongoDB por requisição (expostos em /api/metrics)
+metricas.registrar(app)
+
 # Inicializar MongoDB
 init_mongodb(app)
 
+# Construir índice de disponibilidade dos boxes a partir do banco
+try:
+    indice_boxes.carregar()
+except Exception as e:
+    print(f"Erro ao carregar índice de boxes: {e}")
+
 # Função para criar usuário admin padrão
 def init_admin_user():
     try:
@@ -56,17 +92,40 @@ def init_admin_user():
         print(f"Erro ao criar usuário admin: {e}")
 
 # Registrar blueprints (apenas os atualizados)
+app.register_blueprint(arquivos_bp, url_prefix='/api/arquivos')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
+app.register_blueprint(clientes_bp, url_prefix='/api/clientes')
+app.register_blueprint(contatos_bp, url_prefix='/api/contatos')
 app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(documentos_bp, url_prefix='/api/documentos')
+app.register_blueprint(estoque_bp, url_prefix='/api/estoque')
+app.register_blueprint(financeiro_bp, url_prefix='/api/financeiro')
+app.register_blueprint(guardamoveis_bp, url_prefix='/api/guarda-moveis')
 app.register_blueprint(ia_bp, url_prefix='/api/ia')
 app.register_blueprint(integracoes_bp, url_prefix='/api/integracoes')
+app.register_blueprint(leads_bp, url_prefix='/api/leads')
+app.register_blueprint(licitacoes_bp, url_prefix='/api/licitacoes')
+app.register_blueprint(monitoramento_bp, url_prefix='/api/monitoramento')
 app.register_blueprint(orcamentos_bp, url_prefix='/api/orcamentos')
+app.register_blueprint(whatsapp_bp, url_prefix='/api/whatsapp')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint de verificação de saúde"""
     return {"status": "ok", "message": "VIP Mudanças API está funcionando"}, 200
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Métricas no formato do Prometheus (deste processo)
+
+    Exige METRICS_TOKEN como Bearer; sem o token configurado o endpoint fica desligado.
+    """
+    if not Config.METRICS_TOKEN:
+        return {"error": "Métricas desabilitadas (defina METRICS_TOKEN)"}, 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {Config.METRICS_TOKEN}"):
+        return {"error": "Acesso negado"}, 403
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
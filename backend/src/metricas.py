@@ -0,0 +1,244 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from pymongo import monitoring
+
+# Limites dos histogramas de latência (segundos) e de contagens por requisição
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_CONTAGEM = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def _rotulos_texto(self, valores, extra=None):
+        pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(self.rotulos, valores)]
+        if extra:
+            pares.append(extra)
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._lock:
+            itens = sorted((chave, list(valor) if isinstance(valor, list) else valor)
+                           for chave, valor in self._valores.items())
+        for chave, valor in itens:
+            linhas.extend(self._linhas(chave, valor))
+        return linhas
+
+class Contador(_Metrica):
+    """Contador monotônico por combinação de rótulos"""
+    tipo = "counter"
+
+    def inc(self, *rotulos, valor=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def _linhas(self, chave, valor):
+        return [f"{self.nome}{self._rotulos_texto(chave)} {valor}"]
+
+class Histograma(_Metrica):
+    """Histograma cumulativo no formato do Prometheus (buckets, soma e contagem)"""
+    tipo = "histogram"
+
+    def __init__(self, nome, descricao, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nome, descricao, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, *rotulos):
+        with self._lock:
+            atual = self._valores.get(rotulos)
+            if atual is None:
+                # [contagem por bucket..., +Inf, soma]
+                atual = self._valores[rotulos] = [0] * (len(self.buckets) + 1) + [0.0]
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    atual[indice] += 1
+                    break
+            else:
+                atual[len(self.buckets)] += 1
+            atual[-1] += valor
+
+    def _linhas(self, chave, valor):
+        linhas = []
+        acumulado = 0
+        for limite, quantidade in zip(self.buckets + ("+Inf",), valor[:-1]):
+            acumulado += quantidade
+            rotulos = self._rotulos_texto(chave, 'le="%s"' % limite)
+            linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+        linhas.append(f"{self.nome}_sum{self._rotulos_texto(chave)} {valor[-1]:.6f}")
+        linhas.append(f"{self.nome}_count{self._rotulos_texto(chave)} {acumulado}")
+        return linhas
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_registro = []
+
+http_segundos = Histograma(
+    "vip_http_requisicao_segundos", "Latência das requisições HTTP por rota",
+    ("blueprint", "rota", "metodo", "status")
+)
+http_mongo_comandos = Histograma(
+    "vip_http_requisicao_mongo_comandos", "Comandos MongoDB executados por requisição (N+1 aparece aqui)",
+    ("blueprint", "rota"), BUCKETS_CONTAGEM
+)
+http_mongo_segundos = Histograma(
+    "vip_http_requisicao_mongo_segundos", "Tempo total em comandos MongoDB por requisição",
+    ("blueprint", "rota")
+)
+http_mongo_documentos = Histograma(
+    "vip_http_requisicao_mongo_documentos", "Documentos retornados pelo MongoDB por requisição",
+    ("blueprint", "rota"), BUCKETS_CONTAGEM
+)
+mongo_segundos = Histograma(
+    "vip_mongo_comando_segundos", "Duração dos comandos MongoDB", ("comando", "colecao")
+)
+mongo_falhas = Contador(
+    "vip_mongo_comando_falhas_total", "Comandos MongoDB que falharam", ("comando", "colecao")
+)
+mongo_documentos = Contador(
+    "vip_mongo_documentos_retornados_total", "Documentos retornados pelo MongoDB", ("comando", "colecao")
+)
+externo_segundos = Histograma(
+    "vip_http_externo_segundos", "Latência das chamadas a serviços externos (APIs, IA)",
+    ("servico", "operacao", "status")
+)
+
+# Acumulado da requisição em andamento (cada thread/contexto tem o seu)
+_requisicao_atual = ContextVar("metricas_requisicao", default=None)
+
+# Comandos que não dizem nada sobre a aplicação (handshake/autenticação)
+COMANDOS_IGNORADOS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions"}
+
+class OuvinteComandos(monitoring.CommandListener):
+    """Duração e documentos retornados de cada comando, somados também na requisição atual"""
+
+    def __init__(self):
+        self._colecoes = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in COMANDOS_IGNORADOS:
+            return
+        colecao = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            colecao = event.command.get("collection")
+        with self._lock:
+            self._colecoes[(event.connection_id, event.request_id)] = colecao if isinstance(colecao, str) else ""
+
+    def _finalizar(self, event):
+        with self._lock:
+            return self._colecoes.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        colecao = self._finalizar(event)
+        if colecao is None:
+            return
+        segundos = event.duration_micros / 1e6
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        documentos = len(cursor.get("firstBatch") or cursor.get("nextBatch") or []) if cursor else 0
+
+        mongo_segundos.observar(segundos, event.command_name, colecao)
+        if documentos:
+            mongo_documentos.inc(event.command_name, colecao, valor=documentos)
+
+        atual = _requisicao_atual.get()
+        if atual is not None:
+            atual["comandos"] += 1
+            atual["segundos"] += segundos
+            atual["documentos"] += documentos
+
+    def failed(self, event):
+        colecao = self._finalizar(event)
+        if colecao is None:
+            return
+        mongo_segundos.observar(event.duration_micros / 1e6, event.command_name, colecao)
+        mongo_falhas.inc(event.command_name, colecao)
+
+        atual = _requisicao_atual.get()
+        if atual is not None:
+            atual["comandos"] += 1
+            atual["segundos"] += event.duration_micros / 1e6
+
+@contextmanager
+def cronometro(servico, operacao):
+    """Medir uma chamada externa: `with cronometro("openai", "chat"): ...`"""
+    inicio = time.perf_counter()
+    status = "erro"
+    try:
+        yield
+        status = "ok"
+    finally:
+        externo_segundos.observar(time.perf_counter() - inicio, servico, operacao, status)
+
+def instrumentar_sessao(sessao, servico):
+    """Medir todas as requisições de uma requests.Session (inclusive timeouts e erros de conexão)"""
+    requisitar = sessao.request
+
+    def request_medido(method, url, *args, **kwargs):
+        inicio = time.perf_counter()
+        status = "erro"
+        try:
+            resposta = requisitar(method, url, *args, **kwargs)
+            status = str(resposta.status_code)
+            return resposta
+        finally:
+            externo_segundos.observar(time.perf_counter() - inicio, servico, method.upper(), status)
+
+    sessao.request = request_medido
+    return sessao
+
+def _iniciar_requisicao():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_token = _requisicao_atual.set({"comandos": 0, "segundos": 0.0, "documentos": 0})
+
+def _registrar_status(response):
+    g.metricas_status = response.status_code
+    return response
+
+def _finalizar_requisicao(erro=None):
+    """Registrar a requisição no teardown: roda também quando uma exceção não tratada vira 500"""
+    inicio = g.pop("metricas_inicio", None)
+    token = g.pop("metricas_token", None)
+    status = g.pop("metricas_status", None)
+    if inicio is None:
+        return
+
+    atual = _requisicao_atual.get()
+    try:
+        _requisicao_atual.reset(token)
+    except ValueError:
+        _requisicao_atual.set(None)
+
+    if status is None or erro is not None:
+        status = 500
+    blueprint = request.blueprint or "app"
+    rota = request.url_rule.rule if request.url_rule else "nao_encontrada"
+    http_segundos.observar(time.perf_counter() - inicio, blueprint, rota, request.method, str(status))
+    if atual:
+        http_mongo_comandos.observar(atual["comandos"], blueprint, rota)
+        http_mongo_segundos.observar(atual["segundos"], blueprint, rota)
+        http_mongo_documentos.observar(atual["documentos"], blueprint, rota)
+
+def registrar(app):
+    """Instalar a medição de latência por rota na aplicação Flask"""
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_registrar_status)
+    app.teardown_request(_finalizar_requisicao)
+
+def exportar():
+    """Todas as métricas no formato texto do Prometheus"""
+    linhas = []
+    for metrica in _registro:
+        linhas.extend(metrica.exportar())
+    return "\n".join(linhas) + "\n"
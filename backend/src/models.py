@@ -57,9 +57,7 @@ class Cliente:
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "status": data.get("status", "Novo"),
-            "perfil": data.get("perfil", ""),
-            "documentos": [],
-            "historico": []
+            "perfil": data.get("perfil", "")
         }
         
         result = Cliente.collection.insert_one(cliente_data)
@@ -211,7 +209,7 @@ class Estoque:
             "updated_at": datetime.utcnow(),
             "quantidade": data.get("quantidade", 0),
             "quantidade_minima": data.get("quantidade_minima", 10),
-            "movimentacoes": []
+            "estoque_baixo": data.get("quantidade", 0) <= data.get("quantidade_minima", 10)
         }
         
         result = Estoque.collection.insert_one(item_data)
@@ -0,0 +1,274 @@
+from datetime import datetime, timedelta
+import hashlib
+from bson import ObjectId
+from gridfs import GridFSBucket
+from gridfs.errors import NoFile
+from pymongo.errors import DuplicateKeyError
+from src.config import Config
+from src.database import get_db
+
+# Entidades às quais um arquivo pode ser vinculado -> coleção de origem
+ENTIDADES_VINCULO = {
+    'cliente': 'clientes',
+    'orcamento': 'orcamentos',
+    'contrato': 'contratos'
+}
+
+# Tamanho dos blocos lidos da requisição / enviados na resposta
+TAMANHO_BLOCO_LEITURA = 256 * 1024
+
+class Arquivo:
+    """Arquivos armazenados no GridFS (bucket "arquivos"), deduplicados pelo SHA-256 do conteúdo"""
+
+    def __init__(self, data=None):
+        if data:
+            metadata = data.get('metadata') or {}
+            self._id = data.get('_id')
+            self.nome = data.get('filename')
+            self.tamanho = data.get('length', 0)
+            self.content_type = metadata.get('content_type', 'application/octet-stream')
+            self.sha256 = metadata.get('sha256')
+            self.enviado_por = metadata.get('enviado_por')
+            self.data_criacao = data.get('uploadDate')
+        else:
+            self._id = None
+            self.nome = None
+            self.tamanho = 0
+            self.content_type = 'application/octet-stream'
+            self.sha256 = None
+            self.enviado_por = None
+            self.data_criacao = None
+
+    def __repr__(self):
+        return f'<Arquivo {self.nome} {self.sha256}>'
+
+    @staticmethod
+    def _bucket():
+        return GridFSBucket(get_db(), bucket_name="arquivos", chunk_size_bytes=Config.ARQUIVOS_CHUNK_BYTES)
+
+    @staticmethod
+    def armazenar(stream, nome, content_type=None, enviado_por=None):
+        """Gravar arquivo lendo o stream em blocos; retorna (Arquivo, duplicado)
+
+        O hash é calculado durante o envio. Se o mesmo conteúdo já existir,
+        os blocos recém-gravados são descartados e o arquivo existente é
+        devolvido.
+        """
+        db = get_db()
+        files_collection = db.arquivos.files
+
+        upload = Arquivo._bucket().open_upload_stream(nome)
+        sha256 = hashlib.sha256()
+        try:
+            while True:
+                bloco = stream.read(TAMANHO_BLOCO_LEITURA)
+                if not bloco:
+                    break
+                sha256.update(bloco)
+                upload.write(bloco)
+        except Exception:
+            upload.abort()
+            raise
+
+        digest = sha256.hexdigest()
+        existente = files_collection.find_one({"metadata.sha256": digest})
+        if existente:
+            upload.abort()
+            return Arquivo(existente), True
+
+        upload.metadata = {
+            "sha256": digest,
+            "content_type": content_type or 'application/octet-stream',
+            "enviado_por": enviado_por
+        }
+        try:
+            upload.close()
+        except DuplicateKeyError:
+            # Envio simultâneo do mesmo conteúdo: manter o que foi gravado primeiro
+            db.arquivos.chunks.delete_many({"files_id": upload._id})
+            return Arquivo(files_collection.find_one({"metadata.sha256": digest})), True
+
+        return Arquivo(files_collection.find_one({"_id": upload._id})), False
+
+    @staticmethod
+    def find_by_id(arquivo_id):
+        """Buscar metadados do arquivo por ID"""
+        db = get_db()
+        try:
+            arquivo_data = db.arquivos.files.find_one({"_id": ObjectId(arquivo_id)})
+            return Arquivo(arquivo_data) if arquivo_data else None
+        except:
+            return None
+
+    @staticmethod
+    def abrir(arquivo_id):
+        """Abrir arquivo para leitura (GridOut pesquisável); None se não existir"""
+        try:
+            return Arquivo._bucket().open_download_stream(ObjectId(arquivo_id))
+        except NoFile:
+            return None
+
+    @staticmethod
+    def ler_intervalo(grid_out, inicio, fim):
+        """Gerar os bytes de [inicio, fim) em blocos, sem carregar o arquivo inteiro"""
+        try:
+            grid_out.seek(inicio)
+            restante = fim - inicio
+            while restante > 0:
+                bloco = grid_out.read(min(TAMANHO_BLOCO_LEITURA, restante))
+                if not bloco:
+                    break
+                restante -= len(bloco)
+                yield bloco
+        finally:
+            grid_out.close()
+
+    @staticmethod
+    def remover_se_orfao(arquivo_id):
+        """Excluir o arquivo do GridFS quando não restar nenhum vínculo"""
+        db = get_db()
+        if db.arquivos_vinculos.count_documents({"arquivo_id": arquivo_id}, limit=1):
+            return False
+        try:
+            Arquivo._bucket().delete(arquivo_id)
+        except NoFile:
+            pass
+        return True
+
+    @staticmethod
+    def remover_orfaos(idade_horas=None, limite=500):
+        """Excluir arquivos sem nenhum vínculo enviados há mais de idade_horas
+
+        Envios sem entidade (vinculados depois por /vinculos) têm esse prazo
+        para receber o primeiro vínculo. Cada arquivo é conferido de novo
+        antes da exclusão, então um vínculo criado durante a varredura o mantém.
+        """
+        db = get_db()
+        corte = datetime.utcnow() - timedelta(hours=idade_horas or Config.ARQUIVOS_ORFAOS_HORAS)
+        candidatos = db.arquivos.files.aggregate([
+            {"$match": {"uploadDate": {"$lt": corte}}},
+            {"$project": {"_id": 1}},
+            {"$lookup": {"from": "arquivos_vinculos", "localField": "_id", "foreignField": "arquivo_id", "as": "vinculos"}},
+            {"$match": {"vinculos": {"$size": 0}}},
+            {"$limit": limite}
+        ])
+        return sum(1 for arquivo in candidatos if Arquivo.remover_se_orfao(arquivo["_id"]))
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': str(self._id) if self._id else None,
+            'nome': self.nome,
+            'tamanho': self.tamanho,
+            'content_type': self.content_type,
+            'sha256': self.sha256,
+            'enviado_por': self.enviado_por,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
+
+class ArquivoVinculo:
+    """Vínculo entre um arquivo armazenado e um cliente, orçamento ou contrato"""
+
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.arquivo_id = data.get('arquivo_id')
+            self.entidade = data.get('entidade')
+            self.entidade_id = data.get('entidade_id')
+            self.categoria = data.get('categoria')
+            self.nome = data.get('nome')
+            self.criado_por = data.get('criado_por')
+            self.data_criacao = data.get('data_criacao')
+        else:
+            self._id = None
+            self.arquivo_id = None
+            self.entidade = None
+            self.entidade_id = None
+            self.categoria = None
+            self.nome = None
+            self.criado_por = None
+            self.data_criacao = None
+
+    def __repr__(self):
+        return f'<ArquivoVinculo {self.entidade}:{self.entidade_id} {self.arquivo_id}>'
+
+    @staticmethod
+    def vincular(arquivo_id, entidade, entidade_id, categoria=None, nome=None, criado_por=None):
+        """Vincular arquivo a uma entidade (idempotente)"""
+        if entidade not in ENTIDADES_VINCULO:
+            raise ValueError(f"Entidade inválida: {entidade}")
+
+        if not ObjectId.is_valid(str(entidade_id)):
+            raise ValueError(f"{entidade} não encontrado: {entidade_id}")
+
+        db = get_db()
+        entidade_oid = ObjectId(entidade_id)
+        if not db[ENTIDADES_VINCULO[entidade]].count_documents({"_id": entidade_oid}, limit=1):
+            raise ValueError(f"{entidade} não encontrado: {entidade_id}")
+
+        vinculos_collection = db.arquivos_vinculos
+        vinculo_data = {
+            "arquivo_id": ObjectId(arquivo_id),
+            "entidade": entidade,
+            "entidade_id": entidade_oid,
+            "categoria": categoria,
+            "nome": nome,
+            "criado_por": criado_por,
+            "data_criacao": datetime.utcnow()
+        }
+        try:
+            result = vinculos_collection.insert_one(vinculo_data)
+            vinculo_data["_id"] = result.inserted_id
+        except DuplicateKeyError:
+            vinculo_data = vinculos_collection.find_one({
+                "arquivo_id": vinculo_data["arquivo_id"],
+                "entidade": entidade,
+                "entidade_id": entidade_oid
+            })
+        return ArquivoVinculo(vinculo_data)
+
+    @staticmethod
+    def listar(entidade, entidade_id, categoria=None, limit=50, skip=0):
+        """Listar arquivos de uma entidade com os metadados (uma consulta em cada coleção)"""
+        db = get_db()
+
+        query = {"entidade": entidade, "entidade_id": ObjectId(entidade_id)}
+        if categoria:
+            query["categoria"] = categoria
+
+        vinculos = list(db.arquivos_vinculos.find(query).sort("data_criacao", -1).skip(skip).limit(limit))
+        arquivos = {
+            arquivo_data["_id"]: Arquivo(arquivo_data)
+            for arquivo_data in db.arquivos.files.find({"_id": {"$in": [v["arquivo_id"] for v in vinculos]}})
+        }
+
+        resultado = []
+        for vinculo_data in vinculos:
+            arquivo = arquivos.get(vinculo_data["arquivo_id"])
+            item = ArquivoVinculo(vinculo_data).to_dict()
+            item['arquivo'] = arquivo.to_dict() if arquivo else None
+            resultado.append(item)
+        return resultado
+
+    @staticmethod
+    def remover(vinculo_id):
+        """Remover vínculo e excluir o arquivo se ele não for mais usado"""
+        db = get_db()
+        vinculo_data = db.arquivos_vinculos.find_one_and_delete({"_id": ObjectId(vinculo_id)})
+        if not vinculo_data:
+            return False
+        Arquivo.remover_se_orfao(vinculo_data["arquivo_id"])
+        return True
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': str(self._id) if self._id else None,
+            'arquivo_id': str(self.arquivo_id) if self.arquivo_id else None,
+            'entidade': self.entidade,
+            'entidade_id': str(self.entidade_id) if self.entidade_id else None,
+            'categoria': self.categoria,
+            'nome': self.nome,
+            'criado_por': self.criado_por,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
@@ -0,0 +1,141 @@
+from datetime import datetime
+from pymongo import UpdateOne
+from src.database import get_db
+
+class Boleto:
+    """Boleto emitido pela Cora; chave_periodo ("<box_id>:<AAAA-MM>") garante um por box e competência"""
+
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.chave_periodo = data.get('chave_periodo')
+            self.competencia = data.get('competencia')
+            self.box_id = data.get('box_id')
+            self.box_numero = data.get('box_numero')
+            self.cliente_id = data.get('cliente_id')
+            self.valor = data.get('valor', 0)
+            self.vencimento = data.get('vencimento')
+            self.status = data.get('status', 'pendente')  # pendente, emitido, falha
+            self.cora_id = data.get('cora_id')
+            self.linha_digitavel = data.get('linha_digitavel')
+            self.codigo_barras = data.get('codigo_barras')
+            self.url_pdf = data.get('url_pdf')
+            self.erro = data.get('erro')
+            self.execucao_id = data.get('execucao_id')
+            self.data_criacao = data.get('data_criacao')
+            self.data_emissao = data.get('data_emissao')
+        else:
+            self._id = None
+            self.chave_periodo = None
+            self.competencia = None
+            self.box_id = None
+            self.box_numero = None
+            self.cliente_id = None
+            self.valor = 0
+            self.vencimento = None
+            self.status = 'pendente'
+            self.cora_id = None
+            self.linha_digitavel = None
+            self.codigo_barras = None
+            self.url_pdf = None
+            self.erro = None
+            self.execucao_id = None
+            self.data_criacao = None
+            self.data_emissao = None
+
+    def __repr__(self):
+        return f'<Boleto {self.chave_periodo} {self.status}>'
+
+    @staticmethod
+    def gerar_chave_periodo(box_id, competencia):
+        """Chave determinística do boleto de um box em uma competência"""
+        return f"{box_id}:{competencia}"
+
+    @staticmethod
+    def registrar_pendentes(boletos, execucao_id):
+        """Registrar boletos a emitir em lote; os que já existem não são alterados
+
+        Retorna os que ainda precisam ser emitidos (novos ou que falharam
+        em uma execução anterior).
+        """
+        if not boletos:
+            return []
+        db = get_db()
+        boletos_collection = db.boletos
+
+        agora = datetime.utcnow()
+        operacoes = [
+            UpdateOne(
+                {"chave_periodo": boleto["chave_periodo"]},
+                {"$setOnInsert": {**boleto, "status": "pendente", "data_criacao": agora}},
+                upsert=True
+            )
+            for boleto in boletos
+        ]
+        boletos_collection.bulk_write(operacoes, ordered=False)
+
+        chaves = [boleto["chave_periodo"] for boleto in boletos]
+        a_emitir = list(boletos_collection.find({
+            "chave_periodo": {"$in": chaves},
+            "status": {"$ne": "emitido"}
+        }))
+        if a_emitir:
+            boletos_collection.update_many(
+                {"_id": {"$in": [boleto["_id"] for boleto in a_emitir]}},
+                {"$set": {"execucao_id": execucao_id}}
+            )
+        return a_emitir
+
+    @staticmethod
+    def reconciliar(resultados):
+        """Gravar o retorno da Cora de um lote em um único bulk_write
+
+        Cada resultado é (chave_periodo, dados do boleto emitido ou None, erro).
+        """
+        if not resultados:
+            return
+        db = get_db()
+        boletos_collection = db.boletos
+
+        agora = datetime.utcnow()
+        operacoes = []
+        for chave_periodo, emitido, erro in resultados:
+            if emitido:
+                update = {"$set": {**emitido, "status": "emitido", "data_emissao": agora}, "$unset": {"erro": ""}}
+            else:
+                update = {"$set": {"status": "falha", "erro": str(erro)}}
+            # Nunca rebaixar um boleto já emitido
+            operacoes.append(UpdateOne({"chave_periodo": chave_periodo, "status": {"$ne": "emitido"}}, update))
+        boletos_collection.bulk_write(operacoes, ordered=False)
+
+    @staticmethod
+    def get_by_competencia(competencia, status_filter=None, limit=100, skip=0):
+        """Boletos de uma competência"""
+        db = get_db()
+        boletos_collection = db.boletos
+        query = {"competencia": competencia}
+        if status_filter:
+            query["status"] = status_filter
+        boletos_data = list(boletos_collection.find(query).sort("box_numero", 1).skip(skip).limit(limit))
+        return [Boleto(boleto_data) for boleto_data in boletos_data]
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': str(self._id) if self._id else None,
+            'chave_periodo': self.chave_periodo,
+            'competencia': self.competencia,
+            'box_id': str(self.box_id) if self.box_id else None,
+            'box_numero': self.box_numero,
+            'cliente_id': str(self.cliente_id) if self.cliente_id else None,
+            'valor': self.valor,
+            'vencimento': self.vencimento.isoformat() if isinstance(self.vencimento, datetime) else self.vencimento,
+            'status': self.status,
+            'cora_id': self.cora_id,
+            'linha_digitavel': self.linha_digitavel,
+            'codigo_barras': self.codigo_barras,
+            'url_pdf': self.url_pdf,
+            'erro': self.erro,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_emissao': self.data_emissao.isoformat() if self.data_emissao else None
+        }
@@ -1,6 +1,11 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from src.database import get_db
+from src.services.contatos import campos_normalizados, documento_digitos
+
+# Campos embutidos de versões antigas (agora em clientes_historico/arquivos_vinculos)
+PROJECAO_CLIENTE = {"historico": 0, "documentos": 0}
 
 class Cliente:
     def __init__(self, data=None):
@@ -46,12 +51,6 @@ class Cliente:
         db = get_db()
         clientes_collection = db.clientes
         
-        # Verificar se CPF/CNPJ já existe
-        if data.get('cpf_cnpj'):
-            existing_cliente = clientes_collection.find_one({"cpf_cnpj": data['cpf_cnpj']})
-            if existing_cliente:
-                raise ValueError("CPF/CNPJ já cadastrado")
-        
         cliente_data = {
             "nome": data.get('nome'),
             "email": data.get('email'),
@@ -68,8 +67,16 @@ class Cliente:
             "data_criacao": datetime.utcnow(),
             "data_atualizacao": datetime.utcnow()
         }
+        # Sem documento o campo não é gravado (null/vazio colidiria no índice único de CPF/CNPJ)
+        if not cliente_data["cpf_cnpj"]:
+            del cliente_data["cpf_cnpj"]
+        # Telefone em E.164 e CPF/CNPJ só com dígitos (o índice único impede o mesmo documento formatado diferente)
+        cliente_data.update(campos_normalizados("clientes", cliente_data))
         
-        result = clientes_collection.insert_one(cliente_data)
+        try:
+            result = clientes_collection.insert_one(cliente_data)
+        except DuplicateKeyError:
+            raise ValueError("CPF/CNPJ já cadastrado")
         cliente_data['_id'] = result.inserted_id
         return Cliente(cliente_data)
 
@@ -81,7 +88,7 @@ class Cliente:
         try:
             if isinstance(cliente_id, str):
                 cliente_id = ObjectId(cliente_id)
-            cliente_data = clientes_collection.find_one({"_id": cliente_id})
+            cliente_data = clientes_collection.find_one({"_id": cliente_id}, PROJECAO_CLIENTE)
             return Cliente(cliente_data) if cliente_data else None
         except:
             return None
@@ -91,15 +98,17 @@ class Cliente:
         """Buscar cliente por email"""
         db = get_db()
         clientes_collection = db.clientes
-        cliente_data = clientes_collection.find_one({"email": email})
+        cliente_data = clientes_collection.find_one({"email": email}, PROJECAO_CLIENTE)
         return Cliente(cliente_data) if cliente_data else None
 
     @staticmethod
     def find_by_cpf_cnpj(cpf_cnpj):
-        """Buscar cliente por CPF/CNPJ"""
+        """Buscar cliente por CPF/CNPJ (com ou sem formatação)"""
         db = get_db()
         clientes_collection = db.clientes
-        cliente_data = clientes_collection.find_one({"cpf_cnpj": cpf_cnpj})
+        digitos = documento_digitos(cpf_cnpj)
+        query = {"cpf_cnpj_digitos": digitos} if digitos else {"cpf_cnpj": cpf_cnpj}
+        cliente_data = clientes_collection.find_one(query, PROJECAO_CLIENTE)
         return Cliente(cliente_data) if cliente_data else None
 
     @staticmethod
@@ -112,12 +121,12 @@ class Cliente:
         if status_filter:
             query["status"] = status_filter
         
-        clientes_data = list(clientes_collection.find(query).sort("data_criacao", -1).limit(limit).skip(skip))
+        clientes_data = list(clientes_collection.find(query, PROJECAO_CLIENTE).sort("data_criacao", -1).limit(limit).skip(skip))
         return [Cliente(cliente_data) for cliente_data in clientes_data]
 
     @staticmethod
-    def search_clientes(search_term, limit=20):
-        """Buscar clientes por termo"""
+    def search_clientes(search_term, limit=20, skip=0, status_filter=None):
+        """Buscar clientes por termo (paginado, na mesma ordem da listagem)"""
         db = get_db()
         clientes_collection = db.clientes
         
@@ -130,8 +139,14 @@ class Cliente:
                 {"empresa": {"$regex": search_term, "$options": "i"}}
             ]
         }
+        if status_filter:
+            query["status"] = status_filter
         
-        clientes_data = list(clientes_collection.find(query).limit(limit))
+        # _id desempata clientes criados no mesmo instante (senão o skip pode repetir ou pular resultados)
+        clientes_data = list(
+            clientes_collection.find(query, PROJECAO_CLIENTE)
+            .sort([("data_criacao", -1), ("_id", -1)]).skip(skip).limit(limit)
+        )
         return [Cliente(cliente_data) for cliente_data in clientes_data]
 
     def update(self, data):
@@ -150,12 +165,24 @@ class Cliente:
             if field in data:
                 update_data[field] = data[field]
         
+        update_data.update(campos_normalizados("clientes", update_data))
         update_data['data_atualizacao'] = datetime.utcnow()
         
-        clientes_collection.update_one(
-            {"_id": self._id},
-            {"$set": update_data}
-        )
+        # Documento apagado: remover o campo em vez de gravar null/vazio
+        operacao = {"$set": update_data}
+        if 'cpf_cnpj' in update_data and not update_data['cpf_cnpj']:
+            operacao["$unset"] = {"cpf_cnpj": "", "cpf_cnpj_digitos": ""}
+            del update_data['cpf_cnpj']
+            del update_data['cpf_cnpj_digitos']
+            self.cpf_cnpj = None
+        
+        try:
+            clientes_collection.update_one(
+                {"_id": self._id},
+                operacao
+            )
+        except DuplicateKeyError:
+            raise ValueError("CPF/CNPJ já cadastrado")
         
         # Atualizar objeto atual
         for key, value in update_data.items():
@@ -0,0 +1,173 @@
+from datetime import datetime, timezone
+from bson import ObjectId
+from dateutil.parser import isoparse
+from src.database import get_db
+
+# Eventos por documento de bucket no histórico do cliente
+EVENTOS_POR_BUCKET = 100
+
+class ClienteHistorico:
+    """Histórico do cliente em buckets (clientes_historico), fora do documento do cliente"""
+
+    @staticmethod
+    def registrar(cliente_id, tipo, descricao, dados=None, usuario_id=None, data=None):
+        """Acrescentar evento ao bucket aberto do cliente (um novo é criado quando enche)"""
+        db = get_db()
+        historico_collection = db.clientes_historico
+
+        evento = {
+            "tipo": tipo,
+            "descricao": descricao,
+            "dados": dados or {},
+            "usuario_id": usuario_id,
+            "data": data or datetime.utcnow()
+        }
+        historico_collection.update_one(
+            {"cliente_id": ObjectId(cliente_id), "contagem": {"$lt": EVENTOS_POR_BUCKET}},
+            {
+                "$push": {"eventos": evento},
+                "$inc": {"contagem": 1},
+                "$min": {"inicio": evento["data"]},
+                "$max": {"fim": evento["data"]}
+            },
+            upsert=True
+        )
+        return evento
+
+    @staticmethod
+    def ler_cursor(texto):
+        """Cursor da timeline: "<data ISO>|<chave>" (ou só a data, formato antigo)"""
+        data, _, chave = texto.partition("|")
+        data = isoparse(data)
+        if data.tzinfo:
+            data = data.astimezone(timezone.utc).replace(tzinfo=None)
+        if chave.startswith("doc:") and not ObjectId.is_valid(chave[4:]):
+            raise ValueError(f"Cursor inválido: {texto}")
+        # Sem chave: tudo o que tem exatamente essa data fica para trás (comportamento anterior)
+        return data, chave
+
+    @staticmethod
+    def _antes(item, antes):
+        """Item vem depois do cursor na ordem (data, chave) decrescente"""
+        return antes is None or (item["data"], item["chave"]) < antes
+
+    @staticmethod
+    def get_eventos(cliente_id, limit=50, antes=None):
+        """Eventos do cliente, mais recentes primeiro (lê apenas os buckets necessários)
+
+        Cada evento recebe a chave "hist:<bucket>:<posição>", que desempata
+        eventos com a mesma data no cursor (data, chave) da timeline.
+        """
+        db = get_db()
+        historico_collection = db.clientes_historico
+
+        query = {"cliente_id": ObjectId(cliente_id)}
+        if antes:
+            query["inicio"] = {"$lte": antes[0]}
+
+        resultado = []
+        for bucket in historico_collection.find(query).sort("fim", -1):
+            for posicao, evento in enumerate(bucket.get("eventos", [])):
+                evento["chave"] = f"hist:{bucket['_id']}:{posicao:03d}"
+                if ClienteHistorico._antes(evento, antes):
+                    resultado.append(evento)
+            # Buckets mais antigos só têm eventos anteriores ao início deste
+            if len(resultado) >= limit:
+                break
+        resultado.sort(key=lambda evento: (evento["data"], evento["chave"]), reverse=True)
+        return resultado[:limit]
+
+    @staticmethod
+    def timeline(cliente_id, limit=50, antes=None):
+        """Histórico e documentos vinculados do cliente em uma linha do tempo paginada
+
+        A ordem é (data, chave) decrescente; `antes` é o cursor (data, chave)
+        lido com ler_cursor. Retorna (itens, proximo): proximo é o cursor
+        "<data ISO>|<chave>" da página seguinte (None na última), de modo que
+        itens com a mesma data não são pulados entre páginas.
+        """
+        db = get_db()
+
+        itens = [
+            {
+                "origem": "historico",
+                "tipo": evento["tipo"],
+                "descricao": evento["descricao"],
+                "dados": evento.get("dados", {}),
+                "usuario_id": evento.get("usuario_id"),
+                "data": evento["data"],
+                "chave": evento["chave"]
+            }
+            for evento in ClienteHistorico.get_eventos(cliente_id, limit=limit + 1, antes=antes)
+        ]
+
+        query = {"entidade": "cliente", "entidade_id": ObjectId(cliente_id)}
+        if antes:
+            data, chave = antes
+            mesma_data = {"data_criacao": data}
+            if chave.startswith("doc:"):
+                mesma_data["_id"] = {"$lt": ObjectId(chave[4:])}
+            elif chave <= "doc:":
+                mesma_data = None  # chaves "doc:" não vêm antes do cursor nessa data
+            query["$or"] = [{"data_criacao": {"$lt": data}}] + ([mesma_data] if mesma_data else [])
+        for vinculo in db.arquivos_vinculos.find(query).sort([("data_criacao", -1), ("_id", -1)]).limit(limit + 1):
+            itens.append({
+                "origem": "documento",
+                "tipo": vinculo.get("categoria") or "documento",
+                "descricao": vinculo.get("nome"),
+                "dados": {"arquivo_id": str(vinculo["arquivo_id"]), "vinculo_id": str(vinculo["_id"])},
+                "usuario_id": vinculo.get("criado_por"),
+                "data": vinculo["data_criacao"],
+                "chave": f"doc:{vinculo['_id']}"
+            })
+
+        itens.sort(key=lambda item: (item["data"], item["chave"]), reverse=True)
+        proximo = None
+        if len(itens) > limit:
+            ultimo = itens[limit - 1]
+            proximo = f"{ultimo['data'].isoformat()}|{ultimo['chave']}"
+        for item in itens:
+            item.pop("chave")
+        return itens[:limit], proximo
+
+    @staticmethod
+    def migrar_arrays_legados(limit=500):
+        """Mover `historico`/`documentos` embutidos de clientes antigos para as coleções próprias"""
+        db = get_db()
+        clientes_collection = db.clientes
+
+        migrados = 0
+        legados = clientes_collection.find(
+            {"$or": [{"historico": {"$exists": True}}, {"documentos": {"$exists": True}}]},
+            {"historico": 1, "documentos": 1}
+        ).limit(limit)
+        for cliente in legados:
+            for item in cliente.get("historico") or []:
+                if not isinstance(item, dict):
+                    item = {"descricao": str(item)}
+                ClienteHistorico.registrar(
+                    cliente["_id"],
+                    item.get("tipo", "legado"),
+                    item.get("descricao") or item.get("acao", ""),
+                    dados={k: v for k, v in item.items() if k not in ("tipo", "descricao", "data", "usuario_id")},
+                    usuario_id=item.get("usuario_id"),
+                    data=item.get("data") if isinstance(item.get("data"), datetime) else None
+                )
+            for documento in cliente.get("documentos") or []:
+                arquivo_id = documento.get("arquivo_id") if isinstance(documento, dict) else None
+                if arquivo_id and ObjectId.is_valid(arquivo_id):
+                    db.arquivos_vinculos.update_one(
+                        {"arquivo_id": ObjectId(arquivo_id), "entidade": "cliente", "entidade_id": cliente["_id"]},
+                        {"$setOnInsert": {
+                            "categoria": documento.get("categoria"),
+                            "nome": documento.get("nome"),
+                            "data_criacao": datetime.utcnow()
+                        }},
+                        upsert=True
+                    )
+            clientes_collection.update_one(
+                {"_id": cliente["_id"]},
+                {"$unset": {"historico": "", "documentos": ""}}
+            )
+            migrados += 1
+        return migrados
@@ -0,0 +1,160 @@
+from datetime import datetime
+import hashlib
+import json
+from bson import Binary
+from pymongo import ReturnDocument
+from src.config import Config
+from src.database import get_db
+
+# Documentos maiores que isso não são armazenados (limite de 16MB por documento do MongoDB)
+TAMANHO_MAXIMO_ITEM = 8 * 1024 * 1024
+
+class DocumentoCache:
+    """PDFs gerados, armazenados pelo hash do payload normalizado + versão do template
+
+    Uma nova geração com os mesmos dados devolve o PDF original (inclusive a
+    data de emissão impressa nele), sem passar pelo reportlab.
+    """
+
+    @staticmethod
+    def _normalizar(valor):
+        """Remover espaços das pontas e campos vazios para estabilizar o hash"""
+        if isinstance(valor, dict):
+            return {
+                chave: DocumentoCache._normalizar(item)
+                for chave, item in valor.items()
+                if item is not None
+            }
+        if isinstance(valor, (list, tuple)):
+            return [DocumentoCache._normalizar(item) for item in valor]
+        if isinstance(valor, str):
+            return valor.strip()
+        return valor
+
+    @staticmethod
+    def gerar_chave(tipo, data, versao):
+        """Hash SHA-256 do tipo, versão do template e payload normalizado"""
+        conteudo = json.dumps(
+            {"tipo": tipo, "versao": versao, "dados": DocumentoCache._normalizar(data)},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def obter(chave):
+        """Obter PDF armazenado (None se não existir) e registrar o acesso"""
+        db = get_db()
+        cache_collection = db.documentos_cache
+
+        documento = cache_collection.find_one_and_update(
+            {"_id": chave},
+            {"$set": {"ultimo_acesso": datetime.utcnow()}},
+            projection={"conteudo": 1}
+        )
+        return bytes(documento["conteudo"]) if documento else None
+
+    @staticmethod
+    def obter_muitos(chaves):
+        """Obter vários PDFs armazenados em uma consulta (dict chave -> bytes)"""
+        if not chaves:
+            return {}
+        db = get_db()
+        cache_collection = db.documentos_cache
+
+        encontrados = {
+            documento["_id"]: bytes(documento["conteudo"])
+            for documento in cache_collection.find({"_id": {"$in": list(chaves)}}, {"conteudo": 1})
+        }
+        if encontrados:
+            cache_collection.update_many(
+                {"_id": {"$in": list(encontrados)}},
+                {"$set": {"ultimo_acesso": datetime.utcnow()}}
+            )
+        return encontrados
+
+    @staticmethod
+    def salvar(chave, tipo, conteudo):
+        """Armazenar PDF gerado e aplicar o limite de tamanho total"""
+        if len(conteudo) > TAMANHO_MAXIMO_ITEM:
+            return
+        db = get_db()
+        cache_collection = db.documentos_cache
+
+        agora = datetime.utcnow()
+        result = cache_collection.update_one(
+            {"_id": chave},
+            {
+                "$setOnInsert": {
+                    "tipo": tipo,
+                    "conteudo": Binary(conteudo),
+                    "tamanho": len(conteudo),
+                    "data_criacao": agora
+                },
+                "$set": {"ultimo_acesso": agora}
+            },
+            upsert=True
+        )
+
+        if result.upserted_id is not None:
+            total = DocumentoCache._ajustar_total(len(conteudo))
+            if total > Config.DOCUMENTOS_CACHE_MAX_BYTES:
+                DocumentoCache.remover_excedente()
+
+    @staticmethod
+    def _ajustar_total(delta):
+        """Manter o tamanho total armazenado em um contador (evita somar a coleção)"""
+        db = get_db()
+        meta = db.documentos_cache_meta.find_one_and_update(
+            {"_id": "total"},
+            {"$inc": {"bytes": delta}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return meta["bytes"]
+
+    @staticmethod
+    def remover_excedente(lote=50):
+        """Remover os documentos acessados há mais tempo até caber no limite"""
+        db = get_db()
+        cache_collection = db.documentos_cache
+
+        meta = db.documentos_cache_meta.find_one({"_id": "total"}) or {"bytes": 0}
+        total = meta["bytes"]
+
+        while total > Config.DOCUMENTOS_CACHE_MAX_BYTES:
+            excedente = total - Config.DOCUMENTOS_CACHE_MAX_BYTES
+
+            # Selecionar apenas os mais antigos necessários para liberar o excedente
+            selecionados = []
+            liberados = 0
+            for doc in cache_collection.find({}, {"tamanho": 1}).sort("ultimo_acesso", 1).limit(lote):
+                selecionados.append(doc["_id"])
+                liberados += doc.get("tamanho", 0)
+                if liberados >= excedente:
+                    break
+            if not selecionados:
+                break
+
+            result = cache_collection.delete_many({"_id": {"$in": selecionados}})
+            if not result.deleted_count:
+                break
+
+            if result.deleted_count == len(selecionados):
+                total = DocumentoCache._ajustar_total(-liberados)
+            else:
+                # Outro worker removeu parte do lote ao mesmo tempo: recontar
+                total = DocumentoCache.recalcular_total()
+
+    @staticmethod
+    def recalcular_total():
+        """Recalcular o contador de bytes a partir da coleção"""
+        db = get_db()
+        resultado = list(db.documentos_cache.aggregate([
+            {"$group": {"_id": None, "bytes": {"$sum": "$tamanho"}}}
+        ]))
+        total = resultado[0]["bytes"] if resultado else 0
+        db.documentos_cache_meta.update_one({"_id": "total"}, {"$set": {"bytes": total}}, upsert=True)
+        return total
@@ -1,55 +1,317 @@
-from src.database import db
 from datetime import datetime
+from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from src.database import get_db
+
+# Movimentações por documento de bucket no histórico
+MOVIMENTACOES_POR_BUCKET = 200
+
+TIPOS_MOVIMENTACAO = ["entrada", "saida", "reserva", "devolucao", "ajuste"]
+
+class EstoqueInsuficiente(Exception):
+    """Quantidade disponível menor que a solicitada"""
+
+class Estoque:
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.item = data.get('item')
+            self.quantidade = data.get('quantidade', 0)
+            self.quantidade_minima = data.get('quantidade_minima', 10)
+            self.estoque_baixo = data.get('estoque_baixo', False)
+            self.unidade = data.get('unidade')
+            self.localizacao = data.get('localizacao')
+            self.data_criacao = data.get('data_criacao')
+            self.ultima_atualizacao = data.get('ultima_atualizacao')
+        else:
+            self._id = None
+            self.item = None
+            self.quantidade = 0
+            self.quantidade_minima = 10
+            self.estoque_baixo = False
+            self.unidade = None
+            self.localizacao = None
+            self.data_criacao = None
+            self.ultima_atualizacao = None
 
-class Estoque(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    item = db.Column(db.String(100), nullable=False)
-    quantidade = db.Column(db.Integer, nullable=False)
-    unidade = db.Column(db.String(50), nullable=True)
-    localizacao = db.Column(db.String(100), nullable=True)
-    ultima_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
     def __repr__(self):
         return f"<Estoque {self.item}>"
 
+    @staticmethod
+    def _novo_documento(data, agora):
+        quantidade = int(data.get("quantidade", 0))
+        quantidade_minima = int(data.get("quantidade_minima", 10))
+        return {
+            "item": data.get("item"),
+            "quantidade": quantidade,
+            "quantidade_minima": quantidade_minima,
+            "estoque_baixo": quantidade <= quantidade_minima,
+            "unidade": data.get("unidade"),
+            "localizacao": data.get("localizacao"),
+            "data_criacao": agora,
+            "ultima_atualizacao": agora
+        }
+
+    @staticmethod
+    def _entrada_inicial(item_data, usuario_id):
+        return {
+            "tipo": "entrada",
+            "quantidade": item_data["quantidade"],
+            "saldo": item_data["quantidade"],
+            "motivo": "Cadastro inicial",
+            "usuario_id": usuario_id,
+            "data": item_data["data_criacao"]
+        }
+
     @staticmethod
     def create(data):
-        estoque = Estoque(
-            item=data.get("item"),
-            quantidade=data.get("quantidade"),
-            unidade=data.get("unidade"),
-            localizacao=data.get("localizacao")
-        )
-        db.session.add(estoque)
-        db.session.commit()
-        return estoque.id
+        """Criar novo item de estoque (o histórico fica em estoque_movimentacoes)"""
+        db = get_db()
+        estoque_collection = db.estoque
+
+        item_data = Estoque._novo_documento(data, datetime.utcnow())
+        result = estoque_collection.insert_one(item_data)
+        item_data['_id'] = result.inserted_id
+
+        if item_data["quantidade"]:
+            Estoque._registrar_movimentacao(result.inserted_id, Estoque._entrada_inicial(item_data, data.get("usuario_id")))
+        return Estoque(item_data)
+
+    @staticmethod
+    def create_lote(itens, usuario_id=None):
+        """Criar vários itens com um insert_many e um bulk_write das entradas iniciais"""
+        db = get_db()
+        estoque_collection = db.estoque
+
+        agora = datetime.utcnow()
+        itens_data = [Estoque._novo_documento(data, agora) for data in itens]
+        if not itens_data:
+            return []
+        estoque_collection.insert_many(itens_data)
+
+        # Item novo ainda não tem bucket: cada entrada inicial abre o seu
+        buckets = [
+            InsertOne({
+                "item_id": item_data["_id"],
+                "contagem": 1,
+                "movimentacoes": [Estoque._entrada_inicial(item_data, usuario_id)],
+                "inicio": agora,
+                "fim": agora
+            })
+            for item_data in itens_data if item_data["quantidade"]
+        ]
+        if buckets:
+            db.estoque_movimentacoes.bulk_write(buckets, ordered=False)
+        return [Estoque(item_data) for item_data in itens_data]
+
+    @staticmethod
+    def find_by_id(item_id):
+        """Buscar item por ID"""
+        db = get_db()
+        estoque_collection = db.estoque
+        try:
+            if isinstance(item_id, str):
+                item_id = ObjectId(item_id)
+            item_data = estoque_collection.find_one({"_id": item_id})
+            return Estoque(item_data) if item_data else None
+        except:
+            return None
 
     @staticmethod
-    def get_all():
-        return [e.to_dict() for e in Estoque.query.all()]
+    def get_all(limit=100, skip=0, localizacao=None):
+        """Obter itens de estoque"""
+        db = get_db()
+        estoque_collection = db.estoque
+        query = {"localizacao": localizacao} if localizacao else {}
+        itens_data = list(estoque_collection.find(query).sort("item", 1).skip(skip).limit(limit))
+        return [Estoque(item_data) for item_data in itens_data]
 
     @staticmethod
-    def get_by_id(estoque_id):
-        return Estoque.query.get(estoque_id).to_dict() if Estoque.query.get(estoque_id) else None
+    def get_estoque_baixo(limit=100):
+        """Itens com quantidade igual ou abaixo da mínima (consulta pelo índice do indicador)"""
+        db = get_db()
+        estoque_collection = db.estoque
+        itens_data = list(estoque_collection.find({"estoque_baixo": True}).sort("item", 1).limit(limit))
+        return [Estoque(item_data) for item_data in itens_data]
 
     @staticmethod
-    def update(estoque_id, data):
-        estoque = Estoque.query.get(estoque_id)
-        if not estoque:
+    def _campos_cadastrais(data):
+        allowed_fields = ['item', 'unidade', 'localizacao', 'quantidade_minima']
+        update_data = {field: data[field] for field in allowed_fields if field in data}
+        if 'quantidade_minima' in update_data:
+            update_data['quantidade_minima'] = int(update_data['quantidade_minima'])
+        return update_data
+
+    @staticmethod
+    def _operacao_cadastral(update_data):
+        # Indicador recalculado na mesma operação, com o valor já atualizado
+        return [
+            {"$set": update_data},
+            {"$set": {"estoque_baixo": {"$lte": ["$quantidade", "$quantidade_minima"]}}}
+        ]
+
+    @staticmethod
+    def update(item_id, data):
+        """Atualizar dados cadastrais (a quantidade só muda por movimentação)"""
+        db = get_db()
+        estoque_collection = db.estoque
+
+        update_data = Estoque._campos_cadastrais(data)
+        if not update_data:
             return False
-        for key, value in data.items():
-            setattr(estoque, key, value)
-        db.session.commit()
-        return True
+        update_data["ultima_atualizacao"] = datetime.utcnow()
+
+        result = estoque_collection.update_one({"_id": ObjectId(item_id)}, Estoque._operacao_cadastral(update_data))
+        return result.matched_count > 0
+
+    @staticmethod
+    def update_lote(alteracoes):
+        """Atualizar dados cadastrais de vários itens em um único bulk_write: [{"id", ...campos}]"""
+        db = get_db()
+        estoque_collection = db.estoque
+
+        agora = datetime.utcnow()
+        operacoes = []
+        ignorados = 0
+        for data in alteracoes:
+            update_data = Estoque._campos_cadastrais(data)
+            if not update_data or not ObjectId.is_valid(data.get("id")):
+                ignorados += 1
+                continue
+            update_data["ultima_atualizacao"] = agora
+            operacoes.append(UpdateOne({"_id": ObjectId(data["id"])}, Estoque._operacao_cadastral(update_data)))
+
+        if not operacoes:
+            return {"atualizados": 0, "ignorados": ignorados}
+        result = estoque_collection.bulk_write(operacoes, ordered=False)
+        return {"atualizados": result.matched_count, "ignorados": ignorados + len(operacoes) - result.matched_count}
+
+    @staticmethod
+    def _aplicar_delta(item_id, delta):
+        """Somar delta à quantidade de forma atômica, sem deixá-la negativa
+
+        Retorna o documento atualizado ou None se não houver saldo.
+        """
+        db = get_db()
+        estoque_collection = db.estoque
+
+        filtro = {"_id": item_id}
+        if delta < 0:
+            filtro["quantidade"] = {"$gte": -delta}
+
+        return estoque_collection.find_one_and_update(
+            filtro,
+            [
+                {"$set": {
+                    "quantidade": {"$add": ["$quantidade", delta]},
+                    "ultima_atualizacao": datetime.utcnow()
+                }},
+                {"$set": {"estoque_baixo": {"$lte": ["$quantidade", "$quantidade_minima"]}}}
+            ],
+            projection={"quantidade": 1, "quantidade_minima": 1, "estoque_baixo": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _registrar_movimentacao(item_id, movimentacao):
+        """Acrescentar movimentação ao bucket aberto do item (um novo é criado quando enche)"""
+        db = get_db()
+        movimentacoes_collection = db.estoque_movimentacoes
+
+        movimentacoes_collection.update_one(
+            {"item_id": item_id, "contagem": {"$lt": MOVIMENTACOES_POR_BUCKET}},
+            {
+                "$push": {"movimentacoes": movimentacao},
+                "$inc": {"contagem": 1},
+                "$min": {"inicio": movimentacao["data"]},
+                "$max": {"fim": movimentacao["data"]}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def movimentar(item_id, tipo, quantidade, motivo=None, referencia=None, usuario_id=None):
+        """Registrar entrada/saída/reserva/devolução/ajuste e atualizar a quantidade atomicamente"""
+        if tipo not in TIPOS_MOVIMENTACAO:
+            raise ValueError(f"Tipo de movimentação inválido: {tipo}")
+
+        quantidade = int(quantidade)
+        if tipo == "ajuste":
+            delta = quantidade
+        elif quantidade <= 0:
+            raise ValueError("Quantidade deve ser positiva")
+        else:
+            delta = -quantidade if tipo in ("saida", "reserva") else quantidade
+
+        if not ObjectId.is_valid(str(item_id)):
+            raise ValueError(f"Item não encontrado: {item_id}")
+        item_id = ObjectId(item_id)
+        atualizado = Estoque._aplicar_delta(item_id, delta)
+        if atualizado is None:
+            if not Estoque.find_by_id(item_id):
+                raise ValueError("Item não encontrado")
+            raise EstoqueInsuficiente(f"Estoque insuficiente para {tipo} de {abs(delta)}")
+
+        movimentacao = {
+            "tipo": tipo,
+            "quantidade": delta,
+            "saldo": atualizado["quantidade"],
+            "motivo": motivo,
+            "referencia": referencia,
+            "usuario_id": usuario_id,
+            "data": datetime.utcnow()
+        }
+        Estoque._registrar_movimentacao(item_id, movimentacao)
+        return atualizado
+
+    @staticmethod
+    def reservar_itens(itens, referencia=None, usuario_id=None):
+        """Reservar vários itens (ex.: materiais de uma OS); desfaz as já aplicadas se algum faltar"""
+        aplicadas = []
+        try:
+            for item in itens:
+                Estoque.movimentar(
+                    item.get("item_id"), "reserva", item.get("quantidade", 0),
+                    motivo="Reserva de materiais", referencia=referencia, usuario_id=usuario_id
+                )
+                aplicadas.append(item)
+        except Exception:
+            for item in aplicadas:
+                Estoque.movimentar(
+                    item["item_id"], "devolucao", item["quantidade"],
+                    motivo="Estorno de reserva incompleta", referencia=referencia, usuario_id=usuario_id
+                )
+            raise
+        return len(aplicadas)
+
+    @staticmethod
+    def get_movimentacoes(item_id, limit=50, skip=0):
+        """Movimentações do item, mais recentes primeiro (lê apenas os buckets necessários)"""
+        db = get_db()
+        movimentacoes_collection = db.estoque_movimentacoes
+
+        resultado = []
+        ignorar = skip
+        for bucket in movimentacoes_collection.find({"item_id": ObjectId(item_id)}).sort("fim", -1):
+            movimentacoes = list(reversed(bucket.get("movimentacoes", [])))
+            if ignorar >= len(movimentacoes):
+                ignorar -= len(movimentacoes)
+                continue
+            resultado.extend(movimentacoes[ignorar:])
+            ignorar = 0
+            if len(resultado) >= limit:
+                break
+        return resultado[:limit]
 
     def to_dict(self):
         return {
-            "id": self.id,
+            "id": str(self._id) if self._id else None,
             "item": self.item,
             "quantidade": self.quantidade,
+            "quantidade_minima": self.quantidade_minima,
+            "estoque_baixo": self.estoque_baixo,
             "unidade": self.unidade,
             "localizacao": self.localizacao,
+            "data_criacao": self.data_criacao.isoformat() if self.data_criacao else None,
             "ultima_atualizacao": self.ultima_atualizacao.isoformat() if self.ultima_atualizacao else None
         }
-
-
@@ -0,0 +1,84 @@
+from datetime import datetime
+from src.database import get_db
+
+class Evento:
+    """Evento do Google Agenda espelhado localmente pela sincronização"""
+
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.calendario_id = data.get('calendario_id')
+            self.google_id = data.get('google_id')
+            self.titulo = data.get('titulo', '')
+            self.descricao = data.get('descricao', '')
+            self.endereco = data.get('endereco', '')
+            self.tipo = data.get('tipo', 'evento')
+            self.inicio = data.get('inicio')
+            self.fim = data.get('fim')
+            self.data = data.get('data')
+            self.hora = data.get('hora')
+            self.dia_inteiro = data.get('dia_inteiro', False)
+            self.link = data.get('link')
+            self.atualizado_google = data.get('atualizado_google')
+            self.sincronizado_em = data.get('sincronizado_em')
+        else:
+            self._id = None
+            self.calendario_id = None
+            self.google_id = None
+            self.titulo = ''
+            self.descricao = ''
+            self.endereco = ''
+            self.tipo = 'evento'
+            self.inicio = None
+            self.fim = None
+            self.data = None
+            self.hora = None
+            self.dia_inteiro = False
+            self.link = None
+            self.atualizado_google = None
+            self.sincronizado_em = None
+
+    def __repr__(self):
+        return f'<Evento {self.calendario_id}:{self.google_id}>'
+
+    @staticmethod
+    def find_intervalo(inicio, fim, calendario_id=None, tipo=None, limit=500):
+        """Eventos que se sobrepõem ao intervalo [inicio, fim)"""
+        db = get_db()
+        eventos_collection = db.eventos
+
+        query = {"inicio": {"$lt": fim}, "fim": {"$gt": inicio}}
+        if calendario_id:
+            query["calendario_id"] = calendario_id
+        if tipo:
+            query["tipo"] = tipo
+
+        eventos_data = list(eventos_collection.find(query).sort("inicio", 1).limit(limit))
+        return [Evento(evento_data) for evento_data in eventos_data]
+
+    @staticmethod
+    def ultima_sincronizacao():
+        """Estado da sincronização de cada calendário"""
+        db = get_db()
+        return {
+            estado["_id"]: estado.get("sincronizado_em")
+            for estado in db.calendario_sync.find({}, {"sincronizado_em": 1})
+        }
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': self.google_id,
+            'calendario_id': self.calendario_id,
+            'titulo': self.titulo,
+            'descricao': self.descricao,
+            'data': self.data,
+            'hora': self.hora,
+            'endereco': self.endereco,
+            'tipo': self.tipo,
+            'dia_inteiro': self.dia_inteiro,
+            'inicio': self.inicio.isoformat() if isinstance(self.inicio, datetime) else self.inicio,
+            'fim': self.fim.isoformat() if isinstance(self.fim, datetime) else self.fim,
+            'link': self.link,
+            'sincronizado_em': self.sincronizado_em.isoformat() if self.sincronizado_em else None
+        }
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.database import get_db
+
+class ExecucaoPerdida(Exception):
+    """A execução foi retomada por outro worker (este ficou tempo demais sem registrar progresso)"""
+
+class FaturamentoExecucao:
+    """Execução do faturamento mensal dos boxes (progresso e resultado)"""
+
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.competencia = data.get('competencia')
+            self.status = data.get('status', 'pendente')  # pendente, em_andamento, concluida, erro
+            self.total = data.get('total', 0)
+            self.emitidos = data.get('emitidos', 0)
+            self.falhas = data.get('falhas', 0)
+            self.ja_emitidos = data.get('ja_emitidos', 0)
+            self.erro = data.get('erro')
+            self.worker_id = data.get('worker_id')
+            self.solicitado_por = data.get('solicitado_por')
+            self.data_criacao = data.get('data_criacao')
+            self.data_inicio = data.get('data_inicio')
+            self.data_fim = data.get('data_fim')
+        else:
+            self._id = None
+            self.competencia = None
+            self.status = 'pendente'
+            self.total = 0
+            self.emitidos = 0
+            self.falhas = 0
+            self.ja_emitidos = 0
+            self.erro = None
+            self.worker_id = None
+            self.solicitado_por = None
+            self.data_criacao = None
+            self.data_inicio = None
+            self.data_fim = None
+
+    def __repr__(self):
+        return f'<FaturamentoExecucao {self.competencia} {self.status}>'
+
+    @staticmethod
+    def solicitar(competencia, solicitado_por=None):
+        """Enfileirar execução; retorna None se já houver uma ativa para a competência"""
+        db = get_db()
+        execucoes_collection = db.faturamento_execucoes
+
+        execucao_data = {
+            "competencia": competencia,
+            "status": "pendente",
+            "ativa": True,
+            "total": 0,
+            "emitidos": 0,
+            "falhas": 0,
+            "ja_emitidos": 0,
+            "solicitado_por": solicitado_por,
+            "data_criacao": datetime.utcnow()
+        }
+        try:
+            result = execucoes_collection.insert_one(execucao_data)
+        except DuplicateKeyError:
+            return None
+        execucao_data['_id'] = result.inserted_id
+        return FaturamentoExecucao(execucao_data)
+
+    @staticmethod
+    def reservar(worker_id):
+        """Reservar a próxima execução pendente (ou abandonada por um worker que parou)
+
+        Retomar é seguro: boletos já emitidos são ignorados pela chave do período.
+        """
+        db = get_db()
+        agora = datetime.utcnow()
+        execucao_data = db.faturamento_execucoes.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pendente"},
+                    {"status": "em_andamento", "atualizado_em": {"$lt": agora - timedelta(minutes=10)}}
+                ]
+            },
+            {"$set": {
+                "status": "em_andamento",
+                "worker_id": worker_id,
+                "data_inicio": agora,
+                "atualizado_em": agora,
+                "total": 0,
+                "emitidos": 0,
+                "falhas": 0,
+                "ja_emitidos": 0
+            }},
+            sort=[("data_criacao", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return FaturamentoExecucao(execucao_data) if execucao_data else None
+
+    @staticmethod
+    def registrar_progresso(execucao_id, worker_id, **contadores):
+        """Somar contadores de progresso (total, emitidos, falhas, ja_emitidos)
+
+        Só vale enquanto a execução estiver com este worker: se outro a retomou,
+        levanta ExecucaoPerdida e os contadores da nova execução ficam intactos.
+        """
+        db = get_db()
+        result = db.faturamento_execucoes.update_one(
+            {"_id": execucao_id, "worker_id": worker_id, "status": "em_andamento"},
+            {"$inc": contadores, "$set": {"atualizado_em": datetime.utcnow()}}
+        )
+        if not result.matched_count:
+            raise ExecucaoPerdida(str(execucao_id))
+
+    @staticmethod
+    def finalizar(execucao_id, worker_id, erro=None):
+        """Encerrar execução, liberando a competência para uma nova (False se outro worker a retomou)"""
+        db = get_db()
+        result = db.faturamento_execucoes.update_one(
+            {"_id": execucao_id, "worker_id": worker_id, "status": "em_andamento"},
+            {
+                "$set": {
+                    "status": "erro" if erro else "concluida",
+                    "erro": str(erro) if erro else None,
+                    "data_fim": datetime.utcnow()
+                },
+                "$unset": {"ativa": "", "worker_id": ""}
+            }
+        )
+        return result.matched_count > 0
+
+    @staticmethod
+    def find_by_id(execucao_id):
+        """Buscar execução por ID"""
+        db = get_db()
+        try:
+            execucao_data = db.faturamento_execucoes.find_one({"_id": ObjectId(execucao_id)})
+            return FaturamentoExecucao(execucao_data) if execucao_data else None
+        except:
+            return None
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        processados = self.emitidos + self.falhas + self.ja_emitidos
+        return {
+            'id': str(self._id) if self._id else None,
+            'competencia': self.competencia,
+            'status': self.status,
+            'total': self.total,
+            'emitidos': self.emitidos,
+            'falhas': self.falhas,
+            'ja_emitidos': self.ja_emitidos,
+            'progresso': round(processados / self.total * 100, 1) if self.total else 0,
+            'erro': self.erro,
+            'solicitado_por': self.solicitado_por,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_fim': self.data_fim.isoformat() if self.data_fim else None
+        }
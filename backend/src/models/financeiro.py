@@ -1,56 +1,342 @@
-from src.database import db
 from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from src.database import get_db
+from src.services.calendario import data_utc
+
+TIPOS_TRANSACAO = ["receita", "despesa"]
+
+STATUS_TRANSACAO = ["pendente", "pago", "cancelado"]
+
+SEM_CATEGORIA = "sem_categoria"
+
+class Financeiro:
+    """Transação financeira (receita/despesa); cada escrita atualiza financeiro_rollups"""
+
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.tipo = data.get('tipo', 'receita')
+            self.descricao = data.get('descricao')
+            self.valor = data.get('valor', 0)
+            self.categoria = data.get('categoria') or SEM_CATEGORIA
+            self.status = data.get('status', 'pendente')
+            self.data = data.get('data')
+            self.competencia = data.get('competencia')
+            self.data_vencimento = data.get('data_vencimento')
+            self.data_pagamento = data.get('data_pagamento')
+            self.cliente_id = data.get('cliente_id')
+            self.referencia = data.get('referencia')
+            self.usuario_id = data.get('usuario_id')
+            self.data_criacao = data.get('data_criacao')
+            self.data_atualizacao = data.get('data_atualizacao')
+        else:
+            self._id = None
+            self.tipo = 'receita'
+            self.descricao = None
+            self.valor = 0
+            self.categoria = SEM_CATEGORIA
+            self.status = 'pendente'
+            self.data = None
+            self.competencia = None
+            self.data_vencimento = None
+            self.data_pagamento = None
+            self.cliente_id = None
+            self.referencia = None
+            self.usuario_id = None
+            self.data_criacao = None
+            self.data_atualizacao = None
 
-class Financeiro(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    tipo = db.Column(db.String(50), nullable=False) # 'receita' ou 'despesa'
-    descricao = db.Column(db.String(255), nullable=False)
-    valor = db.Column(db.Float, nullable=False)
-    data = db.Column(db.DateTime, default=datetime.utcnow)
-    categoria = db.Column(db.String(100), nullable=True)
-    
     def __repr__(self):
         return f"<Financeiro {self.descricao}>"
 
+    @staticmethod
+    def _validar(transacao_data):
+        if transacao_data.get("tipo") not in TIPOS_TRANSACAO:
+            raise ValueError(f"Tipo inválido: {transacao_data.get('tipo')}")
+        if transacao_data.get("status") not in STATUS_TRANSACAO:
+            raise ValueError(f"Status inválido: {transacao_data.get('status')}")
+        if transacao_data.get("valor", 0) < 0:
+            raise ValueError("Valor não pode ser negativo")
+
+    @staticmethod
+    def _novo_documento(data, agora):
+        data_transacao = data_utc(data.get("data")) or data_utc(data.get("data_vencimento")) or agora
+        transacao_data = {
+            "tipo": data.get("tipo", "receita"),
+            "descricao": data.get("descricao"),
+            "valor": round(float(data.get("valor", 0)), 2),
+            "categoria": data.get("categoria") or SEM_CATEGORIA,
+            "status": data.get("status", "pendente"),
+            "data": data_transacao,
+            "competencia": data_transacao.strftime("%Y-%m"),
+            "data_vencimento": data_utc(data.get("data_vencimento")),
+            "data_pagamento": data_utc(data.get("data_pagamento")),
+            "cliente_id": data.get("cliente_id"),
+            "referencia": data.get("referencia"),
+            "usuario_id": data.get("usuario_id"),
+            "data_criacao": agora,
+            "data_atualizacao": agora
+        }
+        Financeiro._validar(transacao_data)
+        return transacao_data
+
     @staticmethod
     def create(data):
-        financeiro = Financeiro(
-            tipo=data.get("tipo"),
-            descricao=data.get("descricao"),
-            valor=data.get("valor"),
-            data=data.get("data"),
-            categoria=data.get("categoria")
-        )
-        db.session.add(financeiro)
-        db.session.commit()
-        return financeiro.id
+        """Criar transação e somá-la aos rollups do mês"""
+        db = get_db()
+        financeiro_collection = db.financeiro
+
+        transacao_data = Financeiro._novo_documento(data, datetime.utcnow())
+        result = financeiro_collection.insert_one(transacao_data)
+        transacao_data['_id'] = result.inserted_id
+
+        FinanceiroRollup.aplicar(None, transacao_data)
+        return Financeiro(transacao_data)
+
+    @staticmethod
+    def create_lote(transacoes):
+        """Criar várias transações com um insert_many e um único bulk_write nos rollups
+
+        Todas são validadas antes de gravar: uma transação inválida rejeita o lote (ValueError).
+        """
+        db = get_db()
+        financeiro_collection = db.financeiro
+
+        agora = datetime.utcnow()
+        transacoes_data = []
+        for indice, data in enumerate(transacoes):
+            try:
+                transacoes_data.append(Financeiro._novo_documento(data, agora))
+            except ValueError as e:
+                raise ValueError(f"Transação {indice}: {e}")
+        if not transacoes_data:
+            return []
+
+        financeiro_collection.insert_many(transacoes_data)
+        FinanceiroRollup.aplicar_lote([(None, transacao_data) for transacao_data in transacoes_data])
+        return [Financeiro(transacao_data) for transacao_data in transacoes_data]
 
     @staticmethod
-    def get_all():
-        return [f.to_dict() for f in Financeiro.query.all()]
+    def find_by_id(transacao_id):
+        """Buscar transação por ID"""
+        db = get_db()
+        financeiro_collection = db.financeiro
+        try:
+            if isinstance(transacao_id, str):
+                transacao_id = ObjectId(transacao_id)
+            transacao_data = financeiro_collection.find_one({"_id": transacao_id})
+            return Financeiro(transacao_data) if transacao_data else None
+        except:
+            return None
 
     @staticmethod
-    def get_by_id(financeiro_id):
-        return Financeiro.query.get(financeiro_id).to_dict() if Financeiro.query.get(financeiro_id) else None
+    def get_all(limit=50, skip=0, tipo=None, status=None, competencia=None, cliente_id=None):
+        """Obter transações, mais recentes primeiro"""
+        db = get_db()
+        financeiro_collection = db.financeiro
+
+        query = {}
+        if tipo:
+            query["tipo"] = tipo
+        if status:
+            query["status"] = status
+        if competencia:
+            query["competencia"] = competencia
+        if cliente_id:
+            query["cliente_id"] = cliente_id
+
+        transacoes_data = list(financeiro_collection.find(query).sort("data", -1).skip(skip).limit(limit))
+        return [Financeiro(transacao_data) for transacao_data in transacoes_data]
+
+    @staticmethod
+    def update(transacao_id, data):
+        """Atualizar transação e ajustar os rollups pela diferença (antes/depois)"""
+        db = get_db()
+        financeiro_collection = db.financeiro
+
+        allowed_fields = ['tipo', 'descricao', 'valor', 'categoria', 'status', 'data',
+                          'data_vencimento', 'data_pagamento', 'cliente_id', 'referencia']
+        update_data = {field: data[field] for field in allowed_fields if field in data}
+        if not update_data:
+            return None
+
+        for campo in ('data', 'data_vencimento', 'data_pagamento'):
+            if campo in update_data:
+                update_data[campo] = data_utc(update_data[campo])
+        if 'valor' in update_data:
+            update_data['valor'] = round(float(update_data['valor']), 2)
+        if 'categoria' in update_data:
+            update_data['categoria'] = update_data['categoria'] or SEM_CATEGORIA
+        if update_data.get('data'):
+            update_data['competencia'] = update_data['data'].strftime("%Y-%m")
+        elif 'data' in update_data:
+            del update_data['data']
+        if update_data.get('status') == 'pago' and not update_data.get('data_pagamento'):
+            update_data['data_pagamento'] = datetime.utcnow()
+        update_data["data_atualizacao"] = datetime.utcnow()
+
+        existente = financeiro_collection.find_one({"_id": ObjectId(transacao_id)})
+        if not existente:
+            return None
+        Financeiro._validar({**existente, **update_data})
+
+        # O estado anterior vem da mesma operação atômica, então escritas
+        # concorrentes na mesma transação não contam a mesma diferença duas vezes
+        anterior = financeiro_collection.find_one_and_update(
+            {"_id": ObjectId(transacao_id)},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not anterior:
+            return None
+
+        atual = {**anterior, **update_data}
+        FinanceiroRollup.aplicar(anterior, atual)
+        return Financeiro(atual)
 
     @staticmethod
-    def update(financeiro_id, data):
-        financeiro = Financeiro.query.get(financeiro_id)
-        if not financeiro:
-            return False
-        for key, value in data.items():
-            setattr(financeiro, key, value)
-        db.session.commit()
-        return True
+    def cancelar(transacao_id):
+        """Cancelar transação (sai dos rollups, permanece no histórico)"""
+        return Financeiro.update(transacao_id, {"status": "cancelado"})
 
     def to_dict(self):
         return {
-            "id": self.id,
+            "id": str(self._id) if self._id else None,
             "tipo": self.tipo,
             "descricao": self.descricao,
             "valor": self.valor,
+            "categoria": self.categoria,
+            "status": self.status,
             "data": self.data.isoformat() if self.data else None,
-            "categoria": self.categoria
+            "competencia": self.competencia,
+            "data_vencimento": self.data_vencimento.isoformat() if self.data_vencimento else None,
+            "data_pagamento": self.data_pagamento.isoformat() if self.data_pagamento else None,
+            "cliente_id": self.cliente_id,
+            "referencia": self.referencia,
+            "data_criacao": self.data_criacao.isoformat() if self.data_criacao else None,
+            "data_atualizacao": self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
+
+class FinanceiroRollup:
+    """Totais por mês × categoria × tipo em financeiro_rollups, mantidos com $inc a cada escrita"""
+
+    @staticmethod
+    def _contribuicao(transacao):
+        """Chave e valores que uma transação soma ao rollup (None se não conta)"""
+        if not transacao or transacao.get("status") == "cancelado":
+            return None, None
+        chave = (transacao["competencia"], transacao.get("categoria") or SEM_CATEGORIA, transacao["tipo"])
+        valor = transacao.get("valor", 0)
+        return chave, {
+            "total": valor,
+            "pago": valor if transacao.get("status") == "pago" else 0,
+            "quantidade": 1
         }
 
+    @staticmethod
+    def aplicar(anterior, atual):
+        """Remover a contribuição do estado anterior e somar a do atual"""
+        FinanceiroRollup.aplicar_lote([(anterior, atual)])
+
+    @staticmethod
+    def aplicar_lote(pares):
+        """aplicar() para vários pares (anterior, atual), somados por grupo em um único bulk_write"""
+        db = get_db()
+
+        deltas = {}
+        for anterior, atual in pares:
+            for transacao, sinal in ((anterior, -1), (atual, 1)):
+                chave, valores = FinanceiroRollup._contribuicao(transacao)
+                if chave is None:
+                    continue
+                acumulado = deltas.setdefault(chave, {"total": 0, "pago": 0, "quantidade": 0})
+                for campo, valor in valores.items():
+                    acumulado[campo] += sinal * valor
+
+        operacoes = [
+            UpdateOne(
+                {"mes": mes, "categoria": categoria, "tipo": tipo},
+                {"$inc": delta, "$set": {"atualizado_em": datetime.utcnow()}},
+                upsert=True
+            )
+            for (mes, categoria, tipo), delta in deltas.items()
+            if any(delta.values())
+        ]
+        if operacoes:
+            db.financeiro_rollups.bulk_write(operacoes, ordered=False)
+
+    @staticmethod
+    def reconstruir():
+        """Recalcular todos os rollups a partir das transações (carga inicial ou correção)
+
+        Grupos atualizados por escritas durante a execução não são removidos;
+        o ideal é rodar com pouco movimento.
+        """
+        db = get_db()
+        inicio = datetime.utcnow()
+
+        agrupados = db.financeiro.aggregate([
+            {"$match": {"status": {"$ne": "cancelado"}}},
+            {"$group": {
+                "_id": {"mes": "$competencia", "categoria": {"$ifNull": ["$categoria", SEM_CATEGORIA]}, "tipo": "$tipo"},
+                "total": {"$sum": "$valor"},
+                "pago": {"$sum": {"$cond": [{"$eq": ["$status", "pago"]}, "$valor", 0]}},
+                "quantidade": {"$sum": 1}
+            }}
+        ], allowDiskUse=True)
+
+        operacoes = [
+            UpdateOne(
+                grupo["_id"],
+                {"$set": {
+                    "total": grupo["total"],
+                    "pago": grupo["pago"],
+                    "quantidade": grupo["quantidade"],
+                    "atualizado_em": inicio
+                }},
+                upsert=True
+            )
+            for grupo in agrupados
+        ]
+        if operacoes:
+            db.financeiro_rollups.bulk_write(operacoes, ordered=False)
+
+        # Combinações que não existem mais nas transações
+        removidos = db.financeiro_rollups.delete_many({"atualizado_em": {"$lt": inicio}}).deleted_count
+        return {"grupos": len(operacoes), "removidos": removidos}
+
+    @staticmethod
+    def consultar(mes_inicio, mes_fim, tipo=None, categoria=None):
+        """Rollups no intervalo de meses ("AAAA-MM", inclusivo), ordenados por mês"""
+        db = get_db()
+
+        # Grupos zerados por cancelamentos/alterações ficam até a próxima reconstrução
+        query = {"mes": {"$gte": mes_inicio, "$lte": mes_fim}, "quantidade": {"$gt": 0}}
+        if tipo:
+            query["tipo"] = tipo
+        if categoria:
+            query["categoria"] = categoria
+        return list(db.financeiro_rollups.find(query, {"_id": 0, "atualizado_em": 0}).sort("mes", 1))
+
+    @staticmethod
+    def fluxo_caixa(mes_inicio, mes_fim):
+        """Receitas, despesas e saldo por mês a partir dos rollups"""
+        meses = {}
+        for rollup in FinanceiroRollup.consultar(mes_inicio, mes_fim):
+            mes = meses.setdefault(rollup["mes"], {
+                "mes": rollup["mes"], "receitas": 0, "despesas": 0,
+                "receitas_pagas": 0, "despesas_pagas": 0
+            })
+            sufixo = "receitas" if rollup["tipo"] == "receita" else "despesas"
+            mes[sufixo] += rollup["total"]
+            mes[f"{sufixo}_pagas"] += rollup["pago"]
 
+        resultado = []
+        for mes in sorted(meses):
+            item = meses[mes]
+            for campo in ("receitas", "despesas", "receitas_pagas", "despesas_pagas"):
+                item[campo] = round(item[campo], 2)
+            item["saldo"] = round(item["receitas"] - item["despesas"], 2)
+            resultado.append(item)
+        return resultado
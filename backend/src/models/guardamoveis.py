@@ -1,59 +1,322 @@
-from src.database import db
-from datetime import datetime
-
-class GuardaMoveis(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    cliente_id = db.Column(db.Integer, db.ForeignKey("cliente.id"), nullable=False)
-    box_numero = db.Column(db.String(50), unique=True, nullable=False)
-    tamanho = db.Column(db.String(50), nullable=True)
-    data_inicio = db.Column(db.DateTime, default=datetime.utcnow)
-    data_fim = db.Column(db.DateTime, nullable=True)
-    status = db.Column(db.String(50), default="Ocupado")
-    
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from src.database import get_db
+
+class ConflitoOcupacao(Exception):
+    """O box já está ocupado (ou em alocação) no período solicitado"""
+
+class GuardaMoveis:
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.box_numero = data.get('box_numero')
+            self.tamanho = data.get('tamanho')
+            self.status = data.get('status', 'disponivel')  # disponivel, reservado, ocupado, manutencao
+            self.cliente_id = data.get('cliente_id')
+            self.valor_mensal = data.get('valor_mensal', 0)
+            self.dia_vencimento = data.get('dia_vencimento')
+            self.data_inicio = data.get('data_inicio')
+            self.data_fim = data.get('data_fim')
+            self.observacoes = data.get('observacoes', '')
+            self.data_criacao = data.get('data_criacao')
+            self.data_atualizacao = data.get('data_atualizacao')
+        else:
+            self._id = None
+            self.box_numero = None
+            self.tamanho = None
+            self.status = 'disponivel'
+            self.cliente_id = None
+            self.valor_mensal = 0
+            self.dia_vencimento = None
+            self.data_inicio = None
+            self.data_fim = None
+            self.observacoes = ''
+            self.data_criacao = None
+            self.data_atualizacao = None
+
     def __repr__(self):
         return f"<GuardaMoveis {self.box_numero}>"
 
+    @staticmethod
+    def _novo_documento(data, agora):
+        return {
+            "box_numero": data.get('box_numero'),
+            "tamanho": data.get('tamanho'),
+            "status": data.get('status', 'disponivel'),
+            "cliente_id": data.get('cliente_id'),
+            "valor_mensal": float(data.get('valor_mensal', 0)),
+            "dia_vencimento": data.get('dia_vencimento'),
+            "data_inicio": data.get('data_inicio'),
+            "data_fim": data.get('data_fim'),
+            "observacoes": data.get('observacoes', ''),
+            "data_criacao": agora,
+            "data_atualizacao": agora
+        }
+
     @staticmethod
     def create(data):
-        guarda_moveis = GuardaMoveis(
-            cliente_id=data.get("cliente_id"),
-            box_numero=data.get("box_numero"),
-            tamanho=data.get("tamanho"),
-            data_inicio=data.get("data_inicio"),
-            data_fim=data.get("data_fim"),
-            status=data.get("status", "Ocupado")
-        )
-        db.session.add(guarda_moveis)
-        db.session.commit()
-        return guarda_moveis.id
+        """Criar novo box"""
+        db = get_db()
+        boxes_collection = db.guarda_moveis
+
+        box_data = GuardaMoveis._novo_documento(data, datetime.utcnow())
+        result = boxes_collection.insert_one(box_data)
+        box_data['_id'] = result.inserted_id
+        return GuardaMoveis(box_data)
 
     @staticmethod
-    def get_all():
-        return [gm.to_dict() for gm in GuardaMoveis.query.all()]
+    def create_lote(boxes):
+        """Criar vários boxes em um insert_many não ordenado
+
+        Números de box já cadastrados (ou repetidos no lote) não interrompem
+        os demais: voltam em box_numeros_conflito.
+        """
+        db = get_db()
+        boxes_collection = db.guarda_moveis
+
+        agora = datetime.utcnow()
+        boxes_data = [GuardaMoveis._novo_documento(data, agora) for data in boxes]
+        if not boxes_data:
+            return {"criados": 0, "conflitos": 0, "box_numeros_conflito": []}
+
+        conflitos = []
+        try:
+            boxes_collection.insert_many(boxes_data, ordered=False)
+        except BulkWriteError as e:
+            erros = e.details.get("writeErrors", [])
+            if any(erro.get("code") != 11000 for erro in erros):
+                raise
+            conflitos = [erro["index"] for erro in erros]
+        return {
+            "criados": len(boxes_data) - len(conflitos),
+            "conflitos": len(conflitos),
+            "box_numeros_conflito": [boxes_data[indice]["box_numero"] for indice in conflitos]
+        }
 
     @staticmethod
-    def get_by_id(guarda_moveis_id):
-        return GuardaMoveis.query.get(guarda_moveis_id).to_dict() if GuardaMoveis.query.get(guarda_moveis_id) else None
+    def find_by_id(box_id):
+        """Buscar box por ID"""
+        db = get_db()
+        boxes_collection = db.guarda_moveis
+        try:
+            if isinstance(box_id, str):
+                box_id = ObjectId(box_id)
+            box_data = boxes_collection.find_one({"_id": box_id})
+            return GuardaMoveis(box_data) if box_data else None
+        except:
+            return None
 
     @staticmethod
-    def update(guarda_moveis_id, data):
-        guarda_moveis = GuardaMoveis.query.get(guarda_moveis_id)
-        if not guarda_moveis:
+    def get_all(limit=50, skip=0, status_filter=None, tamanho=None):
+        """Obter boxes"""
+        db = get_db()
+        boxes_collection = db.guarda_moveis
+
+        query = {}
+        if status_filter:
+            query["status"] = status_filter
+        if tamanho:
+            query["tamanho"] = tamanho
+
+        boxes_data = list(boxes_collection.find(query).sort("box_numero", 1).skip(skip).limit(limit))
+        return [GuardaMoveis(box_data) for box_data in boxes_data]
+
+    @staticmethod
+    def _campos_atualizaveis(data):
+        allowed_fields = ['box_numero', 'tamanho', 'status', 'valor_mensal', 'dia_vencimento', 'observacoes']
+        return {field: data[field] for field in allowed_fields if field in data}
+
+    @staticmethod
+    def update(box_id, data):
+        """Atualizar box"""
+        db = get_db()
+        boxes_collection = db.guarda_moveis
+
+        update_data = GuardaMoveis._campos_atualizaveis(data)
+        if not update_data:
             return False
-        for key, value in data.items():
-            setattr(guarda_moveis, key, value)
-        db.session.commit()
-        return True
+        update_data["data_atualizacao"] = datetime.utcnow()
+
+        result = boxes_collection.update_one({"_id": ObjectId(box_id)}, {"$set": update_data})
+        return result.matched_count > 0
+
+    @staticmethod
+    def update_lote(alteracoes):
+        """Atualizar vários boxes em um único bulk_write não ordenado: [{"id", ...campos}]"""
+        db = get_db()
+        boxes_collection = db.guarda_moveis
+
+        agora = datetime.utcnow()
+        operacoes = []
+        ignorados = 0
+        for data in alteracoes:
+            update_data = GuardaMoveis._campos_atualizaveis(data)
+            if not update_data or not ObjectId.is_valid(data.get("id")):
+                ignorados += 1
+                continue
+            update_data["data_atualizacao"] = agora
+            operacoes.append(UpdateOne({"_id": ObjectId(data["id"])}, {"$set": update_data}))
+
+        if not operacoes:
+            return {"atualizados": 0, "ignorados": ignorados, "conflitos": 0}
+        conflitos = 0
+        try:
+            detalhes = boxes_collection.bulk_write(operacoes, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            # Número de box que já pertence a outro box
+            detalhes = e.details
+            erros = detalhes.get("writeErrors", [])
+            if any(erro.get("code") != 11000 for erro in erros):
+                raise
+            conflitos = len(erros)
+        atualizados = detalhes.get("nMatched", 0)
+        return {
+            "atualizados": atualizados,
+            "ignorados": ignorados + len(operacoes) - atualizados - conflitos,
+            "conflitos": conflitos
+        }
+
+    @staticmethod
+    def _travar(box_id, segundos=10):
+        """Reservar o box para alocação (evita duas alocações simultâneas no mesmo box)"""
+        db = get_db()
+        agora = datetime.utcnow()
+        return db.guarda_moveis.find_one_and_update(
+            {"_id": box_id, "$or": [{"trava_ate": {"$exists": False}}, {"trava_ate": {"$lt": agora}}]},
+            {"$set": {"trava_ate": agora + timedelta(seconds=segundos)}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _atualizar_status(box_id, agora=None):
+        """Recalcular status/cliente atual do box a partir das ocupações ativas"""
+        db = get_db()
+        agora = agora or datetime.utcnow()
+
+        atual = db.guarda_moveis_ocupacoes.find_one({
+            "box_id": box_id,
+            "status": "ativa",
+            "data_inicio": {"$lte": agora},
+            "$or": [{"data_fim": None}, {"data_fim": {"$gt": agora}}]
+        })
+        futura = None if atual else db.guarda_moveis_ocupacoes.find_one(
+            {"box_id": box_id, "status": "ativa", "data_inicio": {"$gt": agora}},
+            sort=[("data_inicio", 1)]
+        )
+
+        if atual:
+            update = {"status": "ocupado", "cliente_id": atual["cliente_id"],
+                      "data_inicio": atual["data_inicio"], "data_fim": atual.get("data_fim")}
+        elif futura:
+            update = {"status": "reservado", "cliente_id": futura["cliente_id"],
+                      "data_inicio": futura["data_inicio"], "data_fim": futura.get("data_fim")}
+        else:
+            update = {"status": "disponivel", "cliente_id": None, "data_inicio": None, "data_fim": None}
+
+        update["data_atualizacao"] = agora
+        db.guarda_moveis.update_one(
+            {"_id": box_id, "status": {"$ne": "manutencao"}},
+            {"$set": update}
+        )
+
+    @staticmethod
+    def atualizar_status_vencidos(agora=None):
+        """Recalcular os boxes cujo status gravado venceu (reserva que já começou, ocupação que terminou)"""
+        db = get_db()
+        agora = agora or datetime.utcnow()
+
+        vencidos = db.guarda_moveis.find({
+            "$or": [
+                {"status": "reservado", "data_inicio": {"$lte": agora}},
+                {"status": "ocupado", "data_fim": {"$lte": agora}}
+            ]
+        }, {"_id": 1})
+
+        total = 0
+        for box in vencidos:
+            GuardaMoveis._atualizar_status(box["_id"], agora)
+            total += 1
+        return total
+
+    @staticmethod
+    def ocupar(box_id, cliente_id, data_inicio, data_fim=None, criado_por=None):
+        """Registrar ocupação do box em [data_inicio, data_fim) (data_fim None = sem previsão)"""
+        db = get_db()
+        box_id = ObjectId(box_id)
+
+        if not GuardaMoveis._travar(box_id):
+            raise ConflitoOcupacao("Box em alocação por outro usuário ou inexistente")
+
+        try:
+            conflito_query = {
+                "box_id": box_id,
+                "status": "ativa",
+                "$or": [{"data_fim": None}, {"data_fim": {"$gt": data_inicio}}]
+            }
+            if data_fim is not None:
+                conflito_query["data_inicio"] = {"$lt": data_fim}
+            if db.guarda_moveis_ocupacoes.find_one(conflito_query, {"_id": 1}):
+                raise ConflitoOcupacao("Box já ocupado no período")
+
+            agora = datetime.utcnow()
+            ocupacao_data = {
+                "box_id": box_id,
+                "cliente_id": cliente_id,
+                "data_inicio": data_inicio,
+                "data_fim": data_fim,
+                "status": "ativa",
+                "criado_por": criado_por,
+                "data_criacao": agora,
+                "atualizado_em": agora
+            }
+            result = db.guarda_moveis_ocupacoes.insert_one(ocupacao_data)
+            ocupacao_data['_id'] = result.inserted_id
+
+            GuardaMoveis._atualizar_status(box_id, agora)
+            return ocupacao_data
+        finally:
+            db.guarda_moveis.update_one({"_id": box_id}, {"$unset": {"trava_ate": ""}})
+
+    @staticmethod
+    def encerrar_ocupacao(ocupacao_id, data_fim=None):
+        """Encerrar (ou cancelar, se ainda não começou) uma ocupação"""
+        db = get_db()
+        agora = datetime.utcnow()
+        data_fim = data_fim or agora
+
+        ocupacao = db.guarda_moveis_ocupacoes.find_one({"_id": ObjectId(ocupacao_id), "status": "ativa"})
+        if not ocupacao:
+            return None
+
+        if data_fim <= ocupacao["data_inicio"]:
+            update = {"status": "cancelada", "atualizado_em": agora}
+        else:
+            update = {"data_fim": data_fim, "atualizado_em": agora}
+
+        ocupacao = db.guarda_moveis_ocupacoes.find_one_and_update(
+            {"_id": ocupacao["_id"], "status": "ativa"},
+            {"$set": update},
+            return_document=ReturnDocument.AFTER
+        )
+        if ocupacao:
+            GuardaMoveis._atualizar_status(ocupacao["box_id"], agora)
+        return ocupacao
 
     def to_dict(self):
+        """Converter para dicionário"""
         return {
-            "id": self.id,
-            "cliente_id": self.cliente_id,
+            "id": str(self._id) if self._id else None,
             "box_numero": self.box_numero,
             "tamanho": self.tamanho,
+            "status": self.status,
+            "cliente_id": self.cliente_id,
+            "valor_mensal": self.valor_mensal,
+            "dia_vencimento": self.dia_vencimento,
             "data_inicio": self.data_inicio.isoformat() if self.data_inicio else None,
             "data_fim": self.data_fim.isoformat() if self.data_fim else None,
-            "status": self.status
+            "observacoes": self.observacoes,
+            "data_criacao": self.data_criacao.isoformat() if self.data_criacao else None,
+            "data_atualizacao": self.data_atualizacao.isoformat() if self.data_atualizacao else None
         }
-
-
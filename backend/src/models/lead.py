@@ -1,61 +1,313 @@
-from src.database import db
+import re
 from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from src.database import get_db
+from src.services.contatos import campos_normalizados
 
-class Lead(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
-    cargo = db.Column(db.String(100), nullable=True)
-    empresa = db.Column(db.String(100), nullable=True)
-    email = db.Column(db.String(120), unique=True, nullable=True)
-    telefone = db.Column(db.String(20), nullable=True)
-    localizacao = db.Column(db.String(100), nullable=True)
-    linkedin_url = db.Column(db.String(255), nullable=True)
-    status = db.Column(db.String(50), default="Novo")
-    fonte = db.Column(db.String(100), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+CAMPOS_LEAD = ['nome', 'cargo', 'empresa', 'email', 'telefone', 'localizacao',
+               'linkedin_url', 'status', 'fonte', 'observacoes']
+
+# Campos de pipeline que uma nova captura não deve sobrescrever
+CAMPOS_SO_NA_CRIACAO = ['status', 'observacoes']
+
+def chaves_dedupe(data):
+    """Chaves normalizadas que identificam o mesmo lead (LinkedIn, email, telefone)"""
+    chaves = []
+
+    linkedin = (data.get('linkedin_url') or '').strip().lower()
+    perfil = re.search(r'linkedin\.com/(in|company)/([^/?#]+)', linkedin)
+    if perfil:
+        chaves.append(f"li:{perfil.group(1)}/{perfil.group(2)}")
+
+    email = (data.get('email') or '').strip().lower()
+    if '@' in email:
+        chaves.append(f"email:{email}")
+
+    digitos = re.sub(r'\D', '', data.get('telefone') or '')
+    if len(digitos) in (12, 13) and digitos.startswith('55'):
+        digitos = digitos[2:]
+    digitos = digitos.lstrip('0')
+    if len(digitos) >= 10:
+        chaves.append(f"tel:{digitos}")
+
+    return chaves
+
+class Lead:
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.nome = data.get('nome')
+            self.cargo = data.get('cargo')
+            self.empresa = data.get('empresa')
+            self.email = data.get('email')
+            self.telefone = data.get('telefone')
+            self.localizacao = data.get('localizacao')
+            self.linkedin_url = data.get('linkedin_url')
+            self.status = data.get('status', 'Novo')
+            self.fonte = data.get('fonte')
+            self.observacoes = data.get('observacoes', '')
+            self.convertido = data.get('convertido', False)
+            self.data_criacao = data.get('data_criacao')
+            self.data_atualizacao = data.get('data_atualizacao')
+        else:
+            self._id = None
+            self.nome = None
+            self.cargo = None
+            self.empresa = None
+            self.email = None
+            self.telefone = None
+            self.localizacao = None
+            self.linkedin_url = None
+            self.status = 'Novo'
+            self.fonte = None
+            self.observacoes = ''
+            self.convertido = False
+            self.data_criacao = None
+            self.data_atualizacao = None
 
     def __repr__(self):
         return f'<Lead {self.nome}>'
 
+    @staticmethod
+    def _novo_documento(data, agora):
+        lead_data = {campo: data.get(campo) for campo in CAMPOS_LEAD}
+        lead_data.update(campos_normalizados("leads", lead_data))
+        lead_data.update({
+            "status": data.get('status') or 'Novo',
+            "observacoes": data.get('observacoes') or '',
+            "convertido": False,
+            "data_criacao": agora,
+            "data_atualizacao": agora
+        })
+        return lead_data
+
     @staticmethod
     def create(data):
-        lead = Lead(
-            nome=data.get('nome'),
-            cargo=data.get('cargo'),
-            empresa=data.get('empresa'),
-            email=data.get('email'),
-            telefone=data.get('telefone'),
-            localizacao=data.get('localizacao'),
-            linkedin_url=data.get('linkedin_url'),
-            status=data.get('status', 'Novo'),
-            fonte=data.get('fonte')
-        )
-        db.session.add(lead)
-        db.session.commit()
-        return lead.id
+        """Criar novo lead"""
+        db = get_db()
+        leads_collection = db.leads
+
+        lead_data = Lead._novo_documento(data, datetime.utcnow())
+        chaves = chaves_dedupe(data)
+        if chaves:
+            lead_data["chaves_dedupe"] = chaves
+        try:
+            result = leads_collection.insert_one(lead_data)
+        except DuplicateKeyError:
+            raise ValueError("Lead já cadastrado (LinkedIn, email ou telefone)")
+        lead_data['_id'] = result.inserted_id
+        return Lead(lead_data)
 
     @staticmethod
-    def get_all():
-        return [l.to_dict() for l in Lead.query.all()]
+    def importar(leads):
+        """Importar leads em um único bulk_write não ordenado, deduplicando pelas chaves
+
+        Leads já existentes (mesmo LinkedIn, email ou telefone) são atualizados
+        em vez de duplicados; status e observações só são definidos na criação.
+        Repetir a mesma importação não cria nem altera nada.
+        """
+        db = get_db()
+        leads_collection = db.leads
+
+        agora = datetime.utcnow()
+        resumo = {"recebidos": len(leads), "criados": 0, "atualizados": 0, "inalterados": 0,
+                  "duplicados": 0, "sem_chave": 0}
+
+        operacoes = []
+        vistas = set()
+        for data in leads:
+            chaves = chaves_dedupe(data)
+            if not chaves:
+                resumo["sem_chave"] += 1
+                continue
+            # Repetido dentro do próprio lote
+            if vistas.intersection(chaves):
+                resumo["duplicados"] += 1
+                continue
+            vistas.update(chaves)
+
+            novo = Lead._novo_documento(data, agora)
+            na_criacao = {campo: novo[campo] for campo in CAMPOS_SO_NA_CRIACAO + ['convertido', 'data_criacao']}
+            na_criacao["data_atualizacao"] = agora
+            atualizar = {
+                campo: novo[campo] for campo in CAMPOS_LEAD
+                if campo not in CAMPOS_SO_NA_CRIACAO and novo.get(campo) not in (None, '')
+            }
+            atualizar.update(campos_normalizados("leads", atualizar))
+            # $elemMatch em vez de $in: no upsert o mongod copia um $in de um só elemento
+            # como igualdade (chaves_dedupe viraria string e o $addToSet falharia)
+            operacoes.append(UpdateOne(
+                {"chaves_dedupe": {"$elemMatch": {"$in": chaves}}},
+                {"$set": atualizar, "$setOnInsert": na_criacao, "$addToSet": {"chaves_dedupe": {"$each": chaves}}},
+                upsert=True
+            ))
+
+        if not operacoes:
+            return resumo
+        try:
+            result = leads_collection.bulk_write(operacoes, ordered=False)
+            detalhes = result.bulk_api_result
+        except BulkWriteError as e:
+            # Chaves que já pertencem a leads diferentes (ou inserção concorrente)
+            detalhes = e.details
+            resumo["duplicados"] += sum(1 for erro in detalhes.get("writeErrors", []) if erro.get("code") == 11000)
+            outros = [erro for erro in detalhes.get("writeErrors", []) if erro.get("code") != 11000]
+            if outros:
+                raise
+
+        resumo["criados"] = detalhes.get("nUpserted", 0)
+        resumo["atualizados"] = detalhes.get("nModified", 0)
+        resumo["inalterados"] = detalhes.get("nMatched", 0) - detalhes.get("nModified", 0)
+        return resumo
 
     @staticmethod
-    def get_by_id(lead_id):
-        return Lead.query.get(lead_id).to_dict() if Lead.query.get(lead_id) else None
+    def gerar_chaves_existentes(limit=1000):
+        """Preencher chaves_dedupe de leads antigos (os que colidem ficam marcados sem chave)"""
+        db = get_db()
+        leads_collection = db.leads
+
+        ids = []
+        operacoes = []
+        for lead_data in leads_collection.find(
+            {"chaves_dedupe": {"$exists": False}, "sem_chaves": {"$exists": False}},
+            {"email": 1, "telefone": 1, "linkedin_url": 1}
+        ).limit(limit):
+            chaves = chaves_dedupe(lead_data)
+            ids.append(lead_data["_id"])
+            operacoes.append(UpdateOne(
+                {"_id": lead_data["_id"]},
+                {"$set": {"chaves_dedupe": chaves} if chaves else {"sem_chaves": True}}
+            ))
+
+        if not operacoes:
+            return 0
+        try:
+            leads_collection.bulk_write(operacoes, ordered=False)
+        except BulkWriteError as e:
+            # Duplicados antigos: marcados para não serem tentados de novo
+            colididos = [ids[erro["index"]] for erro in e.details.get("writeErrors", [])]
+            leads_collection.update_many({"_id": {"$in": colididos}}, {"$set": {"sem_chaves": True}})
+        return len(operacoes)
+
+    @staticmethod
+    def find_by_id(lead_id):
+        """Buscar lead por ID"""
+        db = get_db()
+        leads_collection = db.leads
+        try:
+            if isinstance(lead_id, str):
+                lead_id = ObjectId(lead_id)
+            lead_data = leads_collection.find_one({"_id": lead_id})
+            return Lead(lead_data) if lead_data else None
+        except:
+            return None
+
+    @staticmethod
+    def get_all(limit=50, skip=0, status_filter=None, fonte=None):
+        """Obter leads, mais recentes primeiro"""
+        db = get_db()
+        leads_collection = db.leads
+
+        query = {}
+        if status_filter:
+            query["status"] = status_filter
+        if fonte:
+            query["fonte"] = fonte
+
+        leads_data = list(leads_collection.find(query).sort("data_criacao", -1).skip(skip).limit(limit))
+        return [Lead(lead_data) for lead_data in leads_data]
+
+    @staticmethod
+    def iterar(status_filter=None):
+        """Percorrer todos os leads sem carregá-los de uma vez (exportação)"""
+        db = get_db()
+        query = {"status": status_filter} if status_filter else {}
+        for lead_data in db.leads.find(query).sort("data_criacao", -1).batch_size(500):
+            yield Lead(lead_data)
 
     @staticmethod
     def update(lead_id, data):
-        lead = Lead.query.get(lead_id)
-        if not lead:
-            return False
-        for key, value in data.items():
-            setattr(lead, key, value)
-        db.session.commit()
-        return True
+        """Atualizar lead (ValueError se o novo email/telefone/LinkedIn já pertence a outro lead)"""
+        resultado = Lead.update_many([{**data, "id": lead_id}])
+        if resultado["conflitos"]:
+            raise ValueError("Lead já cadastrado (LinkedIn, email ou telefone)")
+        return resultado["atualizados"] > 0
+
+    @staticmethod
+    def update_many(alteracoes):
+        """Atualizar vários leads em um único bulk_write: [{"id", ...campos}]
+
+        As chaves de deduplicação são gravadas na mesma operação dos campos: se
+        colidirem com as de outro lead, aquela alteração inteira é rejeitada.
+        """
+        db = get_db()
+        leads_collection = db.leads
+
+        validas = [
+            alteracao for alteracao in alteracoes
+            if ObjectId.is_valid(str(alteracao.get("id")))
+            and any(campo in alteracao for campo in CAMPOS_LEAD + ['convertido'])
+        ]
+
+        # Valores atuais dos campos de chave que não estão sendo alterados
+        campos_chave = ('email', 'telefone', 'linkedin_url')
+        ids_chave = [
+            ObjectId(alteracao["id"]) for alteracao in validas
+            if any(campo in alteracao for campo in campos_chave)
+        ]
+        atuais = {
+            str(lead_data["_id"]): lead_data
+            for lead_data in leads_collection.find({"_id": {"$in": ids_chave}}, dict.fromkeys(campos_chave, 1))
+        } if ids_chave else {}
+
+        agora = datetime.utcnow()
+        operacoes = []
+        ids = []
+        for alteracao in validas:
+            update_data = {campo: alteracao[campo] for campo in CAMPOS_LEAD + ['convertido'] if campo in alteracao}
+            update_data.update(campos_normalizados("leads", update_data))
+            update_data["data_atualizacao"] = agora
+            operacao = {"$set": update_data}
+
+            atual = atuais.get(str(ObjectId(alteracao["id"])))
+            if atual is not None:
+                chaves = chaves_dedupe({**atual, **update_data})
+                if chaves:
+                    update_data["chaves_dedupe"] = chaves
+                    operacao["$unset"] = {"sem_chaves": ""}
+                else:
+                    # Sem chave: o campo sai do índice único ([] colidiria entre leads)
+                    update_data["sem_chaves"] = True
+                    operacao["$unset"] = {"chaves_dedupe": ""}
+
+            operacoes.append(UpdateOne({"_id": ObjectId(alteracao["id"])}, operacao))
+            ids.append(alteracao["id"])
+
+        if not operacoes:
+            return {"atualizados": 0, "ignorados": len(alteracoes), "conflitos": 0, "ids_conflito": []}
+
+        ids_conflito = []
+        try:
+            detalhes = leads_collection.bulk_write(operacoes, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            detalhes = e.details
+            erros = detalhes.get("writeErrors", [])
+            if any(erro.get("code") != 11000 for erro in erros):
+                raise
+            ids_conflito = [str(ids[erro["index"]]) for erro in erros]
+
+        return {
+            "atualizados": detalhes.get("nMatched", 0),
+            "ignorados": len(alteracoes) - detalhes.get("nMatched", 0) - len(ids_conflito),
+            "conflitos": len(ids_conflito),
+            "ids_conflito": ids_conflito
+        }
 
     def to_dict(self):
         return {
-            'id': self.id,
+            'id': str(self._id) if self._id else None,
             'nome': self.nome,
             'cargo': self.cargo,
             'empresa': self.empresa,
@@ -65,8 +317,8 @@ class Lead(db.Model):
             'linkedin_url': self.linkedin_url,
             'status': self.status,
             'fonte': self.fonte,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'observacoes': self.observacoes,
+            'convertido': self.convertido,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
         }
-
-
@@ -1,69 +1,261 @@
-from src.database import db
-from datetime import datetime
-
-class Licitacao(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    titulo = db.Column(db.String(255), nullable=False)
-    orgao = db.Column(db.String(100), nullable=True)
-    numero = db.Column(db.String(50), nullable=True)
-    valor_estimado = db.Column(db.Float, nullable=True)
-    data_abertura = db.Column(db.DateTime, nullable=True)
-    data_limite = db.Column(db.DateTime, nullable=True)
-    status = db.Column(db.String(50), default="Aberta")
-    portal = db.Column(db.String(100), nullable=True)
-    url = db.Column(db.String(255), nullable=True)
-    palavras_encontradas = db.Column(db.String(255), nullable=True) # Armazenar como string separada por vírgulas
-    descricao = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from src.database import get_db
+from src.services.calendario import data_utc
+
+CAMPOS_LICITACAO = ['titulo', 'orgao', 'numero', 'valor_estimado', 'data_abertura', 'data_limite',
+                    'status', 'portal', 'url', 'palavras_encontradas', 'descricao', 'hash_conteudo']
+
+class Licitacao:
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.chave = data.get('chave')
+            self.titulo = data.get('titulo')
+            self.orgao = data.get('orgao')
+            self.numero = data.get('numero')
+            self.valor_estimado = data.get('valor_estimado')
+            self.data_abertura = data.get('data_abertura')
+            self.data_limite = data.get('data_limite')
+            self.status = data.get('status', 'Aberta')
+            self.portal = data.get('portal')
+            self.url = data.get('url')
+            self.palavras_encontradas = data.get('palavras_encontradas', [])
+            self.descricao = data.get('descricao')
+            self.data_criacao = data.get('data_criacao')
+            self.data_atualizacao = data.get('data_atualizacao')
+        else:
+            self._id = None
+            self.chave = None
+            self.titulo = None
+            self.orgao = None
+            self.numero = None
+            self.valor_estimado = None
+            self.data_abertura = None
+            self.data_limite = None
+            self.status = 'Aberta'
+            self.portal = None
+            self.url = None
+            self.palavras_encontradas = []
+            self.descricao = None
+            self.data_criacao = None
+            self.data_atualizacao = None
 
     def __repr__(self):
         return f'<Licitacao {self.titulo}>'
 
+    @staticmethod
+    def gerar_chave(data):
+        """Identificador da licitação no portal ("<portal>:<numero>", ou a URL)"""
+        if data.get('portal') and data.get('numero'):
+            # Portais informam o número como texto ou como número
+            return f"{str(data['portal']).strip().lower()}:{str(data['numero']).strip()}"
+        return data.get('url')
+
+    @staticmethod
+    def _normalizar(data):
+        """Campos informados, com datas convertidas e palavras como lista"""
+        licitacao_data = {campo: data[campo] for campo in CAMPOS_LICITACAO if campo in data}
+        for campo in ('data_abertura', 'data_limite'):
+            if campo in licitacao_data:
+                licitacao_data[campo] = data_utc(licitacao_data[campo])
+        palavras = licitacao_data.get('palavras_encontradas')
+        if isinstance(palavras, str):
+            licitacao_data['palavras_encontradas'] = [p.strip() for p in palavras.split(',') if p.strip()]
+        if licitacao_data.get('valor_estimado') is not None:
+            licitacao_data['valor_estimado'] = float(licitacao_data['valor_estimado'])
+        return licitacao_data
+
     @staticmethod
     def create(data):
-        palavras_encontradas_str = ",".join(data.get("palavras_encontradas", [])) if isinstance(data.get("palavras_encontradas"), list) else data.get("palavras_encontradas")
-        licitacao = Licitacao(
-            titulo=data.get("titulo"),
-            orgao=data.get("orgao"),
-            numero=data.get("numero"),
-            valor_estimado=data.get("valor_estimado"),
-            data_abertura=data.get("data_abertura"),
-            data_limite=data.get("data_limite"),
-            status=data.get("status", "Aberta"),
-            portal=data.get("portal"),
-            url=data.get("url"),
-            palavras_encontradas=palavras_encontradas_str,
-            descricao=data.get("descricao")
-        )
-        db.session.add(licitacao)
-        db.session.commit()
-        return licitacao.id
+        """Criar (ou atualizar, se já capturada) uma licitação"""
+        licitacao_id = Licitacao.salvar_lote([data])["ids"][0]
+        return Licitacao.find_by_id(licitacao_id)
 
     @staticmethod
-    def get_all():
-        return [l.to_dict() for l in Licitacao.query.all()]
+    def salvar_lote(licitacoes):
+        """Gravar várias licitações em um único bulk_write (upsert pela chave do portal)
+
+        Licitações já capturadas são atualizadas no lugar, então repetir uma
+        busca não duplica registros.
+        """
+        db = get_db()
+        licitacoes_collection = db.licitacoes
+
+        agora = datetime.utcnow()
+        operacoes = []
+        ids = []
+        for data in licitacoes:
+            licitacao_data = Licitacao._normalizar(data)
+            chave = Licitacao.gerar_chave(data)
+            licitacao_id = ObjectId()
+            licitacao_data["data_atualizacao"] = agora
+            na_criacao = {"_id": licitacao_id, "data_criacao": agora}
+            for campo, padrao in (("status", "Aberta"), ("palavras_encontradas", [])):
+                if campo not in licitacao_data:
+                    na_criacao[campo] = padrao
+
+            if chave:
+                filtro = {"chave": chave}
+                licitacao_data["chave"] = chave
+            else:
+                filtro = {"_id": licitacao_id}
+            operacoes.append(UpdateOne(filtro, {"$set": licitacao_data, "$setOnInsert": na_criacao}, upsert=True))
+            ids.append((chave, licitacao_id))
+
+        if not operacoes:
+            return {"criadas": 0, "atualizadas": 0, "ids": []}
+
+        # Grupos do resumo afetados: os novos valores e os anteriores das já existentes
+        grupos = {(data.get('portal'), data.get('orgao')) for data in licitacoes}
+        chaves = [chave for chave, _ in ids if chave]
+        if chaves:
+            grupos.update(
+                (item.get('portal'), item.get('orgao'))
+                for item in licitacoes_collection.find({"chave": {"$in": chaves}}, {"portal": 1, "orgao": 1})
+            )
+
+        result = licitacoes_collection.bulk_write(operacoes, ordered=False)
+        LicitacaoResumo.atualizar_grupos(grupos)
+
+        # Nas já existentes o _id gerado não foi usado: uma consulta para todas
+        existentes = {}
+        chaves_existentes = [chave for indice, (chave, _) in enumerate(ids) if chave and indice not in result.upserted_ids]
+        if chaves_existentes:
+            existentes = {
+                item["chave"]: item["_id"]
+                for item in licitacoes_collection.find({"chave": {"$in": chaves_existentes}}, {"chave": 1})
+            }
+        return {
+            "criadas": result.upserted_count,
+            "atualizadas": result.matched_count,
+            "ids": [
+                result.upserted_ids[indice] if indice in result.upserted_ids else existentes.get(chave, licitacao_id)
+                for indice, (chave, licitacao_id) in enumerate(ids)
+            ]
+        }
 
     @staticmethod
-    def get_by_id(licitacao_id):
-        return Licitacao.query.get(licitacao_id).to_dict() if Licitacao.query.get(licitacao_id) else None
+    def find_by_id(licitacao_id):
+        """Buscar licitação por ID"""
+        db = get_db()
+        licitacoes_collection = db.licitacoes
+        try:
+            if isinstance(licitacao_id, str):
+                licitacao_id = ObjectId(licitacao_id)
+            licitacao_data = licitacoes_collection.find_one({"_id": licitacao_id})
+            return Licitacao(licitacao_data) if licitacao_data else None
+        except:
+            return None
+
+    @staticmethod
+    def get_all(limit=50, skip=0, status_filter=None, portal=None, palavra=None):
+        """Obter licitações, mais recentes primeiro (palavra: com essa palavra-chave encontrada)"""
+        db = get_db()
+        licitacoes_collection = db.licitacoes
+
+        query = {}
+        if status_filter:
+            query["status"] = status_filter
+        if portal:
+            query["portal"] = portal
+        if palavra:
+            query["palavras_encontradas"] = palavra
+
+        licitacoes_data = list(licitacoes_collection.find(query).sort("data_criacao", -1).skip(skip).limit(limit))
+        return [Licitacao(licitacao_data) for licitacao_data in licitacoes_data]
 
     @staticmethod
     def update(licitacao_id, data):
-        licitacao = Licitacao.query.get(licitacao_id)
-        if not licitacao:
+        """Atualizar licitação"""
+        db = get_db()
+        licitacoes_collection = db.licitacoes
+
+        update_data = Licitacao._normalizar(data)
+        if not update_data:
             return False
-        for key, value in data.items():
-            if key == "palavras_encontradas" and isinstance(value, list):
-                setattr(licitacao, key, ",".join(value))
-            else:
-                setattr(licitacao, key, value)
-        db.session.commit()
+        update_data["data_atualizacao"] = datetime.utcnow()
+
+        anterior = licitacoes_collection.find_one_and_update(
+            {"_id": ObjectId(licitacao_id)},
+            {"$set": update_data},
+            projection={"portal": 1, "orgao": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not anterior:
+            return False
+
+        LicitacaoResumo.atualizar_grupos({
+            (anterior.get('portal'), anterior.get('orgao')),
+            (update_data.get('portal', anterior.get('portal')), update_data.get('orgao', anterior.get('orgao')))
+        })
         return True
 
+    @staticmethod
+    def estatisticas(dias_urgencia=7, limite_grupos=20):
+        """Totais, abertas, urgentes e valores por portal/órgão
+
+        Os totais vêm do resumo por portal × órgão (licitacoes_resumo), somado
+        no servidor com $group/$limit, e as urgentes de uma contagem no índice
+        (status, data_limite): o custo não cresce com o acervo de licitações.
+        """
+        db = get_db()
+        agora = datetime.utcnow()
+
+        urgentes = db.licitacoes.count_documents({
+            "status": "Aberta",
+            "data_limite": {"$gte": agora, "$lte": agora + timedelta(days=dias_urgencia)}
+        })
+
+        def _top(campo):
+            return [
+                {"$group": {
+                    "_id": {"$ifNull": [f"${campo}", "Não informado"]},
+                    "total": {"$sum": "$total"},
+                    "abertas": {"$sum": "$abertas"},
+                    "valor_total": {"$sum": "$valor_total"}
+                }},
+                {"$sort": {"valor_total": -1}},
+                {"$limit": limite_grupos}
+            ]
+
+        # Somas e ordenação no servidor: só os totais e os maiores grupos voltam para a aplicação
+        resumo = next(db.licitacoes_resumo.aggregate([{"$facet": {
+            "totais": [{"$group": {
+                "_id": None,
+                "total": {"$sum": "$total"},
+                "abertas": {"$sum": "$abertas"},
+                "valor_total": {"$sum": "$valor_total"},
+                "valor_aberto": {"$sum": "$valor_aberto"}
+            }}],
+            "por_portal": _top("portal"),
+            "por_orgao": _top("orgao")
+        }}]))
+        totais = resumo["totais"][0] if resumo["totais"] else {}
+
+        def _itens(grupos):
+            return [{
+                "nome": grupo["_id"] or "Não informado",
+                "total": grupo["total"],
+                "abertas": grupo["abertas"],
+                "valor_total": round(grupo["valor_total"], 2)
+            } for grupo in grupos]
+
+        return {
+            "total": totais.get("total", 0),
+            "abertas": totais.get("abertas", 0),
+            "urgentes": urgentes,
+            "dias_urgencia": dias_urgencia,
+            "valor_total": round(totais.get("valor_total", 0), 2),
+            "valor_aberto": round(totais.get("valor_aberto", 0), 2),
+            "por_portal": _itens(resumo["por_portal"]),
+            "por_orgao": _itens(resumo["por_orgao"])
+        }
+
     def to_dict(self):
         return {
-            "id": self.id,
+            "id": str(self._id) if self._id else None,
             "titulo": self.titulo,
             "orgao": self.orgao,
             "numero": self.numero,
@@ -73,10 +265,73 @@ class Licitacao(db.Model):
             "status": self.status,
             "portal": self.portal,
             "url": self.url,
-            "palavras_encontradas": self.palavras_encontradas.split(",") if self.palavras_encontradas else [],
+            "palavras_encontradas": self.palavras_encontradas or [],
             "descricao": self.descricao,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "data_criacao": self.data_criacao.isoformat() if self.data_criacao else None,
+            "data_atualizacao": self.data_atualizacao.isoformat() if self.data_atualizacao else None
         }
 
+class LicitacaoResumo:
+    """Totais por portal × órgão em licitacoes_resumo, recalculados para os grupos alterados a cada escrita"""
+
+    ESTAGIOS_GRUPO = [
+        {"$group": {
+            "_id": {"portal": "$portal", "orgao": "$orgao"},
+            "total": {"$sum": 1},
+            "abertas": {"$sum": {"$cond": [{"$eq": ["$status", "Aberta"]}, 1, 0]}},
+            "valor_total": {"$sum": {"$ifNull": ["$valor_estimado", 0]}},
+            "valor_aberto": {"$sum": {"$cond": [
+                {"$eq": ["$status", "Aberta"]}, {"$ifNull": ["$valor_estimado", 0]}, 0
+            ]}}
+        }}
+    ]
+
+    @staticmethod
+    def _gravar(agrupados, grupos_esperados=None):
+        db = get_db()
+        agora = datetime.utcnow()
+
+        operacoes = []
+        encontrados = set()
+        for grupo in agrupados:
+            chave = (grupo["_id"].get("portal"), grupo["_id"].get("orgao"))
+            encontrados.add(chave)
+            operacoes.append(UpdateOne(
+                {"portal": chave[0], "orgao": chave[1]},
+                {"$set": {
+                    "total": grupo["total"],
+                    "abertas": grupo["abertas"],
+                    "valor_total": grupo["valor_total"],
+                    "valor_aberto": grupo["valor_aberto"],
+                    "atualizado_em": agora
+                }},
+                upsert=True
+            ))
+        # Grupos que ficaram vazios (ex.: licitação mudou de órgão)
+        for portal, orgao in (grupos_esperados or set()) - encontrados:
+            operacoes.append(DeleteOne({"portal": portal, "orgao": orgao}))
 
+        if operacoes:
+            db.licitacoes_resumo.bulk_write(operacoes, ordered=False)
+        return agora
+
+    @staticmethod
+    def atualizar_grupos(grupos):
+        """Recalcular apenas os grupos (portal, órgão) informados, pelo índice (portal, orgao)"""
+        db = get_db()
+        grupos = set(grupos)
+        if not grupos:
+            return
+        agrupados = db.licitacoes.aggregate(
+            [{"$match": {"$or": [{"portal": portal, "orgao": orgao} for portal, orgao in grupos]}}]
+            + LicitacaoResumo.ESTAGIOS_GRUPO
+        )
+        LicitacaoResumo._gravar(agrupados, grupos)
+
+    @staticmethod
+    def reconstruir():
+        """Recalcular o resumo inteiro a partir das licitações (carga inicial ou correção)"""
+        db = get_db()
+        inicio = LicitacaoResumo._gravar(db.licitacoes.aggregate(LicitacaoResumo.ESTAGIOS_GRUPO, allowDiskUse=True))
+        removidos = db.licitacoes_resumo.delete_many({"atualizado_em": {"$lt": inicio}}).deleted_count
+        return {"grupos": db.licitacoes_resumo.count_documents({}), "removidos": removidos}
@@ -0,0 +1,196 @@
+from datetime import datetime
+import uuid
+from pymongo import UpdateOne
+from src.database import get_db
+
+# Ordem de progressão do status; recibos fora de ordem nunca regridem o status
+STATUS_ORDEM = ["pendente", "enviado", "falhou", "entregue", "lido"]
+
+# Status dos provedores -> status interno
+STATUS_PROVEDOR = {
+    "queued": "pendente",
+    "sent": "enviado",
+    "failed": "falhou",
+    "delivered": "entregue",
+    "read": "lido"
+}
+
+# Campo de data registrado para cada status
+CAMPOS_DATA = {
+    "enviado": "enviado_em",
+    "falhou": "falhou_em",
+    "entregue": "entregue_em",
+    "lido": "lido_em"
+}
+
+class Mensagem:
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.mensagem_id = data.get('mensagem_id')
+            self.telefone = data.get('telefone')
+            self.campanha_id = data.get('campanha_id')
+            self.template = data.get('template')
+            self.status = data.get('status', 'pendente')
+            self.enviado_em = data.get('enviado_em')
+            self.entregue_em = data.get('entregue_em')
+            self.lido_em = data.get('lido_em')
+            self.falhou_em = data.get('falhou_em')
+            self.data_criacao = data.get('data_criacao')
+            self.data_atualizacao = data.get('data_atualizacao')
+        else:
+            self._id = None
+            self.mensagem_id = None
+            self.telefone = None
+            self.campanha_id = None
+            self.template = None
+            self.status = 'pendente'
+            self.enviado_em = None
+            self.entregue_em = None
+            self.lido_em = None
+            self.falhou_em = None
+            self.data_criacao = None
+            self.data_atualizacao = None
+
+    def __repr__(self):
+        return f'<Mensagem {self.mensagem_id} {self.status}>'
+
+    @staticmethod
+    def gerar_mensagem_id():
+        """Gerar id local para envios simulados"""
+        return f"msg_{uuid.uuid4().hex}"
+
+    @staticmethod
+    def registrar_envios(envios):
+        """Registrar mensagens enviadas (ou agendadas) em lote
+
+        Cada envio é um dict com mensagem_id, telefone, status e,
+        opcionalmente, campanha_id e template.
+        """
+        if not envios:
+            return
+        db = get_db()
+        mensagens_collection = db.mensagens
+
+        agora = datetime.utcnow()
+        operacoes = []
+        for envio in envios:
+            status = envio.get('status', 'enviado')
+            dados = {
+                "telefone": envio.get('telefone'),
+                "campanha_id": envio.get('campanha_id'),
+                "template": envio.get('template'),
+                "data_criacao": agora
+            }
+            if status in CAMPOS_DATA:
+                dados[CAMPOS_DATA[status]] = agora
+
+            # Upsert: o recibo do provedor pode chegar antes do registro do envio
+            operacoes.append(UpdateOne(
+                {"mensagem_id": envio['mensagem_id']},
+                [
+                    {"$set": {
+                        **{campo: {"$ifNull": [f"${campo}", {"$literal": valor}]} for campo, valor in dados.items()},
+                        "status_rank": {"$max": [{"$ifNull": ["$status_rank", 0]}, STATUS_ORDEM.index(status)]},
+                        "data_atualizacao": agora
+                    }},
+                    {"$set": {"status": {"$arrayElemAt": [STATUS_ORDEM, "$status_rank"]}}}
+                ],
+                upsert=True
+            ))
+
+        mensagens_collection.bulk_write(operacoes, ordered=False)
+
+    @staticmethod
+    def aplicar_status(recibos):
+        """Aplicar recibos de entrega/leitura em lote (um único bulk_write)
+
+        Cada recibo é um dict com mensagem_id, status (do provedor ou interno)
+        e timestamp opcional.
+        """
+        db = get_db()
+        mensagens_collection = db.mensagens
+
+        agora = datetime.utcnow()
+        operacoes = []
+        for recibo in recibos:
+            status = STATUS_PROVEDOR.get(recibo.get('status'), recibo.get('status'))
+            if status not in STATUS_ORDEM or not recibo.get('mensagem_id'):
+                continue
+
+            etapa = {
+                "status_rank": {"$max": [{"$ifNull": ["$status_rank", 0]}, STATUS_ORDEM.index(status)]},
+                "data_atualizacao": agora
+            }
+            campo_data = CAMPOS_DATA.get(status)
+            if campo_data:
+                etapa[campo_data] = {"$ifNull": [f"${campo_data}", {"$literal": recibo.get('timestamp') or agora}]}
+
+            operacoes.append(UpdateOne(
+                {"mensagem_id": recibo['mensagem_id']},
+                [
+                    {"$set": etapa},
+                    {"$set": {"status": {"$arrayElemAt": [STATUS_ORDEM, "$status_rank"]}}}
+                ],
+                upsert=True
+            ))
+
+        if operacoes:
+            mensagens_collection.bulk_write(operacoes, ordered=False)
+        return len(operacoes)
+
+    @staticmethod
+    def find_by_mensagem_id(mensagem_id):
+        """Buscar mensagem pelo id do provedor"""
+        db = get_db()
+        mensagens_collection = db.mensagens
+        mensagem_data = mensagens_collection.find_one({"mensagem_id": mensagem_id})
+        return Mensagem(mensagem_data) if mensagem_data else None
+
+    @staticmethod
+    def find_many(mensagem_ids):
+        """Buscar várias mensagens pelo id do provedor em uma consulta"""
+        db = get_db()
+        mensagens_collection = db.mensagens
+        mensagens_data = list(mensagens_collection.find({"mensagem_id": {"$in": list(mensagem_ids)}}))
+        return [Mensagem(mensagem_data) for mensagem_data in mensagens_data]
+
+    @staticmethod
+    def get_by_telefone(telefone, limit=50, skip=0):
+        """Obter mensagens enviadas para um telefone"""
+        db = get_db()
+        mensagens_collection = db.mensagens
+        mensagens_data = list(mensagens_collection.find({"telefone": telefone}).sort("data_criacao", -1).limit(limit).skip(skip))
+        return [Mensagem(mensagem_data) for mensagem_data in mensagens_data]
+
+    @staticmethod
+    def resumo_campanha(campanha_id):
+        """Contagem de mensagens por status de uma campanha"""
+        db = get_db()
+        mensagens_collection = db.mensagens
+
+        pipeline = [
+            {"$match": {"campanha_id": campanha_id}},
+            {"$group": {"_id": "$status", "total": {"$sum": 1}}}
+        ]
+        resumo = {status: 0 for status in STATUS_ORDEM}
+        for item in mensagens_collection.aggregate(pipeline):
+            resumo[item["_id"]] = item["total"]
+        return resumo
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': str(self._id) if self._id else None,
+            'mensagem_id': self.mensagem_id,
+            'telefone': self.telefone,
+            'campanha_id': self.campanha_id,
+            'template': self.template,
+            'status': self.status,
+            'enviado_em': self.enviado_em.isoformat() if isinstance(self.enviado_em, datetime) else self.enviado_em,
+            'entregue_em': self.entregue_em.isoformat() if isinstance(self.entregue_em, datetime) else self.entregue_em,
+            'lido_em': self.lido_em.isoformat() if isinstance(self.lido_em, datetime) else self.lido_em,
+            'falhou_em': self.falhou_em.isoformat() if isinstance(self.falhou_em, datetime) else self.falhou_em,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
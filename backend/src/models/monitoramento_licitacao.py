@@ -0,0 +1,90 @@
+from datetime import datetime
+from pymongo import ReturnDocument
+from src.database import get_db
+
+# Documento único com a configuração de monitoramento
+MONITORAMENTO_ID = "padrao"
+
+class MonitoramentoLicitacao:
+    def __init__(self, data=None):
+        if data:
+            self.palavras_chave = data.get('palavras_chave', [])
+            self.portais = data.get('portais', [])
+            self.email_alertas = data.get('email_alertas', True)
+            self.ativo = data.get('ativo', True)
+            self.versao = data.get('versao', 0)
+            self.ultima_busca = data.get('ultima_busca')
+            self.configurado_em = data.get('configurado_em')
+            self.configurado_por = data.get('configurado_por')
+        else:
+            self.palavras_chave = []
+            self.portais = []
+            self.email_alertas = True
+            self.ativo = True
+            self.versao = 0
+            self.ultima_busca = None
+            self.configurado_em = None
+            self.configurado_por = None
+
+    def __repr__(self):
+        return f'<MonitoramentoLicitacao v{self.versao}>'
+
+    @staticmethod
+    def get():
+        """Configuração atual (padrão vazio se nunca configurada)"""
+        db = get_db()
+        return MonitoramentoLicitacao(db.licitacoes_monitoramento.find_one({"_id": MONITORAMENTO_ID}))
+
+    @staticmethod
+    def get_versao():
+        """Apenas a versão da configuração (consulta leve para os caches)"""
+        db = get_db()
+        data = db.licitacoes_monitoramento.find_one({"_id": MONITORAMENTO_ID}, {"versao": 1})
+        return data.get("versao", 0) if data else 0
+
+    @staticmethod
+    def salvar(data, usuario_id=None):
+        """Gravar configuração; a versão incrementada faz os workers recompilarem as palavras"""
+        db = get_db()
+
+        palavras = []
+        for palavra in data.get('palavras_chave', []):
+            palavra = str(palavra).strip()
+            if palavra and palavra not in palavras:
+                palavras.append(palavra)
+
+        config_data = db.licitacoes_monitoramento.find_one_and_update(
+            {"_id": MONITORAMENTO_ID},
+            {
+                "$set": {
+                    "palavras_chave": palavras,
+                    "portais": data.get('portais', []),
+                    "email_alertas": data.get('email_alertas', True),
+                    "ativo": data.get('ativo', True),
+                    "configurado_em": datetime.utcnow(),
+                    "configurado_por": usuario_id
+                },
+                "$inc": {"versao": 1}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return MonitoramentoLicitacao(config_data)
+
+    @staticmethod
+    def registrar_busca():
+        db = get_db()
+        db.licitacoes_monitoramento.update_one(
+            {"_id": MONITORAMENTO_ID}, {"$set": {"ultima_busca": datetime.utcnow()}}
+        )
+
+    def to_dict(self):
+        return {
+            'palavras_chave': self.palavras_chave,
+            'portais': self.portais,
+            'email_alertas': self.email_alertas,
+            'ativo': self.ativo,
+            'versao': self.versao,
+            'ultima_busca': self.ultima_busca.isoformat() if self.ultima_busca else None,
+            'configurado_em': self.configurado_em.isoformat() if self.configurado_em else None
+        }
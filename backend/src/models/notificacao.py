@@ -0,0 +1,246 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from dateutil.relativedelta import relativedelta
+from pymongo import ReturnDocument
+from src.config import Config
+from src.database import get_db
+
+# Intervalo de cada recorrência
+RECORRENCIAS = {
+    "diario": relativedelta(days=1),
+    "semanal": relativedelta(weeks=1),
+    "mensal": relativedelta(months=1)
+}
+
+TIPOS_NOTIFICACAO = ["whatsapp", "email", "sms"]
+
+class Notificacao:
+    """Notificação agendada; a fila é a própria coleção, ordenada por next_run_at"""
+
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.tipo = data.get('tipo')
+            self.destinatario = data.get('destinatario')
+            self.mensagem = data.get('mensagem', '')
+            self.recorrencia = data.get('recorrencia')
+            self.status = data.get('status', 'agendada')  # agendada, processando, enviada, erro, cancelada
+            self.next_run_at = data.get('next_run_at')
+            self.tentativas = data.get('tentativas', 0)
+            self.execucoes = data.get('execucoes', 0)
+            self.ultimo_envio = data.get('ultimo_envio')
+            self.erro = data.get('erro')
+            self.criado_por = data.get('criado_por')
+            self.data_criacao = data.get('data_criacao')
+        else:
+            self._id = None
+            self.tipo = None
+            self.destinatario = None
+            self.mensagem = ''
+            self.recorrencia = None
+            self.status = 'agendada'
+            self.next_run_at = None
+            self.tentativas = 0
+            self.execucoes = 0
+            self.ultimo_envio = None
+            self.erro = None
+            self.criado_por = None
+            self.data_criacao = None
+
+    def __repr__(self):
+        return f'<Notificacao {self.tipo} {self.destinatario} {self.next_run_at}>'
+
+    @staticmethod
+    def agendar(data):
+        """Agendar nova notificação"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+
+        notificacao_data = {
+            "tipo": data['tipo'],
+            "destinatario": data['destinatario'],
+            "mensagem": data.get('mensagem', ''),
+            "recorrencia": data.get('recorrencia'),
+            "status": "agendada",
+            "next_run_at": data['next_run_at'],
+            "agendada_para": data['next_run_at'],
+            "inicio": data['next_run_at'],  # âncora da recorrência
+            "ocorrencia": 0,
+            "tentativas": 0,
+            "execucoes": 0,
+            "criado_por": data.get('criado_por'),
+            "data_criacao": datetime.utcnow()
+        }
+
+        result = notificacoes_collection.insert_one(notificacao_data)
+        notificacao_data['_id'] = result.inserted_id
+        return Notificacao(notificacao_data)
+
+    @staticmethod
+    def reservar(worker_id, limite=100):
+        """Reservar notificações vencidas (ou com reserva expirada), a mais antiga primeiro"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+
+        agora = datetime.utcnow()
+        lease_ate = agora + timedelta(seconds=Config.NOTIFICACOES_LEASE_SECONDS)
+
+        # Duas consultas separadas para que cada uma use seu índice sem ordenação em memória:
+        # primeiro as reservas expiradas (raras), depois as vencidas pela ordem de next_run_at
+        consultas = [
+            ({"status": "processando", "lease_ate": {"$lt": agora}}, None),
+            ({"status": "agendada", "next_run_at": {"$lte": agora}}, [("next_run_at", 1)])
+        ]
+
+        reservadas = []
+        for filtro, ordenacao in consultas:
+            while len(reservadas) < limite:
+                notificacao = notificacoes_collection.find_one_and_update(
+                    filtro,
+                    {
+                        "$set": {"status": "processando", "lease_ate": lease_ate, "worker_id": worker_id},
+                        "$inc": {"tentativas": 1}
+                    },
+                    sort=ordenacao,
+                    return_document=ReturnDocument.AFTER
+                )
+                if not notificacao:
+                    break
+                reservadas.append(notificacao)
+        return reservadas
+
+    @staticmethod
+    def proxima_execucao(notificacao, agora=None):
+        """Próxima ocorrência depois de agora: (data, número da ocorrência)
+
+        Cada ocorrência é calculada a partir da âncora (inicio + n × intervalo), nunca
+        da anterior: a mensal do dia 31 cai no dia 30/28 nos meses curtos e volta ao
+        dia 31 depois. Ocorrências perdidas durante uma parada não são reenviadas.
+        """
+        agora = agora or datetime.utcnow()
+        intervalo = RECORRENCIAS[notificacao["recorrencia"]]
+        # Notificações antigas sem âncora: a ocorrência atual passa a ser a âncora
+        inicio = notificacao.get("inicio") or notificacao["agendada_para"]
+        ocorrencia = notificacao.get("ocorrencia", 0) if notificacao.get("inicio") else 0
+
+        ocorrencia += 1
+        while inicio + intervalo * ocorrencia <= agora:
+            ocorrencia += 1
+        return inicio + intervalo * ocorrencia, ocorrencia
+
+    @staticmethod
+    def concluir(notificacao):
+        """Registrar envio: reagendar se recorrente, senão marcar como enviada"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+
+        agora = datetime.utcnow()
+        if notificacao.get("recorrencia") in RECORRENCIAS:
+            proxima, ocorrencia = Notificacao.proxima_execucao(notificacao, agora)
+            update = {
+                "status": "agendada",
+                "next_run_at": proxima,
+                "agendada_para": proxima,
+                "inicio": notificacao.get("inicio") or notificacao["agendada_para"],
+                "ocorrencia": ocorrencia,
+                "tentativas": 0,
+                "ultimo_envio": agora
+            }
+        else:
+            update = {"status": "enviada", "ultimo_envio": agora}
+
+        # Só quem detém a reserva pode concluir
+        notificacoes_collection.update_one(
+            {"_id": notificacao["_id"], "status": "processando", "worker_id": notificacao.get("worker_id")},
+            {
+                "$set": update,
+                "$inc": {"execucoes": 1},
+                "$unset": {"lease_ate": "", "worker_id": "", "erro": ""}
+            }
+        )
+
+    @staticmethod
+    def falhar(notificacao, erro):
+        """Devolver à fila com backoff, ou marcar como erro após o limite de tentativas"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+
+        tentativas = notificacao.get("tentativas", 1)
+        if tentativas >= Config.NOTIFICACOES_MAX_TENTATIVAS:
+            if notificacao.get("recorrencia") in RECORRENCIAS:
+                # Recorrente: desistir desta ocorrência e seguir para a próxima
+                proxima, ocorrencia = Notificacao.proxima_execucao(notificacao)
+                update = {
+                    "status": "agendada",
+                    "erro": str(erro),
+                    "tentativas": 0,
+                    "next_run_at": proxima,
+                    "agendada_para": proxima,
+                    "inicio": notificacao.get("inicio") or notificacao["agendada_para"],
+                    "ocorrencia": ocorrencia
+                }
+            else:
+                update = {"status": "erro", "erro": str(erro)}
+        else:
+            # Nova tentativa desloca apenas next_run_at; a recorrência segue agendada_para
+            espera = min(30 * 2 ** (tentativas - 1), 3600)
+            update = {
+                "status": "agendada",
+                "erro": str(erro),
+                "next_run_at": datetime.utcnow() + timedelta(seconds=espera)
+            }
+
+        notificacoes_collection.update_one(
+            {"_id": notificacao["_id"], "status": "processando", "worker_id": notificacao.get("worker_id")},
+            {"$set": update, "$unset": {"lease_ate": "", "worker_id": ""}}
+        )
+
+    @staticmethod
+    def cancelar(notificacao_id):
+        """Cancelar notificação ainda não enviada (ou recorrente)"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+        result = notificacoes_collection.update_one(
+            {"_id": ObjectId(notificacao_id), "status": {"$in": ["agendada", "processando"]}},
+            {"$set": {"status": "cancelada", "data_cancelamento": datetime.utcnow()}, "$unset": {"next_run_at": ""}}
+        )
+        return result.modified_count > 0
+
+    @staticmethod
+    def find_by_id(notificacao_id):
+        """Buscar notificação por ID"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+        try:
+            notificacao_data = notificacoes_collection.find_one({"_id": ObjectId(notificacao_id)})
+            return Notificacao(notificacao_data) if notificacao_data else None
+        except:
+            return None
+
+    @staticmethod
+    def get_proximas(limit=50, skip=0, status_filter="agendada"):
+        """Próximas notificações pela ordem de execução"""
+        db = get_db()
+        notificacoes_collection = db.notificacoes
+        notificacoes_data = list(
+            notificacoes_collection.find({"status": status_filter}).sort("next_run_at", 1).skip(skip).limit(limit)
+        )
+        return [Notificacao(notificacao_data) for notificacao_data in notificacoes_data]
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': str(self._id) if self._id else None,
+            'tipo': self.tipo,
+            'destinatario': self.destinatario,
+            'mensagem': self.mensagem,
+            'recorrencia': self.recorrencia,
+            'status': self.status,
+            'data_envio': self.next_run_at.isoformat() if self.next_run_at else None,
+            'tentativas': self.tentativas,
+            'execucoes': self.execucoes,
+            'ultimo_envio': self.ultimo_envio.isoformat() if self.ultimo_envio else None,
+            'erro': self.erro,
+            'criado_por': self.criado_por,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
@@ -1,6 +1,8 @@
 from datetime import datetime
 from bson import ObjectId
 from src.database import get_db
+from src.services.calendario import invalidar_calendario
+from src.services.contatos import campos_normalizados
 import uuid
 
 class Orcamento:
@@ -103,9 +105,11 @@ class Orcamento:
             "data_criacao": datetime.utcnow(),
             "data_atualizacao": datetime.utcnow()
         }
+        orcamento_data.update(campos_normalizados("orcamentos", orcamento_data))
         
         result = orcamentos_collection.insert_one(orcamento_data)
         orcamento_data['_id'] = result.inserted_id
+        invalidar_calendario()
         return Orcamento(orcamento_data)
 
     @staticmethod
@@ -175,12 +179,14 @@ class Orcamento:
             if field in data:
                 update_data[field] = data[field]
         
+        update_data.update(campos_normalizados("orcamentos", update_data))
         update_data['data_atualizacao'] = datetime.utcnow()
         
         orcamentos_collection.update_one(
             {"_id": self._id},
             {"$set": update_data}
         )
+        invalidar_calendario()
         
         # Atualizar objeto atual
         for key, value in update_data.items():
@@ -191,6 +197,7 @@ class Orcamento:
         db = get_db()
         orcamentos_collection = db.orcamentos
         orcamentos_collection.delete_one({"_id": self._id})
+        invalidar_calendario()
 
     def calcular_valor_final(self):
         """Calcular valor final com desconto"""
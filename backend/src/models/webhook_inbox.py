@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+import hashlib
+import json
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.config import Config
+from src.database import get_db
+
+class WebhookInbox:
+    """Caixa de entrada durável dos webhooks (processada por workers)"""
+
+    @staticmethod
+    def gerar_mensagem_id(payload):
+        """Gerar identificador estável quando o provedor não envia um"""
+        conteudo = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return "sha256:" + hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def registrar(provedor, mensagem_id, payload):
+        """Gravar evento recebido; retorna False se já foi registrado antes"""
+        db = get_db()
+        inbox_collection = db.webhook_inbox
+
+        agora = datetime.utcnow()
+        try:
+            inbox_collection.insert_one({
+                "provedor": provedor,
+                "mensagem_id": mensagem_id,
+                "payload": payload,
+                "status": "pendente",
+                "tentativas": 0,
+                "recebido_em": agora,
+                "disponivel_em": agora
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @staticmethod
+    def reservar(worker_id, limite=50):
+        """Reservar eventos pendentes (ou com reserva expirada) para processamento"""
+        db = get_db()
+        inbox_collection = db.webhook_inbox
+
+        agora = datetime.utcnow()
+        lease_ate = agora + timedelta(seconds=Config.WEBHOOK_INBOX_LEASE_SECONDS)
+
+        reservados = []
+        for _ in range(limite):
+            evento = inbox_collection.find_one_and_update(
+                {
+                    "$or": [
+                        {"status": "pendente", "disponivel_em": {"$lte": agora}},
+                        {"status": "processando", "lease_ate": {"$lt": agora}}
+                    ]
+                },
+                {
+                    "$set": {"status": "processando", "lease_ate": lease_ate, "worker_id": worker_id},
+                    "$inc": {"tentativas": 1}
+                },
+                sort=[("disponivel_em", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if not evento:
+                break
+            reservados.append(evento)
+        return reservados
+
+    @staticmethod
+    def concluir(evento_ids):
+        """Marcar eventos como processados"""
+        if not evento_ids:
+            return
+        db = get_db()
+        inbox_collection = db.webhook_inbox
+        inbox_collection.update_many(
+            {"_id": {"$in": list(evento_ids)}},
+            {
+                "$set": {"status": "processado", "processado_em": datetime.utcnow()},
+                "$unset": {"lease_ate": "", "worker_id": ""}
+            }
+        )
+
+    @staticmethod
+    def falhar(evento, erro):
+        """Devolver evento à fila com backoff, ou marcar como erro após o limite"""
+        db = get_db()
+        inbox_collection = db.webhook_inbox
+
+        tentativas = evento.get("tentativas", 1)
+        if tentativas >= Config.WEBHOOK_INBOX_MAX_TENTATIVAS:
+            update = {"status": "erro", "erro": str(erro), "processado_em": datetime.utcnow()}
+        else:
+            espera = min(2 ** tentativas, 300)
+            update = {
+                "status": "pendente",
+                "erro": str(erro),
+                "disponivel_em": datetime.utcnow() + timedelta(seconds=espera)
+            }
+
+        inbox_collection.update_one(
+            {"_id": evento["_id"], "worker_id": evento.get("worker_id")},
+            {"$set": update, "$unset": {"lease_ate": "", "worker_id": ""}}
+        )
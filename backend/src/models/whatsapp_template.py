@@ -0,0 +1,310 @@
+from datetime import datetime
+import string
+import threading
+import time
+from pymongo import ReturnDocument
+from src.config import Config
+from src.database import get_db
+
+# Templates iniciais (semeados no banco na primeira carga)
+TEMPLATES_PADRAO = {
+    'boas_vindas': {
+        "variaveis": ["nome"],
+        "texto": """
+Olá {nome}! 👋
+
+Bem-vindo à VIP Mudanças!
+
+Recebemos seu contato e nossa equipe entrará em contato em breve para agendar uma visita técnica gratuita.
+
+📞 Contato: (11) 99999-9999
+🌐 Site: vipmudancas.com.br
+
+Obrigado pela confiança! 🚚
+            """
+    },
+    'agendamento_visita': {
+        "variaveis": ["nome", "endereco", "data_hora", "consultor"],
+        "texto": """
+Olá {nome}! 📅
+
+Sua visita técnica foi agendada:
+
+📍 Endereço: {endereco}
+🕐 Data/Hora: {data_hora}
+👨‍💼 Consultor: {consultor}
+
+Estaremos no local no horário combinado.
+
+Dúvidas? Entre em contato: (11) 99999-9999
+            """
+    },
+    'orcamento_pronto': {
+        "variaveis": ["nome", "valor", "servicos", "validade"],
+        "texto": """
+Olá {nome}! 💰
+
+Seu orçamento está pronto!
+
+💵 Valor: R$ {valor}
+📋 Serviços: {servicos}
+⏰ Validade: {validade}
+
+Para confirmar, responda este WhatsApp ou ligue:
+📞 (11) 99999-9999
+
+Aguardamos seu retorno! 🚚
+            """
+    },
+    'lembrete_pagamento': {
+        "variaveis": ["nome", "valor", "vencimento", "forma_pagamento"],
+        "texto": """
+Olá {nome}! 💳
+
+Lembramos que o vencimento do seu pagamento é amanhã:
+
+💰 Valor: R$ {valor}
+📅 Vencimento: {vencimento}
+🏦 Forma: {forma_pagamento}
+
+Para evitar atrasos, efetue o pagamento hoje.
+
+Dúvidas? (11) 99999-9999
+            """
+    }
+}
+
+
+class TemplateCompilado:
+    """Template pré-processado em partes literais e variáveis"""
+
+    def __init__(self, nome, texto, versao=1):
+        self.nome = nome
+        self.versao = versao
+        self.partes = []
+        campos = []
+
+        for literal, campo, formato, conversao in string.Formatter().parse(texto):
+            if literal:
+                self.partes.append((literal, None))
+            if campo is None:
+                continue
+            if not campo or not campo.isidentifier() or formato or conversao:
+                raise ValueError(f"Variável inválida no template {nome}: {{{campo}}}")
+            self.partes.append((None, campo))
+            campos.append(campo)
+
+        self.variaveis = frozenset(campos)
+
+    def faltantes(self, variaveis):
+        """Variáveis declaradas que não foram fornecidas"""
+        return sorted(self.variaveis.difference(variaveis))
+
+    def render(self, variaveis):
+        """Renderizar template validando as variáveis obrigatórias"""
+        faltantes = self.faltantes(variaveis)
+        if faltantes:
+            raise ValueError(f"Variável obrigatória não fornecida: {', '.join(faltantes)}")
+        return "".join(literal if campo is None else str(variaveis[campo]) for literal, campo in self.partes)
+
+    def render_lote(self, lista_variaveis, variaveis_globais=None):
+        """Renderizar o template para vários contatos de uma vez
+
+        Retorna (mensagens, erros), onde erros lista os índices dos contatos
+        com variáveis faltantes. Nenhuma mensagem é gerada se houver erros.
+        """
+        globais = variaveis_globais or {}
+        faltantes_globais = self.variaveis.difference(globais)
+
+        erros = []
+        for indice, variaveis in enumerate(lista_variaveis):
+            faltantes = faltantes_globais.difference(variaveis)
+            if faltantes:
+                erros.append({"indice": indice, "faltantes": sorted(faltantes)})
+        if erros:
+            return [], erros
+
+        # Partes fixas e variáveis globais são resolvidas uma única vez
+        fixas = [
+            literal if campo is None else (str(globais[campo]) if campo in globais else None)
+            for literal, campo in self.partes
+        ]
+        campos = [(i, campo) for i, (literal, campo) in enumerate(self.partes) if campo is not None]
+
+        mensagens = []
+        for variaveis in lista_variaveis:
+            partes = list(fixas)
+            for i, campo in campos:
+                if campo in variaveis:
+                    partes[i] = str(variaveis[campo])
+            mensagens.append("".join(partes))
+        return mensagens, []
+
+
+class WhatsAppTemplate:
+    def __init__(self, data=None):
+        if data:
+            self._id = data.get('_id')
+            self.nome = data.get('nome')
+            self.texto = data.get('texto', '')
+            self.variaveis = data.get('variaveis', [])
+            self.versao = data.get('versao', 1)
+            self.ativo = data.get('ativo', True)
+            self.data_criacao = data.get('data_criacao')
+            self.data_atualizacao = data.get('data_atualizacao')
+        else:
+            self._id = None
+            self.nome = None
+            self.texto = ''
+            self.variaveis = []
+            self.versao = 1
+            self.ativo = True
+            self.data_criacao = None
+            self.data_atualizacao = None
+
+    def __repr__(self):
+        return f'<WhatsAppTemplate {self.nome} v{self.versao}>'
+
+    @staticmethod
+    def compilar(nome, texto, variaveis):
+        """Compilar template conferindo as variáveis declaradas"""
+        compilado = TemplateCompilado(nome, texto)
+        declaradas = set(variaveis or [])
+        if declaradas != compilado.variaveis:
+            nao_declaradas = sorted(compilado.variaveis - declaradas)
+            nao_usadas = sorted(declaradas - compilado.variaveis)
+            raise ValueError(
+                f"Variáveis do template {nome} não conferem "
+                f"(não declaradas: {nao_declaradas}, não usadas: {nao_usadas})"
+            )
+        return compilado
+
+    @staticmethod
+    def salvar(nome, texto, variaveis):
+        """Criar ou atualizar template (valida antes de gravar)"""
+        WhatsAppTemplate.compilar(nome, texto, variaveis)
+
+        db = get_db()
+        templates_collection = db.whatsapp_templates
+
+        agora = datetime.utcnow()
+        template_data = templates_collection.find_one_and_update(
+            {"nome": nome},
+            {
+                "$set": {
+                    "texto": texto,
+                    "variaveis": list(variaveis),
+                    "ativo": True,
+                    "data_atualizacao": agora
+                },
+                "$inc": {"versao": 1},
+                "$setOnInsert": {"data_criacao": agora}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return WhatsAppTemplate(template_data)
+
+    @staticmethod
+    def semear_padrao():
+        """Inserir templates padrão que ainda não existem no banco"""
+        db = get_db()
+        templates_collection = db.whatsapp_templates
+
+        agora = datetime.utcnow()
+        for nome, template in TEMPLATES_PADRAO.items():
+            templates_collection.update_one(
+                {"nome": nome},
+                {"$setOnInsert": {
+                    "nome": nome,
+                    "texto": template["texto"],
+                    "variaveis": template["variaveis"],
+                    "versao": 1,
+                    "ativo": True,
+                    "data_criacao": agora,
+                    "data_atualizacao": agora
+                }},
+                upsert=True
+            )
+
+    @staticmethod
+    def get_all_templates():
+        """Obter todos os templates ativos"""
+        db = get_db()
+        templates_collection = db.whatsapp_templates
+        templates_data = list(templates_collection.find({"ativo": True}).sort("nome", 1))
+        return [WhatsAppTemplate(template_data) for template_data in templates_data]
+
+    def to_dict(self):
+        """Converter para dicionário"""
+        return {
+            'id': str(self._id) if self._id else None,
+            'nome': self.nome,
+            'texto': self.texto,
+            'variaveis': self.variaveis,
+            'versao': self.versao,
+            'ativo': self.ativo,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
+
+
+class TemplateRegistry:
+    """Cache por worker dos templates compilados, recarregado quando a versão muda"""
+
+    def __init__(self, intervalo_recarga=None):
+        self.intervalo_recarga = intervalo_recarga
+        self._compilados = {}
+        self._versoes = {}
+        self._ultima_verificacao = 0
+        self._semeado = False
+        self._lock = threading.Lock()
+
+    def _recarregar(self):
+        db = get_db()
+        templates_collection = db.whatsapp_templates
+
+        if not self._semeado:
+            WhatsAppTemplate.semear_padrao()
+            self._semeado = True
+
+        # Consulta leve: apenas nome e versão; o texto só é buscado se mudou
+        versoes = {
+            t["nome"]: t.get("versao", 1)
+            for t in templates_collection.find({"ativo": True}, {"nome": 1, "versao": 1})
+        }
+        alterados = [nome for nome, versao in versoes.items() if self._versoes.get(nome) != versao]
+
+        compilados = {nome: c for nome, c in self._compilados.items() if nome in versoes}
+        if alterados:
+            for template_data in templates_collection.find({"nome": {"$in": alterados}, "ativo": True}):
+                try:
+                    compilados[template_data["nome"]] = TemplateCompilado(
+                        template_data["nome"], template_data["texto"], template_data.get("versao", 1)
+                    )
+                except ValueError as e:
+                    print(f"Erro ao compilar template {template_data['nome']}: {e}")
+                    versoes.pop(template_data["nome"], None)
+
+        self._compilados = compilados
+        self._versoes = versoes
+        self._ultima_verificacao = time.monotonic()
+
+    def get(self, nome):
+        """Obter template compilado pelo nome (None se não existir)"""
+        intervalo = self.intervalo_recarga
+        if intervalo is None:
+            intervalo = Config.WHATSAPP_TEMPLATES_RELOAD_SECONDS
+
+        if time.monotonic() - self._ultima_verificacao >= intervalo or not self._semeado:
+            with self._lock:
+                if time.monotonic() - self._ultima_verificacao >= intervalo or not self._semeado:
+                    self._recarregar()
+        return self._compilados.get(nome)
+
+    def invalidar(self):
+        """Forçar recarga na próxima consulta"""
+        self._ultima_verificacao = 0
+
+
+template_registry = TemplateRegistry()
@@ -0,0 +1,210 @@
+import unicodedata
+from urllib.parse import quote
+from bson import ObjectId
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.models.arquivo import Arquivo, ArquivoVinculo, ENTIDADES_VINCULO
+
+arquivos_bp = Blueprint('arquivos', __name__)
+
+def _content_disposition(nome):
+    """Cabeçalho com o nome em ASCII (clientes antigos) e em UTF-8 (RFC 5987)"""
+    nome = (nome or "arquivo").replace("\r", " ").replace("\n", " ")
+    ascii_nome = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii").replace('"', "").replace("\\", "") or "arquivo"
+    return f"inline; filename=\"{ascii_nome}\"; filename*=UTF-8''{quote(nome, safe='')}"
+
+@arquivos_bp.route('/', methods=['POST'])
+@jwt_required()
+def upload_arquivo():
+    """Enviar arquivo (multipart no campo "arquivo" ou corpo binário com ?nome=)
+
+    Opcionalmente vincula o arquivo a uma entidade informada em
+    entidade/entidade_id/categoria (campos do formulário ou query string).
+    """
+    try:
+        user_id = get_jwt_identity()
+
+        if 'arquivo' in request.files:
+            # O werkzeug grava uploads grandes em arquivo temporário, não em memória
+            arquivo_enviado = request.files['arquivo']
+            stream = arquivo_enviado.stream
+            nome = arquivo_enviado.filename
+            content_type = arquivo_enviado.mimetype
+            params = request.form
+        else:
+            stream = request.stream
+            nome = request.args.get('nome')
+            content_type = request.mimetype
+            params = request.args
+
+        if not nome:
+            return jsonify({"error": "Nome do arquivo é obrigatório"}), 400
+
+        entidade = params.get('entidade')
+        entidade_id = params.get('entidade_id')
+        if entidade and entidade not in ENTIDADES_VINCULO:
+            return jsonify({"error": f"Entidade inválida: {entidade}"}), 400
+        # Validar antes de gravar no GridFS (um id inválido deixaria o arquivo órfão)
+        if entidade and entidade_id and not ObjectId.is_valid(entidade_id):
+            return jsonify({"error": f"{entidade} não encontrado: {entidade_id}"}), 400
+
+        arquivo, duplicado = Arquivo.armazenar(stream, nome, content_type, enviado_por=user_id)
+
+        resposta = {
+            "success": True,
+            "arquivo": arquivo.to_dict(),
+            "duplicado": duplicado
+        }
+
+        if entidade and entidade_id:
+            try:
+                vinculo = ArquivoVinculo.vincular(
+                    arquivo._id, entidade, entidade_id,
+                    categoria=params.get('categoria'), nome=nome, criado_por=user_id
+                )
+            except ValueError as e:
+                if not duplicado:
+                    Arquivo.remover_se_orfao(arquivo._id)
+                return jsonify({"error": str(e)}), 400
+            resposta["vinculo"] = vinculo.to_dict()
+
+        return jsonify(resposta), 201
+
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Arquivo maior que o limite de {request.max_content_length} bytes"}), 413
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@arquivos_bp.route('/<arquivo_id>', methods=['GET'])
+@jwt_required()
+def get_arquivo(arquivo_id):
+    """Obter metadados do arquivo"""
+    try:
+        arquivo = Arquivo.find_by_id(arquivo_id)
+
+        if not arquivo:
+            return jsonify({"error": "Arquivo não encontrado"}), 404
+
+        return jsonify({"arquivo": arquivo.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@arquivos_bp.route('/<arquivo_id>/download', methods=['GET'])
+@jwt_required()
+def download_arquivo(arquivo_id):
+    """Baixar arquivo em streaming, com suporte a Range (206) e If-None-Match"""
+    try:
+        grid_out = Arquivo.abrir(arquivo_id)
+
+        if grid_out is None:
+            return jsonify({"error": "Arquivo não encontrado"}), 404
+
+        metadata = grid_out.metadata or {}
+        etag = metadata.get('sha256') or str(grid_out._id)
+        tamanho = grid_out.length
+        headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": f'"{etag}"',
+            "Content-Disposition": _content_disposition(grid_out.filename),
+            "Cache-Control": "private, max-age=86400"
+        }
+
+        # Conteúdo endereçado pelo hash: o ETag nunca muda para o mesmo id
+        if etag in request.if_none_match:
+            grid_out.close()
+            return Response(status=304, headers=headers)
+
+        inicio, fim, status = 0, tamanho, 200
+        if request.range is not None:
+            intervalo = request.range.range_for_length(tamanho)
+            if intervalo is None:
+                grid_out.close()
+                headers["Content-Range"] = f"bytes */{tamanho}"
+                return Response(status=416, headers=headers)
+            inicio, fim = intervalo
+            status = 206
+            headers["Content-Range"] = f"bytes {inicio}-{fim - 1}/{tamanho}"
+
+        headers["Content-Length"] = str(fim - inicio)
+
+        return Response(
+            Arquivo.ler_intervalo(grid_out, inicio, fim),
+            status=status,
+            mimetype=metadata.get('content_type', 'application/octet-stream'),
+            headers=headers,
+            direct_passthrough=True
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@arquivos_bp.route('/<arquivo_id>/vinculos', methods=['POST'])
+@jwt_required()
+def vincular_arquivo(arquivo_id):
+    """Vincular arquivo existente a um cliente, orçamento ou contrato"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+
+        arquivo = Arquivo.find_by_id(arquivo_id)
+        if not arquivo:
+            return jsonify({"error": "Arquivo não encontrado"}), 404
+
+        if not data.get('entidade') or not data.get('entidade_id'):
+            return jsonify({"error": "entidade e entidade_id são obrigatórios"}), 400
+
+        try:
+            vinculo = ArquivoVinculo.vincular(
+                arquivo._id, data['entidade'], data['entidade_id'],
+                categoria=data.get('categoria'), nome=data.get('nome') or arquivo.nome, criado_por=user_id
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"success": True, "vinculo": vinculo.to_dict()}), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@arquivos_bp.route('/vinculos/<vinculo_id>', methods=['DELETE'])
+@jwt_required()
+def remover_vinculo(vinculo_id):
+    """Remover vínculo (o arquivo é excluído quando não tiver mais vínculos)"""
+    try:
+        if not ArquivoVinculo.remover(vinculo_id):
+            return jsonify({"error": "Vínculo não encontrado"}), 404
+
+        return jsonify({"success": True, "message": "Vínculo removido com sucesso"}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@arquivos_bp.route('/<entidade>/<entidade_id>', methods=['GET'])
+@jwt_required()
+def listar_arquivos_entidade(entidade, entidade_id):
+    """Listar arquivos vinculados a um cliente, orçamento ou contrato"""
+    try:
+        if entidade not in ENTIDADES_VINCULO:
+            return jsonify({"error": f"Entidade inválida: {entidade}"}), 400
+        if not ObjectId.is_valid(entidade_id):
+            return jsonify({"error": f"{entidade} não encontrado: {entidade_id}"}), 404
+
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+        skip = (page - 1) * per_page
+
+        arquivos = ArquivoVinculo.listar(
+            entidade, entidade_id,
+            categoria=request.args.get('categoria'), limit=per_page, skip=skip
+        )
+
+        return jsonify({
+            "arquivos": arquivos,
+            "page": page,
+            "per_page": per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,6 +1,12 @@
+import re
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.cliente import Cliente
+from src.models.cliente_historico import ClienteHistorico
+from src.models.user import User
+from src.database import get_db
+from src.services import dedupe_clientes
+from bson import ObjectId
 from datetime import datetime
 
 clientes_bp = Blueprint("clientes", __name__)
@@ -8,10 +14,24 @@ clientes_bp = Blueprint("clientes", __name__)
 @clientes_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_clientes():
-    """Listar todos os clientes"""
+    """Listar clientes (ou buscar por nome, email, telefone e empresa com `busca`)"""
     try:
-        clientes = Cliente.get_all()
-        return jsonify({"clientes": clientes}), 200
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 50))
+        skip = (page - 1) * per_page
+
+        if request.args.get("busca"):
+            clientes = Cliente.search_clientes(
+                re.escape(request.args["busca"]), limit=per_page, skip=skip,
+                status_filter=request.args.get("status")
+            )
+        else:
+            clientes = Cliente.get_all_clientes(limit=per_page, skip=skip, status_filter=request.args.get("status"))
+        return jsonify({
+            "clientes": [cliente.to_dict() for cliente in clientes],
+            "page": page,
+            "per_page": per_page
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -28,44 +48,64 @@ def create_cliente():
             if not data.get(field):
                 return jsonify({"error": f"Campo {field} é obrigatório"}), 400
         
-        cliente_id = Cliente.create(data)
+        try:
+            cliente = Cliente.create_cliente(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+
+        ClienteHistorico.registrar(cliente._id, "cadastro", "Cliente cadastrado", usuario_id=get_jwt_identity())
+        duplicatas = dedupe_clientes.verificar_cliente(cliente._id)
         return jsonify({
             "message": "Cliente criado com sucesso",
-            "cliente_id": cliente_id
+            "cliente_id": str(cliente._id),
+            "possiveis_duplicatas": [
+                {**item, "cliente_id": str(item["cliente_id"])} for item in duplicatas
+            ]
         }), 201
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@clientes_bp.route("/<int:cliente_id>", methods=["GET"])
+@clientes_bp.route("/<cliente_id>", methods=["GET"])
 @jwt_required()
 def get_cliente(cliente_id):
     """Obter cliente por ID"""
     try:
-        cliente = Cliente.get_by_id(cliente_id)
+        cliente = Cliente.find_by_id(cliente_id)
         if not cliente:
             return jsonify({"error": "Cliente não encontrado"}), 404
         
-        return jsonify({"cliente": cliente}), 200
+        return jsonify({"cliente": cliente.to_dict()}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@clientes_bp.route("/<int:cliente_id>", methods=["PUT"])
+@clientes_bp.route("/<cliente_id>", methods=["PUT"])
 @jwt_required()
 def update_cliente(cliente_id):
     """Atualizar cliente"""
     try:
         data = request.get_json()
         
-        success = Cliente.update(cliente_id, data)
-        if not success:
+        cliente = Cliente.find_by_id(cliente_id)
+        if not cliente:
             return jsonify({"error": "Cliente não encontrado"}), 404
         
+        try:
+            cliente.update(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+        alterados = sorted(campo for campo in data if campo != "data_atualizacao")
+        ClienteHistorico.registrar(
+            cliente._id, "atualizacao", "Dados do cliente atualizados",
+            dados={"campos": alterados}, usuario_id=get_jwt_identity()
+        )
+        if {"nome", "email", "telefone", "cpf_cnpj", "ativo"} & set(alterados):
+            dedupe_clientes.verificar_cliente(cliente._id)
         return jsonify({"message": "Cliente atualizado com sucesso"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@clientes_bp.route("/<int:cliente_id>/status", methods=["PUT"])
+@clientes_bp.route("/<cliente_id>/status", methods=["PUT"])
 @jwt_required()
 def update_status_cliente(cliente_id):
     """Atualizar status do cliente"""
@@ -81,17 +121,21 @@ def update_status_cliente(cliente_id):
         if status == "Perdido" and not justificativa:
             return jsonify({"error": "Justificativa é obrigatória para status 'Perdido'"}), 400
         
-        update_data = {
-            "status": status,
-            "updated_at": datetime.utcnow()
-        }
+        cliente = Cliente.find_by_id(cliente_id)
+        if not cliente:
+            return jsonify({"error": "Cliente não encontrado"}), 404
         
+        status_anterior = cliente.status
+        update_data = {"status": status}
         if justificativa:
             update_data["justificativa"] = justificativa
         
-        success = Cliente.update(cliente_id, update_data)
-        if not success:
-            return jsonify({"error": "Cliente não encontrado"}), 404
+        cliente.update(update_data)
+        ClienteHistorico.registrar(
+            cliente._id, "status", f"Status alterado de {status_anterior} para {status}",
+            dados={"anterior": status_anterior, "novo": status, "justificativa": justificativa},
+            usuario_id=get_jwt_identity()
+        )
         
         return jsonify({"message": "Status atualizado com sucesso"}), 200
     except Exception as e:
@@ -113,13 +157,152 @@ def pre_cadastro():
         data["status"] = "Novo"
         data["fonte"] = data.get("fonte", "Site/Instagram")
         
-        cliente_id = Cliente.create(data)
+        try:
+            cliente = Cliente.create_cliente(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+
+        ClienteHistorico.registrar(cliente._id, "cadastro", f"Pré-cadastro via {data['fonte']}")
+        dedupe_clientes.verificar_cliente(cliente._id)
         return jsonify({
             "message": "Pré-cadastro realizado com sucesso",
-            "cliente_id": cliente_id
+            "cliente_id": str(cliente._id)
         }), 201
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@clientes_bp.route("/<cliente_id>/timeline", methods=["GET"])
+@jwt_required()
+def get_timeline_cliente(cliente_id):
+    """Linha do tempo do cliente (histórico + documentos), paginada pelo cursor `antes` (= `proximo`)"""
+    try:
+        if not Cliente.find_by_id(cliente_id):
+            return jsonify({"error": "Cliente não encontrado"}), 404
+
+        limit = min(int(request.args.get("limit", 50)), 200)
+        try:
+            antes = ClienteHistorico.ler_cursor(request.args["antes"]) if request.args.get("antes") else None
+        except ValueError:
+            return jsonify({"error": "Parâmetro antes inválido"}), 400
+
+        itens, proximo = ClienteHistorico.timeline(cliente_id, limit=limit, antes=antes)
+        for item in itens:
+            item["data"] = item["data"].isoformat()
+
+        return jsonify({
+            "itens": itens,
+            "proximo": proximo
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _resumo_clientes(ids):
+    db = get_db()
+    return {
+        cliente["_id"]: {
+            "id": str(cliente["_id"]),
+            "nome": cliente.get("nome"),
+            "email": cliente.get("email"),
+            "telefone": cliente.get("telefone"),
+            "cpf_cnpj": cliente.get("cpf_cnpj"),
+            "fonte": cliente.get("fonte")
+        }
+        for cliente in db.clientes.find(
+            {"_id": {"$in": list(ids)}}, {"nome": 1, "email": 1, "telefone": 1, "cpf_cnpj": 1, "fonte": 1}
+        )
+    }
+
+@clientes_bp.route("/duplicatas", methods=["GET"])
+@jwt_required()
+def get_duplicatas():
+    """Pares de clientes suspeitos de duplicidade, mais prováveis primeiro"""
+    try:
+        db = get_db()
+        page = int(request.args.get("page", 1))
+        per_page = min(int(request.args.get("per_page", 50)), 200)
+        status = request.args.get("status", "pendente")
+
+        pares = list(
+            db.clientes_duplicatas.find({"status": status})
+            .sort("score", -1).skip((page - 1) * per_page).limit(per_page)
+        )
+        clientes = _resumo_clientes(cliente_id for par in pares for cliente_id in par["clientes"])
+
+        return jsonify({
+            "duplicatas": [{
+                "id": par["_id"],
+                "score": par["score"],
+                "motivos": par.get("motivos", []),
+                "status": par["status"],
+                "origem": par.get("origem"),
+                "clientes": [clientes.get(cliente_id) for cliente_id in par["clientes"]],
+                "data_atualizacao": par["data_atualizacao"].isoformat()
+            } for par in pares],
+            "page": page,
+            "per_page": per_page
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@clientes_bp.route("/duplicatas/<par_id>", methods=["PUT"])
+@jwt_required()
+def resolver_duplicata(par_id):
+    """Marcar um par como duplicata confirmada ou descartada (não volta a ser sugerido)"""
+    try:
+        data = request.get_json()
+        status = data.get("status")
+        if status not in ("confirmada", "descartada"):
+            return jsonify({"error": "Status deve ser 'confirmada' ou 'descartada'"}), 400
+
+        db = get_db()
+        resultado = db.clientes_duplicatas.update_one(
+            {"_id": par_id},
+            {"$set": {"status": status, "resolvido_por": get_jwt_identity(), "resolvido_em": datetime.utcnow()}}
+        )
+        if not resultado.matched_count:
+            return jsonify({"error": "Par não encontrado"}), 404
+
+        return jsonify({"message": "Par atualizado com sucesso"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@clientes_bp.route("/duplicatas/varrer", methods=["POST"])
+@jwt_required()
+def varrer_duplicatas():
+    """Agendar a comparação da base inteira por blocos (apenas admin; executada pelo worker)"""
+    try:
+        current_user = User.find_by_id(get_jwt_identity())
+        if not current_user or current_user.role != 'admin':
+            return jsonify({"error": "Acesso negado"}), 403
 
+        dedupe_clientes.agendar_varredura()
+        return jsonify({"message": "Varredura agendada"}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@clientes_bp.route("/<cliente_id>/duplicatas", methods=["GET"])
+@jwt_required()
+def get_duplicatas_cliente(cliente_id):
+    """Clientes parecidos com este (calculado na hora pelas chaves de bloqueio)"""
+    try:
+        if not ObjectId.is_valid(cliente_id):
+            return jsonify({"error": "Cliente não encontrado"}), 404
+
+        db = get_db()
+        cliente = db.clientes.find_one({"_id": ObjectId(cliente_id)}, dedupe_clientes.CAMPOS_COMPARACAO)
+        if not cliente:
+            return jsonify({"error": "Cliente não encontrado"}), 404
+
+        encontrados = dedupe_clientes.candidatos(cliente)
+        clientes = _resumo_clientes(item["cliente_id"] for item in encontrados)
+        return jsonify({
+            "duplicatas": [{
+                "cliente": clientes.get(item["cliente_id"]),
+                "score": item["score"],
+                "motivos": item["motivos"]
+            } for item in encontrados]
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from src.services import contatos
+
+contatos_bp = Blueprint('contatos', __name__)
+
+@contatos_bp.route('/resolver', methods=['GET'])
+@jwt_required()
+def resolver_contato():
+    """Clientes, leads e orçamentos de um telefone e/ou CPF/CNPJ (qualquer formatação)"""
+    try:
+        telefone = request.args.get('telefone')
+        documento = request.args.get('documento')
+        if not telefone and not documento:
+            return jsonify({"error": "Informe telefone ou documento"}), 400
+
+        resultado = contatos.resolver(telefone=telefone, documento=documento)
+        if not resultado["telefone"] and not resultado["documento"]:
+            return jsonify({"error": "Telefone ou documento inválido"}), 400
+
+        for colecao in ("clientes", "leads", "orcamentos"):
+            resultado[colecao] = [str(registro_id) for registro_id in resultado[colecao]]
+        return jsonify(resultado), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
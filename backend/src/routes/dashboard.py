@@ -2,8 +2,12 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user_activity import UserActivity
 from src.models.user import User
+from src.models.financeiro import FinanceiroRollup
+from src.config import Config
 from src.database import get_db
+from src.services.calendario import cache_calendario, consultar_eventos, data_utc, versao_calendario
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
@@ -26,8 +30,11 @@ def get_metricas():
         # Contar contratos ativos (simulado)
         contratos_ativos = 25
         
-        # Faturamento mensal (simulado)
-        faturamento_mensal = 125000.00
+        # Faturamento do mês corrente (rollups do financeiro)
+        mes_atual = datetime.utcnow().strftime("%Y-%m")
+        faturamento_mensal = round(sum(
+            rollup["total"] for rollup in FinanceiroRollup.consultar(mes_atual, mes_atual, tipo="receita")
+        ), 2)
         
         # Contar leads ativos (simulado)
         leads_ativos = 30
@@ -75,49 +82,54 @@ def get_atividades_recentes():
 @dashboard_bp.route("/calendario", methods=["GET"])
 @jwt_required()
 def get_calendario():
-    """Obter eventos do calendário"""
+    """Obter eventos do calendário em uma janela de datas
+
+    Parâmetros: mes=YYYY-MM ou from/to (ISO, "to" exclusivo; padrão: mês
+    atual), vendedor_id e equipe_id opcionais.
+    """
     try:
-        db = get_db()
-        
-        eventos = []
+        if request.args.get("mes"):
+            inicio = datetime.strptime(request.args["mes"], "%Y-%m")
+            fim = inicio + relativedelta(months=1)
+        elif request.args.get("from") or request.args.get("to"):
+            if not request.args.get("from") or not request.args.get("to"):
+                return jsonify({"error": "Informe from e to"}), 400
+            inicio = data_utc(request.args["from"])
+            fim = data_utc(request.args["to"])
+        else:
+            inicio = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            fim = inicio + relativedelta(months=1)
+        
+        if fim <= inicio:
+            return jsonify({"error": "to deve ser posterior a from"}), 400
+        if fim - inicio > timedelta(days=Config.CALENDARIO_JANELA_MAX_DIAS):
+            return jsonify({"error": f"Janela máxima de {Config.CALENDARIO_JANELA_MAX_DIAS} dias"}), 400
+        
+        vendedor_id = request.args.get("vendedor_id")
+        equipe_id = request.args.get("equipe_id")
+        
+        # A versão muda a cada escrita em orçamentos/eventos (em qualquer processo)
+        chave = (versao_calendario(), inicio, fim, vendedor_id, equipe_id)
+        resposta = cache_calendario.obter(chave)
+        cache_status = "HIT"
+        if resposta is None:
+            eventos = consultar_eventos(inicio, fim, vendedor_id=vendedor_id, equipe_id=equipe_id)
+            resposta = {
+                "eventos": eventos,
+                "from": inicio.isoformat(),
+                "to": fim.isoformat(),
+                "total": len(eventos)
+            }
+            cache_calendario.salvar(chave, resposta)
+            cache_status = "MISS"
         
-        # Buscar orçamentos com data de visita se a coleção existir
-        if "orcamentos" in db.list_collection_names():
-            orcamentos = list(db.orcamentos.find({
-                "data_visita": {"$exists": True, "$ne": None}
-            }).limit(20))
-            
-            for orcamento in orcamentos:
-                if orcamento.get("data_visita"):
-                    eventos.append({
-                        "id": str(orcamento["_id"]),
-                        "titulo": f"Visita - {orcamento.get('cliente_nome', 'Cliente')}",
-                        "data": orcamento["data_visita"].strftime("%Y-%m-%d") if isinstance(orcamento["data_visita"], datetime) else orcamento["data_visita"],
-                        "tipo": "visita",
-                        "cor": "blue"
-                    })
-        
-        # Se não há eventos reais, retornar eventos simulados
-        if not eventos:
-            eventos = [
-                {
-                    "id": "1",
-                    "titulo": "Visita - Cliente Silva",
-                    "data": (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%d"),
-                    "tipo": "visita",
-                    "cor": "blue"
-                },
-                {
-                    "id": "2",
-                    "titulo": "Mudança - Empresa ABC",
-                    "data": (datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%d"),
-                    "tipo": "mudanca",
-                    "cor": "green"
-                }
-            ]
-        
-        return jsonify({"eventos": eventos}), 200
+        response = jsonify(resposta)
+        response.headers["X-Cache"] = cache_status
+        response.headers["Cache-Control"] = f"private, max-age={Config.CALENDARIO_CACHE_SECONDS}"
+        return response, 200
         
+    except ValueError as e:
+        return jsonify({"error": f"Data inválida: {e}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1,40 +1,151 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, send_file
 from flask_jwt_extended import jwt_required
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from bson import ObjectId
+from io import BytesIO
 import os
-import tempfile
+import threading
+import zipfile
+from src.config import Config
+from src.database import get_db
+from src.models.documento_cache import DocumentoCache
+from src.services.documentos_pdf import RENDERIZADORES, TEMPLATE_VERSAO, renderizar, renderizar_item_lote, nome_arquivo
 
 documentos_bp = Blueprint('documentos', __name__)
 
-def create_pdf_styles():
-    """Criar estilos personalizados para PDFs"""
-    styles = getSampleStyleSheet()
-    
-    # Estilo para título principal
-    styles.add(ParagraphStyle(
-        name='TituloVIP',
-        parent=styles['Title'],
-        fontSize=18,
-        spaceAfter=30,
-        textColor=colors.HexColor('#1e40af'),
-        alignment=1  # Centralizado
-    ))
-    
-    # Estilo para subtítulos
-    styles.add(ParagraphStyle(
-        name='SubtituloVIP',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=colors.HexColor('#3b82f6')
-    ))
+# Coleções de onde documentos podem ser carregados por id (campo do número)
+COLECOES_DOCUMENTOS = {
+    'contrato': ('contratos', 'numero_contrato'),
+    'ordem_servico': ('ordens_servico', 'numero_os')
+}
+
+# Pool de processos para geração em lote (criado sob demanda, um por worker)
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=Config.DOCUMENTOS_LOTE_PROCESSOS or os.cpu_count())
+    return _pool
+
+def _descartar_pool(pool):
+    """Descartar um pool quebrado (processo filho morto); o próximo lote cria outro"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _submeter(documentos, chaves, em_cache):
+    """Enviar ao pool os documentos fora do cache (recriando o pool uma vez se estiver quebrado)"""
+    for tentativa in range(2):
+        pool = _get_pool()
+        try:
+            return pool, {
+                pool.submit(renderizar_item_lote, indice, documento['tipo'], documento.get('dados', {})): indice
+                for indice, documento in enumerate(documentos)
+                if chaves[indice] not in em_cache
+            }
+        except BrokenProcessPool:
+            _descartar_pool(pool)
+            if tentativa:
+                raise
+
+class _ZipBuffer:
+    """Destino não pesquisável para o zipfile; os bytes são drenados a cada arquivo"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drenar(self):
+        conteudo = b"".join(self._partes)
+        self._partes = []
+        return conteudo
+
+def _stream_zip(documentos, chaves, em_cache, pool, futures):
+    """Gerar o zip incrementalmente: primeiro os PDFs em cache, depois os renderizados conforme ficam prontos"""
+    buffer = _ZipBuffer()
+    erros = []
+
+    # PDFs já são comprimidos: armazenar sem recomprimir
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as arquivo_zip:
+        for indice, documento in enumerate(documentos):
+            conteudo = em_cache.get(chaves[indice])
+            if conteudo is not None:
+                nome = f"{indice + 1:03d}_{nome_arquivo(documento['tipo'], documento.get('dados', {}))}"
+                arquivo_zip.writestr(nome, conteudo)
+                yield buffer.drenar()
+
+        for future in as_completed(futures):
+            try:
+                indice, nome, conteudo = future.result()
+                arquivo_zip.writestr(nome, conteudo)
+                DocumentoCache.salvar(chaves[indice], documentos[indice]['tipo'], conteudo)
+            except BrokenProcessPool as e:
+                # Só este lote perde os documentos pendentes; o pool é recriado no próximo
+                _descartar_pool(pool)
+                erros.append(f"Documento {futures[future] + 1}: {e}")
+            except Exception as e:
+                erros.append(f"Documento {futures[future] + 1}: {e}")
+            yield buffer.drenar()
+
+        if erros:
+            arquivo_zip.writestr("erros.txt", "\n".join(erros))
+
+    yield buffer.drenar()
+
+def _carregar_documentos(tipo, ids):
+    """Carregar dados de contratos/ordens de serviço por id em uma única consulta"""
+    if tipo not in COLECOES_DOCUMENTOS:
+        raise ValueError(f"Carregamento por id não suportado para: {tipo}")
+
+    colecao, campo_numero = COLECOES_DOCUMENTOS[tipo]
+    db = get_db()
+
+    object_ids = [ObjectId(documento_id) for documento_id in ids]
+    encontrados = {doc['_id']: doc for doc in db[colecao].find({"_id": {"$in": object_ids}})}
+
+    documentos = []
+    for object_id in object_ids:
+        doc = encontrados.get(object_id)
+        if not doc:
+            raise ValueError(f"Documento não encontrado: {object_id}")
+        dados = {chave: valor for chave, valor in doc.items() if chave != '_id'}
+        dados['numero'] = doc.get(campo_numero, doc.get('numero', str(object_id)))
+        documentos.append({"tipo": tipo, "dados": dados})
+    return documentos
+
+def _responder_pdf(tipo, data):
+    """Devolver documento como application/pdf, do cache ou renderizado em memória"""
+    chave = DocumentoCache.gerar_chave(tipo, data, TEMPLATE_VERSAO)
+    pdf_content = DocumentoCache.obter(chave)
+    cache_status = "HIT"
     
-    return styles
+    if pdf_content is None:
+        pdf_content = renderizar(tipo, data)
+        DocumentoCache.salvar(chave, tipo, pdf_content)
+        cache_status = "MISS"
+
+    response = send_file(
+        BytesIO(pdf_content),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=nome_arquivo(tipo, data)
+    )
+    response.headers['X-Documento-Numero'] = data.get('numero', '001-2025')
+    response.headers['X-Cache'] = cache_status
+    return response
 
 @documentos_bp.route('/gerar-contrato', methods=['POST'])
 @jwt_required()
@@ -42,128 +153,8 @@ def gerar_contrato():
     """Gerar contrato de mudança em PDF"""
     try:
         data = request.get_json()
-        
-        # Dados do cliente
-        cliente = data.get('cliente', {})
-        servico = data.get('servico', {})
-        
-        # Gerar número sequencial (simulado)
-        numero_contrato = data.get('numero', '001-2025')
-        
-        # Criar arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Criar documento PDF
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-        styles = create_pdf_styles()
-        story = []
-        
-        # Cabeçalho
-        story.append(Paragraph("VIP MUDANÇAS", styles['TituloVIP']))
-        story.append(Paragraph("CONTRATO DE PRESTAÇÃO DE SERVIÇOS DE MUDANÇA", styles['SubtituloVIP']))
-        story.append(Spacer(1, 20))
-        
-        # Número do contrato
-        story.append(Paragraph(f"<b>Contrato Nº:</b> {numero_contrato}", styles['Normal']))
-        story.append(Paragraph(f"<b>Data:</b> {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Dados do contratante
-        story.append(Paragraph("<b>CONTRATANTE:</b>", styles['SubtituloVIP']))
-        contratante_data = [
-            ['Nome:', cliente.get('nome', '')],
-            ['CPF/CNPJ:', cliente.get('cpf_cnpj', '')],
-            ['Telefone:', cliente.get('telefone', '')],
-            ['Email:', cliente.get('email', '')],
-            ['Endereço:', cliente.get('endereco_origem', '')]
-        ]
-        
-        contratante_table = Table(contratante_data, colWidths=[1.5*inch, 4*inch])
-        contratante_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(contratante_table)
-        story.append(Spacer(1, 20))
-        
-        # Dados do serviço
-        story.append(Paragraph("<b>DADOS DO SERVIÇO:</b>", styles['SubtituloVIP']))
-        servico_data = [
-            ['Tipo de Mudança:', servico.get('tipo', 'Residencial')],
-            ['Data da Mudança:', servico.get('data_mudanca', '')],
-            ['Endereço Origem:', servico.get('endereco_origem', '')],
-            ['Endereço Destino:', servico.get('endereco_destino', '')],
-            ['Valor Total:', f"R$ {servico.get('valor_total', '0,00')}"],
-            ['Forma de Pagamento:', servico.get('forma_pagamento', 'À vista')]
-        ]
-        
-        servico_table = Table(servico_data, colWidths=[1.5*inch, 4*inch])
-        servico_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(servico_table)
-        story.append(Spacer(1, 20))
-        
-        # Cláusulas do contrato
-        story.append(Paragraph("<b>CLÁUSULAS CONTRATUAIS:</b>", styles['SubtituloVIP']))
-        
-        clausulas = [
-            "1. A VIP MUDANÇAS se compromete a executar os serviços de mudança conforme especificado neste contrato.",
-            "2. O cliente se responsabiliza por embalar adequadamente objetos frágeis e de valor.",
-            "3. A empresa não se responsabiliza por danos em objetos mal embalados pelo cliente.",
-            "4. O pagamento deverá ser efetuado conforme acordado neste contrato.",
-            "5. Cancelamentos com menos de 24h de antecedência estão sujeitos a multa de 30% do valor.",
-            "6. A empresa possui seguro para cobertura de danos durante o transporte.",
-            "7. Este contrato é válido por 30 dias a partir da data de assinatura."
-        ]
-        
-        for clausula in clausulas:
-            story.append(Paragraph(clausula, styles['Normal']))
-            story.append(Spacer(1, 8))
-        
-        story.append(Spacer(1, 30))
-        
-        # Assinaturas
-        story.append(Paragraph("<b>ASSINATURAS:</b>", styles['SubtituloVIP']))
-        story.append(Spacer(1, 40))
-        
-        assinaturas_data = [
-            ['_' * 30, '_' * 30],
-            ['VIP MUDANÇAS', 'CONTRATANTE'],
-            ['CNPJ: 12.345.678/0001-90', cliente.get('nome', '')]
-        ]
-        
-        assinaturas_table = Table(assinaturas_data, colWidths=[2.5*inch, 2.5*inch])
-        assinaturas_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(assinaturas_table)
-        
-        # Gerar PDF
-        doc.build(story)
-        
-        # Ler arquivo e retornar base64 (simulado)
-        with open(pdf_path, 'rb') as f:
-            pdf_content = f.read()
-        
-        # Limpar arquivo temporário
-        os.unlink(pdf_path)
-        
-        return jsonify({
-            "message": "Contrato gerado com sucesso",
-            "numero_contrato": numero_contrato,
-            "arquivo": "contrato_base64_aqui",  # Em produção, retornaria o base64
-            "tamanho": len(pdf_content)
-        }), 200
-        
+        return _responder_pdf('contrato', data)
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -173,115 +164,8 @@ def gerar_ordem_servico():
     """Gerar ordem de serviço em PDF"""
     try:
         data = request.get_json()
-        
-        # Dados da OS
-        cliente = data.get('cliente', {})
-        servico = data.get('servico', {})
-        equipe = data.get('equipe', [])
-        
-        # Gerar número sequencial
-        numero_os = data.get('numero', '001-2025')
-        
-        # Criar arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Criar documento PDF
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-        styles = create_pdf_styles()
-        story = []
-        
-        # Cabeçalho
-        story.append(Paragraph("VIP MUDANÇAS", styles['TituloVIP']))
-        story.append(Paragraph("ORDEM DE SERVIÇO", styles['SubtituloVIP']))
-        story.append(Spacer(1, 20))
-        
-        # Dados da OS
-        story.append(Paragraph(f"<b>OS Nº:</b> {numero_os}", styles['Normal']))
-        story.append(Paragraph(f"<b>Data de Emissão:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Dados do cliente
-        story.append(Paragraph("<b>CLIENTE:</b>", styles['SubtituloVIP']))
-        cliente_info = f"""
-        <b>Nome:</b> {cliente.get('nome', '')}<br/>
-        <b>Telefone:</b> {cliente.get('telefone', '')}<br/>
-        <b>Email:</b> {cliente.get('email', '')}
-        """
-        story.append(Paragraph(cliente_info, styles['Normal']))
-        story.append(Spacer(1, 15))
-        
-        # Dados do serviço
-        story.append(Paragraph("<b>DETALHES DO SERVIÇO:</b>", styles['SubtituloVIP']))
-        servico_info = f"""
-        <b>Data da Mudança:</b> {servico.get('data_mudanca', '')}<br/>
-        <b>Horário:</b> {servico.get('horario', '08:00')}<br/>
-        <b>Origem:</b> {servico.get('endereco_origem', '')}<br/>
-        <b>Destino:</b> {servico.get('endereco_destino', '')}<br/>
-        <b>Tipo:</b> {servico.get('tipo', 'Residencial')}<br/>
-        <b>Observações:</b> {servico.get('observacoes', 'Nenhuma')}
-        """
-        story.append(Paragraph(servico_info, styles['Normal']))
-        story.append(Spacer(1, 15))
-        
-        # Equipe designada
-        if equipe:
-            story.append(Paragraph("<b>EQUIPE DESIGNADA:</b>", styles['SubtituloVIP']))
-            for membro in equipe:
-                story.append(Paragraph(f"• {membro.get('nome', '')} - {membro.get('funcao', '')}", styles['Normal']))
-            story.append(Spacer(1, 15))
-        
-        # Lista de materiais/itens
-        story.append(Paragraph("<b>MATERIAIS NECESSÁRIOS:</b>", styles['SubtituloVIP']))
-        materiais = [
-            "□ Caixas de papelão",
-            "□ Plástico bolha",
-            "□ Fita adesiva",
-            "□ Papel pardo",
-            "□ Cobertores",
-            "□ Cintas de amarração",
-            "□ Outros: _______________"
-        ]
-        
-        for material in materiais:
-            story.append(Paragraph(material, styles['Normal']))
-        
-        story.append(Spacer(1, 30))
-        
-        # Assinaturas
-        story.append(Paragraph("<b>CONTROLE DE EXECUÇÃO:</b>", styles['SubtituloVIP']))
-        story.append(Spacer(1, 20))
-        
-        controle_data = [
-            ['Início dos trabalhos:', '___:___', 'Responsável:', '_' * 20],
-            ['Término dos trabalhos:', '___:___', 'Responsável:', '_' * 20],
-            ['Assinatura do Cliente:', '_' * 30, 'Data:', '___/___/___']
-        ]
-        
-        controle_table = Table(controle_data, colWidths=[1.5*inch, 1*inch, 1*inch, 1.5*inch])
-        controle_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        story.append(controle_table)
-        
-        # Gerar PDF
-        doc.build(story)
-        
-        # Ler arquivo e limpar
-        with open(pdf_path, 'rb') as f:
-            pdf_content = f.read()
-        
-        os.unlink(pdf_path)
-        
-        return jsonify({
-            "message": "Ordem de serviço gerada com sucesso",
-            "numero_os": numero_os,
-            "arquivo": "os_base64_aqui",
-            "tamanho": len(pdf_content)
-        }), 200
-        
+        return _responder_pdf('ordem_servico', data)
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -289,91 +173,60 @@ def gerar_ordem_servico():
 @jwt_required()
 def gerar_recibo():
     """Gerar recibo de pagamento em PDF"""
+    try:
+        data = request.get_json()
+        return _responder_pdf('recibo', data)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@documentos_bp.route('/gerar-lote', methods=['POST'])
+@jwt_required()
+def gerar_lote():
+    """Gerar vários documentos em paralelo e devolver um zip em streaming
+
+    Aceita {"documentos": [{"tipo": ..., "dados": {...}}]} ou
+    {"tipo": "ordem_servico" | "contrato", "ids": [...]}.
+    """
     try:
         data = request.get_json()
         
-        # Dados do recibo
-        cliente = data.get('cliente', {})
-        pagamento = data.get('pagamento', {})
-        
-        # Gerar número sequencial
-        numero_recibo = data.get('numero', '001-2025')
-        
-        # Criar arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            pdf_path = tmp_file.name
-        
-        # Criar documento PDF
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-        styles = create_pdf_styles()
-        story = []
-        
-        # Cabeçalho
-        story.append(Paragraph("VIP MUDANÇAS", styles['TituloVIP']))
-        story.append(Paragraph("RECIBO DE PAGAMENTO", styles['SubtituloVIP']))
-        story.append(Spacer(1, 20))
-        
-        # Dados do recibo
-        story.append(Paragraph(f"<b>Recibo Nº:</b> {numero_recibo}", styles['Normal']))
-        story.append(Paragraph(f"<b>Data:</b> {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
-        story.append(Spacer(1, 20))
+        try:
+            if data.get('ids'):
+                documentos = _carregar_documentos(data.get('tipo'), data['ids'])
+            else:
+                documentos = data.get('documentos', [])
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Valor por extenso (simulado)
-        valor = pagamento.get('valor', 0)
-        valor_extenso = "Valor por extenso aqui"  # Em produção, converter para extenso
+        if not documentos:
+            return jsonify({"error": "Nenhum documento informado"}), 400
         
-        # Corpo do recibo
-        recibo_texto = f"""
-        Recebi de <b>{cliente.get('nome', '')}</b>, portador do CPF/CNPJ <b>{cliente.get('cpf_cnpj', '')}</b>,
-        a quantia de <b>R$ {valor:.2f}</b> ({valor_extenso}), referente aos serviços de mudança
-        prestados conforme contrato <b>{pagamento.get('contrato', '')}</b>.
-        """
+        if len(documentos) > Config.DOCUMENTOS_LOTE_MAX:
+            return jsonify({"error": f"Máximo de {Config.DOCUMENTOS_LOTE_MAX} documentos por lote"}), 400
         
-        story.append(Paragraph(recibo_texto, styles['Normal']))
-        story.append(Spacer(1, 30))
+        for documento in documentos:
+            if documento.get('tipo') not in RENDERIZADORES:
+                return jsonify({"error": f"Tipo de documento inválido: {documento.get('tipo')}"}), 400
         
-        # Detalhes do pagamento
-        story.append(Paragraph("<b>DETALHES DO PAGAMENTO:</b>", styles['SubtituloVIP']))
-        pagamento_data = [
-            ['Forma de Pagamento:', pagamento.get('forma_pagamento', '')],
-            ['Data do Serviço:', pagamento.get('data_servico', '')],
-            ['Observações:', pagamento.get('observacoes', 'Nenhuma')]
+        # Documentos já gerados vêm do cache em uma única consulta
+        chaves = [
+            DocumentoCache.gerar_chave(documento['tipo'], documento.get('dados', {}), TEMPLATE_VERSAO)
+            for documento in documentos
         ]
+        em_cache = DocumentoCache.obter_muitos(chaves)
         
-        pagamento_table = Table(pagamento_data, colWidths=[2*inch, 3*inch])
-        pagamento_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(pagamento_table)
-        story.append(Spacer(1, 40))
-        
-        # Assinatura
-        story.append(Paragraph("São Paulo, " + datetime.now().strftime('%d de %B de %Y'), styles['Normal']))
-        story.append(Spacer(1, 40))
+        # Renderização distribuída entre os núcleos; o worker web apenas repassa os bytes
+        pool, futures = _submeter(documentos, chaves, em_cache)
         
-        story.append(Paragraph("_" * 40, styles['Normal']))
-        story.append(Paragraph("VIP MUDANÇAS", styles['Normal']))
-        story.append(Paragraph("CNPJ: 12.345.678/0001-90", styles['Normal']))
-        
-        # Gerar PDF
-        doc.build(story)
-        
-        # Ler arquivo e limpar
-        with open(pdf_path, 'rb') as f:
-            pdf_content = f.read()
-        
-        os.unlink(pdf_path)
-        
-        return jsonify({
-            "message": "Recibo gerado com sucesso",
-            "numero_recibo": numero_recibo,
-            "arquivo": "recibo_base64_aqui",
-            "tamanho": len(pdf_content)
-        }), 200
+        return Response(
+            _stream_zip(documentos, chaves, em_cache, pool, futures),
+            mimetype='application/zip',
+            headers={
+                "Content-Disposition": "attachment; filename=documentos.zip",
+                "X-Total-Documentos": str(len(documentos))
+            }
+        )
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-
@@ -0,0 +1,215 @@
+from bson import ObjectId
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models.estoque import Estoque, EstoqueInsuficiente
+
+estoque_bp = Blueprint('estoque', __name__)
+
+@estoque_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_itens():
+    """Obter itens de estoque"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 100))
+        skip = (page - 1) * per_page
+
+        itens = Estoque.get_all(limit=per_page, skip=skip, localizacao=request.args.get('localizacao'))
+
+        return jsonify({
+            "itens": [item.to_dict() for item in itens],
+            "page": page,
+            "per_page": per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_item():
+    """Criar novo item de estoque"""
+    try:
+        data = request.get_json()
+
+        if not data.get('item'):
+            return jsonify({"error": "Campo item é obrigatório"}), 400
+
+        data['usuario_id'] = get_jwt_identity()
+        item = Estoque.create(data)
+
+        return jsonify({
+            "message": "Item criado com sucesso",
+            "item": item.to_dict()
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/lote', methods=['POST'])
+@jwt_required()
+def create_itens_lote():
+    """Cadastrar vários itens de uma vez: {"itens": [...]}"""
+    try:
+        data = request.get_json()
+        itens = data.get('itens', [])
+
+        if not itens:
+            return jsonify({"error": "Nenhum item informado"}), 400
+
+        for indice, item in enumerate(itens):
+            if not item.get('item'):
+                return jsonify({"error": f"Item {indice}: campo item é obrigatório"}), 400
+
+        criados = Estoque.create_lote(itens, usuario_id=get_jwt_identity())
+
+        return jsonify({
+            "message": f"{len(criados)} itens criados com sucesso",
+            "itens": [item.to_dict() for item in criados]
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/lote', methods=['PUT'])
+@jwt_required()
+def update_itens_lote():
+    """Atualizar dados cadastrais de vários itens: {"itens": [{"id", ...campos}]}"""
+    try:
+        data = request.get_json()
+        alteracoes = data.get('itens', [])
+
+        if not alteracoes:
+            return jsonify({"error": "Nenhum item informado"}), 400
+
+        return jsonify(Estoque.update_lote(alteracoes)), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/estoque-baixo', methods=['GET'])
+@jwt_required()
+def get_estoque_baixo():
+    """Itens no nível mínimo ou abaixo"""
+    try:
+        itens = Estoque.get_estoque_baixo()
+
+        return jsonify({
+            "itens": [item.to_dict() for item in itens],
+            "total": len(itens)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/reservas', methods=['POST'])
+@jwt_required()
+def reservar_itens():
+    """Reservar materiais de uma OS: {"itens": [{"item_id", "quantidade"}], "referencia"}"""
+    try:
+        data = request.get_json()
+        itens = data.get('itens', [])
+
+        if not itens:
+            return jsonify({"error": "Nenhum item informado"}), 400
+
+        try:
+            reservados = Estoque.reservar_itens(itens, referencia=data.get('referencia'), usuario_id=get_jwt_identity())
+        except EstoqueInsuficiente as e:
+            return jsonify({"error": str(e)}), 409
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"success": True, "reservados": reservados}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/<item_id>', methods=['GET'])
+@jwt_required()
+def get_item(item_id):
+    """Obter item específico"""
+    try:
+        item = Estoque.find_by_id(item_id)
+
+        if not item:
+            return jsonify({"error": "Item não encontrado"}), 404
+
+        return jsonify({"item": item.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/<item_id>', methods=['PUT'])
+@jwt_required()
+def update_item(item_id):
+    """Atualizar dados do item (quantidade só por movimentação)"""
+    try:
+        if not ObjectId.is_valid(item_id):
+            return jsonify({"error": "Item não encontrado"}), 404
+
+        data = request.get_json()
+
+        if not Estoque.update(item_id, data):
+            return jsonify({"error": "Item não encontrado"}), 404
+
+        return jsonify({
+            "message": "Item atualizado com sucesso",
+            "item": Estoque.find_by_id(item_id).to_dict()
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/<item_id>/movimentacoes', methods=['POST'])
+@jwt_required()
+def movimentar_item(item_id):
+    """Registrar movimentação: {"tipo", "quantidade", "motivo", "referencia"}"""
+    try:
+        if not ObjectId.is_valid(item_id):
+            return jsonify({"error": "Item não encontrado"}), 404
+
+        data = request.get_json()
+
+        try:
+            atualizado = Estoque.movimentar(
+                item_id, data.get('tipo'), data.get('quantidade', 0),
+                motivo=data.get('motivo'), referencia=data.get('referencia'), usuario_id=get_jwt_identity()
+            )
+        except EstoqueInsuficiente as e:
+            return jsonify({"error": str(e)}), 409
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "success": True,
+            "quantidade": atualizado["quantidade"],
+            "estoque_baixo": atualizado["estoque_baixo"]
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@estoque_bp.route('/<item_id>/movimentacoes', methods=['GET'])
+@jwt_required()
+def get_movimentacoes(item_id):
+    """Histórico de movimentações do item"""
+    try:
+        if not ObjectId.is_valid(item_id):
+            return jsonify({"error": "Item não encontrado"}), 404
+
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+
+        movimentacoes = Estoque.get_movimentacoes(item_id, limit=per_page, skip=(page - 1) * per_page)
+        for movimentacao in movimentacoes:
+            movimentacao['data'] = movimentacao['data'].isoformat() if movimentacao.get('data') else None
+
+        return jsonify({
+            "movimentacoes": movimentacoes,
+            "page": page,
+            "per_page": per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,217 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from src.models.financeiro import Financeiro, FinanceiroRollup
+from src.models.user import User
+
+financeiro_bp = Blueprint('financeiro', __name__)
+
+def _intervalo_meses():
+    """Intervalo "AAAA-MM" dos relatórios (padrão: últimos 12 meses)"""
+    hoje = datetime.utcnow()
+    mes_fim = request.args.get('ate') or hoje.strftime("%Y-%m")
+    mes_inicio = request.args.get('de') or f"{hoje.year - 1}-{hoje.month:02d}"
+    for mes in (mes_inicio, mes_fim):
+        datetime.strptime(mes, "%Y-%m")
+    if mes_inicio > mes_fim:
+        raise ValueError("Parâmetro de deve ser anterior a ate")
+    return mes_inicio, mes_fim
+
+@financeiro_bp.route('/transacoes', methods=['GET'])
+@jwt_required()
+def get_transacoes():
+    """Listar transações"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+        skip = (page - 1) * per_page
+
+        transacoes = Financeiro.get_all(
+            limit=per_page, skip=skip,
+            tipo=request.args.get('tipo'),
+            status=request.args.get('status'),
+            competencia=request.args.get('competencia'),
+            cliente_id=request.args.get('cliente_id')
+        )
+
+        return jsonify({
+            "transacoes": [transacao.to_dict() for transacao in transacoes],
+            "page": page,
+            "per_page": per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/transacoes', methods=['POST'])
+@jwt_required()
+def create_transacao():
+    """Registrar receita ou despesa"""
+    try:
+        data = request.get_json()
+
+        if not data.get('descricao') or data.get('valor') is None:
+            return jsonify({"error": "descricao e valor são obrigatórios"}), 400
+
+        data['usuario_id'] = get_jwt_identity()
+        try:
+            transacao = Financeiro.create(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "message": "Transação registrada com sucesso",
+            "transacao": transacao.to_dict()
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/transacoes/lote', methods=['POST'])
+@jwt_required()
+def create_transacoes_lote():
+    """Registrar várias transações de uma vez: {"transacoes": [...]}"""
+    try:
+        data = request.get_json()
+        transacoes = data.get('transacoes', [])
+
+        if not transacoes:
+            return jsonify({"error": "Nenhuma transação informada"}), 400
+
+        usuario_id = get_jwt_identity()
+        for indice, transacao in enumerate(transacoes):
+            if not transacao.get('descricao') or transacao.get('valor') is None:
+                return jsonify({"error": f"Transação {indice}: descricao e valor são obrigatórios"}), 400
+            transacao['usuario_id'] = usuario_id
+
+        try:
+            criadas = Financeiro.create_lote(transacoes)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "message": f"{len(criadas)} transações registradas com sucesso",
+            "transacoes": [transacao.to_dict() for transacao in criadas]
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/transacoes/<transacao_id>', methods=['GET'])
+@jwt_required()
+def get_transacao(transacao_id):
+    """Obter transação específica"""
+    try:
+        transacao = Financeiro.find_by_id(transacao_id)
+
+        if not transacao:
+            return jsonify({"error": "Transação não encontrada"}), 404
+
+        return jsonify({"transacao": transacao.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/transacoes/<transacao_id>', methods=['PUT'])
+@jwt_required()
+def update_transacao(transacao_id):
+    """Atualizar transação (inclusive baixa: {"status": "pago"})"""
+    try:
+        data = request.get_json()
+
+        try:
+            transacao = Financeiro.update(transacao_id, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if not transacao:
+            return jsonify({"error": "Transação não encontrada"}), 404
+
+        return jsonify({
+            "message": "Transação atualizada com sucesso",
+            "transacao": transacao.to_dict()
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/transacoes/<transacao_id>', methods=['DELETE'])
+@jwt_required()
+def cancelar_transacao(transacao_id):
+    """Cancelar transação"""
+    try:
+        if not Financeiro.cancelar(transacao_id):
+            return jsonify({"error": "Transação não encontrada"}), 404
+
+        return jsonify({"message": "Transação cancelada com sucesso"}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/relatorios/fluxo-caixa', methods=['GET'])
+@jwt_required()
+def get_fluxo_caixa():
+    """Receitas, despesas e saldo por mês (?de=AAAA-MM&ate=AAAA-MM), lido dos rollups"""
+    try:
+        try:
+            mes_inicio, mes_fim = _intervalo_meses()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        meses = FinanceiroRollup.fluxo_caixa(mes_inicio, mes_fim)
+
+        return jsonify({
+            "de": mes_inicio,
+            "ate": mes_fim,
+            "meses": meses,
+            "total_receitas": round(sum(mes["receitas"] for mes in meses), 2),
+            "total_despesas": round(sum(mes["despesas"] for mes in meses), 2)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/relatorios/categorias', methods=['GET'])
+@jwt_required()
+def get_relatorio_categorias():
+    """Totais por mês e categoria (?tipo=receita|despesa&categoria=...), lido dos rollups"""
+    try:
+        try:
+            mes_inicio, mes_fim = _intervalo_meses()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        rollups = FinanceiroRollup.consultar(
+            mes_inicio, mes_fim,
+            tipo=request.args.get('tipo'),
+            categoria=request.args.get('categoria')
+        )
+
+        totais = {}
+        for rollup in rollups:
+            chave = f"{rollup['tipo']}:{rollup['categoria']}"
+            totais[chave] = round(totais.get(chave, 0) + rollup["total"], 2)
+
+        return jsonify({
+            "de": mes_inicio,
+            "ate": mes_fim,
+            "rollups": rollups,
+            "totais": totais
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@financeiro_bp.route('/rollups/reconstruir', methods=['POST'])
+@jwt_required()
+def reconstruir_rollups():
+    """Recalcular os rollups a partir das transações (apenas admin)"""
+    try:
+        current_user = User.find_by_id(get_jwt_identity())
+        if not current_user or current_user.role != 'admin':
+            return jsonify({"error": "Acesso negado"}), 403
+
+        return jsonify(FinanceiroRollup.reconstruir()), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
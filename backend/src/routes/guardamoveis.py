@@ -0,0 +1,225 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+from src.models.guardamoveis import GuardaMoveis, ConflitoOcupacao
+from src.services.calendario import data_utc
+from src.services.disponibilidade_boxes import indice_boxes
+
+guardamoveis_bp = Blueprint('guardamoveis', __name__)
+
+@guardamoveis_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_boxes():
+    """Obter lista de boxes"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+        skip = (page - 1) * per_page
+
+        boxes = GuardaMoveis.get_all(
+            limit=per_page, skip=skip,
+            status_filter=request.args.get('status'),
+            tamanho=request.args.get('tamanho')
+        )
+
+        return jsonify({
+            "boxes": [box.to_dict() for box in boxes],
+            "page": page,
+            "per_page": per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_box():
+    """Criar novo box"""
+    try:
+        data = request.get_json()
+
+        if not data.get('box_numero') or not data.get('tamanho'):
+            return jsonify({"error": "box_numero e tamanho são obrigatórios"}), 400
+
+        box = GuardaMoveis.create(data)
+
+        return jsonify({
+            "message": "Box criado com sucesso",
+            "box": box.to_dict()
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/lote', methods=['POST'])
+@jwt_required()
+def create_boxes_lote():
+    """Cadastrar vários boxes de uma vez: {"boxes": [...]}"""
+    try:
+        data = request.get_json()
+        boxes = data.get('boxes', [])
+
+        if not boxes:
+            return jsonify({"error": "Nenhum box informado"}), 400
+
+        for indice, box in enumerate(boxes):
+            if not box.get('box_numero') or not box.get('tamanho'):
+                return jsonify({"error": f"Box {indice}: box_numero e tamanho são obrigatórios"}), 400
+
+        resumo = GuardaMoveis.create_lote(boxes)
+        return jsonify({
+            "message": f"{resumo['criados']} boxes criados, {resumo['conflitos']} já cadastrados",
+            "resumo": resumo
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/lote', methods=['PUT'])
+@jwt_required()
+def update_boxes_lote():
+    """Atualizar vários boxes de uma vez: {"boxes": [{"id", ...campos}]}"""
+    try:
+        data = request.get_json()
+        alteracoes = data.get('boxes', [])
+
+        if not alteracoes:
+            return jsonify({"error": "Nenhum box informado"}), 400
+
+        return jsonify(GuardaMoveis.update_lote(alteracoes)), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/<box_id>', methods=['GET'])
+@jwt_required()
+def get_box(box_id):
+    """Obter box específico"""
+    try:
+        box = GuardaMoveis.find_by_id(box_id)
+
+        if not box:
+            return jsonify({"error": "Box não encontrado"}), 404
+
+        return jsonify({"box": box.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/<box_id>', methods=['PUT'])
+@jwt_required()
+def update_box(box_id):
+    """Atualizar box"""
+    try:
+        data = request.get_json()
+
+        if not GuardaMoveis.update(box_id, data):
+            return jsonify({"error": "Box não encontrado"}), 404
+
+        return jsonify({
+            "message": "Box atualizado com sucesso",
+            "box": GuardaMoveis.find_by_id(box_id).to_dict()
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/disponibilidade', methods=['GET'])
+@jwt_required()
+def get_disponibilidade():
+    """Primeiro box livre de um tamanho a partir de uma data (data_fim opcional)"""
+    try:
+        tamanho = request.args.get('tamanho')
+        if not tamanho:
+            return jsonify({"error": "tamanho é obrigatório"}), 400
+
+        try:
+            data_inicio = data_utc(request.args.get('data_inicio')) or datetime.utcnow()
+            data_fim = data_utc(request.args.get('data_fim'))
+            box = indice_boxes.primeiro_livre(tamanho, data_inicio, data_fim)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "disponivel": box is not None,
+            "box": box
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/ocupacao', methods=['GET'])
+@jwt_required()
+def get_taxa_ocupacao():
+    """Taxa de ocupação por tamanho em um período (padrão: hoje)"""
+    try:
+        try:
+            data_inicio = data_utc(request.args.get('data_inicio')) or datetime.utcnow()
+            data_fim = data_utc(request.args.get('data_fim')) or data_inicio + timedelta(days=1)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "ocupacao": indice_boxes.taxa_ocupacao(data_inicio, data_fim, tamanho=request.args.get('tamanho'))
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/<box_id>/ocupacoes', methods=['POST'])
+@jwt_required()
+def ocupar_box(box_id):
+    """Alocar box para um cliente em um período"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+
+        if not data.get('cliente_id'):
+            return jsonify({"error": "cliente_id é obrigatório"}), 400
+
+        try:
+            data_inicio = data_utc(data.get('data_inicio')) or datetime.utcnow()
+            data_fim = data_utc(data.get('data_fim'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if data_fim and data_fim <= data_inicio:
+            return jsonify({"error": "data_fim deve ser posterior a data_inicio"}), 400
+
+        try:
+            ocupacao = GuardaMoveis.ocupar(box_id, data['cliente_id'], data_inicio, data_fim, criado_por=user_id)
+        except ConflitoOcupacao as e:
+            return jsonify({"error": str(e)}), 409
+
+        indice_boxes.registrar_ocupacao(ocupacao)
+
+        return jsonify({
+            "message": "Box alocado com sucesso",
+            "ocupacao_id": str(ocupacao['_id']),
+            "box": GuardaMoveis.find_by_id(box_id).to_dict()
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@guardamoveis_bp.route('/ocupacoes/<ocupacao_id>/encerrar', methods=['POST'])
+@jwt_required()
+def encerrar_ocupacao(ocupacao_id):
+    """Encerrar ocupação (saída do cliente) na data informada ou agora"""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        try:
+            data_fim = data_utc(data.get('data_fim'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        ocupacao = GuardaMoveis.encerrar_ocupacao(ocupacao_id, data_fim)
+        if not ocupacao:
+            return jsonify({"error": "Ocupação não encontrada"}), 404
+
+        indice_boxes.registrar_ocupacao(ocupacao)
+
+        return jsonify({"message": "Ocupação encerrada com sucesso"}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -3,12 +3,18 @@ from flask_jwt_extended import jwt_required
 import openai
 import os
 from src.config import Config
+from src.metricas import cronometro
 
 ia_bp = Blueprint('ia', __name__)
 
 # Configurar OpenAI
 openai.api_key = Config.OPENAI_API_KEY
 
+def _chat_completion(operacao, **kwargs):
+    """Chamada ao modelo com o tempo registrado nas métricas (serviço openai)"""
+    with cronometro("openai", operacao):
+        return openai.ChatCompletion.create(**kwargs)
+
 @ia_bp.route('/analisar-cliente', methods=['POST'])
 @jwt_required()
 def analisar_cliente():
@@ -43,7 +49,8 @@ def analisar_cliente():
             justificativa = "Análise simulada: Cliente com potencial moderado baseado nos dados fornecidos."
         else:
             try:
-                response = openai.ChatCompletion.create(
+                response = _chat_completion(
+                    "analisar_cliente",
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": "Você é um assistente especializado em análise de clientes para empresa de mudanças."},
@@ -110,7 +117,8 @@ def sugerir_acao():
             sugestao = sugestoes.get(cliente_status, "Mantenha contato regular e acompanhe o cliente.")
         else:
             try:
-                response = openai.ChatCompletion.create(
+                response = _chat_completion(
+                    "sugerir_acao",
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": "Você é um assistente de vendas especializado em mudanças residenciais e comerciais."},
@@ -185,7 +193,8 @@ def gerar_mensagem():
             mensagem = mensagens_simuladas.get(tipo_mensagem, mensagens_simuladas['whatsapp'])
         else:
             try:
-                response = openai.ChatCompletion.create(
+                response = _chat_completion(
+                    "gerar_mensagem",
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": "Você é um especialista em comunicação para empresa de mudanças."},
@@ -233,7 +242,8 @@ def chat_ia():
             resposta = "Olá! Sou a IA Mirante. No momento estou em modo simulação. Como posso ajudar com suas vendas e gestão de clientes?"
         else:
             try:
-                response = openai.ChatCompletion.create(
+                response = _chat_completion(
+                    "chat",
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": "Você é a IA Mirante, assistente especializada em mudanças residenciais e comerciais da VIP Mudanças."},
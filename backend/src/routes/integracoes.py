@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from src.config import Config
+from src.models.boleto import Boleto
+from src.models.evento import Evento
+from src.models.faturamento_execucao import FaturamentoExecucao
+from src.models.notificacao import Notificacao, RECORRENCIAS, TIPOS_NOTIFICACAO
+from src.models.webhook_inbox import WebhookInbox
+from src.services import google_calendar
 
 integracoes_bp = Blueprint('integracoes', __name__)
 
 # Configurações das integrações
-GOOGLE_CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+GOOGLE_CALENDAR_API = Config.GOOGLE_CALENDAR_API_URL
 GOOGLE_DRIVE_API = "https://www.googleapis.com/drive/v3"
 GOOGLE_SHEETS_API = "https://sheets.googleapis.com/v4"
 
@@ -17,30 +23,26 @@ def google_agenda():
     """Integração com Google Agenda"""
     try:
         if request.method == 'GET':
-            # Listar eventos
-            # Em produção, fazer requisição real para Google Calendar API
-            eventos_simulados = [
-                {
-                    "id": "evento1",
-                    "titulo": "Visita - Carlos Silva",
-                    "data": "2025-06-20",
-                    "hora": "09:00",
-                    "endereco": "Rua das Flores, 123",
-                    "tipo": "visita"
-                },
-                {
-                    "id": "evento2", 
-                    "titulo": "Mudança - Ana Santos",
-                    "data": "2025-06-21",
-                    "hora": "08:00",
-                    "endereco": "Av. Paulista, 456",
-                    "tipo": "mudanca"
-                }
-            ]
+            # Listar eventos do cache local (mantido pela sincronização incremental)
+            data_inicio = request.args.get('from')
+            data_fim = request.args.get('to')
+            inicio = datetime.fromisoformat(data_inicio) if data_inicio else datetime.combine(datetime.utcnow().date(), datetime.min.time())
+            fim = datetime.fromisoformat(data_fim) if data_fim else inicio + timedelta(days=30)
+            
+            eventos = Evento.find_intervalo(
+                inicio, fim,
+                calendario_id=request.args.get('calendario_id'),
+                tipo=request.args.get('tipo')
+            )
+            sincronizacoes = Evento.ultima_sincronizacao()
             
             return jsonify({
-                "eventos": eventos_simulados,
-                "total": len(eventos_simulados)
+                "eventos": [evento.to_dict() for evento in eventos],
+                "total": len(eventos),
+                "sincronizado_em": {
+                    calendario_id: sincronizado_em.isoformat() if sincronizado_em else None
+                    for calendario_id, sincronizado_em in sincronizacoes.items()
+                }
             }), 200
         
         else:  # POST - Criar evento
@@ -82,6 +84,21 @@ def google_agenda():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@integracoes_bp.route('/google-agenda/sincronizar', methods=['POST'])
+@jwt_required()
+def google_agenda_sincronizar():
+    """Forçar sincronização dos calendários (o worker também sincroniza periodicamente)"""
+    try:
+        resultados = google_calendar.sincronizar_todos()
+        
+        return jsonify({
+            "success": all("erro" not in resultado for resultado in resultados),
+            "calendarios": resultados
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @integracoes_bp.route('/google-drive/upload', methods=['POST'])
 @jwt_required()
 def google_drive_upload():
@@ -141,34 +158,17 @@ def google_sheets_atualizar():
 
 @integracoes_bp.route('/manychat/webhook', methods=['POST'])
 def manychat_webhook():
-    """Webhook para integração com ManyChat"""
+    """Webhook para integração com ManyChat (apenas registra; workers processam)"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
-        # Processar dados do ManyChat
-        user_id = data.get('user_id', '')
-        message = data.get('last_input_text', '')
-        user_data = data.get('custom_fields', {})
-        
-        # Extrair informações do cliente
-        cliente_info = {
-            "nome": user_data.get('nome', ''),
-            "telefone": user_data.get('telefone', ''),
-            "email": user_data.get('email', ''),
-            "endereco_origem": user_data.get('endereco_origem', ''),
-            "endereco_destino": user_data.get('endereco_destino', ''),
-            "tipo_mudanca": user_data.get('tipo_mudanca', 'residencial'),
-            "data_mudanca": user_data.get('data_mudanca', ''),
-            "fonte": "ManyChat Bot"
-        }
+        if not isinstance(data, dict):
+            return jsonify({"error": "Payload inválido"}), 400
         
-        # Em produção, salvar no banco de dados como pré-cadastro
-        # db.clientes.insert_one({
-        #     **cliente_info,
-        #     "status": "Novo",
-        #     "data_cadastro": datetime.now(),
-        #     "manychat_user_id": user_id
-        # })
+        mensagem_id = data.get('message_id') or WebhookInbox.gerar_mensagem_id(data)
+        WebhookInbox.registrar("manychat", str(mensagem_id), data)
+        
+        user_data = data.get('custom_fields', {}) or {}
         
         # Resposta para o ManyChat
         resposta = {
@@ -177,7 +177,7 @@ def manychat_webhook():
                 "messages": [
                     {
                         "type": "text",
-                        "text": f"Obrigado {cliente_info['nome']}! Seus dados foram registrados e nossa equipe entrará em contato em breve."
+                        "text": f"Obrigado {user_data.get('nome', '')}! Seus dados foram registrados e nossa equipe entrará em contato em breve."
                     }
                 ],
                 "actions": [
@@ -245,11 +245,80 @@ def cora_gerar_boleto():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@integracoes_bp.route('/cora/faturamento', methods=['POST'])
+@jwt_required()
+def cora_faturamento():
+    """Solicitar faturamento mensal dos boxes ocupados (executado pelo worker)"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        
+        competencia = data.get('competencia') or datetime.utcnow().strftime('%Y-%m')
+        try:
+            datetime.strptime(competencia, '%Y-%m')
+        except ValueError:
+            return jsonify({"error": "Competência deve estar no formato AAAA-MM"}), 400
+        
+        execucao = FaturamentoExecucao.solicitar(competencia, solicitado_por=user_id)
+        if not execucao:
+            return jsonify({"error": f"Já existe um faturamento em andamento para {competencia}"}), 409
+        
+        return jsonify({
+            "success": True,
+            "message": "Faturamento agendado",
+            "execucao": execucao.to_dict()
+        }), 202
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@integracoes_bp.route('/cora/faturamento/<execucao_id>', methods=['GET'])
+@jwt_required()
+def cora_faturamento_status(execucao_id):
+    """Acompanhar o progresso de um faturamento"""
+    try:
+        execucao = FaturamentoExecucao.find_by_id(execucao_id)
+        
+        if not execucao:
+            return jsonify({"error": "Execução não encontrada"}), 404
+        
+        return jsonify({"execucao": execucao.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@integracoes_bp.route('/cora/boletos', methods=['GET'])
+@jwt_required()
+def cora_boletos():
+    """Listar boletos de uma competência"""
+    try:
+        competencia = request.args.get('competencia') or datetime.utcnow().strftime('%Y-%m')
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 100))
+        
+        boletos = Boleto.get_by_competencia(
+            competencia,
+            status_filter=request.args.get('status'),
+            limit=per_page,
+            skip=(page - 1) * per_page
+        )
+        
+        return jsonify({
+            "boletos": [boleto.to_dict() for boleto in boletos],
+            "competencia": competencia,
+            "page": page,
+            "per_page": per_page
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @integracoes_bp.route('/notificacoes/programar', methods=['POST'])
 @jwt_required()
 def programar_notificacao():
     """Programar notificação automática"""
     try:
+        user_id = get_jwt_identity()
         data = request.get_json()
         
         tipo = data.get('tipo', '')  # whatsapp, email, sms
@@ -258,27 +327,78 @@ def programar_notificacao():
         data_envio = data.get('data_envio', '')
         recorrencia = data.get('recorrencia', None)  # diario, semanal, mensal
         
-        # Em produção, salvar na fila de notificações
-        notificacao = {
-            "id": f"notif_{datetime.now().timestamp()}",
+        if tipo not in TIPOS_NOTIFICACAO:
+            return jsonify({"error": f"Tipo inválido: {tipo}"}), 400
+        
+        if not destinatario or not mensagem:
+            return jsonify({"error": "Destinatário e mensagem são obrigatórios"}), 400
+        
+        if recorrencia and recorrencia not in RECORRENCIAS:
+            return jsonify({"error": f"Recorrência inválida: {recorrencia}"}), 400
+        
+        # Horários são guardados em UTC (sem fuso), como o restante da base
+        if data_envio:
+            try:
+                next_run_at = datetime.fromisoformat(data_envio.replace('Z', '+00:00'))
+            except ValueError:
+                return jsonify({"error": "data_envio inválida"}), 400
+            if next_run_at.tzinfo:
+                next_run_at = next_run_at.astimezone(timezone.utc).replace(tzinfo=None)
+        else:
+            next_run_at = datetime.utcnow()
+        
+        notificacao = Notificacao.agendar({
             "tipo": tipo,
             "destinatario": destinatario,
             "mensagem": mensagem,
-            "data_envio": data_envio,
             "recorrencia": recorrencia,
-            "status": "agendada",
-            "criado_em": datetime.now().isoformat()
-        }
+            "next_run_at": next_run_at,
+            "criado_por": user_id
+        })
         
         return jsonify({
             "success": True,
             "message": "Notificação programada com sucesso",
-            "notificacao": notificacao
+            "notificacao": notificacao.to_dict()
+        }), 201
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@integracoes_bp.route('/notificacoes/programadas', methods=['GET'])
+@jwt_required()
+def listar_notificacoes_programadas():
+    """Listar notificações programadas pela ordem de envio"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+        status_filter = request.args.get('status', 'agendada')
+        
+        skip = (page - 1) * per_page
+        notificacoes = Notificacao.get_proximas(limit=per_page, skip=skip, status_filter=status_filter)
+        
+        return jsonify({
+            "notificacoes": [notificacao.to_dict() for notificacao in notificacoes],
+            "page": page,
+            "per_page": per_page
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@integracoes_bp.route('/notificacoes/<notificacao_id>', methods=['DELETE'])
+@jwt_required()
+def cancelar_notificacao(notificacao_id):
+    """Cancelar notificação programada"""
+    try:
+        if not Notificacao.cancelar(notificacao_id):
+            return jsonify({"error": "Notificação não encontrada ou já enviada"}), 404
+        
+        return jsonify({"success": True, "message": "Notificação cancelada"}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @integracoes_bp.route('/automacoes/status', methods=['GET'])
 @jwt_required()
 def status_automacoes():
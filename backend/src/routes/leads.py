@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.lead import Lead
-from datetime import datetime
 
 leads_bp = Blueprint("leads", __name__)
 
@@ -10,8 +9,20 @@ leads_bp = Blueprint("leads", __name__)
 def get_leads():
     """Listar todos os leads"""
     try:
-        leads = Lead.get_all()
-        return jsonify({"leads": leads}), 200
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 50))
+        skip = (page - 1) * per_page
+
+        leads = Lead.get_all(
+            limit=per_page, skip=skip,
+            status_filter=request.args.get("status"),
+            fonte=request.args.get("fonte")
+        )
+        return jsonify({
+            "leads": [lead.to_dict() for lead in leads],
+            "page": page,
+            "per_page": per_page
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -28,15 +39,61 @@ def create_lead():
             if not data.get(field):
                 return jsonify({"error": f"Campo {field} é obrigatório"}), 400
         
-        lead_id = Lead.create(data)
+        try:
+            lead = Lead.create(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+        
         return jsonify({
             "message": "Lead criado com sucesso",
-            "lead_id": lead_id
+            "lead_id": str(lead._id)
         }), 201
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@leads_bp.route("/lote", methods=["POST"])
+@jwt_required()
+def create_leads_lote():
+    """Importar vários leads de uma vez, deduplicando por LinkedIn/email/telefone: {"leads": [...]}"""
+    try:
+        data = request.get_json()
+        leads = data.get("leads", [])
+        
+        if not leads:
+            return jsonify({"error": "Nenhum lead informado"}), 400
+        
+        required_fields = ["nome", "cargo", "empresa"]
+        for indice, lead in enumerate(leads):
+            for field in required_fields:
+                if not lead.get(field):
+                    return jsonify({"error": f"Lead {indice}: campo {field} é obrigatório"}), 400
+        
+        resumo = Lead.importar(leads)
+        return jsonify({
+            "message": f"{resumo['criados']} leads criados, {resumo['atualizados']} atualizados",
+            "resumo": resumo
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@leads_bp.route("/lote", methods=["PUT"])
+@jwt_required()
+def update_leads_lote():
+    """Atualizar vários leads de uma vez: {"leads": [{"id", ...campos}]}"""
+    try:
+        data = request.get_json()
+        alteracoes = data.get("leads", [])
+        
+        if not alteracoes:
+            return jsonify({"error": "Nenhum lead informado"}), 400
+        
+        return jsonify(Lead.update_many(alteracoes)), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @leads_bp.route("/capturar", methods=["POST"])
 @jwt_required()
 def capturar_leads():
@@ -67,14 +124,11 @@ def capturar_leads():
             }
         ]
         
-        leads_criados = []
-        for lead_data in leads_simulados:
-            lead_id = Lead.create(lead_data)
-            leads_criados.append(lead_id)
+        resumo = Lead.importar(leads_simulados)
         
         return jsonify({
-            "message": f"{len(leads_criados)} leads capturados com sucesso",
-            "leads_ids": leads_criados
+            "message": f"{resumo['criados']} leads capturados com sucesso",
+            "resumo": resumo
         }), 201
         
     except Exception as e:
@@ -85,20 +139,18 @@ def capturar_leads():
 def exportar_leads():
     """Exportar leads em formato CSV"""
     try:
-        leads = Lead.get_all()
-        
         # Simular exportação CSV (retornar dados estruturados)
         csv_data = []
-        for lead in leads:
+        for lead in Lead.iterar(status_filter=request.args.get("status")):
             csv_data.append({
-                "Nome": lead.get("nome", ""),
-                "Cargo": lead.get("cargo", ""),
-                "Empresa": lead.get("empresa", ""),
-                "Email": lead.get("email", ""),
-                "Telefone": lead.get("telefone", ""),
-                "Localização": lead.get("localizacao", ""),
-                "Status": lead.get("status", ""),
-                "Data Criação": lead.get("created_at", "") # .strftime("%d/%m/%Y %H:%M") if lead.get("created_at") else ""
+                "Nome": lead.nome or "",
+                "Cargo": lead.cargo or "",
+                "Empresa": lead.empresa or "",
+                "Email": lead.email or "",
+                "Telefone": lead.telefone or "",
+                "Localização": lead.localizacao or "",
+                "Status": lead.status or "",
+                "Data Criação": lead.data_criacao.strftime("%d/%m/%Y %H:%M") if lead.data_criacao else ""
             })
         
         return jsonify({
@@ -110,3 +162,33 @@ def exportar_leads():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@leads_bp.route("/<lead_id>", methods=["GET"])
+@jwt_required()
+def get_lead(lead_id):
+    """Obter lead por ID"""
+    try:
+        lead = Lead.find_by_id(lead_id)
+        if not lead:
+            return jsonify({"error": "Lead não encontrado"}), 404
+        
+        return jsonify({"lead": lead.to_dict()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@leads_bp.route("/<lead_id>", methods=["PUT"])
+@jwt_required()
+def update_lead(lead_id):
+    """Atualizar lead"""
+    try:
+        data = request.get_json()
+        
+        try:
+            atualizado = Lead.update(lead_id, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+        if not atualizado:
+            return jsonify({"error": "Lead não encontrado"}), 404
+        
+        return jsonify({"message": "Lead atualizado com sucesso"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
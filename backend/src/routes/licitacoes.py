@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.database import get_db
 from src.models.licitacao import Licitacao
+from src.models.monitoramento_licitacao import MonitoramentoLicitacao
+from src.services.crawler_licitacoes import portais_configurados, solicitar_varredura
+from src.services.palavras_chave import AutomatoPalavras, monitor_palavras, reclassificar
 from datetime import datetime
 
 licitacoes_bp = Blueprint("licitacoes", __name__)
@@ -10,18 +14,47 @@ licitacoes_bp = Blueprint("licitacoes", __name__)
 def get_licitacoes():
     """Listar todas as licitações"""
     try:
-        licitacoes = Licitacao.get_all()
-        return jsonify({"licitacoes": licitacoes}), 200
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 50))
+        skip = (page - 1) * per_page
+
+        licitacoes = Licitacao.get_all(
+            limit=per_page, skip=skip,
+            status_filter=request.args.get("status"),
+            portal=request.args.get("portal"),
+            palavra=request.args.get("palavra")
+        )
+        return jsonify({
+            "licitacoes": [licitacao.to_dict() for licitacao in licitacoes],
+            "page": page,
+            "per_page": per_page
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @licitacoes_bp.route("/buscar", methods=["POST"])
 @jwt_required()
 def buscar_licitacoes():
-    """Simular busca automática de licitações"""
+    """Buscar licitações nos portais monitorados (simulada se nenhum portal tiver URL configurada)"""
     try:
-        data = request.get_json()
-        palavras_chave = data.get("palavras_chave", ["mudança", "remoção", "transporte"])
+        data = request.get_json(silent=True) or {}
+        
+        # Portais reais: a varredura (com o intervalo de cortesia de cada portal) é feita
+        # pelo worker; aqui apenas antecipamos a próxima. O resultado aparece em ultima_busca
+        portais = portais_configurados()
+        if portais:
+            solicitar_varredura()
+            return jsonify({
+                "message": "Busca agendada",
+                "portais": [portal["nome"] for portal in portais]
+            }), 202
+        
+        # Palavras da requisição ou, sem elas, as do monitoramento configurado
+        if data.get("palavras_chave"):
+            automato = AutomatoPalavras(data["palavras_chave"])
+        else:
+            automato = monitor_palavras.get()
+        palavras_chave = automato.palavras_chave
         
         # Simular busca em portais (em produção, faria scraping real)
         licitacoes_simuladas = [
@@ -35,7 +68,6 @@ def buscar_licitacoes():
                 "status": "Aberta",
                 "portal": "ComprasNet",
                 "url": "https://comprasnet.gov.br/licitacao/001-2025",
-                "palavras_encontradas": ["mudança", "transporte"],
                 "descricao": "Serviços de mudança e transporte de móveis e equipamentos"
             },
             {
@@ -48,19 +80,17 @@ def buscar_licitacoes():
                 "status": "Aberta",
                 "portal": "SIGA-RJ",
                 "url": "https://siga.rj.gov.br/licitacao/002-2025",
-                "palavras_encontradas": ["remoção"],
                 "descricao": "Serviços de remoção e transporte de equipamentos hospitalares"
             }
         ]
         
-        licitacoes_criadas = []
-        for licitacao_data in licitacoes_simuladas:
-            licitacao_id = Licitacao.create(licitacao_data)
-            licitacoes_criadas.append(licitacao_id)
+        resultado = Licitacao.salvar_lote(automato.classificar(licitacoes_simuladas))
+        MonitoramentoLicitacao.registrar_busca()
         
         return jsonify({
-            "message": f"{len(licitacoes_criadas)} licitações encontradas",
-            "licitacoes_ids": licitacoes_criadas,
+            "message": f"{len(resultado['ids'])} licitações encontradas",
+            "licitacoes_ids": [str(licitacao_id) for licitacao_id in resultado["ids"]],
+            "novas": resultado["criadas"],
             "palavras_chave_usadas": palavras_chave
         }), 201
         
@@ -73,53 +103,86 @@ def configurar_monitoramento():
     """Configurar monitoramento automático"""
     try:
         data = request.get_json()
-        palavras_chave = data.get("palavras_chave", [])
-        portais = data.get("portais", [])
-        email_alertas = data.get("email_alertas", True)
         
-        # Simular configuração de monitoramento
-        config_monitoramento = {
-            "palavras_chave": palavras_chave,
-            "portais": portais,
-            "email_alertas": email_alertas,
-            "ativo": True,
-            "ultima_busca": datetime.utcnow().isoformat(),
-            "configurado_em": datetime.utcnow().isoformat()
-        }
+        config_monitoramento = MonitoramentoLicitacao.salvar(data, usuario_id=get_jwt_identity())
+        monitor_palavras.invalidar()
+        
+        # Reaplicar as novas palavras às licitações ainda abertas
+        alteradas = reclassificar(monitor_palavras.get(), {"status": "Aberta"})
         
         return jsonify({
             "message": "Monitoramento configurado com sucesso",
-            "configuracao": config_monitoramento
+            "configuracao": config_monitoramento.to_dict(),
+            "licitacoes_reclassificadas": alteradas
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@licitacoes_bp.route("/monitorar", methods=["GET"])
+@jwt_required()
+def get_monitoramento():
+    """Obter configuração de monitoramento"""
+    try:
+        return jsonify({"configuracao": MonitoramentoLicitacao.get().to_dict()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@licitacoes_bp.route("/crawler", methods=["GET"])
+@jwt_required()
+def get_estado_crawler():
+    """Última varredura de cada portal (marca d'água e resumo)"""
+    try:
+        db = get_db()
+        portais = []
+        for estado in db.licitacoes_crawler.find({}, {"paginas": 0}):
+            portais.append({
+                "portal": estado["_id"],
+                "marca": estado["marca"].isoformat() if estado.get("marca") else None,
+                "ultima_execucao": estado["ultima_execucao"].isoformat() if estado.get("ultima_execucao") else None,
+                "ultimo_resumo": estado.get("ultimo_resumo")
+            })
+        return jsonify({"portais": portais}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @licitacoes_bp.route("/estatisticas", methods=["GET"])
 @jwt_required()
 def get_estatisticas():
     """Obter estatísticas das licitações"""
     try:
-        todas_licitacoes = Licitacao.get_all()
-        
-        # Calcular estatísticas
-        total = len(todas_licitacoes)
-        abertas = len([l for l in todas_licitacoes if l.get("status") == "Aberta"])
-        urgentes = len([l for l in todas_licitacoes if l.get("data_limite") and 
-                       (datetime.fromisoformat(l["data_limite"]) - datetime.utcnow()).days <= 7])
-        
-        valor_total = sum([l.get("valor_estimado", 0) for l in todas_licitacoes])
+        dias_urgencia = int(request.args.get("dias_urgencia", 7))
         
         return jsonify({
-            "estatisticas": {
-                "total": total,
-                "abertas": abertas,
-                "urgentes": urgentes,
-                "valor_total": valor_total
-            }
+            "estatisticas": Licitacao.estatisticas(dias_urgencia=dias_urgencia)
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@licitacoes_bp.route("/<licitacao_id>", methods=["GET"])
+@jwt_required()
+def get_licitacao(licitacao_id):
+    """Obter licitação por ID"""
+    try:
+        licitacao = Licitacao.find_by_id(licitacao_id)
+        if not licitacao:
+            return jsonify({"error": "Licitação não encontrada"}), 404
+        
+        return jsonify({"licitacao": licitacao.to_dict()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
+@licitacoes_bp.route("/<licitacao_id>", methods=["PUT"])
+@jwt_required()
+def update_licitacao(licitacao_id):
+    """Atualizar licitação (ex.: status)"""
+    try:
+        data = request.get_json()
+        
+        if not Licitacao.update(licitacao_id, data):
+            return jsonify({"error": "Licitação não encontrada"}), 404
+        
+        return jsonify({"message": "Licitação atualizada com sucesso"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,77 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.consultas_lentas import COLECAO
+from src.database import get_db
+from src.models.user import User
+
+monitoramento_bp = Blueprint('monitoramento', __name__)
+
+def _admin():
+    current_user = User.find_by_id(get_jwt_identity())
+    return current_user and current_user.role == 'admin'
+
+@monitoramento_bp.route('/consultas-lentas', methods=['GET'])
+@jwt_required()
+def get_consultas_lentas():
+    """Consultas lentas mais recentes (filtros: colecao, rota, plano=collscan|sort_em_memoria)"""
+    try:
+        if not _admin():
+            return jsonify({"error": "Acesso negado"}), 403
+
+        db = get_db()
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        query = {}
+        if request.args.get('colecao'):
+            query["colecao"] = request.args['colecao']
+        if request.args.get('rota'):
+            query["origem.rota"] = request.args['rota']
+        if request.args.get('plano') in ('collscan', 'sort_em_memoria'):
+            query[f"plano.{request.args['plano']}"] = True
+
+        consultas = []
+        for item in db[COLECAO].find(query).sort("$natural", -1).limit(limit):
+            item["id"] = str(item.pop("_id"))
+            item["data"] = item["data"].isoformat()
+            consultas.append(item)
+        return jsonify({"consultas": consultas}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@monitoramento_bp.route('/consultas-lentas/resumo', methods=['GET'])
+@jwt_required()
+def get_resumo_consultas_lentas():
+    """Consultas lentas agrupadas pela forma (sem valores), piores primeiro"""
+    try:
+        if not _admin():
+            return jsonify({"error": "Acesso negado"}), 403
+
+        db = get_db()
+        grupos = db[COLECAO].aggregate([
+            {"$sort": {"$natural": -1}},
+            {"$group": {
+                "_id": "$forma",
+                "colecao": {"$first": "$colecao"},
+                "comando": {"$first": "$comando"},
+                "consulta": {"$first": "$consulta"},
+                "rotas": {"$addToSet": "$origem.rota"},
+                "ocorrencias": {"$sum": 1},
+                "duracao_media_ms": {"$avg": "$duracao_ms"},
+                "duracao_max_ms": {"$max": "$duracao_ms"},
+                "plano": {"$max": "$plano"},
+                "ultima": {"$max": "$data"}
+            }},
+            {"$sort": {"ocorrencias": -1, "duracao_max_ms": -1}},
+            {"$limit": min(int(request.args.get('limit', 50)), 500)}
+        ])
+
+        resumo = []
+        for grupo in grupos:
+            grupo["forma"] = grupo.pop("_id")
+            grupo["duracao_media_ms"] = round(grupo["duracao_media_ms"], 1)
+            grupo["ultima"] = grupo["ultima"].isoformat()
+            resumo.append(grupo)
+        return jsonify({"resumo": resumo}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
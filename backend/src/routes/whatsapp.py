@@ -4,6 +4,10 @@ import requests
 import json
 from datetime import datetime
 from src.config import Config
+from src.models.mensagem import Mensagem
+from src.models.webhook_inbox import WebhookInbox
+from src.models.whatsapp_template import WhatsAppTemplate, template_registry
+from src.services.contatos import telefone_e164
 
 whatsapp_bp = Blueprint('whatsapp', __name__)
 
@@ -22,8 +26,8 @@ def enviar_mensagem():
         mensagem = data.get('mensagem', '')
         tipo = data.get('tipo', 'texto')  # texto, imagem, documento
         
-        # Limpar telefone (remover caracteres especiais)
-        telefone_limpo = ''.join(filter(str.isdigit, telefone))
+        # Telefone com DDI, só dígitos (E.164 sem o "+")
+        telefone_limpo = (telefone_e164(telefone) or '').lstrip('+')
         
         if not telefone_limpo or not mensagem:
             return jsonify({"error": "Telefone e mensagem são obrigatórios"}), 400
@@ -43,10 +47,14 @@ def enviar_mensagem():
         # Simular envio (em produção, fazer requisição real)
         if not AUTHENTIC_TOKEN:
             # Modo simulação
+            message_id = Mensagem.gerar_mensagem_id()
+            Mensagem.registrar_envios([{"mensagem_id": message_id, "telefone": telefone_limpo, "status": "entregue"}])
+            
             return jsonify({
                 "success": True,
                 "message": "Mensagem enviada (simulação)",
                 "telefone": telefone_limpo,
+                "message_id": message_id,
                 "status": "delivered",
                 "timestamp": datetime.now().isoformat()
             }), 200
@@ -59,10 +67,12 @@ def enviar_mensagem():
             # Simulação de resposta
             result = {
                 "success": True,
-                "message_id": f"msg_{datetime.now().timestamp()}",
+                "message_id": Mensagem.gerar_mensagem_id(),
                 "status": "sent"
             }
             
+            Mensagem.registrar_envios([{"mensagem_id": result["message_id"], "telefone": telefone_limpo, "status": "enviado"}])
+            
             return jsonify({
                 "success": True,
                 "message": "Mensagem enviada com sucesso",
@@ -92,79 +102,34 @@ def enviar_template():
         template_tipo = data.get('template', 'boas_vindas')
         variaveis = data.get('variaveis', {})
         
-        # Templates predefinidos
-        templates = {
-            'boas_vindas': """
-Olá {nome}! 👋
-
-Bem-vindo à VIP Mudanças! 
-
-Recebemos seu contato e nossa equipe entrará em contato em breve para agendar uma visita técnica gratuita.
-
-📞 Contato: (11) 99999-9999
-🌐 Site: vipmudancas.com.br
-
-Obrigado pela confiança! 🚚
-            """,
-            'agendamento_visita': """
-Olá {nome}! 📅
-
-Sua visita técnica foi agendada:
-
-📍 Endereço: {endereco}
-🕐 Data/Hora: {data_hora}
-👨‍💼 Consultor: {consultor}
-
-Estaremos no local no horário combinado.
-
-Dúvidas? Entre em contato: (11) 99999-9999
-            """,
-            'orcamento_pronto': """
-Olá {nome}! 💰
-
-Seu orçamento está pronto!
-
-💵 Valor: R$ {valor}
-📋 Serviços: {servicos}
-⏰ Validade: {validade}
-
-Para confirmar, responda este WhatsApp ou ligue:
-📞 (11) 99999-9999
-
-Aguardamos seu retorno! 🚚
-            """,
-            'lembrete_pagamento': """
-Olá {nome}! 💳
-
-Lembramos que o vencimento do seu pagamento é amanhã:
-
-💰 Valor: R$ {valor}
-📅 Vencimento: {vencimento}
-🏦 Forma: {forma_pagamento}
-
-Para evitar atrasos, efetue o pagamento hoje.
-
-Dúvidas? (11) 99999-9999
-            """
-        }
-        
-        # Obter template
-        template = templates.get(template_tipo, templates['boas_vindas'])
+        # Obter template compilado (cache por worker)
+        template = template_registry.get(template_tipo)
+        if not template:
+            return jsonify({"error": f"Template não encontrado: {template_tipo}"}), 404
         
         # Substituir variáveis
         try:
-            mensagem = template.format(**variaveis)
-        except KeyError as e:
-            return jsonify({"error": f"Variável obrigatória não fornecida: {e}"}), 400
+            mensagem = template.render(variaveis)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Enviar mensagem
-        telefone_limpo = ''.join(filter(str.isdigit, telefone))
+        telefone_limpo = (telefone_e164(telefone) or '').lstrip('+')
         
         # Simular envio
+        message_id = Mensagem.gerar_mensagem_id()
+        Mensagem.registrar_envios([{
+            "mensagem_id": message_id,
+            "telefone": telefone_limpo,
+            "template": template_tipo,
+            "status": "enviado"
+        }])
+        
         return jsonify({
             "success": True,
             "message": "Template enviado com sucesso",
             "telefone": telefone_limpo,
+            "message_id": message_id,
             "template": template_tipo,
             "preview": mensagem[:100] + "...",
             "timestamp": datetime.now().isoformat()
@@ -175,40 +140,25 @@ Dúvidas? (11) 99999-9999
 
 @whatsapp_bp.route('/webhook', methods=['POST'])
 def webhook_whatsapp():
-    """Webhook para receber mensagens do WhatsApp"""
+    """Webhook para receber mensagens do WhatsApp (apenas registra; workers processam)"""
     try:
-        data = request.get_json()
-        
-        # Processar mensagem recebida
-        telefone = data.get('from', '')
-        mensagem = data.get('message', '')
-        timestamp = data.get('timestamp', datetime.now().isoformat())
+        data = request.get_json(silent=True)
         
-        # Log da mensagem recebida
-        print(f"Mensagem recebida de {telefone}: {mensagem}")
+        if not isinstance(data, dict):
+            return jsonify({"error": "Payload inválido"}), 400
         
-        # Aqui você pode implementar lógica de resposta automática
-        # Por exemplo, responder com menu de opções
+        mensagem_id = data.get('message_id') or data.get('id') or WebhookInbox.gerar_mensagem_id(data)
         
-        resposta_automatica = """
-Olá! Obrigado por entrar em contato com a VIP Mudanças! 🚚
-
-Escolha uma opção:
-1️⃣ Solicitar orçamento
-2️⃣ Agendar visita
-3️⃣ Falar com consultor
-4️⃣ Acompanhar mudança
-
-Digite o número da opção desejada.
-        """
+        # Recibos de status reutilizam o id da mensagem: a chave inclui o status
+        if data.get('type') == 'status':
+            mensagem_id = f"status:{mensagem_id}:{data.get('status', '')}"
         
-        # Em produção, enviar resposta automática
-        # enviar_mensagem_automatica(telefone, resposta_automatica)
+        novo = WebhookInbox.registrar("whatsapp", str(mensagem_id), data)
         
         return jsonify({
             "success": True,
-            "message": "Webhook processado",
-            "action": "auto_response_sent"
+            "message": "Webhook recebido",
+            "duplicado": not novo
         }), 200
         
     except Exception as e:
@@ -219,17 +169,37 @@ Digite o número da opção desejada.
 def status_mensagem(message_id):
     """Verificar status de uma mensagem enviada"""
     try:
-        # Em produção, consultar API Authentic
-        # Simulação de status
-        status_simulado = {
-            "message_id": message_id,
-            "status": "delivered",
-            "timestamp": datetime.now().isoformat(),
-            "read": True,
-            "delivered_at": datetime.now().isoformat()
-        }
+        mensagem = Mensagem.find_by_mensagem_id(message_id)
+        
+        if not mensagem:
+            return jsonify({"error": "Mensagem não encontrada"}), 404
+        
+        return jsonify(mensagem.to_dict()), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@whatsapp_bp.route('/status-mensagens', methods=['POST'])
+@jwt_required()
+def status_mensagens():
+    """Verificar status de várias mensagens em uma única consulta"""
+    try:
+        data = request.get_json()
+        message_ids = data.get('message_ids', [])
+        
+        if not message_ids:
+            return jsonify({"error": "Lista message_ids é obrigatória"}), 400
+        
+        if len(message_ids) > 1000:
+            return jsonify({"error": "Máximo de 1000 mensagens por consulta"}), 400
         
-        return jsonify(status_simulado), 200
+        mensagens = Mensagem.find_many(message_ids)
+        encontradas = {mensagem.mensagem_id: mensagem.to_dict() for mensagem in mensagens}
+        
+        return jsonify({
+            "mensagens": encontradas,
+            "nao_encontradas": [message_id for message_id in message_ids if message_id not in encontradas]
+        }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -250,22 +220,52 @@ def criar_campanha():
         if not contatos:
             return jsonify({"error": "Lista de contatos é obrigatória"}), 400
         
+        template_compilado = template_registry.get(template)
+        if not template_compilado:
+            return jsonify({"error": f"Template não encontrado: {template}"}), 404
+        
+        # Renderizar todas as mensagens antes de enfileirar (falha rápida)
+        mensagens, erros = template_compilado.render_lote(
+            [contato.get('variaveis', {}) for contato in contatos],
+            variaveis_globais
+        )
+        if erros:
+            return jsonify({
+                "error": "Variáveis obrigatórias não fornecidas",
+                "contatos_invalidos": [
+                    {"telefone": contatos[erro["indice"]].get('telefone', ''), "faltantes": erro["faltantes"]}
+                    for erro in erros
+                ]
+            }), 400
+        
         # Simular criação de campanha
         campanha_id = f"camp_{datetime.now().timestamp()}"
         
         # Em produção, processar envios em background
         resultados = []
-        for contato in contatos:
+        envios = []
+        for contato, mensagem in zip(contatos, mensagens):
             telefone = contato.get('telefone', '')
-            variaveis_personalizadas = {**variaveis_globais, **contato.get('variaveis', {})}
+            message_id = Mensagem.gerar_mensagem_id()
             
             # Simular envio
             resultado = {
                 "telefone": telefone,
+                "message_id": message_id,
                 "status": "agendado" if agendamento else "enviado",
+                "preview": mensagem[:100] + "...",
                 "timestamp": datetime.now().isoformat()
             }
             resultados.append(resultado)
+            envios.append({
+                "mensagem_id": message_id,
+                "telefone": (telefone_e164(telefone) or '').lstrip('+'),
+                "campanha_id": campanha_id,
+                "template": template,
+                "status": "pendente" if agendamento else "enviado"
+            })
+        
+        Mensagem.registrar_envios(envios)
         
         return jsonify({
             "success": True,
@@ -279,6 +279,66 @@ def criar_campanha():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@whatsapp_bp.route('/campanhas/<campanha_id>/status', methods=['GET'])
+@jwt_required()
+def status_campanha(campanha_id):
+    """Resumo do estado de entrega das mensagens de uma campanha"""
+    try:
+        resumo = Mensagem.resumo_campanha(campanha_id)
+        
+        return jsonify({
+            "campanha_id": campanha_id,
+            "total": sum(resumo.values()),
+            "por_status": resumo
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@whatsapp_bp.route('/templates', methods=['GET'])
+@jwt_required()
+def listar_templates():
+    """Listar templates de mensagem cadastrados"""
+    try:
+        # Garante que os templates padrão estejam semeados
+        template_registry.get('boas_vindas')
+        templates = WhatsAppTemplate.get_all_templates()
+        
+        return jsonify({"templates": [template.to_dict() for template in templates]}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@whatsapp_bp.route('/templates/<nome>', methods=['PUT'])
+@jwt_required()
+def salvar_template(nome):
+    """Criar ou atualizar template de mensagem"""
+    try:
+        data = request.get_json()
+        
+        texto = data.get('texto', '')
+        variaveis = data.get('variaveis', [])
+        
+        if not texto:
+            return jsonify({"error": "Texto do template é obrigatório"}), 400
+        
+        try:
+            template = WhatsAppTemplate.salvar(nome, texto, variaveis)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Recarregar imediatamente neste worker; os demais recarregam pelo intervalo
+        template_registry.invalidar()
+        
+        return jsonify({
+            "success": True,
+            "message": "Template salvo com sucesso",
+            "template": template.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @whatsapp_bp.route('/bot-config', methods=['GET', 'POST'])
 @jwt_required()
 def bot_config():
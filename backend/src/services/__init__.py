@@ -0,0 +1 @@
+# Serviços da aplicação (regras de negócio e processamento em segundo plano)
@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+import threading
+import time
+from src.config import Config
+from src.database import get_db
+
+# Cor exibida no calendário para cada tipo de evento
+CORES_EVENTO = {
+    "visita": "blue",
+    "mudanca": "green",
+    "ordem_servico": "orange",
+    "evento": "purple"
+}
+
+# Limite de itens por fonte em uma janela (proteção contra janelas enormes)
+LIMITE_POR_FONTE = 2000
+
+def data_utc(valor):
+    """Data ISO (com ou sem fuso) ou datetime como datetime UTC sem fuso, o formato gravado no banco
+
+    Com fuso, o horário é convertido para UTC (não apenas descartado). Vazio -> None.
+    """
+    if not valor:
+        return None
+    data = valor if isinstance(valor, datetime) else datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+    if data.tzinfo:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+def _formatar_data(valor):
+    return valor.strftime("%Y-%m-%d") if isinstance(valor, datetime) else valor
+
+def _formatar_hora(valor):
+    if isinstance(valor, datetime) and (valor.hour or valor.minute):
+        return valor.strftime("%H:%M")
+    return None
+
+def _evento(id_evento, titulo, tipo, inicio, origem, **extras):
+    return {
+        "id": id_evento,
+        "titulo": titulo,
+        "data": _formatar_data(inicio),
+        "hora": _formatar_hora(inicio),
+        "inicio": inicio.isoformat() if isinstance(inicio, datetime) else inicio,
+        "tipo": tipo,
+        "cor": CORES_EVENTO.get(tipo, "gray"),
+        "origem": origem,
+        **extras
+    }
+
+def _visitas_e_mudancas(db, inicio, fim, vendedor_id):
+    """Visitas e mudanças de orçamentos (uma consulta por campo de data, ambas indexadas)"""
+    eventos = []
+    projecao = {"cliente_nome": 1, "data_visita": 1, "data_mudanca": 1, "vendedor_nome": 1, "status": 1}
+
+    for campo, tipo, prefixo in (("data_visita", "visita", "Visita"), ("data_mudanca", "mudanca", "Mudança")):
+        query = {campo: {"$gte": inicio, "$lt": fim}, "status": {"$ne": "rejeitado"}}
+        if vendedor_id:
+            query["vendedor_id"] = vendedor_id
+
+        for orcamento in db.orcamentos.find(query, projecao).sort(campo, 1).limit(LIMITE_POR_FONTE):
+            eventos.append(_evento(
+                f"{tipo}:{orcamento['_id']}",
+                f"{prefixo} - {orcamento.get('cliente_nome', 'Cliente')}",
+                tipo,
+                orcamento[campo],
+                "orcamento",
+                orcamento_id=str(orcamento["_id"]),
+                vendedor_nome=orcamento.get("vendedor_nome"),
+                status=orcamento.get("status")
+            ))
+    return eventos
+
+def _ordens_servico(db, inicio, fim, vendedor_id, equipe_id):
+    """Ordens de serviço agendadas na janela (por data_servico)"""
+    query = {"data_servico": {"$gte": inicio, "$lt": fim}, "status": {"$ne": "cancelada"}}
+    if vendedor_id:
+        query["vendedor_id"] = vendedor_id
+    if equipe_id:
+        query["equipe_id"] = equipe_id
+
+    projecao = {"numero_os": 1, "cliente_nome": 1, "data_servico": 1, "equipe_id": 1, "status": 1}
+    eventos = []
+    for ordem in db.ordens_servico.find(query, projecao).sort("data_servico", 1).limit(LIMITE_POR_FONTE):
+        eventos.append(_evento(
+            f"os:{ordem['_id']}",
+            f"OS {ordem.get('numero_os', '')} - {ordem.get('cliente_nome', 'Cliente')}",
+            "ordem_servico",
+            ordem["data_servico"],
+            "ordem_servico",
+            ordem_servico_id=str(ordem["_id"]),
+            equipe_id=ordem.get("equipe_id"),
+            status=ordem.get("status")
+        ))
+    return eventos
+
+def _eventos_google(db, inicio, fim):
+    """Eventos do Google Agenda já sincronizados localmente"""
+    query = {"inicio": {"$lt": fim}, "fim": {"$gt": inicio}}
+    projecao = {"google_id": 1, "titulo": 1, "tipo": 1, "inicio": 1, "hora": 1, "data": 1, "endereco": 1}
+    eventos = []
+    for evento in db.eventos.find(query, projecao).sort("inicio", 1).limit(LIMITE_POR_FONTE):
+        item = _evento(
+            f"google:{evento['google_id']}",
+            evento.get("titulo", ""),
+            evento.get("tipo", "evento"),
+            evento["inicio"],
+            "google",
+            endereco=evento.get("endereco")
+        )
+        # Data/hora locais calculadas na sincronização
+        item["data"] = evento.get("data") or item["data"]
+        item["hora"] = evento.get("hora")
+        eventos.append(item)
+    return eventos
+
+def consultar_eventos(inicio, fim, vendedor_id=None, equipe_id=None):
+    """Eventos de todas as fontes no intervalo [inicio, fim), ordenados por início
+
+    O filtro de vendedor vale para orçamentos e ordens de serviço; o de
+    equipe apenas para ordens de serviço (visitas e eventos do Google não
+    têm equipe e são omitidos quando ele é usado).
+    """
+    db = get_db()
+    eventos = []
+    if not equipe_id:
+        eventos.extend(_visitas_e_mudancas(db, inicio, fim, vendedor_id))
+    eventos.extend(_ordens_servico(db, inicio, fim, vendedor_id, equipe_id))
+    if not vendedor_id and not equipe_id:
+        eventos.extend(_eventos_google(db, inicio, fim))
+
+    eventos.sort(key=lambda evento: evento["inicio"] or "")
+    return eventos
+
+class CacheCalendario:
+    """Cache em memória das janelas consultadas (ex.: visão mensal), com expiração"""
+
+    def __init__(self, ttl_segundos, max_itens=256):
+        self._ttl = ttl_segundos
+        self._max_itens = max_itens
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item and item[0] > time.monotonic():
+                return item[1]
+            self._itens.pop(chave, None)
+            return None
+
+    def salvar(self, chave, valor):
+        with self._lock:
+            if len(self._itens) >= self._max_itens:
+                # Descartar a entrada que expira primeiro
+                self._itens.pop(min(self._itens, key=lambda k: self._itens[k][0]))
+            self._itens[chave] = (time.monotonic() + self._ttl, valor)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+cache_calendario = CacheCalendario(Config.CALENDARIO_CACHE_SECONDS)
+
+VERSAO_ID = "calendario"
+
+def versao_calendario():
+    """Versão atual dos dados do calendário (faz parte da chave do cache)"""
+    db = get_db()
+    data = db.versoes_cache.find_one({"_id": VERSAO_ID}, {"versao": 1})
+    return data.get("versao", 0) if data else 0
+
+def invalidar_calendario():
+    """Registrar alteração em orçamentos/eventos: o cache de todos os processos deixa de valer"""
+    db = get_db()
+    db.versoes_cache.update_one({"_id": VERSAO_ID}, {"$inc": {"versao": 1}}, upsert=True)
+    cache_calendario.limpar()
@@ -0,0 +1,123 @@
+import re
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from src.config import Config
+from src.database import get_db
+
+def telefone_e164(valor, ddi_padrao=None):
+    """Telefone no formato E.164 (+5511987654321) ou None se não parecer um número válido
+
+    Sem DDI assume-se o padrão (Brasil); o zero de tronco é descartado e
+    celulares brasileiros antigos de 8 dígitos ganham o nono dígito.
+    """
+    if not valor:
+        return None
+    ddi_padrao = ddi_padrao or Config.TELEFONE_DDI_PADRAO
+
+    texto = str(valor).strip()
+    digitos = re.sub(r"\D", "", texto)
+    if texto.startswith("+"):
+        internacional = True
+    elif digitos.startswith("00"):
+        digitos, internacional = digitos[2:], True
+    else:
+        internacional = False
+
+    if not internacional:
+        digitos = digitos.lstrip("0")
+        # DDI já presente (ex.: 5511987654321 vindo do WhatsApp)
+        if ddi_padrao == "55" and len(digitos) in (12, 13) and digitos.startswith("55"):
+            digitos = digitos[2:]
+        digitos = ddi_padrao + digitos
+
+    if digitos.startswith("55"):
+        nacional = digitos[2:]
+        if len(nacional) == 10 and nacional[2] in "6789":
+            nacional = nacional[:2] + "9" + nacional[2:]
+        if len(nacional) not in (10, 11) or nacional[0] == "0":
+            return None
+        return "+55" + nacional
+
+    return "+" + digitos if 8 <= len(digitos) <= 15 else None
+
+def documento_digitos(valor):
+    """CPF/CNPJ apenas com dígitos (None se não tiver 11 ou 14 dígitos)"""
+    digitos = re.sub(r"\D", "", str(valor or ""))
+    return digitos if len(digitos) in (11, 14) else None
+
+# Coleção -> (campo de telefone, campo de documento) normalizados na escrita
+CAMPOS_CONTATO = {
+    "clientes": ("telefone", "cpf_cnpj"),
+    "leads": ("telefone", None),
+    "orcamentos": ("cliente_telefone", None)
+}
+
+def campos_normalizados(colecao, data):
+    """Campos canônicos a gravar junto com os dados informados (apenas dos campos presentes)"""
+    campo_telefone, campo_documento = CAMPOS_CONTATO[colecao]
+    normalizados = {}
+    if campo_telefone in data:
+        normalizados[f"{campo_telefone}_e164"] = telefone_e164(data.get(campo_telefone))
+    if campo_documento and campo_documento in data:
+        normalizados[f"{campo_documento}_digitos"] = documento_digitos(data.get(campo_documento))
+    return normalizados
+
+def resolver(telefone=None, documento=None, limit=20):
+    """Registros (clientes, leads, orçamentos) de um telefone e/ou CPF/CNPJ, por consultas indexadas"""
+    db = get_db()
+    e164 = telefone_e164(telefone)
+    digitos = documento_digitos(documento)
+
+    resultado = {"telefone": e164, "documento": digitos, "clientes": [], "leads": [], "orcamentos": []}
+    for colecao, (campo_telefone, campo_documento) in CAMPOS_CONTATO.items():
+        condicoes = []
+        if e164:
+            condicoes.append({f"{campo_telefone}_e164": e164})
+        if digitos and campo_documento:
+            condicoes.append({f"{campo_documento}_digitos": digitos})
+        if not condicoes:
+            continue
+        query = condicoes[0] if len(condicoes) == 1 else {"$or": condicoes}
+        resultado[colecao] = [
+            registro["_id"] for registro in db[colecao].find(query, {"_id": 1}).sort("_id", -1).limit(limit)
+        ]
+    return resultado
+
+def normalizar_existentes(limit=1000):
+    """Preencher os campos canônicos de registros gravados antes da normalização
+
+    Um CPF/CNPJ que já pertence a outro cliente (duplicado antigo com outra
+    formatação) fica sem documento canônico, para não travar a migração.
+    """
+    db = get_db()
+    total = 0
+    for colecao, (campo_telefone, campo_documento) in CAMPOS_CONTATO.items():
+        projecao = {campo_telefone: 1}
+        if campo_documento:
+            projecao[campo_documento] = 1
+
+        pendentes = []
+        operacoes = []
+        for registro in db[colecao].find({f"{campo_telefone}_e164": {"$exists": False}}, projecao).limit(limit):
+            normalizados = {f"{campo_telefone}_e164": telefone_e164(registro.get(campo_telefone))}
+            if campo_documento:
+                normalizados[f"{campo_documento}_digitos"] = documento_digitos(registro.get(campo_documento))
+            pendentes.append((registro["_id"], normalizados))
+            operacoes.append(UpdateOne({"_id": registro["_id"]}, {"$set": normalizados}))
+
+        if not operacoes:
+            continue
+        try:
+            db[colecao].bulk_write(operacoes, ordered=False)
+        except BulkWriteError as e:
+            erros = e.details.get("writeErrors", [])
+            if any(erro.get("code") != 11000 for erro in erros):
+                raise
+            for erro in erros:
+                registro_id, normalizados = pendentes[erro["index"]]
+                db[colecao].update_one(
+                    {"_id": registro_id},
+                    {"$set": {**normalizados, f"{campo_documento}_digitos": None}}
+                )
+        total += len(operacoes)
+    return total
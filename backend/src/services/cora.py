@@ -0,0 +1,61 @@
+import requests
+from src.config import Config
+from src.metricas import instrumentar_sessao
+from src.services.contatos import documento_digitos
+
+# Sessão compartilhada entre as threads de emissão (pool de conexões HTTP)
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+instrumentar_sessao(_session, "cora")
+
+def _headers(chave_idempotencia):
+    headers = {
+        "Content-Type": "application/json",
+        # A Cora devolve o mesmo boleto para a mesma chave (reenvio seguro)
+        "Idempotency-Key": chave_idempotencia
+    }
+    if Config.CORA_API_TOKEN:
+        headers["Authorization"] = f"Bearer {Config.CORA_API_TOKEN}"
+    return headers
+
+def emitir_boleto(boleto, cliente):
+    """Emitir um boleto na Cora; retorna os dados do boleto emitido"""
+    cliente = cliente or {}
+    documento = cliente.get('cpf_cnpj_digitos') or documento_digitos(cliente.get('cpf_cnpj')) or ''
+    payload = {
+        "code": boleto["chave_periodo"],
+        "customer": {
+            "name": cliente.get('nome', ''),
+            "email": cliente.get('email'),
+            "document": {
+                "identity": documento,
+                "type": "CNPJ" if len(documento) > 11 else "CPF"
+            }
+        },
+        "services": [{
+            "name": f"Aluguel box {boleto.get('box_numero', '')} - {boleto['competencia']}",
+            "description": "Pagamento referente ao aluguel de box VIP Storage",
+            "amount": int(round(boleto["valor"] * 100))
+        }],
+        "payment_terms": {
+            "due_date": boleto["vencimento"].strftime("%Y-%m-%d")
+        }
+    }
+
+    response = _session.post(
+        f"{Config.CORA_API_URL}/v2/invoices",
+        json=payload,
+        headers=_headers(boleto["chave_periodo"]),
+        timeout=30
+    )
+    response.raise_for_status()
+    resultado = response.json()
+
+    boleto_bancario = (resultado.get("payment_options") or {}).get("bank_slip") or {}
+    return {
+        "cora_id": resultado.get("id"),
+        "linha_digitavel": boleto_bancario.get("digitable"),
+        "codigo_barras": boleto_bancario.get("barcode"),
+        "url_pdf": boleto_bancario.get("url")
+    }
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+from dateutil import parser as date_parser
+from src.config import Config
+from src.metricas import instrumentar_sessao
+from src.database import get_db
+from src.models.licitacao import Licitacao
+from src.models.monitoramento_licitacao import MonitoramentoLicitacao
+from src.services.palavras_chave import monitor_palavras
+
+# Pedido de varredura feito pela API, atendido pelo worker (em tarefas_agendadas)
+SOLICITACAO_ID = "licitacoes_varredura_solicitada"
+
+# Sessão compartilhada entre as threads do crawler (pool de conexões HTTP)
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=16))
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=16))
+_session.headers["User-Agent"] = "VIPMudancas-Monitor/1.0"
+instrumentar_sessao(_session, "portais_licitacao")
+
+class _LimitePortal:
+    """Intervalo mínimo entre requisições ao mesmo portal (compartilhado entre threads)"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._proximo = 0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+_limites = {}
+_limites_lock = threading.Lock()
+
+def _limite(portal):
+    intervalo = portal.get("intervalo_ms", Config.LICITACOES_CRAWLER_INTERVALO_MS) / 1000
+    with _limites_lock:
+        limite = _limites.get(portal["nome"])
+        if limite is None:
+            limite = _limites[portal["nome"]] = _LimitePortal(intervalo)
+        limite.intervalo = intervalo
+        return limite
+
+def _hash(valor):
+    if not isinstance(valor, bytes):
+        valor = json.dumps(valor, sort_keys=True, default=str).encode()
+    return hashlib.sha256(valor).hexdigest()
+
+def _converter_data(valor):
+    """Data ISO do portal -> datetime UTC sem fuso (None se vazia)"""
+    if not valor:
+        return None
+    data = date_parser.isoparse(valor)
+    return data.astimezone(timezone.utc).replace(tzinfo=None) if data.tzinfo else data
+
+def converter_licitacao(portal, item):
+    """Licitação no formato do portal (JSON de listagem) -> campos do modelo"""
+    return {
+        "portal": portal["nome"],
+        "numero": str(item.get("numero") or "") or None,
+        "titulo": item.get("titulo") or item.get("objeto"),
+        "orgao": item.get("orgao"),
+        "valor_estimado": item.get("valor_estimado"),
+        "data_abertura": _converter_data(item.get("data_abertura")),
+        "data_limite": _converter_data(item.get("data_limite")),
+        "status": item.get("status") or "Aberta",
+        "url": item.get("url"),
+        "descricao": item.get("descricao")
+    }
+
+def _buscar_pagina(portal, pagina, estado_pagina):
+    """GET condicional de uma página da listagem; retorna (resposta, corpo) ou (resposta, None) se não mudou"""
+    headers = {}
+    if estado_pagina.get("etag"):
+        headers["If-None-Match"] = estado_pagina["etag"]
+    if estado_pagina.get("last_modified"):
+        headers["If-Modified-Since"] = estado_pagina["last_modified"]
+
+    _limite(portal).aguardar()
+    resposta = _session.get(portal["url"], params={"pagina": pagina}, headers=headers, timeout=30)
+    if resposta.status_code == 304:
+        return resposta, None
+    resposta.raise_for_status()
+    return resposta, resposta.content
+
+def rastrear_portal(portal, automato=None):
+    """Percorrer a listagem do portal até o que já foi visto e gravar só licitações novas ou alteradas
+
+    A listagem vem ordenada pela última atualização (mais recentes primeiro).
+    A marca d'água é a maior atualização já processada: a varredura para na
+    primeira página sem mudanças (304 ou mesmo hash) ou que já alcança a marca.
+    """
+    db = get_db()
+    automato = automato or monitor_palavras.get()
+
+    estado = db.licitacoes_crawler.find_one({"_id": portal["nome"]}) or {}
+    paginas_estado = estado.get("paginas", {})
+    marca = estado.get("marca")
+    nova_marca = marca
+
+    resumo = {"portal": portal["nome"], "paginas": 0, "nao_modificadas": 0, "itens": 0,
+              "novas": 0, "alteradas": 0, "inalteradas": 0}
+    candidatas = {}
+    inicio = datetime.utcnow()
+
+    for pagina in range(1, portal.get("max_paginas", Config.LICITACOES_CRAWLER_MAX_PAGINAS) + 1):
+        estado_pagina = paginas_estado.get(str(pagina), {})
+        resposta, corpo = _buscar_pagina(portal, pagina, estado_pagina)
+        resumo["paginas"] += 1
+
+        hash_pagina = _hash(corpo) if corpo is not None else estado_pagina.get("hash")
+        if corpo is None or hash_pagina == estado_pagina.get("hash"):
+            resumo["nao_modificadas"] += 1
+            break
+
+        paginas_estado[str(pagina)] = {
+            "etag": resposta.headers.get("ETag"),
+            "last_modified": resposta.headers.get("Last-Modified"),
+            "hash": hash_pagina
+        }
+
+        dados = json.loads(corpo)
+        alcancou_marca = False
+        for item in dados.get("licitacoes", []):
+            atualizado_em = _converter_data(item.get("atualizado_em"))
+            # Empates com a marca são reprocessados; o hash de conteúdo descarta os já gravados
+            if marca and atualizado_em and atualizado_em < marca:
+                alcancou_marca = True
+                continue
+            if atualizado_em and (nova_marca is None or atualizado_em > nova_marca):
+                nova_marca = atualizado_em
+
+            licitacao = converter_licitacao(portal, item)
+            licitacao["hash_conteudo"] = _hash(licitacao)
+            chave = Licitacao.gerar_chave(licitacao)
+            if chave:
+                candidatas[chave] = licitacao
+            resumo["itens"] += 1
+
+        if alcancou_marca or pagina >= dados.get("total_paginas", pagina):
+            break
+
+    # Apenas as que não existem ou cujo conteúdo mudou (uma consulta pelas chaves)
+    if candidatas:
+        hashes = {
+            item["chave"]: item.get("hash_conteudo")
+            for item in db.licitacoes.find({"chave": {"$in": list(candidatas)}}, {"chave": 1, "hash_conteudo": 1})
+        }
+        gravar = []
+        for chave, licitacao in candidatas.items():
+            if chave not in hashes:
+                resumo["novas"] += 1
+            elif hashes[chave] != licitacao["hash_conteudo"]:
+                resumo["alteradas"] += 1
+            else:
+                resumo["inalteradas"] += 1
+                continue
+            gravar.append(licitacao)
+        if gravar:
+            Licitacao.salvar_lote(automato.classificar(gravar))
+
+    db.licitacoes_crawler.update_one(
+        {"_id": portal["nome"]},
+        {"$set": {
+            "paginas": paginas_estado,
+            "marca": nova_marca,
+            "ultima_execucao": inicio,
+            "ultimo_resumo": resumo
+        }},
+        upsert=True
+    )
+    return resumo
+
+def portais_configurados(portais=None):
+    """Portais do monitoramento com nome e URL (os demais não podem ser rastreados)"""
+    if portais is None:
+        portais = MonitoramentoLicitacao.get().portais
+    return [portal for portal in portais or [] if isinstance(portal, dict) and portal.get("url") and portal.get("nome")]
+
+def solicitar_varredura():
+    """Pedir ao worker uma varredura dos portais agora (antecipa a execução periódica)"""
+    db = get_db()
+    db.tarefas_agendadas.update_one(
+        {"_id": SOLICITACAO_ID},
+        {"$set": {"solicitada_em": datetime.utcnow()}},
+        upsert=True
+    )
+
+def reservar_solicitacao():
+    """Consumir o pedido pendente, se houver (apenas um worker o recebe)"""
+    db = get_db()
+    return db.tarefas_agendadas.find_one_and_delete({"_id": SOLICITACAO_ID}) is not None
+
+def rastrear_todos(portais=None):
+    """Rastrear os portais configurados em paralelo (cada portal com seu próprio limite)"""
+    portais = portais_configurados(portais)
+    if not portais:
+        return []
+
+    automato = monitor_palavras.get()
+
+    def _rastrear(portal):
+        try:
+            return rastrear_portal(portal, automato)
+        except Exception as e:
+            return {"portal": portal["nome"], "erro": str(e)}
+
+    with ThreadPoolExecutor(max_workers=Config.LICITACOES_CRAWLER_CONCORRENCIA) as pool:
+        resultados = list(pool.map(_rastrear, portais))
+
+    MonitoramentoLicitacao.registrar_busca()
+    return resultados
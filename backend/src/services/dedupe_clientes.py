@@ -0,0 +1,344 @@
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from itertools import combinations
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from src.config import Config
+from src.database import get_db
+from src.services.contatos import documento_digitos, telefone_e164
+
+# Chaves mais discriminantes primeiro: um bloco grande de nomes comuns não pode esconder
+# o cliente com o mesmo documento/telefone/email
+ORDEM_CHAVES = ("doc", "tel", "email", "nome")
+
+# Documento de controle da varredura completa (uma execução por vez entre as réplicas)
+VARREDURA_ID = "clientes_duplicatas_varredura"
+
+# Partículas ignoradas ao escolher primeiro/último nome
+PARTICULAS = {"da", "das", "de", "do", "dos", "e"}
+
+# Regras fonéticas aproximadas do português (aplicadas em ordem)
+_REGRAS_FONETICAS = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"[cs]h"), "x"),
+    (re.compile(r"lh"), "l"),
+    (re.compile(r"nh"), "n"),
+    (re.compile(r"qu|q"), "k"),
+    (re.compile(r"gu(?=[ei])"), "g"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"g(?=[eiy])"), "j"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"n(?![aeiou])"), "m"),
+]
+_VOGAIS = re.compile(r"(?<!^)[aeiou]")
+_REPETIDAS = re.compile(r"(.)\1+")
+
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", (texto or "").lower()).encode("ascii", "ignore").decode("ascii")
+
+def fonetico(palavra):
+    """Código fonético de uma palavra (Souza/Sousa, Thiago/Tiago, Kátia/Cátia -> mesmo código)"""
+    codigo = re.sub(r"[^a-z]", "", _sem_acentos(palavra))
+    for regra, troca in _REGRAS_FONETICAS:
+        codigo = regra.sub(troca, codigo)
+    return _REPETIDAS.sub(r"\1", _VOGAIS.sub("", codigo))
+
+def _partes_nome(nome):
+    return [parte for parte in re.findall(r"[a-z]+", _sem_acentos(nome)) if parte not in PARTICULAS]
+
+def _telefone(valor):
+    """Últimos 8 dígitos do telefone (chave de bloqueio: iguais mesmo sem DDD)"""
+    digitos = re.sub(r"\D", "", telefone_e164(valor) or valor or "")
+    return digitos[-8:] if len(digitos) >= 8 else None
+
+def _email(valor):
+    """Email normalizado (minúsculas, sem +sufixo) e sua parte local"""
+    email = (valor or "").strip().lower()
+    if "@" not in email:
+        return None, None
+    local, dominio = email.rsplit("@", 1)
+    local = local.split("+", 1)[0]
+    if dominio in ("gmail.com", "googlemail.com"):
+        local = local.replace(".", "")
+    return f"{local}@{dominio}", local
+
+def chaves_bloqueio(cliente):
+    """Chaves de bloqueio do cliente: só clientes que compartilham alguma chave são comparados"""
+    chaves = []
+
+    partes = _partes_nome(cliente.get("nome"))
+    if partes:
+        chaves.append(f"nome:{fonetico(partes[0])}:{fonetico(partes[-1])}")
+
+    telefone = _telefone(cliente.get("telefone"))
+    if telefone:
+        chaves.append(f"tel:{telefone}")
+
+    _, local = _email(cliente.get("email"))
+    if local:
+        chaves.append(f"email:{local}")
+
+    documento = documento_digitos(cliente.get("cpf_cnpj"))
+    if documento:
+        chaves.append(f"doc:{documento}")
+
+    return chaves
+
+def similaridade(a, b):
+    """Pontuação (0 a 1) de dois clientes serem a mesma pessoa e os campos que coincidem"""
+    motivos = []
+
+    nome_a = " ".join(_partes_nome(a.get("nome")))
+    nome_b = " ".join(_partes_nome(b.get("nome")))
+    nome = SequenceMatcher(None, nome_a, nome_b).ratio() if nome_a and nome_b else 0
+    if nome >= 0.85:
+        motivos.append("nome")
+
+    telefone_a, telefone_b = telefone_e164(a.get("telefone")), telefone_e164(b.get("telefone"))
+    if telefone_a and telefone_b:
+        telefone = 1 if telefone_a == telefone_b else 0
+    else:
+        # Sem DDD não há E.164: comparar pelos últimos dígitos
+        telefone_a, telefone_b = _telefone(a.get("telefone")), _telefone(b.get("telefone"))
+        telefone = 0.8 if telefone_a and telefone_a == telefone_b else 0
+    if telefone:
+        motivos.append("telefone")
+
+    email_a, local_a = _email(a.get("email"))
+    email_b, local_b = _email(b.get("email"))
+    email = 0
+    if email_a and email_a == email_b:
+        email = 1
+        motivos.append("email")
+    elif local_a and local_a == local_b:
+        email = 0.6
+        motivos.append("email_local")
+
+    pontuacao = 0.5 * nome + 0.25 * telefone + 0.25 * email
+
+    documento_a, documento_b = documento_digitos(a.get("cpf_cnpj")), documento_digitos(b.get("cpf_cnpj"))
+    if documento_a and documento_b:
+        if documento_a == documento_b:
+            motivos.append("cpf_cnpj")
+            pontuacao = max(pontuacao, 0.95)
+        else:
+            # Documentos diferentes: provavelmente pessoas diferentes com dados parecidos
+            pontuacao *= 0.5
+
+    return round(pontuacao, 3), motivos
+
+CAMPOS_COMPARACAO = {"nome": 1, "email": 1, "telefone": 1, "cpf_cnpj": 1, "chaves_bloqueio": 1}
+
+def _id_par(id_a, id_b):
+    menor, maior = sorted([str(id_a), str(id_b)])
+    return f"{menor}:{maior}"
+
+def _operacao_par(id_a, id_b, pontuacao, motivos, origem, agora):
+    menor, maior = sorted([str(id_a), str(id_b)])
+    return UpdateOne(
+        {"_id": _id_par(menor, maior)},
+        {
+            "$set": {"score": pontuacao, "motivos": motivos, "origem": origem, "data_atualizacao": agora},
+            "$setOnInsert": {
+                "clientes": [ObjectId(menor), ObjectId(maior)],
+                "status": "pendente",
+                "data_criacao": agora
+            }
+        },
+        upsert=True
+    )
+
+def candidatos(cliente, limiar=None, limite=None):
+    """Clientes ativos que compartilham uma chave de bloqueio, pontuados e acima do limiar"""
+    db = get_db()
+    limiar = Config.CLIENTES_DEDUPE_LIMIAR if limiar is None else limiar
+    limite = limite or Config.CLIENTES_DEDUPE_BLOCO_MAX
+
+    chaves = chaves_bloqueio(cliente)
+    if not chaves:
+        return []
+
+    # Uma consulta por chave, cada uma com o seu limite
+    chaves.sort(key=lambda chave: ORDEM_CHAVES.index(chave.split(":", 1)[0]))
+    vistos = {cliente.get("_id")}
+    resultado = []
+    for chave in chaves:
+        for outro in db.clientes.find(
+            {"chaves_bloqueio": chave, "ativo": True, "_id": {"$ne": cliente.get("_id")}},
+            CAMPOS_COMPARACAO
+        ).limit(limite):
+            if outro["_id"] in vistos:
+                continue
+            vistos.add(outro["_id"])
+            pontuacao, motivos = similaridade(cliente, outro)
+            if pontuacao >= limiar:
+                resultado.append({"cliente_id": outro["_id"], "score": pontuacao, "motivos": motivos})
+
+    resultado.sort(key=lambda item: item["score"], reverse=True)
+    return resultado
+
+def verificar_cliente(cliente_id):
+    """Atualizar as chaves do cliente e registrar seus pares suspeitos (chamado a cada cadastro/alteração)"""
+    db = get_db()
+    if isinstance(cliente_id, str):
+        cliente_id = ObjectId(cliente_id)
+
+    cliente = db.clientes.find_one({"_id": cliente_id}, {**CAMPOS_COMPARACAO, "ativo": 1})
+    if not cliente:
+        return []
+
+    chaves = chaves_bloqueio(cliente)
+    if chaves != cliente.get("chaves_bloqueio"):
+        db.clientes.update_one({"_id": cliente_id}, {"$set": {"chaves_bloqueio": chaves}})
+
+    encontrados = candidatos(cliente) if cliente.get("ativo", True) else []
+
+    agora = datetime.utcnow()
+    operacoes = [
+        _operacao_par(cliente_id, item["cliente_id"], item["score"], item["motivos"], "cadastro", agora)
+        for item in encontrados
+    ]
+    if operacoes:
+        db.clientes_duplicatas.bulk_write(operacoes, ordered=False)
+
+    # Pares pendentes que deixaram de ser suspeitos (dados corrigidos)
+    db.clientes_duplicatas.delete_many({
+        "clientes": cliente_id,
+        "status": "pendente",
+        "_id": {"$nin": [_id_par(cliente_id, item["cliente_id"]) for item in encontrados]}
+    })
+    return encontrados
+
+def gerar_chaves_existentes(limit=1000):
+    """Preencher chaves_bloqueio de clientes cadastrados antes da deduplicação"""
+    db = get_db()
+    operacoes = [
+        UpdateOne({"_id": cliente["_id"]}, {"$set": {"chaves_bloqueio": chaves_bloqueio(cliente)}})
+        for cliente in db.clientes.find({"chaves_bloqueio": {"$exists": False}}, CAMPOS_COMPARACAO).limit(limit)
+    ]
+    if operacoes:
+        db.clientes.bulk_write(operacoes, ordered=False)
+    return len(operacoes)
+
+def varrer_base(limiar=None, bloco_max=None):
+    """Comparar a base inteira bloco a bloco (clientes com a mesma chave), sem comparar todos com todos
+
+    Blocos maiores que `bloco_max` (ex.: parte local "contato" repetida em
+    muitos emails) são ignorados: não discriminam e seriam quadráticos.
+    """
+    db = get_db()
+    limiar = Config.CLIENTES_DEDUPE_LIMIAR if limiar is None else limiar
+    bloco_max = bloco_max or Config.CLIENTES_DEDUPE_BLOCO_MAX
+
+    while gerar_chaves_existentes():
+        pass
+
+    resumo = {"blocos": 0, "blocos_ignorados": 0, "comparacoes": 0, "pares": 0}
+    blocos = db.clientes.aggregate([
+        {"$match": {"ativo": True, "chaves_bloqueio.0": {"$exists": True}}},
+        {"$unwind": "$chaves_bloqueio"},
+        {"$group": {"_id": "$chaves_bloqueio", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ], allowDiskUse=True)
+
+    comparados = set()
+    operacoes = []
+    agora = datetime.utcnow()
+    for bloco in blocos:
+        if len(bloco["ids"]) > bloco_max:
+            resumo["blocos_ignorados"] += 1
+            continue
+        resumo["blocos"] += 1
+
+        clientes = list(db.clientes.find({"_id": {"$in": bloco["ids"]}}, CAMPOS_COMPARACAO))
+        for a, b in combinations(clientes, 2):
+            par = _id_par(a["_id"], b["_id"])
+            # O mesmo par pode aparecer em vários blocos (mesmo nome e mesmo telefone)
+            if par in comparados:
+                continue
+            comparados.add(par)
+            resumo["comparacoes"] += 1
+
+            pontuacao, motivos = similaridade(a, b)
+            if pontuacao >= limiar:
+                operacoes.append(_operacao_par(a["_id"], b["_id"], pontuacao, motivos, "varredura", agora))
+                resumo["pares"] += 1
+
+        if len(operacoes) >= 500:
+            db.clientes_duplicatas.bulk_write(operacoes, ordered=False)
+            operacoes = []
+
+    if operacoes:
+        db.clientes_duplicatas.bulk_write(operacoes, ordered=False)
+
+    return resumo
+
+def agendar_varredura(quando=None):
+    """Pedir uma varredura completa (executada pelo próximo worker que a reservar)"""
+    db = get_db()
+    db.tarefas_agendadas.update_one(
+        {"_id": VARREDURA_ID},
+        {"$set": {"proxima_em": quando or datetime.utcnow()}},
+        upsert=True
+    )
+
+def _reservar_varredura(worker_id):
+    db = get_db()
+    agora = datetime.utcnow()
+    try:
+        db.tarefas_agendadas.update_one(
+            {"_id": VARREDURA_ID}, {"$setOnInsert": {"proxima_em": agora}}, upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # outra réplica criou o documento ao mesmo tempo
+    return db.tarefas_agendadas.find_one_and_update(
+        {
+            "_id": VARREDURA_ID,
+            "proxima_em": {"$lte": agora},
+            "$or": [{"lease_ate": None}, {"lease_ate": {"$lt": agora}}]
+        },
+        {"$set": {
+            "lease_ate": agora + timedelta(seconds=Config.CLIENTES_DEDUPE_VARREDURA_LEASE_SECONDS),
+            "worker_id": worker_id
+        }}
+    ) is not None
+
+def executar_varredura(worker_id):
+    """Executar a varredura completa se estiver vencida e nenhuma outra réplica a tiver reservado
+
+    Retorna o resumo da varredura (None se não era a vez deste worker).
+    """
+    if not _reservar_varredura(worker_id):
+        return None
+
+    db = get_db()
+    try:
+        resumo = varrer_base()
+    except Exception as e:
+        # Lease liberado: a próxima verificação tenta de novo
+        db.tarefas_agendadas.update_one(
+            {"_id": VARREDURA_ID, "worker_id": worker_id},
+            {"$set": {"erro": str(e)}, "$unset": {"lease_ate": "", "worker_id": ""}}
+        )
+        raise
+
+    agora = datetime.utcnow()
+    db.tarefas_agendadas.update_one(
+        {"_id": VARREDURA_ID, "worker_id": worker_id},
+        {
+            "$set": {
+                "proxima_em": agora + timedelta(seconds=Config.CLIENTES_DEDUPE_VARREDURA_SECONDS),
+                "ultima_execucao": agora,
+                "resumo": resumo
+            },
+            "$unset": {"lease_ate": "", "worker_id": "", "erro": ""}
+        }
+    )
+    return resumo
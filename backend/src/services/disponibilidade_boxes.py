@@ -0,0 +1,211 @@
+from datetime import date, datetime
+import threading
+import time
+from src.config import Config
+from src.database import get_db
+
+# Dia zero dos mapas de bits (ocupações anteriores não interessam para alocação)
+DATA_BASE = date(2024, 1, 1)
+
+def _dia(valor):
+    """Índice do dia em relação a DATA_BASE (datas anteriores viram 0)"""
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    return max((valor - DATA_BASE).days, 0)
+
+def _mascara(inicio, fim):
+    """Bits dos dias [inicio, fim)"""
+    return ((1 << (fim - inicio)) - 1) << inicio
+
+class _Box:
+    __slots__ = ("id", "numero", "tamanho", "manutencao", "ocupacoes", "bits", "aberto_desde")
+
+    def __init__(self, box_id, numero, tamanho, manutencao):
+        self.id = box_id
+        self.numero = numero
+        self.tamanho = tamanho
+        self.manutencao = manutencao
+        self.ocupacoes = {}      # ocupacao_id -> (dia_inicio, dia_fim ou None)
+        self.bits = 0            # bit i = dia i ocupado
+        self.aberto_desde = None # ocupação sem data de fim: todos os dias a partir deste
+
+    def recalcular(self):
+        bits = 0
+        aberto_desde = None
+        for inicio, fim in self.ocupacoes.values():
+            if fim is None:
+                aberto_desde = inicio if aberto_desde is None else min(aberto_desde, inicio)
+            elif fim > inicio:
+                bits |= _mascara(inicio, fim)
+        self.bits = bits
+        self.aberto_desde = aberto_desde
+
+    def livre(self, inicio, fim):
+        """Livre em [inicio, fim) (fim None = a partir de inicio, sem previsão de saída)"""
+        if self.aberto_desde is not None and (fim is None or self.aberto_desde < fim):
+            return False
+        if fim is None:
+            return (self.bits >> inicio) == 0
+        return not (self.bits & _mascara(inicio, fim))
+
+    def dias_ocupados(self, inicio, fim):
+        ocupados = (self.bits & _mascara(inicio, fim)).bit_count()
+        if self.aberto_desde is not None and self.aberto_desde < fim:
+            # Dias do trecho aberto que ainda não estavam contados nos bits
+            aberto = _mascara(max(self.aberto_desde, inicio), fim)
+            ocupados += (aberto & ~self.bits).bit_count()
+        return ocupados
+
+class IndiceDisponibilidade:
+    """Índice em memória da ocupação dos boxes: um mapa de bits de dias por box, agrupado por tamanho
+
+    Carregado do banco na inicialização e atualizado incrementalmente
+    (boxes e ocupações alterados desde a última verificação). As consultas
+    não acessam o banco; a alocação em si continua validada no banco
+    (GuardaMoveis.ocupar).
+    """
+
+    def __init__(self, intervalo_recarga=None):
+        self.intervalo_recarga = intervalo_recarga
+        self._boxes = {}
+        self._por_tamanho = {}
+        self._marca_boxes = None
+        self._marca_ocupacoes = None
+        self._ultima_verificacao = 0
+        self._carregado = False
+        self._lock = threading.RLock()
+
+    def _reindexar_tamanhos(self):
+        por_tamanho = {}
+        for box in self._boxes.values():
+            por_tamanho.setdefault(box.tamanho, []).append(box)
+        for boxes in por_tamanho.values():
+            boxes.sort(key=lambda box: box.numero or "")
+        self._por_tamanho = por_tamanho
+
+    def _aplicar_boxes(self, boxes_data):
+        alterou_tamanho = False
+        for box_data in boxes_data:
+            box_id = str(box_data["_id"])
+            box = self._boxes.get(box_id)
+            manutencao = box_data.get("status") == "manutencao"
+            if box is None:
+                box = _Box(box_id, box_data.get("box_numero"), box_data.get("tamanho"), manutencao)
+                self._boxes[box_id] = box
+                alterou_tamanho = True
+            else:
+                if box.tamanho != box_data.get("tamanho") or box.numero != box_data.get("box_numero"):
+                    alterou_tamanho = True
+                box.numero = box_data.get("box_numero")
+                box.tamanho = box_data.get("tamanho")
+                box.manutencao = manutencao
+            marca = box_data.get("data_atualizacao")
+            if marca and (self._marca_boxes is None or marca > self._marca_boxes):
+                self._marca_boxes = marca
+        if alterou_tamanho:
+            self._reindexar_tamanhos()
+
+    def _aplicar_ocupacoes(self, ocupacoes_data):
+        alterados = set()
+        for ocupacao in ocupacoes_data:
+            box = self._boxes.get(str(ocupacao["box_id"]))
+            marca = ocupacao.get("atualizado_em")
+            if marca and (self._marca_ocupacoes is None or marca > self._marca_ocupacoes):
+                self._marca_ocupacoes = marca
+            if box is None:
+                continue
+            chave = str(ocupacao["_id"])
+            if ocupacao.get("status") == "ativa":
+                fim = ocupacao.get("data_fim")
+                box.ocupacoes[chave] = (_dia(ocupacao["data_inicio"]), _dia(fim) if fim else None)
+            else:
+                box.ocupacoes.pop(chave, None)
+            alterados.add(box)
+        for box in alterados:
+            box.recalcular()
+
+    def carregar(self):
+        """Reconstruir o índice completo a partir do banco"""
+        db = get_db()
+        with self._lock:
+            self._boxes = {}
+            self._marca_boxes = None
+            self._marca_ocupacoes = None
+            self._aplicar_boxes(db.guarda_moveis.find(
+                {}, {"box_numero": 1, "tamanho": 1, "status": 1, "data_atualizacao": 1}
+            ))
+            self._reindexar_tamanhos()
+            self._aplicar_ocupacoes(db.guarda_moveis_ocupacoes.find(
+                {"status": "ativa"},
+                {"box_id": 1, "data_inicio": 1, "data_fim": 1, "status": 1, "atualizado_em": 1}
+            ))
+            self._carregado = True
+            self._ultima_verificacao = time.monotonic()
+
+    def _atualizar(self):
+        """Aplicar apenas o que mudou desde a última verificação"""
+        db = get_db()
+        filtro_boxes = {"data_atualizacao": {"$gte": self._marca_boxes}} if self._marca_boxes else {}
+        filtro_ocupacoes = {"atualizado_em": {"$gte": self._marca_ocupacoes}} if self._marca_ocupacoes else {}
+        self._aplicar_boxes(db.guarda_moveis.find(
+            filtro_boxes, {"box_numero": 1, "tamanho": 1, "status": 1, "data_atualizacao": 1}
+        ))
+        self._aplicar_ocupacoes(db.guarda_moveis_ocupacoes.find(
+            filtro_ocupacoes,
+            {"box_id": 1, "data_inicio": 1, "data_fim": 1, "status": 1, "atualizado_em": 1}
+        ))
+        self._ultima_verificacao = time.monotonic()
+
+    def _garantir_atualizado(self):
+        intervalo = self.intervalo_recarga
+        if intervalo is None:
+            intervalo = Config.GUARDA_MOVEIS_INDICE_RELOAD_SECONDS
+
+        if not self._carregado:
+            self.carregar()
+        elif time.monotonic() - self._ultima_verificacao >= intervalo:
+            with self._lock:
+                if time.monotonic() - self._ultima_verificacao >= intervalo:
+                    self._atualizar()
+
+    def registrar_ocupacao(self, ocupacao):
+        """Aplicar imediatamente uma ocupação criada/alterada neste processo"""
+        with self._lock:
+            if not self._carregado:
+                return
+            self._aplicar_ocupacoes([ocupacao])
+
+    def primeiro_livre(self, tamanho, inicio, fim=None):
+        """Primeiro box (pela numeração) do tamanho informado livre em [inicio, fim)"""
+        self._garantir_atualizado()
+        dia_inicio = _dia(inicio)
+        dia_fim = _dia(fim) if fim else None
+        if dia_fim is not None and dia_fim <= dia_inicio:
+            raise ValueError("Data final deve ser posterior à inicial")
+
+        for box in self._por_tamanho.get(tamanho, []):
+            if not box.manutencao and box.livre(dia_inicio, dia_fim):
+                return {"id": box.id, "box_numero": box.numero, "tamanho": box.tamanho}
+        return None
+
+    def taxa_ocupacao(self, inicio, fim, tamanho=None):
+        """Taxa de ocupação (dias ocupados / dias disponíveis) no período, por tamanho"""
+        self._garantir_atualizado()
+        dia_inicio = _dia(inicio)
+        dia_fim = max(_dia(fim), dia_inicio + 1)
+        dias = dia_fim - dia_inicio
+
+        tamanhos = [tamanho] if tamanho else list(self._por_tamanho)
+        resultado = {}
+        for chave in tamanhos:
+            boxes = [box for box in self._por_tamanho.get(chave, []) if not box.manutencao]
+            ocupados = sum(box.dias_ocupados(dia_inicio, dia_fim) for box in boxes)
+            capacidade = len(boxes) * dias
+            resultado[chave] = {
+                "boxes": len(boxes),
+                "dias_ocupados": ocupados,
+                "taxa": round(ocupados / capacidade, 4) if capacidade else 0
+            }
+        return resultado
+
+indice_boxes = IndiceDisponibilidade()
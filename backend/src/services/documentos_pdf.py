@@ -0,0 +1,323 @@
+from functools import lru_cache
+from io import BytesIO
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from datetime import datetime
+
+# Incrementar ao alterar o layout de qualquer documento
+TEMPLATE_VERSAO = 1
+
+# Estilos de tabela pré-calculados (compartilhados entre requisições)
+ESTILO_TABELA_DADOS = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+ESTILO_TABELA_ASSINATURAS = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+ESTILO_TABELA_CONTROLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+CLAUSULAS_CONTRATO = [
+    "1. A VIP MUDANÇAS se compromete a executar os serviços de mudança conforme especificado neste contrato.",
+    "2. O cliente se responsabiliza por embalar adequadamente objetos frágeis e de valor.",
+    "3. A empresa não se responsabiliza por danos em objetos mal embalados pelo cliente.",
+    "4. O pagamento deverá ser efetuado conforme acordado neste contrato.",
+    "5. Cancelamentos com menos de 24h de antecedência estão sujeitos a multa de 30% do valor.",
+    "6. A empresa possui seguro para cobertura de danos durante o transporte.",
+    "7. Este contrato é válido por 30 dias a partir da data de assinatura."
+]
+
+MATERIAIS_ORDEM_SERVICO = [
+    "□ Caixas de papelão",
+    "□ Plástico bolha",
+    "□ Fita adesiva",
+    "□ Papel pardo",
+    "□ Cobertores",
+    "□ Cintas de amarração",
+    "□ Outros: _______________"
+]
+
+@lru_cache(maxsize=1)
+def create_pdf_styles():
+    """Criar estilos personalizados para PDFs (uma vez por worker)"""
+    styles = getSampleStyleSheet()
+
+    # Estilo para título principal
+    styles.add(ParagraphStyle(
+        name='TituloVIP',
+        parent=styles['Title'],
+        fontSize=18,
+        spaceAfter=30,
+        textColor=colors.HexColor('#1e40af'),
+        alignment=1  # Centralizado
+    ))
+
+    # Estilo para subtítulos
+    styles.add(ParagraphStyle(
+        name='SubtituloVIP',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.HexColor('#3b82f6')
+    ))
+
+    return styles
+
+def _construir_pdf(story):
+    """Gerar o PDF em memória e retornar os bytes"""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build(story)
+    return buffer.getvalue()
+
+def gerar_contrato_pdf(data):
+    """Gerar contrato de mudança em PDF"""
+    styles = create_pdf_styles()
+
+    # Dados do cliente
+    cliente = data.get('cliente', {})
+    servico = data.get('servico', {})
+
+    # Gerar número sequencial (simulado)
+    numero_contrato = data.get('numero', '001-2025')
+
+    story = []
+
+    # Cabeçalho
+    story.append(Paragraph("VIP MUDANÇAS", styles['TituloVIP']))
+    story.append(Paragraph("CONTRATO DE PRESTAÇÃO DE SERVIÇOS DE MUDANÇA", styles['SubtituloVIP']))
+    story.append(Spacer(1, 20))
+
+    # Número do contrato
+    story.append(Paragraph(f"<b>Contrato Nº:</b> {numero_contrato}", styles['Normal']))
+    story.append(Paragraph(f"<b>Data:</b> {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Dados do contratante
+    story.append(Paragraph("<b>CONTRATANTE:</b>", styles['SubtituloVIP']))
+    contratante_data = [
+        ['Nome:', cliente.get('nome', '')],
+        ['CPF/CNPJ:', cliente.get('cpf_cnpj', '')],
+        ['Telefone:', cliente.get('telefone', '')],
+        ['Email:', cliente.get('email', '')],
+        ['Endereço:', cliente.get('endereco_origem', '')]
+    ]
+
+    contratante_table = Table(contratante_data, colWidths=[1.5*inch, 4*inch])
+    contratante_table.setStyle(ESTILO_TABELA_DADOS)
+    story.append(contratante_table)
+    story.append(Spacer(1, 20))
+
+    # Dados do serviço
+    story.append(Paragraph("<b>DADOS DO SERVIÇO:</b>", styles['SubtituloVIP']))
+    servico_data = [
+        ['Tipo de Mudança:', servico.get('tipo', 'Residencial')],
+        ['Data da Mudança:', servico.get('data_mudanca', '')],
+        ['Endereço Origem:', servico.get('endereco_origem', '')],
+        ['Endereço Destino:', servico.get('endereco_destino', '')],
+        ['Valor Total:', f"R$ {servico.get('valor_total', '0,00')}"],
+        ['Forma de Pagamento:', servico.get('forma_pagamento', 'À vista')]
+    ]
+
+    servico_table = Table(servico_data, colWidths=[1.5*inch, 4*inch])
+    servico_table.setStyle(ESTILO_TABELA_DADOS)
+    story.append(servico_table)
+    story.append(Spacer(1, 20))
+
+    # Cláusulas do contrato
+    story.append(Paragraph("<b>CLÁUSULAS CONTRATUAIS:</b>", styles['SubtituloVIP']))
+
+    for clausula in CLAUSULAS_CONTRATO:
+        story.append(Paragraph(clausula, styles['Normal']))
+        story.append(Spacer(1, 8))
+
+    story.append(Spacer(1, 30))
+
+    # Assinaturas
+    story.append(Paragraph("<b>ASSINATURAS:</b>", styles['SubtituloVIP']))
+    story.append(Spacer(1, 40))
+
+    assinaturas_data = [
+        ['_' * 30, '_' * 30],
+        ['VIP MUDANÇAS', 'CONTRATANTE'],
+        ['CNPJ: 12.345.678/0001-90', cliente.get('nome', '')]
+    ]
+
+    assinaturas_table = Table(assinaturas_data, colWidths=[2.5*inch, 2.5*inch])
+    assinaturas_table.setStyle(ESTILO_TABELA_ASSINATURAS)
+    story.append(assinaturas_table)
+
+    return _construir_pdf(story)
+
+def gerar_ordem_servico_pdf(data):
+    """Gerar ordem de serviço em PDF"""
+    styles = create_pdf_styles()
+
+    # Dados da OS
+    cliente = data.get('cliente', {})
+    servico = data.get('servico', {})
+    equipe = data.get('equipe', [])
+
+    # Gerar número sequencial
+    numero_os = data.get('numero', '001-2025')
+
+    story = []
+
+    # Cabeçalho
+    story.append(Paragraph("VIP MUDANÇAS", styles['TituloVIP']))
+    story.append(Paragraph("ORDEM DE SERVIÇO", styles['SubtituloVIP']))
+    story.append(Spacer(1, 20))
+
+    # Dados da OS
+    story.append(Paragraph(f"<b>OS Nº:</b> {numero_os}", styles['Normal']))
+    story.append(Paragraph(f"<b>Data de Emissão:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Dados do cliente
+    story.append(Paragraph("<b>CLIENTE:</b>", styles['SubtituloVIP']))
+    cliente_info = f"""
+    <b>Nome:</b> {cliente.get('nome', '')}<br/>
+    <b>Telefone:</b> {cliente.get('telefone', '')}<br/>
+    <b>Email:</b> {cliente.get('email', '')}
+    """
+    story.append(Paragraph(cliente_info, styles['Normal']))
+    story.append(Spacer(1, 15))
+
+    # Dados do serviço
+    story.append(Paragraph("<b>DETALHES DO SERVIÇO:</b>", styles['SubtituloVIP']))
+    servico_info = f"""
+    <b>Data da Mudança:</b> {servico.get('data_mudanca', '')}<br/>
+    <b>Horário:</b> {servico.get('horario', '08:00')}<br/>
+    <b>Origem:</b> {servico.get('endereco_origem', '')}<br/>
+    <b>Destino:</b> {servico.get('endereco_destino', '')}<br/>
+    <b>Tipo:</b> {servico.get('tipo', 'Residencial')}<br/>
+    <b>Observações:</b> {servico.get('observacoes', 'Nenhuma')}
+    """
+    story.append(Paragraph(servico_info, styles['Normal']))
+    story.append(Spacer(1, 15))
+
+    # Equipe designada
+    if equipe:
+        story.append(Paragraph("<b>EQUIPE DESIGNADA:</b>", styles['SubtituloVIP']))
+        for membro in equipe:
+            story.append(Paragraph(f"• {membro.get('nome', '')} - {membro.get('funcao', '')}", styles['Normal']))
+        story.append(Spacer(1, 15))
+
+    # Lista de materiais/itens
+    story.append(Paragraph("<b>MATERIAIS NECESSÁRIOS:</b>", styles['SubtituloVIP']))
+
+    for material in MATERIAIS_ORDEM_SERVICO:
+        story.append(Paragraph(material, styles['Normal']))
+
+    story.append(Spacer(1, 30))
+
+    # Assinaturas
+    story.append(Paragraph("<b>CONTROLE DE EXECUÇÃO:</b>", styles['SubtituloVIP']))
+    story.append(Spacer(1, 20))
+
+    controle_data = [
+        ['Início dos trabalhos:', '___:___', 'Responsável:', '_' * 20],
+        ['Término dos trabalhos:', '___:___', 'Responsável:', '_' * 20],
+        ['Assinatura do Cliente:', '_' * 30, 'Data:', '___/___/___']
+    ]
+
+    controle_table = Table(controle_data, colWidths=[1.5*inch, 1*inch, 1*inch, 1.5*inch])
+    controle_table.setStyle(ESTILO_TABELA_CONTROLE)
+    story.append(controle_table)
+
+    return _construir_pdf(story)
+
+def gerar_recibo_pdf(data):
+    """Gerar recibo de pagamento em PDF"""
+    styles = create_pdf_styles()
+
+    # Dados do recibo
+    cliente = data.get('cliente', {})
+    pagamento = data.get('pagamento', {})
+
+    # Gerar número sequencial
+    numero_recibo = data.get('numero', '001-2025')
+
+    story = []
+
+    # Cabeçalho
+    story.append(Paragraph("VIP MUDANÇAS", styles['TituloVIP']))
+    story.append(Paragraph("RECIBO DE PAGAMENTO", styles['SubtituloVIP']))
+    story.append(Spacer(1, 20))
+
+    # Dados do recibo
+    story.append(Paragraph(f"<b>Recibo Nº:</b> {numero_recibo}", styles['Normal']))
+    story.append(Paragraph(f"<b>Data:</b> {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Valor por extenso (simulado)
+    valor = pagamento.get('valor', 0)
+    valor_extenso = "Valor por extenso aqui"  # Em produção, converter para extenso
+
+    # Corpo do recibo
+    recibo_texto = f"""
+    Recebi de <b>{cliente.get('nome', '')}</b>, portador do CPF/CNPJ <b>{cliente.get('cpf_cnpj', '')}</b>,
+    a quantia de <b>R$ {valor:.2f}</b> ({valor_extenso}), referente aos serviços de mudança
+    prestados conforme contrato <b>{pagamento.get('contrato', '')}</b>.
+    """
+
+    story.append(Paragraph(recibo_texto, styles['Normal']))
+    story.append(Spacer(1, 30))
+
+    # Detalhes do pagamento
+    story.append(Paragraph("<b>DETALHES DO PAGAMENTO:</b>", styles['SubtituloVIP']))
+    pagamento_data = [
+        ['Forma de Pagamento:', pagamento.get('forma_pagamento', '')],
+        ['Data do Serviço:', pagamento.get('data_servico', '')],
+        ['Observações:', pagamento.get('observacoes', 'Nenhuma')]
+    ]
+
+    pagamento_table = Table(pagamento_data, colWidths=[2*inch, 3*inch])
+    pagamento_table.setStyle(ESTILO_TABELA_DADOS)
+    story.append(pagamento_table)
+    story.append(Spacer(1, 40))
+
+    # Assinatura
+    story.append(Paragraph("São Paulo, " + datetime.now().strftime('%d de %B de %Y'), styles['Normal']))
+    story.append(Spacer(1, 40))
+
+    story.append(Paragraph("_" * 40, styles['Normal']))
+    story.append(Paragraph("VIP MUDANÇAS", styles['Normal']))
+    story.append(Paragraph("CNPJ: 12.345.678/0001-90", styles['Normal']))
+
+    return _construir_pdf(story)
+
+# Tipo de documento -> (função de renderização, prefixo do nome do arquivo)
+RENDERIZADORES = {
+    'contrato': (gerar_contrato_pdf, 'contrato'),
+    'ordem_servico': (gerar_ordem_servico_pdf, 'os'),
+    'recibo': (gerar_recibo_pdf, 'recibo')
+}
+
+def nome_arquivo(tipo, data):
+    """Nome do arquivo PDF para download"""
+    prefixo = RENDERIZADORES[tipo][1]
+    return f"{prefixo}_{data.get('numero', '001-2025')}.pdf"
+
+def renderizar(tipo, data):
+    """Renderizar documento do tipo informado e retornar os bytes do PDF"""
+    if tipo not in RENDERIZADORES:
+        raise ValueError(f"Tipo de documento inválido: {tipo}")
+    return RENDERIZADORES[tipo][0](data)
+
+def renderizar_item_lote(indice, tipo, data):
+    """Renderizar um item do lote (executado nos processos do pool)"""
+    return indice, f"{indice + 1:03d}_{nome_arquivo(tipo, data)}", renderizar(tipo, data)
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import calendar
+from bson import ObjectId
+from src.config import Config
+from src.database import get_db
+from src.models.boleto import Boleto
+from src.models.faturamento_execucao import ExecucaoPerdida, FaturamentoExecucao
+from src.services import cora
+
+def periodo_competencia(competencia):
+    """Intervalo [início, fim) do mês da competência (AAAA-MM)"""
+    ano, mes = (int(parte) for parte in competencia.split("-"))
+    inicio = datetime(ano, mes, 1)
+    fim = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+def pipeline_faturaveis(competencia):
+    """Boxes faturáveis na competência: ocupações ativas que se sobrepõem ao mês
+
+    Não depende do status gravado no box (que só é recalculado periodicamente):
+    uma ocupação que começou depois de uma reserva entra, uma que terminou antes
+    do mês não entra. Com mais de uma ocupação no mês, o boleto (um por box e
+    competência) vai para o cliente da ocupação mais recente.
+    """
+    inicio, fim = periodo_competencia(competencia)
+    return [
+        {"$match": {
+            "status": "ativa",
+            "data_inicio": {"$lt": fim},
+            "$or": [{"data_fim": None}, {"data_fim": {"$gt": inicio}}]
+        }},
+        {"$sort": {"data_inicio": 1}},
+        {"$group": {"_id": "$box_id", "cliente_id": {"$last": "$cliente_id"}}},
+        {"$lookup": {"from": "guarda_moveis", "localField": "_id", "foreignField": "_id", "as": "box"}},
+        {"$unwind": "$box"},
+        {"$match": {"box.valor_mensal": {"$gt": 0}}},
+        {"$project": {
+            "cliente_id": 1,
+            "box_numero": "$box.box_numero",
+            "valor_mensal": "$box.valor_mensal",
+            "dia_vencimento": "$box.dia_vencimento"
+        }}
+    ]
+
+def calcular_vencimento(competencia, dia_vencimento):
+    """Data de vencimento na competência (AAAA-MM), limitada ao último dia do mês"""
+    ano, mes = (int(parte) for parte in competencia.split("-"))
+    ultimo_dia = calendar.monthrange(ano, mes)[1]
+    return datetime(ano, mes, min(int(dia_vencimento), ultimo_dia))
+
+def _carregar_clientes(db, boxes):
+    """Clientes dos boxes de um lote em uma única consulta"""
+    ids = set()
+    for box in boxes:
+        try:
+            ids.add(ObjectId(box.get("cliente_id")))
+        except Exception:
+            continue
+    return {
+        str(cliente["_id"]): cliente
+        for cliente in db.clientes.find({"_id": {"$in": list(ids)}}, {"nome": 1, "cpf_cnpj": 1, "cpf_cnpj_digitos": 1, "email": 1})
+    }
+
+def _emitir(item):
+    boleto, cliente = item
+    try:
+        return boleto["chave_periodo"], cora.emitir_boleto(boleto, cliente), None
+    except Exception as e:
+        return boleto["chave_periodo"], None, e
+
+def _processar_lote(db, pool, execucao, boxes):
+    """Registrar, emitir em paralelo e reconciliar os boletos de um lote de boxes"""
+    clientes = _carregar_clientes(db, boxes)
+
+    boletos = [
+        {
+            "chave_periodo": Boleto.gerar_chave_periodo(box["_id"], execucao.competencia),
+            "competencia": execucao.competencia,
+            "box_id": box["_id"],
+            "box_numero": box.get("box_numero"),
+            "cliente_id": box.get("cliente_id"),
+            "valor": float(box["valor_mensal"]),
+            "vencimento": calcular_vencimento(
+                execucao.competencia,
+                box.get("dia_vencimento") or Config.GUARDA_MOVEIS_DIA_VENCIMENTO
+            )
+        }
+        for box in boxes
+    ]
+
+    a_emitir = Boleto.registrar_pendentes(boletos, execucao._id)
+    ja_emitidos = len(boletos) - len(a_emitir)
+
+    resultados = list(pool.map(
+        _emitir,
+        [(boleto, clientes.get(str(boleto.get("cliente_id")))) for boleto in a_emitir]
+    ))
+    Boleto.reconciliar(resultados)
+
+    emitidos = sum(1 for _, emitido, _ in resultados if emitido)
+    FaturamentoExecucao.registrar_progresso(
+        execucao._id,
+        execucao.worker_id,
+        emitidos=emitidos,
+        falhas=len(resultados) - emitidos,
+        ja_emitidos=ja_emitidos
+    )
+
+def executar(execucao):
+    """Faturar todos os boxes ocupados (em algum momento) na competência da execução
+
+    Idempotente: cada boleto tem a chave "<box_id>:<AAAA-MM>" e os já
+    emitidos são ignorados, então uma execução repetida (ou retomada)
+    só emite o que falta.
+    """
+    db = get_db()
+    try:
+        pipeline = pipeline_faturaveis(execucao.competencia)
+        contagem = list(db.guarda_moveis_ocupacoes.aggregate(pipeline + [{"$count": "total"}]))
+        FaturamentoExecucao.registrar_progresso(
+            execucao._id,
+            execucao.worker_id,
+            total=contagem[0]["total"] if contagem else 0
+        )
+
+        cursor = db.guarda_moveis_ocupacoes.aggregate(pipeline, batchSize=Config.CORA_LOTE)
+
+        with ThreadPoolExecutor(max_workers=Config.CORA_CONCORRENCIA) as pool:
+            lote = []
+            for box in cursor:
+                lote.append(box)
+                if len(lote) >= Config.CORA_LOTE:
+                    _processar_lote(db, pool, execucao, lote)
+                    lote = []
+            if lote:
+                _processar_lote(db, pool, execucao, lote)
+
+        FaturamentoExecucao.finalizar(execucao._id, execucao.worker_id)
+    except ExecucaoPerdida:
+        # Outro worker retomou a execução e segue dela; os boletos já emitidos aqui são ignorados por ele
+        print(f"Faturamento {execucao.competencia} retomado por outro worker, abandonando")
+    except Exception as e:
+        print(f"Erro no faturamento {execucao.competencia}: {e}")
+        FaturamentoExecucao.finalizar(execucao._id, execucao.worker_id, erro=e)
+
+def processar_pendente(worker_id):
+    """Executar a próxima execução de faturamento pendente; retorna 1 se havia uma"""
+    execucao = FaturamentoExecucao.reservar(worker_id)
+    if not execucao:
+        return 0
+    executar(execucao)
+    return 1
@@ -0,0 +1,166 @@
+from datetime import datetime, timezone
+from urllib.parse import quote
+import requests
+from dateutil import parser as date_parser
+from pymongo import UpdateOne, DeleteOne
+from src.config import Config
+from src.metricas import instrumentar_sessao
+from src.database import get_db
+from src.services.calendario import invalidar_calendario
+
+# Sessão reaproveitada entre sincronizações (mantém a conexão HTTP aberta)
+_session = requests.Session()
+instrumentar_sessao(_session, "google_calendar")
+
+class SyncTokenExpirado(Exception):
+    """O Google respondeu 410: o token incremental não vale mais e é preciso sincronizar tudo"""
+
+def _parametros_autenticacao():
+    headers = {}
+    params = {}
+    if Config.GOOGLE_CALENDAR_ACCESS_TOKEN:
+        headers["Authorization"] = f"Bearer {Config.GOOGLE_CALENDAR_ACCESS_TOKEN}"
+    elif Config.GOOGLE_CALENDAR_API_KEY:
+        params["key"] = Config.GOOGLE_CALENDAR_API_KEY
+    return headers, params
+
+def _converter_horario(horario):
+    """Converter start/end do Google em (datetime UTC, data local, hora local, dia inteiro)"""
+    horario = horario or {}
+    if horario.get("dateTime"):
+        local = date_parser.isoparse(horario["dateTime"])
+        utc = local.astimezone(timezone.utc).replace(tzinfo=None) if local.tzinfo else local
+        return utc, local.date().isoformat(), local.strftime("%H:%M"), False
+    if horario.get("date"):
+        dia = date_parser.isoparse(horario["date"])
+        return dia, horario["date"], None, True
+    return None, None, None, False
+
+def _inferir_tipo(titulo):
+    titulo = (titulo or "").lower()
+    if "visita" in titulo:
+        return "visita"
+    if "mudança" in titulo or "mudanca" in titulo:
+        return "mudanca"
+    return "evento"
+
+def converter_evento(calendario_id, item, sincronizado_em):
+    """Converter evento da API do Google para o documento da coleção eventos"""
+    inicio, data, hora, dia_inteiro = _converter_horario(item.get("start"))
+    fim, _, _, _ = _converter_horario(item.get("end"))
+    return {
+        "calendario_id": calendario_id,
+        "google_id": item["id"],
+        "titulo": item.get("summary", ""),
+        "descricao": item.get("description", ""),
+        "endereco": item.get("location", ""),
+        "tipo": _inferir_tipo(item.get("summary")),
+        "inicio": inicio,
+        "fim": fim or inicio,
+        "data": data,
+        "hora": hora,
+        "dia_inteiro": dia_inteiro,
+        "link": item.get("htmlLink"),
+        "atualizado_google": item.get("updated"),
+        "sincronizado_em": sincronizado_em
+    }
+
+def _listar_alteracoes(calendario_id, sync_token, sincronizado_em):
+    """Percorrer as páginas de eventos e aplicar cada página em um bulk_write
+
+    Com sync_token, o Google devolve apenas o que mudou desde a última
+    sincronização (incluindo cancelados). Retorna (novo sync_token, total).
+    """
+    db = get_db()
+    eventos_collection = db.eventos
+
+    url = f"{Config.GOOGLE_CALENDAR_API_URL}/calendars/{quote(calendario_id, safe='')}/events"
+    headers, params = _parametros_autenticacao()
+    params.update({"maxResults": 250, "singleEvents": "true"})
+    if sync_token:
+        params["syncToken"] = sync_token
+
+    total = 0
+    while True:
+        response = _session.get(url, params=params, headers=headers, timeout=15)
+        if response.status_code == 410:
+            raise SyncTokenExpirado(calendario_id)
+        response.raise_for_status()
+        pagina = response.json()
+
+        operacoes = []
+        for item in pagina.get("items", []):
+            filtro = {"calendario_id": calendario_id, "google_id": item["id"]}
+            if item.get("status") == "cancelled":
+                operacoes.append(DeleteOne(filtro))
+            else:
+                operacoes.append(UpdateOne(
+                    filtro,
+                    {"$set": converter_evento(calendario_id, item, sincronizado_em)},
+                    upsert=True
+                ))
+        if operacoes:
+            eventos_collection.bulk_write(operacoes, ordered=False)
+            total += len(operacoes)
+
+        if pagina.get("nextPageToken"):
+            params["pageToken"] = pagina["nextPageToken"]
+            continue
+        return pagina.get("nextSyncToken"), total
+
+def sincronizar_calendario(calendario_id):
+    """Sincronizar um calendário: incremental pelo sync token, completa na primeira vez ou após 410"""
+    db = get_db()
+    estado = db.calendario_sync.find_one({"_id": calendario_id}) or {}
+
+    sincronizado_em = datetime.utcnow()
+    sync_token = estado.get("sync_token")
+    completa = not sync_token
+
+    try:
+        novo_token, total = _listar_alteracoes(calendario_id, sync_token, sincronizado_em)
+    except SyncTokenExpirado:
+        completa = True
+        novo_token, total = _listar_alteracoes(calendario_id, None, sincronizado_em)
+
+    removidos = 0
+    if completa:
+        # Na listagem completa, o que não foi visto agora deixou de existir no Google
+        result = db.eventos.delete_many({
+            "calendario_id": calendario_id,
+            "sincronizado_em": {"$lt": sincronizado_em}
+        })
+        removidos = result.deleted_count
+
+    db.calendario_sync.update_one(
+        {"_id": calendario_id},
+        {"$set": {
+            "sync_token": novo_token,
+            "sincronizado_em": sincronizado_em,
+            "ultima_sincronizacao_completa": completa,
+            "ultimo_total_alteracoes": total
+        }},
+        upsert=True
+    )
+    if total or removidos:
+        invalidar_calendario()
+
+    return {
+        "calendario_id": calendario_id,
+        "completa": completa,
+        "alteracoes": total,
+        "removidos": removidos
+    }
+
+def sincronizar_todos():
+    """Sincronizar todos os calendários configurados; falhas de um não interrompem os outros"""
+    resultados = []
+    for calendario_id in Config.GOOGLE_CALENDAR_IDS:
+        calendario_id = calendario_id.strip()
+        if not calendario_id:
+            continue
+        try:
+            resultados.append(sincronizar_calendario(calendario_id))
+        except Exception as e:
+            resultados.append({"calendario_id": calendario_id, "erro": str(e)})
+    return resultados
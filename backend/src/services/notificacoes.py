@@ -0,0 +1,65 @@
+from email.message import EmailMessage
+import smtplib
+from src.config import Config
+from src.models.mensagem import Mensagem
+from src.models.notificacao import Notificacao
+from src.services.contatos import telefone_e164
+
+def enviar_whatsapp(notificacao):
+    """Enviar notificação por WhatsApp (simulado, registrado em mensagens)"""
+    telefone = (telefone_e164(notificacao.get("destinatario")) or '').lstrip('+')
+    if not telefone:
+        raise ValueError("Telefone do destinatário inválido")
+
+    # Em produção, enviar pela API Authentic (ver routes/whatsapp.py)
+    Mensagem.registrar_envios([{
+        "mensagem_id": Mensagem.gerar_mensagem_id(),
+        "telefone": telefone,
+        "status": "enviado",
+        "template": "notificacao"
+    }])
+
+def enviar_email(notificacao):
+    """Enviar notificação por email (SMTP configurado) ou registrar simulação"""
+    if not Config.SMTP_SERVER:
+        print(f"Email (simulação) para {notificacao.get('destinatario')}: {notificacao.get('mensagem')}")
+        return
+
+    mensagem = EmailMessage()
+    mensagem["From"] = Config.SMTP_USERNAME
+    mensagem["To"] = notificacao["destinatario"]
+    mensagem["Subject"] = "VIP Mudanças"
+    mensagem.set_content(notificacao.get("mensagem", ""))
+
+    with smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT, timeout=15) as smtp:
+        smtp.starttls()
+        if Config.SMTP_USERNAME:
+            smtp.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
+        smtp.send_message(mensagem)
+
+def enviar_sms(notificacao):
+    """Enviar notificação por SMS (simulado)"""
+    print(f"SMS (simulação) para {notificacao.get('destinatario')}: {notificacao.get('mensagem')}")
+
+ENVIADORES = {
+    "whatsapp": enviar_whatsapp,
+    "email": enviar_email,
+    "sms": enviar_sms
+}
+
+def processar_lote(worker_id, limite=100):
+    """Reservar e enviar notificações vencidas; retorna quantas foram reservadas"""
+    notificacoes = Notificacao.reservar(worker_id, limite)
+
+    for notificacao in notificacoes:
+        try:
+            enviador = ENVIADORES.get(notificacao.get("tipo"))
+            if not enviador:
+                raise ValueError(f"Tipo de notificação inválido: {notificacao.get('tipo')}")
+            enviador(notificacao)
+            Notificacao.concluir(notificacao)
+        except Exception as e:
+            print(f"Erro ao enviar notificação {notificacao['_id']}: {e}")
+            Notificacao.falhar(notificacao, e)
+
+    return len(notificacoes)
@@ -0,0 +1,174 @@
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from pymongo import UpdateOne
+from src.config import Config
+from src.database import get_db
+from src.models.monitoramento_licitacao import MonitoramentoLicitacao
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Usadas enquanto o monitoramento não tiver palavras configuradas
+PALAVRAS_PADRAO = ["mudança", "remoção", "transporte"]
+
+@lru_cache(maxsize=65536)
+def _singular(token):
+    """Radical comum ao singular e ao plural de uma palavra em português (já sem acentos)
+
+    Não é a forma singular de verdade: singular e plural só precisam chegar ao
+    mesmo radical ("cofre"/"cofres" -> "cofr", "pais"/"paises" -> "pai").
+    """
+    if len(token) <= 2 or token.isdigit():
+        return token
+    if token.endswith(("oes", "aes")):
+        return token[:-3] + "ao"
+    if len(token) > 4:
+        # móveis -> movel, animais -> animal (com 4 letras ou menos: mais, pais, cais)
+        for plural, singular in (("ais", "al"), ("eis", "el"), ("ois", "ol"), ("uis", "ul")):
+            if token.endswith(plural):
+                return token[:-3] + singular
+    if token.endswith("ns"):
+        return token[:-2] + "m"
+    # -s, depois -e, depois -s de novo: base/bases, analise/analises, pais/paises, mes/meses
+    for sufixo in ("s", "e", "s"):
+        if token.endswith(sufixo) and len(token) > 2:
+            token = token[:-1]
+    return token
+
+def tokens_normalizados(texto):
+    """Palavras do texto sem acentos, em minúsculas e no singular"""
+    if not texto:
+        return []
+    # NFKD separa os acentos das letras; o encode descarta os acentos
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    return [_singular(token) for token in _TOKEN.findall(texto)]
+
+class AutomatoPalavras:
+    """Aho-Corasick sobre palavras normalizadas: todas as palavras-chave em uma passada pelo texto
+
+    As transições são por palavra (não por caractere), então só há
+    correspondência de palavras inteiras, e expressões com várias palavras
+    ("transporte de móveis") funcionam igual às simples.
+    """
+
+    def __init__(self, palavras_chave):
+        self.palavras_chave = []
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saida = [()]
+
+        vistas = set()
+        for palavra in palavras_chave:
+            tokens = tuple(tokens_normalizados(palavra))
+            if not tokens or tokens in vistas:
+                continue
+            vistas.add(tokens)
+            self.palavras_chave.append(palavra)
+
+            no = 0
+            for token in tokens:
+                proximo = self._transicoes[no].get(token)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saida.append(())
+                    self._transicoes[no][token] = proximo
+                no = proximo
+            self._saida[no] = (palavra,)
+
+        self._construir_falhas()
+
+    def _construir_falhas(self):
+        fila = list(self._transicoes[0].values())
+        indice = 0
+        while indice < len(fila):
+            no = fila[indice]
+            indice += 1
+            for token, filho in self._transicoes[no].items():
+                falha = self._falha[no]
+                while falha and token not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                self._falha[filho] = self._transicoes[falha].get(token, 0)
+                # Saídas do sufixo mais longo já incorporadas (não é preciso seguir a cadeia na busca)
+                self._saida[filho] = self._saida[filho] + self._saida[self._falha[filho]]
+                fila.append(filho)
+
+    def encontrar(self, *textos):
+        """Palavras-chave (como configuradas) presentes em qualquer um dos textos"""
+        transicoes = self._transicoes
+        falha = self._falha
+        saida = self._saida
+
+        encontradas = set()
+        for texto in textos:
+            no = 0
+            for token in tokens_normalizados(texto):
+                while no and token not in transicoes[no]:
+                    no = falha[no]
+                no = transicoes[no].get(token, 0)
+                if saida[no]:
+                    encontradas.update(saida[no])
+        return sorted(encontradas)
+
+    def classificar(self, licitacoes):
+        """Preencher palavras_encontradas (título + descrição) de cada licitação"""
+        for licitacao in licitacoes:
+            licitacao["palavras_encontradas"] = self.encontrar(licitacao.get("titulo"), licitacao.get("descricao"))
+        return licitacoes
+
+class MonitorPalavras:
+    """Autômato das palavras monitoradas, recompilado quando a versão da configuração muda"""
+
+    def __init__(self, intervalo_recarga=None):
+        self.intervalo_recarga = intervalo_recarga
+        self._automato = AutomatoPalavras(PALAVRAS_PADRAO)
+        self._versao = None
+        self._ultima_verificacao = 0
+        self._lock = threading.Lock()
+
+    def _recarregar(self):
+        versao = MonitoramentoLicitacao.get_versao()
+        if versao != self._versao:
+            self._automato = AutomatoPalavras(MonitoramentoLicitacao.get().palavras_chave or PALAVRAS_PADRAO)
+            self._versao = versao
+        self._ultima_verificacao = time.monotonic()
+
+    def get(self):
+        intervalo = self.intervalo_recarga
+        if intervalo is None:
+            intervalo = Config.LICITACOES_MONITOR_RELOAD_SECONDS
+
+        if time.monotonic() - self._ultima_verificacao >= intervalo:
+            with self._lock:
+                if time.monotonic() - self._ultima_verificacao >= intervalo:
+                    self._recarregar()
+        return self._automato
+
+    def invalidar(self):
+        """Forçar recarga na próxima consulta"""
+        self._ultima_verificacao = 0
+
+monitor_palavras = MonitorPalavras()
+
+def reclassificar(automato, filtro=None, lote=500):
+    """Reaplicar o autômato às licitações já gravadas (após mudar as palavras monitoradas)"""
+    db = get_db()
+    licitacoes_collection = db.licitacoes
+
+    alteradas = 0
+    operacoes = []
+    for licitacao in licitacoes_collection.find(
+        filtro or {}, {"titulo": 1, "descricao": 1, "palavras_encontradas": 1}
+    ).batch_size(lote):
+        palavras = automato.encontrar(licitacao.get("titulo"), licitacao.get("descricao"))
+        if palavras != licitacao.get("palavras_encontradas"):
+            operacoes.append(UpdateOne({"_id": licitacao["_id"]}, {"$set": {"palavras_encontradas": palavras}}))
+        if len(operacoes) >= lote:
+            alteradas += licitacoes_collection.bulk_write(operacoes, ordered=False).modified_count
+            operacoes = []
+    if operacoes:
+        alteradas += licitacoes_collection.bulk_write(operacoes, ordered=False).modified_count
+    return alteradas
@@ -0,0 +1,144 @@
+from datetime import datetime
+from src.database import get_db
+from src.models.mensagem import Mensagem
+from src.models.webhook_inbox import WebhookInbox
+from src.services import contatos, dedupe_clientes
+from src.services.calendario import data_utc
+
+RESPOSTA_AUTOMATICA = """
+Olá! Obrigado por entrar em contato com a VIP Mudanças! 🚚
+
+Escolha uma opção:
+1️⃣ Solicitar orçamento
+2️⃣ Agendar visita
+3️⃣ Falar com consultor
+4️⃣ Acompanhar mudança
+
+Digite o número da opção desejada.
+        """
+
+def processar_whatsapp(evento):
+    """Processar mensagem recebida pelo webhook do WhatsApp"""
+    db = get_db()
+    payload = evento["payload"]
+    telefone = contatos.telefone_e164(payload.get('from'))
+    if not telefone:
+        return
+
+    # Cliente/lead/orçamento do remetente pelo telefone canônico (consultas indexadas, sem regex)
+    registros = contatos.resolver(telefone=telefone)
+    recebida_em = _converter_timestamp(payload.get('timestamp')) or datetime.utcnow()
+    for colecao in ("clientes", "leads"):
+        if registros[colecao]:
+            # $max: reprocessar o evento (ou recebê-lo fora de ordem) não volta a data
+            db[colecao].update_many(
+                {"_id": {"$in": registros[colecao]}},
+                {"$max": {"ultimo_contato_whatsapp": recebida_em}}
+            )
+
+    # Em produção, enviar resposta automática
+    # enviar_mensagem_automatica(telefone, RESPOSTA_AUTOMATICA)
+
+def processar_manychat(evento):
+    """Registrar pré-cadastro de cliente vindo do ManyChat"""
+    db = get_db()
+    payload = evento["payload"]
+
+    user_id = payload.get('user_id', '')
+    user_data = payload.get('custom_fields', {}) or {}
+
+    cliente_info = {
+        "nome": user_data.get('nome', ''),
+        "telefone": user_data.get('telefone', ''),
+        "telefone_e164": contatos.telefone_e164(user_data.get('telefone')),
+        "email": user_data.get('email', ''),
+        "endereco_origem": user_data.get('endereco_origem', ''),
+        "endereco_destino": user_data.get('endereco_destino', ''),
+        "tipo_mudanca": user_data.get('tipo_mudanca', 'residencial'),
+        "data_mudanca": user_data.get('data_mudanca', ''),
+        "fonte": "ManyChat Bot",
+        "data_atualizacao": datetime.utcnow()
+    }
+
+    if not user_id:
+        return
+
+    # Upsert pelo usuário do ManyChat: reprocessar o mesmo evento é inofensivo
+    db.clientes.update_one(
+        {"manychat_user_id": user_id},
+        {
+            "$set": cliente_info,
+            "$setOnInsert": {
+                "status": "novo",
+                "ativo": True,
+                "data_criacao": datetime.utcnow()
+            }
+        },
+        upsert=True
+    )
+
+    cliente = db.clientes.find_one({"manychat_user_id": user_id}, {"_id": 1})
+    dedupe_clientes.verificar_cliente(cliente["_id"])
+
+def _converter_timestamp(valor):
+    """Converter timestamp do provedor (epoch ou ISO) para datetime"""
+    if valor in (None, ''):
+        return None
+    try:
+        return datetime.utcfromtimestamp(float(valor))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return data_utc(valor)
+    except ValueError:
+        return None
+
+def _recibo_status(evento):
+    """Extrair recibo de entrega/leitura de um evento do WhatsApp (ou None)"""
+    payload = evento["payload"]
+    if evento["provedor"] != "whatsapp" or payload.get('type') != 'status':
+        return None
+    return {
+        "mensagem_id": payload.get('message_id') or payload.get('id'),
+        "status": payload.get('status'),
+        "timestamp": _converter_timestamp(payload.get('timestamp'))
+    }
+
+PROCESSADORES = {
+    "whatsapp": processar_whatsapp,
+    "manychat": processar_manychat
+}
+
+def processar_lote(worker_id, limite=50):
+    """Reservar e processar um lote da caixa de entrada; retorna quantos foram reservados"""
+    eventos = WebhookInbox.reservar(worker_id, limite)
+
+    concluidos = []
+    recibos = []
+    for evento in eventos:
+        # Recibos de status são acumulados e gravados em um único bulk_write
+        recibo = _recibo_status(evento)
+        if recibo:
+            recibos.append((evento, recibo))
+            continue
+
+        processador = PROCESSADORES.get(evento["provedor"])
+        try:
+            if processador:
+                processador(evento)
+            concluidos.append(evento["_id"])
+        except Exception as e:
+            print(f"Erro ao processar webhook {evento['provedor']}/{evento['mensagem_id']}: {e}")
+            WebhookInbox.falhar(evento, e)
+
+    if recibos:
+        try:
+            Mensagem.aplicar_status([recibo for evento, recibo in recibos])
+            concluidos.extend(evento["_id"] for evento, recibo in recibos)
+        except Exception as e:
+            print(f"Erro ao aplicar recibos de status: {e}")
+            for evento, recibo in recibos:
+                WebhookInbox.falhar(evento, e)
+
+    WebhookInbox.concluir(concluidos)
+    return len(eventos)
@@ -0,0 +1,64 @@
+import importlib.util
+import os
+import sys
+import threading
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Permitir `from src...` rodando o pytest a partir de backend/ ou da raiz do repositório
+sys.path.insert(0, BACKEND)
+
+@pytest.fixture
+def db(monkeypatch):
+    """Banco em memória (mongomock) no lugar da conexão do get_db()"""
+    mongomock = pytest.importorskip("mongomock")
+    from src import database
+    banco = mongomock.MongoClient().vipmudancas_testes
+    monkeypatch.setattr(database, "mongo_db", banco)
+    return banco
+
+@pytest.fixture
+def db_real(monkeypatch):
+    """Banco temporário em um mongod de verdade (MONGODB_TEST_URI), com os índices da aplicação
+
+    Para comportamentos que o mongomock não reproduz (upsert, índices parciais).
+    """
+    uri = os.environ.get("MONGODB_TEST_URI")
+    if not uri:
+        pytest.skip("MONGODB_TEST_URI não definido")
+    from pymongo import MongoClient
+    from src import database
+    cliente = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    nome = f"vipmudancas_testes_{os.getpid()}"
+    banco = cliente[nome]
+    monkeypatch.setattr(database, "mongo_db", banco)
+    database.create_indexes()
+    yield banco
+    cliente.drop_database(nome)
+    cliente.close()
+
+@pytest.fixture
+def servidor_fake():
+    """Subir um dos servidores falsos de tools/ em uma porta livre
+
+    servidor_fake("fake_portal") -> (módulo, url base). Cada chamada carrega o
+    módulo de novo, então o estado em memória do servidor começa vazio.
+    """
+    from werkzeug.serving import make_server
+
+    servidores = []
+
+    def _subir(nome):
+        spec = importlib.util.spec_from_file_location(nome, os.path.join(BACKEND, "tools", f"{nome}.py"))
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+
+        servidor = make_server("127.0.0.1", 0, modulo.app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+        return modulo, f"http://127.0.0.1:{servidor.server_port}"
+
+    yield _subir
+    for servidor in servidores:
+        servidor.shutdown()
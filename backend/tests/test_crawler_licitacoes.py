@@ -0,0 +1,82 @@
+import pytest
+import requests
+from src.services.crawler_licitacoes import rastrear_portal
+from src.services.palavras_chave import AutomatoPalavras
+
+@pytest.fixture
+def url_fake(db, servidor_fake):
+    """Portal falso com 45 licitações (3 páginas de 20)"""
+    _, url = servidor_fake("fake_portal")
+    requests.post(f"{url}/_admin/semear", json={"quantidade": 45}).raise_for_status()
+    return url
+
+@pytest.fixture
+def portal(url_fake):
+    return {"nome": "Fake", "url": f"{url_fake}/licitacoes", "intervalo_ms": 0, "max_paginas": 10}
+
+@pytest.fixture
+def automato():
+    return AutomatoPalavras(["mudança", "transporte de móveis"])
+
+def test_primeira_varredura_grava_todas(db, portal, automato):
+    resumo = rastrear_portal(portal, automato)
+
+    assert resumo["paginas"] == 3
+    assert resumo["novas"] == 45
+    assert resumo["alteradas"] == 0
+    assert db.licitacoes.count_documents({"portal": "Fake"}) == 45
+    assert db.licitacoes_crawler.find_one({"_id": "Fake"})["marca"] is not None
+
+def test_repeticao_sem_mudancas_para_no_304(db, url_fake, portal, automato):
+    rastrear_portal(portal, automato)
+    enviados = requests.get(f"{url_fake}/_admin/estatisticas").json()["itens_enviados"]
+
+    resumo = rastrear_portal(portal, automato)
+
+    assert resumo["paginas"] == 1
+    assert resumo["nao_modificadas"] == 1
+    assert resumo["itens"] == 0
+    estatisticas = requests.get(f"{url_fake}/_admin/estatisticas").json()
+    assert estatisticas["respostas_304"] == 1
+    assert estatisticas["itens_enviados"] == enviados
+    assert db.licitacoes.count_documents({}) == 45
+
+def test_licitacoes_alteradas_sao_atualizadas(db, url_fake, portal, automato):
+    rastrear_portal(portal, automato)
+    requests.post(f"{url_fake}/_admin/alterar", json={"quantidade": 3}).raise_for_status()
+
+    resumo = rastrear_portal(portal, automato)
+
+    assert resumo["paginas"] == 1
+    assert resumo["alteradas"] == 3
+    assert resumo["novas"] == 0
+    assert db.licitacoes.count_documents({}) == 45
+
+    # O que foi gravado é o que o portal lista agora
+    topo = requests.get(portal["url"], params={"pagina": 1}).json()["licitacoes"][:3]
+    for item in topo:
+        gravada = db.licitacoes.find_one({"chave": f"fake:{item['numero']}"})
+        assert gravada["status"] == item["status"]
+        assert gravada["valor_estimado"] == item["valor_estimado"]
+
+def test_licitacoes_novas_sao_inseridas(db, url_fake, portal, automato):
+    rastrear_portal(portal, automato)
+    requests.post(f"{url_fake}/_admin/semear", json={"quantidade": 2}).raise_for_status()
+
+    resumo = rastrear_portal(portal, automato)
+
+    assert resumo["paginas"] == 1
+    assert resumo["novas"] == 2
+    assert resumo["alteradas"] == 0
+    assert db.licitacoes.count_documents({}) == 47
+    assert db.licitacoes.count_documents({"chave": {"$in": ["fake:00046/2025", "fake:00047/2025"]}}) == 2
+
+def test_busca_solicitada_e_atendida_por_um_worker(db):
+    from src.services.crawler_licitacoes import reservar_solicitacao, solicitar_varredura
+
+    assert reservar_solicitacao() is False
+    solicitar_varredura()
+    solicitar_varredura()
+
+    assert reservar_solicitacao() is True
+    assert reservar_solicitacao() is False
@@ -0,0 +1,70 @@
+import pytest
+import requests
+from src.config import Config
+from src.services.google_calendar import sincronizar_calendario
+
+@pytest.fixture
+def url_fake(db, servidor_fake, monkeypatch):
+    """API falsa do Google Agenda com 30 eventos no calendário primary"""
+    _, url = servidor_fake("fake_google_calendar")
+    monkeypatch.setattr(Config, "GOOGLE_CALENDAR_API_URL", url)
+    monkeypatch.setattr(Config, "GOOGLE_CALENDAR_ACCESS_TOKEN", None)
+    monkeypatch.setattr(Config, "GOOGLE_CALENDAR_API_KEY", None)
+    requests.post(f"{url}/_admin/semear", params={"quantidade": 30}).raise_for_status()
+    return url
+
+def _evento(titulo, inicio):
+    return {
+        "summary": titulo,
+        "start": {"dateTime": inicio, "timeZone": "America/Sao_Paulo"},
+        "end": {"dateTime": inicio.replace("T10", "T12"), "timeZone": "America/Sao_Paulo"}
+    }
+
+def test_primeira_sincronizacao_completa(db, url_fake):
+    resultado = sincronizar_calendario("primary")
+
+    assert resultado["completa"] is True
+    assert resultado["alteracoes"] == 30
+    assert db.eventos.count_documents({"calendario_id": "primary"}) == 30
+    assert db.calendario_sync.find_one({"_id": "primary"})["sync_token"]
+
+def test_sincronizacao_incremental_sem_mudancas(db, url_fake):
+    sincronizar_calendario("primary")
+    versao = db.versoes_cache.find_one({"_id": "calendario"})["versao"]
+
+    resultado = sincronizar_calendario("primary")
+
+    assert resultado == {"calendario_id": "primary", "completa": False, "alteracoes": 0, "removidos": 0}
+    # Nada mudou: o cache do calendário continua valendo
+    assert db.versoes_cache.find_one({"_id": "calendario"})["versao"] == versao
+
+def test_sincronizacao_incremental_aplica_alteracoes(db, url_fake):
+    sincronizar_calendario("primary")
+    eventos_url = f"{url_fake}/calendars/primary/events"
+    novo = requests.post(eventos_url, json=_evento("Visita - Cliente novo", "2026-03-10T10:00:00-03:00")).json()
+    alterado, removido = (evento["google_id"] for evento in db.eventos.find().sort("google_id", 1).limit(2))
+    requests.patch(f"{eventos_url}/{alterado}", json={"summary": "Mudança - Cliente alterado"}).raise_for_status()
+    requests.delete(f"{eventos_url}/{removido}").raise_for_status()
+
+    resultado = sincronizar_calendario("primary")
+
+    assert resultado["completa"] is False
+    assert resultado["alteracoes"] == 3
+    assert db.eventos.count_documents({}) == 30
+    assert db.eventos.find_one({"google_id": novo["id"]})["data"] == "2026-03-10"
+    assert db.eventos.find_one({"google_id": alterado})["titulo"] == "Mudança - Cliente alterado"
+    assert db.eventos.find_one({"google_id": removido}) is None
+
+def test_token_expirado_refaz_sincronizacao_completa(db, url_fake):
+    sincronizar_calendario("primary")
+    # Removido enquanto o token estava expirado: só a listagem completa revela
+    removido = db.eventos.find_one()["google_id"]
+    requests.delete(f"{url_fake}/calendars/primary/events/{removido}").raise_for_status()
+    requests.post(f"{url_fake}/_admin/expirar-tokens").raise_for_status()
+
+    resultado = sincronizar_calendario("primary")
+
+    assert resultado["completa"] is True
+    assert resultado["alteracoes"] == 29
+    assert resultado["removidos"] == 1
+    assert db.eventos.count_documents({}) == 29
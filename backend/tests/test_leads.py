@@ -0,0 +1,42 @@
+import pytest
+from src.models.lead import Lead
+
+# Como em /leads/capturar: só o LinkedIn identifica o lead (uma única chave)
+LEADS_SO_LINKEDIN = [
+    {"nome": "João Silva", "cargo": "Gerente", "empresa": "Tech Corp",
+     "linkedin_url": "https://linkedin.com/in/joaosilva"},
+    {"nome": "Maria Santos", "cargo": "Coordenadora", "empresa": "Global Solutions",
+     "linkedin_url": "https://linkedin.com/in/mariasantos"}
+]
+
+@pytest.fixture(params=["db", "db_real"])
+def banco(request):
+    return request.getfixturevalue(request.param)
+
+def test_importar_leads_com_uma_chave(banco):
+    resumo = Lead.importar(LEADS_SO_LINKEDIN)
+
+    assert resumo["criados"] == 2
+    for lead in banco.leads.find():
+        assert isinstance(lead["chaves_dedupe"], list)
+    assert banco.leads.find_one({"nome": "João Silva"})["chaves_dedupe"] == ["li:in/joaosilva"]
+
+def test_reimportar_nao_duplica(banco):
+    Lead.importar(LEADS_SO_LINKEDIN)
+
+    resumo = Lead.importar(LEADS_SO_LINKEDIN)
+
+    assert resumo["criados"] == 0
+    assert resumo["inalterados"] == 2
+    assert banco.leads.count_documents({}) == 2
+
+def test_nova_chave_e_acrescentada_ao_lead_existente(banco):
+    Lead.importar(LEADS_SO_LINKEDIN)
+
+    resumo = Lead.importar([{**LEADS_SO_LINKEDIN[0], "email": "Joao@TechCorp.com"}])
+
+    assert resumo["atualizados"] == 1
+    assert banco.leads.count_documents({}) == 2
+    assert sorted(banco.leads.find_one({"nome": "João Silva"})["chaves_dedupe"]) == [
+        "email:joao@techcorp.com", "li:in/joaosilva"
+    ]
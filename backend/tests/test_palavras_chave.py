@@ -0,0 +1,28 @@
+import pytest
+from src.services.palavras_chave import AutomatoPalavras, tokens_normalizados
+
+@pytest.mark.parametrize("singular, plural", [
+    ("cofre", "cofres"),
+    ("análise", "análises"),
+    ("base", "bases"),
+    ("país", "países"),
+    ("mês", "meses"),
+    ("flor", "flores"),
+    ("luz", "luzes"),
+    ("móvel", "móveis"),
+    ("homem", "homens"),
+    ("remoção", "remoções"),
+    ("mudança", "mudanças"),
+    ("transporte", "transportes"),
+])
+def test_singular_e_plural_tem_o_mesmo_radical(singular, plural):
+    assert tokens_normalizados(singular) == tokens_normalizados(plural)
+
+def test_mais_nao_vira_mal():
+    assert tokens_normalizados("mais") != tokens_normalizados("mal")
+
+def test_automato_encontra_plural_da_palavra_chave():
+    automato = AutomatoPalavras(["cofre", "análise de solo", "transporte de móveis"])
+    assert automato.encontrar("Aquisição de COFRES e análises de solos") == ["análise de solo", "cofre"]
+    assert automato.encontrar("Transportes de móvel") == ["transporte de móveis"]
+    assert automato.encontrar("Serviços de limpeza") == []
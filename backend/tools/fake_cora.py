@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Servidor falso da API de boletos da Cora para desenvolvimento e testes locais
+
+Implementa POST /v2/invoices com Idempotency-Key (a mesma chave devolve o
+mesmo boleto), latência simulada e taxa de falhas configurável.
+
+Uso:
+    python tools/fake_cora.py --port 8082 --latencia-ms 80 --taxa-falha 0.02
+    CORA_API_URL=http://localhost:8082 python worker.py
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+
+_lock = threading.Lock()
+_boletos = {}   # Idempotency-Key -> boleto
+_opcoes = {"latencia_ms": 50, "taxa_falha": 0.0}
+_estatisticas = {"requisicoes": 0, "emitidos": 0, "repetidos": 0, "falhas": 0}
+
+@app.route('/v2/invoices', methods=['POST'])
+def criar_boleto():
+    data = request.get_json() or {}
+    chave = request.headers.get('Idempotency-Key') or str(uuid.uuid4())
+
+    time.sleep(_opcoes["latencia_ms"] / 1000 * random.uniform(0.5, 1.5))
+
+    with _lock:
+        _estatisticas["requisicoes"] += 1
+        if chave in _boletos:
+            _estatisticas["repetidos"] += 1
+            return jsonify(_boletos[chave]), 200
+
+        if random.random() < _opcoes["taxa_falha"]:
+            _estatisticas["falhas"] += 1
+            return jsonify({"errors": [{"code": "internal_error", "message": "Falha simulada"}]}), 503
+
+        if not data.get("services") or not data.get("payment_terms", {}).get("due_date"):
+            return jsonify({"errors": [{"code": "invalid_request", "message": "services e due_date são obrigatórios"}]}), 400
+
+        numero = f"{random.randint(0, 10 ** 44 - 1):044d}"
+        boleto_id = f"inv_{uuid.uuid4().hex[:20]}"
+        boleto = {
+            "id": boleto_id,
+            "code": data.get("code"),
+            "status": "OPEN",
+            "total_amount": sum(servico.get("amount", 0) for servico in data["services"]),
+            "customer": data.get("customer"),
+            "payment_terms": data["payment_terms"],
+            "payment_options": {
+                "bank_slip": {
+                    "barcode": numero,
+                    "digitable": f"{numero[:5]}.{numero[5:10]} {numero[10:15]}.{numero[15:21]} {numero[21:26]}.{numero[26:32]} {numero[32]} {numero[33:]}",
+                    "url": f"http://{request.host}/v2/invoices/{boleto_id}/pdf"
+                }
+            }
+        }
+        _boletos[chave] = boleto
+        _estatisticas["emitidos"] += 1
+        return jsonify(boleto), 201
+
+@app.route('/_admin/estatisticas', methods=['GET'])
+def estatisticas():
+    """Requisições recebidas, boletos emitidos, repetidos (idempotência) e falhas"""
+    with _lock:
+        return jsonify({**_estatisticas, "boletos": len(_boletos)}), 200
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--port', type=int, default=8082)
+    argumentos.add_argument('--latencia-ms', type=int, default=50)
+    argumentos.add_argument('--taxa-falha', type=float, default=0.0)
+    opcoes = argumentos.parse_args()
+    _opcoes["latencia_ms"] = opcoes.latencia_ms
+    _opcoes["taxa_falha"] = opcoes.taxa_falha
+    app.run(host=opcoes.host, port=opcoes.port, threaded=True)
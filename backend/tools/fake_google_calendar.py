@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Servidor falso da API do Google Agenda para desenvolvimento e testes locais
+
+Implementa o subconjunto usado pela sincronização (listagem paginada com
+syncToken/pageToken, eventos cancelados e resposta 410 para tokens
+expirados), além de criação/edição/remoção de eventos.
+
+Uso:
+    python tools/fake_google_calendar.py --port 8081
+    GOOGLE_CALENDAR_API_URL=http://localhost:8081 python worker.py
+"""
+import argparse
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+
+_lock = threading.Lock()
+_estado = {
+    "seq": 0,             # contador global de alterações
+    "token_minimo": 0,    # tokens emitidos antes disso respondem 410
+    "calendarios": {},    # calendario_id -> {evento_id: evento}
+    "itens_enviados": 0,
+    "requisicoes": 0
+}
+
+def _calendario(calendario_id):
+    return _estado["calendarios"].setdefault(calendario_id, {})
+
+def _registrar_alteracao(evento):
+    _estado["seq"] += 1
+    evento["_seq"] = _estado["seq"]
+    evento["updated"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def _publico(evento):
+    return {chave: valor for chave, valor in evento.items() if not chave.startswith("_")}
+
+def _erro(codigo, mensagem):
+    return jsonify({"error": {"code": codigo, "message": mensagem}}), codigo
+
+@app.route('/calendars/<calendario_id>/events', methods=['GET'])
+def listar_eventos(calendario_id):
+    max_results = min(int(request.args.get('maxResults', 250)), 2500)
+    sync_token = request.args.get('syncToken')
+    page_token = request.args.get('pageToken')
+
+    with _lock:
+        _estado["requisicoes"] += 1
+        eventos = _calendario(calendario_id)
+
+        if page_token:
+            # pageToken = "<desde>:<instantâneo>:<deslocamento>"
+            desde, instantaneo, deslocamento = (int(parte) for parte in page_token.split(":"))
+        else:
+            instantaneo, deslocamento = _estado["seq"], 0
+            if sync_token:
+                try:
+                    desde = int(sync_token.replace("tok-", ""))
+                except ValueError:
+                    return _erro(400, "Invalid sync token")
+                if desde < _estado["token_minimo"]:
+                    return _erro(410, "Sync token is no longer valid, a full sync is required.")
+            else:
+                desde = -1
+
+        if desde >= 0:
+            # Incremental: tudo que mudou, inclusive cancelados
+            selecionados = [e for e in eventos.values() if desde < e["_seq"] <= instantaneo]
+        else:
+            selecionados = [e for e in eventos.values() if e["_seq"] <= instantaneo and e.get("status") != "cancelled"]
+        selecionados.sort(key=lambda e: e["_seq"])
+
+        pagina = selecionados[deslocamento:deslocamento + max_results]
+        _estado["itens_enviados"] += len(pagina)
+
+        resposta = {"kind": "calendar#events", "items": [_publico(e) for e in pagina]}
+        if deslocamento + max_results < len(selecionados):
+            resposta["nextPageToken"] = f"{desde}:{instantaneo}:{deslocamento + max_results}"
+        else:
+            resposta["nextSyncToken"] = f"tok-{instantaneo}"
+        return jsonify(resposta), 200
+
+@app.route('/calendars/<calendario_id>/events', methods=['POST'])
+def criar_evento(calendario_id):
+    data = request.get_json() or {}
+    with _lock:
+        evento_id = data.get("id") or f"evt{_estado['seq'] + 1:08d}"
+        evento = {
+            "kind": "calendar#event",
+            "id": evento_id,
+            "status": "confirmed",
+            "summary": data.get("summary", ""),
+            "description": data.get("description", ""),
+            "location": data.get("location", ""),
+            "start": data.get("start", {}),
+            "end": data.get("end", {}),
+            "htmlLink": f"https://calendar.google.com/calendar/event?eid={evento_id}"
+        }
+        _registrar_alteracao(evento)
+        _calendario(calendario_id)[evento_id] = evento
+        return jsonify(_publico(evento)), 200
+
+@app.route('/calendars/<calendario_id>/events/<evento_id>', methods=['PATCH', 'PUT'])
+def atualizar_evento(calendario_id, evento_id):
+    data = request.get_json() or {}
+    with _lock:
+        evento = _calendario(calendario_id).get(evento_id)
+        if not evento or evento.get("status") == "cancelled":
+            return _erro(404, "Not Found")
+        for campo in ("summary", "description", "location", "start", "end"):
+            if campo in data:
+                evento[campo] = data[campo]
+        _registrar_alteracao(evento)
+        return jsonify(_publico(evento)), 200
+
+@app.route('/calendars/<calendario_id>/events/<evento_id>', methods=['DELETE'])
+def remover_evento(calendario_id, evento_id):
+    with _lock:
+        evento = _calendario(calendario_id).get(evento_id)
+        if not evento or evento.get("status") == "cancelled":
+            return _erro(410, "Resource has been deleted")
+        # Como no Google: o evento continua existindo como "cancelled" para a sincronização
+        evento["status"] = "cancelled"
+        _registrar_alteracao(evento)
+        return "", 204
+
+@app.route('/_admin/semear', methods=['POST'])
+def semear():
+    """Criar N eventos aleatórios (?quantidade=, ?calendario_id=)"""
+    quantidade = int(request.args.get('quantidade', 100))
+    calendario_id = request.args.get('calendario_id', 'primary')
+    base = datetime.now(timezone(timedelta(hours=-3))).replace(minute=0, second=0, microsecond=0)
+    with _lock:
+        eventos = _calendario(calendario_id)
+        for _ in range(quantidade):
+            inicio = base + timedelta(days=random.randint(-30, 90), hours=random.randint(-8, 8))
+            tipo = random.choice(["Visita", "Mudança", "Reunião"])
+            evento_id = f"evt{_estado['seq'] + 1:08d}"
+            evento = {
+                "kind": "calendar#event",
+                "id": evento_id,
+                "status": "confirmed",
+                "summary": f"{tipo} - Cliente {random.randint(1, 9999)}",
+                "location": f"Rua Exemplo, {random.randint(1, 999)}",
+                "start": {"dateTime": inicio.isoformat(), "timeZone": "America/Sao_Paulo"},
+                "end": {"dateTime": (inicio + timedelta(hours=2)).isoformat(), "timeZone": "America/Sao_Paulo"},
+                "htmlLink": f"https://calendar.google.com/calendar/event?eid={evento_id}"
+            }
+            _registrar_alteracao(evento)
+            eventos[evento_id] = evento
+    return jsonify({"criados": quantidade, "seq": _estado["seq"]}), 200
+
+@app.route('/_admin/expirar-tokens', methods=['POST'])
+def expirar_tokens():
+    """Invalidar todos os sync tokens emitidos até agora (próxima chamada recebe 410)"""
+    with _lock:
+        _estado["token_minimo"] = _estado["seq"] + 1
+    return jsonify({"token_minimo": _estado["token_minimo"]}), 200
+
+@app.route('/_admin/estatisticas', methods=['GET'])
+def estatisticas():
+    """Quantidade de requisições e de eventos transferidos"""
+    with _lock:
+        return jsonify({
+            "requisicoes": _estado["requisicoes"],
+            "itens_enviados": _estado["itens_enviados"],
+            "seq": _estado["seq"],
+            "eventos": {cal: len(eventos) for cal, eventos in _estado["calendarios"].items()}
+        }), 200
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--port', type=int, default=8081)
+    opcoes = argumentos.parse_args()
+    app.run(host=opcoes.host, port=opcoes.port, threaded=True)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Portal de licitações falso para desenvolvimento e testes locais do crawler
+
+Serve a listagem paginada em JSON (mais recentes primeiro pela última
+atualização) com ETag/Last-Modified e respostas 304 para requisições
+condicionais. Também conta requisições que desrespeitam o intervalo mínimo
+configurado (para verificar a política de cortesia do crawler).
+
+Uso:
+    python tools/fake_portal.py --port 8083 --intervalo-minimo-ms 200
+    curl -X POST localhost:8083/_admin/semear -d '{"quantidade": 500}' -H 'Content-Type: application/json'
+    Portal no monitoramento: {"nome": "Fake", "url": "http://localhost:8083/licitacoes", "intervalo_ms": 200}
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from flask import Flask, Response, jsonify, request
+
+app = Flask(__name__)
+
+_lock = threading.Lock()
+_licitacoes = {}   # numero -> licitação
+_opcoes = {"por_pagina": 20, "intervalo_minimo_ms": 0, "latencia_ms": 0}
+_estatisticas = {"requisicoes": 0, "respostas_304": 0, "itens_enviados": 0, "violacoes_intervalo": 0}
+_ultima_requisicao = {"momento": None}
+_relogio = {"ultimo": None}
+
+OBJETOS = [
+    "Contratação de empresa para serviços de mudança",
+    "Remoção e transporte de móveis e equipamentos",
+    "Aquisição de material de escritório",
+    "Serviços de guarda-móveis e armazenagem",
+    "Locação de veículos com motorista",
+    "Manutenção predial preventiva"
+]
+ORGAOS = ["Prefeitura de São Paulo", "Secretaria de Saúde - RJ", "Tribunal Regional", "Universidade Federal"]
+
+def _proximo_momento():
+    """Horário de atualização sempre crescente (um segundo à frente do anterior, se preciso)"""
+    agora = datetime.now(timezone.utc).replace(microsecond=0)
+    if _relogio["ultimo"] is not None and agora <= _relogio["ultimo"]:
+        agora = _relogio["ultimo"] + timedelta(seconds=1)
+    _relogio["ultimo"] = agora
+    return agora
+
+def _ordenadas():
+    return sorted(_licitacoes.values(), key=lambda item: (item["atualizado_em"], item["numero"]), reverse=True)
+
+@app.route('/licitacoes', methods=['GET'])
+def listar():
+    time.sleep(_opcoes["latencia_ms"] / 1000)
+    pagina = max(int(request.args.get('pagina', 1)), 1)
+    por_pagina = int(request.args.get('por_pagina', _opcoes["por_pagina"]))
+
+    with _lock:
+        agora = time.monotonic()
+        anterior = _ultima_requisicao["momento"]
+        if anterior is not None and (agora - anterior) * 1000 < _opcoes["intervalo_minimo_ms"] * 0.9:
+            _estatisticas["violacoes_intervalo"] += 1
+        _ultima_requisicao["momento"] = agora
+        _estatisticas["requisicoes"] += 1
+
+        todas = _ordenadas()
+        itens = todas[(pagina - 1) * por_pagina:pagina * por_pagina]
+        corpo = json.dumps({
+            "pagina": pagina,
+            "total_paginas": max((len(todas) + por_pagina - 1) // por_pagina, 1),
+            "licitacoes": itens
+        }, sort_keys=True)
+
+    etag = '"' + hashlib.sha256(corpo.encode()).hexdigest()[:32] + '"'
+    modificado = max((datetime.fromisoformat(item["atualizado_em"]) for item in itens), default=None)
+
+    nao_modificado = etag in request.headers.get('If-None-Match', '')
+    if not request.headers.get('If-None-Match') and modificado and request.headers.get('If-Modified-Since'):
+        try:
+            nao_modificado = modificado <= parsedate_to_datetime(request.headers['If-Modified-Since'])
+        except (TypeError, ValueError):
+            nao_modificado = False
+
+    headers = {"ETag": etag}
+    if modificado:
+        headers["Last-Modified"] = format_datetime(modificado, usegmt=True)
+    if nao_modificado:
+        with _lock:
+            _estatisticas["respostas_304"] += 1
+        return Response(status=304, headers=headers)
+
+    with _lock:
+        _estatisticas["itens_enviados"] += len(itens)
+    return Response(corpo, status=200, mimetype='application/json', headers=headers)
+
+@app.route('/_admin/semear', methods=['POST'])
+def semear():
+    """Criar licitações novas: {"quantidade": 100}"""
+    quantidade = int((request.get_json(silent=True) or {}).get('quantidade', 100))
+    with _lock:
+        inicio = len(_licitacoes)
+        for indice in range(inicio, inicio + quantidade):
+            numero = f"{indice + 1:05d}/2025"
+            atualizado_em = _proximo_momento()
+            abertura = atualizado_em + timedelta(days=random.randint(1, 30))
+            _licitacoes[numero] = {
+                "numero": numero,
+                "titulo": random.choice(OBJETOS),
+                "orgao": random.choice(ORGAOS),
+                "valor_estimado": round(random.uniform(10000, 500000), 2),
+                "data_abertura": abertura.isoformat(),
+                "data_limite": (abertura + timedelta(days=15)).isoformat(),
+                "status": "Aberta",
+                "url": f"http://{request.host}/licitacoes/{indice + 1}",
+                "descricao": random.choice(OBJETOS),
+                "atualizado_em": atualizado_em.isoformat()
+            }
+    return jsonify({"criadas": quantidade, "total": len(_licitacoes)}), 200
+
+@app.route('/_admin/alterar', methods=['POST'])
+def alterar():
+    """Alterar licitações existentes (status/valor), que sobem para o topo da listagem"""
+    quantidade = int((request.get_json(silent=True) or {}).get('quantidade', 5))
+    with _lock:
+        escolhidas = random.sample(list(_licitacoes.values()), min(quantidade, len(_licitacoes)))
+        for item in escolhidas:
+            item["status"] = random.choice(["Aberta", "Suspensa", "Encerrada"])
+            item["valor_estimado"] = round(item["valor_estimado"] * random.uniform(0.9, 1.1), 2)
+            item["atualizado_em"] = _proximo_momento().isoformat()
+    return jsonify({"alteradas": len(escolhidas)}), 200
+
+@app.route('/_admin/estatisticas', methods=['GET'])
+def estatisticas():
+    with _lock:
+        return jsonify({**_estatisticas, "licitacoes": len(_licitacoes)}), 200
+
+@app.route('/_admin/zerar-estatisticas', methods=['POST'])
+def zerar_estatisticas():
+    with _lock:
+        for chave in _estatisticas:
+            _estatisticas[chave] = 0
+    return jsonify(_estatisticas), 200
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--port', type=int, default=8083)
+    argumentos.add_argument('--por-pagina', type=int, default=20)
+    argumentos.add_argument('--intervalo-minimo-ms', type=int, default=0)
+    argumentos.add_argument('--latencia-ms', type=int, default=0)
+    opcoes = argumentos.parse_args()
+    _opcoes.update(por_pagina=opcoes.por_pagina, intervalo_minimo_ms=opcoes.intervalo_minimo_ms,
+                   latencia_ms=opcoes.latencia_ms)
+    app.run(host=opcoes.host, port=opcoes.port, threaded=True)
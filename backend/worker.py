@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+import os
+import sys
+import socket
+import threading
+import time
+
+# Adicionar o diretório pai ao path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from src.config import Config
+from src.main import app
+from src.database import get_db
+from src.models.arquivo import Arquivo
+from src.models.cliente_historico import ClienteHistorico
+from src.models.financeiro import FinanceiroRollup
+from src.models.guardamoveis import GuardaMoveis
+from src.models.lead import Lead
+from src.models.licitacao import LicitacaoResumo
+from src.services import contatos, crawler_licitacoes, dedupe_clientes, faturamento_guardamoveis, google_calendar, notificacoes, webhook_worker
+
+def varrer_duplicatas(worker_id):
+    """Varredura completa de clientes duplicados (fora do laço principal; reservada por lease entre réplicas)"""
+    try:
+        resumo = dedupe_clientes.executar_varredura(worker_id)
+        if resumo:
+            print(f"Varredura de clientes duplicados: {resumo}")
+    except Exception as e:
+        print(f"Erro na varredura de clientes duplicados: {e}")
+
+def faturar_pendentes(worker_id):
+    """Execuções de faturamento pendentes (fora do laço principal: uma chamada à Cora por box)"""
+    try:
+        while faturamento_guardamoveis.processar_pendente(worker_id):
+            pass
+    except Exception as e:
+        print(f"Erro no faturamento: {e}")
+
+if __name__ == '__main__':
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Worker iniciado: {worker_id}")
+
+    with app.app_context():
+        # Clientes antigos ainda com histórico/documentos embutidos no documento
+        while ClienteHistorico.migrar_arrays_legados():
+            pass
+
+        # Telefones/documentos antigos sem a forma canônica (E.164 / só dígitos)
+        while contatos.normalizar_existentes():
+            pass
+
+        # Clientes antigos sem chaves de bloqueio (deduplicação)
+        while dedupe_clientes.gerar_chaves_existentes():
+            pass
+
+        # Leads antigos sem chaves de deduplicação
+        while Lead.gerar_chaves_existentes():
+            pass
+
+        # Carga inicial dos rollups financeiros (depois disso são mantidos a cada escrita)
+        db = get_db()
+        if db.financeiro_rollups.estimated_document_count() == 0 and db.financeiro.estimated_document_count():
+            print(f"Rollups financeiros reconstruídos: {FinanceiroRollup.reconstruir()}")
+        if db.licitacoes_resumo.estimated_document_count() == 0 and db.licitacoes.estimated_document_count():
+            print(f"Resumo de licitações reconstruído: {LicitacaoResumo.reconstruir()}")
+
+        proxima_sincronizacao_agenda = 0
+        proxima_varredura_portais = 0
+        proxima_verificacao_solicitacoes = 0
+        proxima_varredura_duplicatas = 0
+        thread_varredura_duplicatas = None
+        proximo_faturamento = 0
+        thread_faturamento = None
+        proxima_atualizacao_boxes = 0
+        proxima_limpeza_arquivos = 0
+        while True:
+            # Cada etapa isolada: uma falha transitória do MongoDB/HTTP (AutoReconnect,
+            # NetworkTimeout...) é registrada e a etapa tenta de novo no próximo ciclo,
+            # sem derrubar webhooks e notificações junto
+
+            # Sincronização incremental do Google Agenda (apenas o que mudou)
+            if time.monotonic() >= proxima_sincronizacao_agenda:
+                proxima_sincronizacao_agenda = time.monotonic() + Config.GOOGLE_CALENDAR_SYNC_SECONDS
+                try:
+                    for resultado in google_calendar.sincronizar_todos():
+                        if "erro" in resultado:
+                            print(f"Erro ao sincronizar agenda {resultado['calendario_id']}: {resultado['erro']}")
+                except Exception as e:
+                    print(f"Erro na sincronização do Google Agenda: {e}")
+
+            # Busca pedida pela API (POST /licitacoes/buscar): antecipar a varredura dos portais
+            if time.monotonic() >= proxima_verificacao_solicitacoes:
+                proxima_verificacao_solicitacoes = time.monotonic() + 5
+                try:
+                    if crawler_licitacoes.reservar_solicitacao():
+                        proxima_varredura_portais = 0
+                except Exception as e:
+                    print(f"Erro ao verificar busca de licitações solicitada: {e}")
+
+            # Portais de licitação (requisições condicionais, só o que mudou é gravado)
+            if time.monotonic() >= proxima_varredura_portais:
+                proxima_varredura_portais = time.monotonic() + Config.LICITACOES_CRAWLER_SECONDS
+                try:
+                    for resultado in crawler_licitacoes.rastrear_todos():
+                        if "erro" in resultado:
+                            print(f"Erro ao rastrear portal {resultado['portal']}: {resultado['erro']}")
+                except Exception as e:
+                    print(f"Erro na varredura dos portais de licitação: {e}")
+
+            # Varredura completa de clientes duplicados (o cadastro já verifica cada cliente novo).
+            # Roda em thread própria para não atrasar webhooks/notificações; o agendamento fica no banco
+            if time.monotonic() >= proxima_varredura_duplicatas:
+                if thread_varredura_duplicatas is None or not thread_varredura_duplicatas.is_alive():
+                    thread_varredura_duplicatas = threading.Thread(
+                        target=varrer_duplicatas, args=(worker_id,), name="varredura-duplicatas", daemon=True
+                    )
+                    thread_varredura_duplicatas.start()
+                proxima_varredura_duplicatas = time.monotonic() + 60
+
+            # Status dos boxes muda com o tempo (reserva que começa, ocupação que termina)
+            if time.monotonic() >= proxima_atualizacao_boxes:
+                proxima_atualizacao_boxes = time.monotonic() + Config.GUARDA_MOVEIS_STATUS_SECONDS
+                try:
+                    atualizados = GuardaMoveis.atualizar_status_vencidos()
+                    if atualizados:
+                        print(f"Status de boxes recalculados: {atualizados}")
+                except Exception as e:
+                    print(f"Erro ao recalcular status dos boxes: {e}")
+
+            # Arquivos enviados e nunca vinculados (ou que perderam os vínculos)
+            if time.monotonic() >= proxima_limpeza_arquivos:
+                proxima_limpeza_arquivos = time.monotonic() + 3600
+                try:
+                    removidos = Arquivo.remover_orfaos()
+                    if removidos:
+                        print(f"Arquivos órfãos removidos: {removidos}")
+                except Exception as e:
+                    print(f"Erro ao remover arquivos órfãos: {e}")
+
+            # Faturamento mensal também em thread própria (a execução reservada é renovada a cada lote)
+            if time.monotonic() >= proximo_faturamento:
+                if thread_faturamento is None or not thread_faturamento.is_alive():
+                    thread_faturamento = threading.Thread(
+                        target=faturar_pendentes, args=(worker_id,), name="faturamento", daemon=True
+                    )
+                    thread_faturamento.start()
+                proximo_faturamento = time.monotonic() + 5
+
+            processados = 0
+            for nome, processar_lote in (
+                ("webhooks", webhook_worker.processar_lote),
+                ("notificações", notificacoes.processar_lote)
+            ):
+                try:
+                    processados += processar_lote(worker_id)
+                except Exception as e:
+                    print(f"Erro ao processar {nome}: {e}")
+
+            # Sem trabalho pendente (ou após erro): aguardar antes de consultar de novo
+            if not processados:
+                time.sleep(1)